@@ -18,7 +18,7 @@ from fastapi.openapi.utils import get_openapi
 from pydantic import BaseModel
 
 from api.utils.common import *
-from core.helper import decrypt_id
+from core.helper import decrypt_id, notify_workflow_scheduler
 from celery_app import asr, run_app
 from config import settings
 from core.database import redis
@@ -167,6 +167,7 @@ async def run(
             app_run_id = AppRuns().insert(app_run_data)
             Apps().increment_execution_times(app_id)
             Apps().commit()
+            notify_workflow_scheduler(app_run_id)
 
             # Run workflow
             result = await asyncio.to_thread(
@@ -18,6 +18,7 @@ from api.schema.user import *
 from api.utils.jwt import *
 from core.database import redis,SQLDatabase
 from api.utils.auth import get_uid_user_info,update_uid_language,set_current_language,set_current_user_id
+from api.utils.principal_cache import principal_cache
 from dateutil.relativedelta import relativedelta
 
 from config import settings
@@ -94,6 +95,7 @@ async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends
                 # Update Redis with new token
                 redis_expiry_seconds = ACCESS_TOKEN_EXPIRE_MINUTES * 60
                 redis.set(redis_key, access_token, ex=redis_expiry_seconds)
+            principal_cache.invalidate(user['id'])
     
     # Check if a valid token already exists in Redis
     redis_key = f"access_token:{user['id']}"
@@ -244,6 +246,7 @@ async def logout(current_user: TokenData = Depends(get_current_user), token: str
     else:
         redis_key = f"access_token:{current_user.uid}"
     redis.delete(redis_key)
+    principal_cache.invalidate(current_user.uid)
     
     return response_success("Successfully logged out")
 
@@ -771,6 +774,7 @@ async def switch_user_team(team_id: SwitchTeamId, userinfo: TokenData = Depends(
             # Update Redis with new token
             redis_expiry_seconds = ACCESS_TOKEN_EXPIRE_MINUTES * 60
             redis.set(token_redis_key, new_access_token, ex=redis_expiry_seconds)
+    principal_cache.invalidate(user_id)
     
     # Prepare response data
     response_data = {"team_id": team_id_value}
@@ -986,6 +990,7 @@ async def account_binding_with_three_parties(user_return_data: AccountBindingWit
                 'user_id':user_id
             }
         )
+        principal_cache.invalidate(have_user_id)
         msg_ok=get_language_content('binding_successful')
         return response_success({'msg':msg_ok})
 
@@ -1103,7 +1108,8 @@ async def cancel_third_party_binding(request_data: OpenidList, userinfo: TokenDa
             [{'column': 'id', 'value': user_id}],
             user_update_data
         )
-        
+        principal_cache.invalidate(user_id)
+
     return response_success({
         'msg': get_language_content('cancel_binding_successful'),
         'deleted_count': deleted_count
@@ -1426,6 +1432,7 @@ async def reset_password(reset_data: ResetPasswordData):
         SQLDatabase.close()
         
         if result:
+            principal_cache.invalidate(user['id'])
             # Password reset successful, delete verification data from Redis
             redis.delete(redis_key)
             
@@ -1615,6 +1622,7 @@ async def change_password(password_data: ChangePasswordData, userinfo: TokenData
         SQLDatabase.close()
         
         if result:
+            principal_cache.invalidate(uid)
             msg = get_language_content('password_changed_successfully')
             return response_success({
                 'msg': msg
@@ -1749,6 +1757,7 @@ async def switch_member_role(role_data: SwitchMemberRoleData, userinfo: TokenDat
             except Exception as e:
                 # Cache clearing failure should not affect the main process
                 print(f"Failed to clear user Redis cache: {e}")
+            principal_cache.invalidate(target_user_id)
             
             msg = get_language_content('member_role_switched_successfully')
             return response_success({
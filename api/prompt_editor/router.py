@@ -1,8 +1,6 @@
 import json
 import re
 import os
-import sys
-import importlib
 import subprocess
 from datetime import datetime
 from fastapi import APIRouter, HTTPException, Depends, Request, status
@@ -10,7 +8,7 @@ from fastapi.responses import HTMLResponse, RedirectResponse
 from pydantic import BaseModel
 
 # Import language pack related modules
-from languages import get_language_content, prompt_descriptions
+from languages import get_language_content, prompt_descriptions, reload_prompt_catalog
 # Import authentication modules
 from api.utils.jwt import get_current_user, TokenData, oauth2_scheme
 from api.utils.common import response_success, response_error
@@ -1138,9 +1136,8 @@ async def save_prompt(request: PromptUpdateRequest, current_user: TokenData = De
         with open(prompt_file_path, "w", encoding="utf-8") as f:
             f.write(new_content_file)
         
-        # Force reload the prompt module to get the latest content
-        if 'prompt' in sys.modules:
-            importlib.reload(sys.modules['prompt'])
+        # Reload the prompt catalog of this process; other processes pick up the change by watching prompt.py
+        reload_prompt_catalog()
         
         return {"status": "success", "message": f"Prompt {key} saved successfully to prompt.py"}
         
@@ -23,6 +23,8 @@ class NodeData(BaseModel):
     error: Optional[str] = None
     condition_id: Optional[str] = None
     outputs: Optional[Dict[str, Any]] = None
+    outputs_md: Optional[str] = None
+    file_list: Optional[List[Dict[str, Any]]] = None
     output_type: Optional[int] = None
     elapsed_time: Optional[float] = None
     prompt_tokens: Optional[int] = None
@@ -2,6 +2,7 @@ from pathlib import Path
 
 from fastapi import APIRouter, Depends
 from core.database.models import Suppliers, SupplierConfigurations, Models, ModelConfigurations, Users
+from core.llm.client_pool import invalidate_model_configs
 from api.utils.common import response_success, response_error
 from api.utils.jwt import get_current_user
 from api.schema.supplier import OperationResponse, SupplierRequest, SupplierListResponse, ModelSwitchRequest
@@ -193,6 +194,9 @@ async def supplier_authorize(supplier_request: SupplierRequest, userinfo: TokenD
             }
             column = [{'column': 'id', 'value': supplier_config['id']}]
             SupplierConfigurations().update(column, new_config)
+            # Commit before invalidating, so that no process reloads and caches the previous configuration
+            SupplierConfigurations().commit()
+            invalidate_model_configs()
     else:
         new_config = {
             'supplier_id': supplier_id,
@@ -1,4 +1,4 @@
-from datetime import date
+import hashlib
 from mimetypes import guess_type
 from fastapi import APIRouter, File
 from core.database.models import (
@@ -7,6 +7,7 @@ from core.database.models import (
 from api.utils.common import *
 from api.utils.jwt import *
 from api.schema.vector import *
+from core.file.content_store import get_temp_path, store_file
 from languages import get_language_content
 from config import settings
 
@@ -40,26 +41,23 @@ async def upload_file(file: UploadFile = File(...), chat_base_url: str = None, u
     if file.size > max_file_size:
         return response_error(get_language_content("api_upload_max_size"))
 
-    today = date.today()
-    today_path = project_root.joinpath(
-        'upload_files',
-        str(today.year),
-        str(today.month),
-        str(today.day)
-    )
-    today_path.mkdir(parents=True, exist_ok=True)
-    original_file_path = today_path.joinpath(filename)
-    new_file_path = original_file_path.with_stem(uuid4().hex)
-    with new_file_path.open('wb') as file_io:
+    # Files with the same content and extension are stored once
+    original_file_path = Path(filename)
+    temp_file_path = get_temp_path()
+    sha256 = hashlib.sha256()
+    with temp_file_path.open('wb') as file_io:
         while content := await file.read(1_048_576):
+            sha256.update(content)
             file_io.write(content)
+    content_hash = sha256.hexdigest()
     row = {
         'user_id': user_id,
         'name': original_file_path.stem,
-        'path': str(new_file_path.relative_to(project_root)).replace("\\", "/"),
+        'path': store_file(temp_file_path, content_hash, original_file_path.suffix),
         'size': file.size,
         'extension': original_file_path.suffix,
-        'mime_type': content_type
+        'mime_type': content_type,
+        'content_hash': content_hash
     }
     file_id = UploadFiles().insert(row)
     row['file_id'] = file_id
@@ -14,6 +14,7 @@ from api.utils.jwt import *
 from api.utils.common import *
 import hashlib
 from core.database.models.users import Users
+from api.utils.principal_cache import principal_cache
 from contextvars import ContextVar
 from languages import language_packs
 
@@ -230,6 +231,7 @@ def get_current_user_id() -> int:
 
 def set_current_language(user_id: int, language: str):
     redis.set("user_language:{}".format(user_id), language if language in language_packs else 'en')
+    principal_cache.invalidate(user_id)
 
 def get_current_language(uid:int = 0) -> str:
     if uid > 0:
@@ -238,13 +240,18 @@ def get_current_language(uid:int = 0) -> str:
         user_id = get_current_user_id()
         if user_id is None:
             return 'en'
+    user_language = principal_cache.get_language(user_id)
+    if user_language is not None:
+        return user_language
+    generation = principal_cache.get_generation()
     language_data = redis.get("user_language:{}".format(user_id))
     if language_data:
-        return language_data.decode('utf-8')
+        user_language = language_data.decode('utf-8')
     else:
         user_language = Users().get_user_language(user_id)
         redis.set("user_language:{}".format(user_id), user_language if user_language in language_packs else 'en')
-        return user_language
+    principal_cache.set_language(user_id, user_language, generation)
+    return user_language
 
 def authenticate_third_party_user(platform: str, openid: str, sundry: Union[str, int, None] = None, nickname: str = None, position: str = None,
                                   avatar: str = None, language: str = 'en', 
@@ -9,9 +9,13 @@ from fastapi import Depends, HTTPException, status
 from core.database import redis
 from core.database.models.users import Users
 from core.database.models.user_team_relations import UserTeamRelations
+from api.utils.principal_cache import principal_cache
+from log import Logger
 
 
 
+logger = Logger.get_logger('auth')
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/v1/auth/login")
 
 SECRET_KEY = settings.ACCESS_TOKEN_SECRET_KEY
@@ -65,7 +69,7 @@ def verify_token(token: str, credentials_exception):
         user_type: str = payload.get("user_type", "regular")
         
         if uid is None:
-            print(f"Problem with uid: {uid}")
+            logger.info('Problem with uid: %s', uid)
             raise credentials_exception
             
         # Get stored token from Redis based on user type
@@ -74,46 +78,50 @@ def verify_token(token: str, credentials_exception):
         else:
             redis_key = f"access_token:{uid}"
             
-        stored_token = redis.get(redis_key)
+        # Tokens verified recently are served from the principal cache without Redis and database lookups
+        if not principal_cache.is_verified(user_type, uid, token, team_id):
+            generation = principal_cache.get_generation()
+            stored_token = redis.get(redis_key)
 
-        user_info = Users().get_user_by_id(uid)
-        # Check if user exists
-        if not user_info:
-            print(f"User {uid} not found")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+            user_info = Users().get_user_by_id(uid)
+            # Check if user exists
+            if not user_info:
+                logger.info('User %s not found', uid)
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="User not found",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
 
-        if user_info['team_id']!= team_id:
-            user_info = UserTeamRelations().select_one(
-                columns="*",
-                conditions=[
-                    {"column": "user_id", "value": uid},
-                    {"column": "team_id", "value": team_id}
-                ]
-            )
+            if user_info['team_id']!= team_id:
+                user_info = UserTeamRelations().select_one(
+                    columns="*",
+                    conditions=[
+                        {"column": "user_id", "value": uid},
+                        {"column": "team_id", "value": team_id}
+                    ]
+                )
             
-            user_update_data = {
-                "team_id":team_id,
-                "role":user_info['role'],
-                "inviter_id":user_info['inviter_id'],
-                "role_id":user_info['role_id']
-            }
-            Users().update(
-                [{'column': 'id', 'value': uid}],
-                user_update_data
-            )
+                user_update_data = {
+                    "team_id":team_id,
+                    "role":user_info['role'],
+                    "inviter_id":user_info['inviter_id'],
+                    "role_id":user_info['role_id']
+                }
+                Users().update(
+                    [{'column': 'id', 'value': uid}],
+                    user_update_data
+                )
 
-        # Verify if token matches
-        if not stored_token or stored_token.decode('utf-8') != token:
-            print(f"Token mismatch for user {uid}")
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid or expired token",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+            # Verify if token matches
+            if not stored_token or stored_token.decode('utf-8') != token:
+                logger.info('Token mismatch for user %s', uid)
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Invalid or expired token",
+                    headers={"WWW-Authenticate": "Bearer"},
+                )
+            principal_cache.add_verified(user_type, uid, token, team_id, generation)
         token_data = TokenData(
             uid=uid,
             team_id=team_id,
@@ -0,0 +1,167 @@
+import os
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from config import settings
+from core.database import redis
+from log import Logger
+
+
+logger = Logger.get_logger('auth')
+
+class PrincipalCache:
+    """
+    An in-process cache of the verified access tokens and the languages of users, so that authenticating
+    a request needs no Redis or database round trip while its entries are fresh.
+
+    Entries expire after `ttl` seconds, and all entries of a user are dropped in every process when
+    an invalidation of the user is published on the invalidation channel, e.g. on logout, password change
+    or role change. Nothing is cached while the process is not subscribed to the channel,
+    so that no invalidation can be missed.
+    """
+
+    def __init__(self, ttl: int, max_size: int, channel: str):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.channel = channel
+        # (user type, user ID) -> (access token, team ID, expiry time)
+        self._principals: OrderedDict[Tuple[str, int], Tuple[str, int, float]] = OrderedDict()
+        # user ID -> (language, expiry time)
+        self._languages: OrderedDict[int, Tuple[str, float]] = OrderedDict()
+        # Incremented on every invalidation, so that values read before an invalidation are not cached after it
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._subscribed = threading.Event()
+        self._listener_pid: Optional[int] = None
+
+    def _ensure_listener(self) -> bool:
+        """
+        Starts the invalidation listener of this process if it is not running, e.g. after a fork.
+
+        :return: Whether the process is subscribed to the invalidation channel.
+        """
+        if self.ttl <= 0:
+            return False
+        pid = os.getpid()
+        if self._listener_pid != pid:
+            with self._lock:
+                if self._listener_pid != pid:
+                    self._subscribed = threading.Event()
+                    self._principals.clear()
+                    self._languages.clear()
+                    threading.Thread(target=self._listen, name='principal-cache-listener', daemon=True).start()
+                    self._listener_pid = pid
+        return self._subscribed.is_set()
+
+    def _listen(self) -> None:
+        subscribed = self._subscribed
+        while True:
+            pubsub = redis.pubsub()
+            try:
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    if message['type'] == 'subscribe':
+                        # Entries cached before the subscription may have missed invalidations
+                        self.clear()
+                        subscribed.set()
+                    elif message['type'] == 'message':
+                        self._drop(int(message['data']))
+            except Exception:
+                logger.exception('Principal cache invalidation listener disconnected')
+            finally:
+                subscribed.clear()
+                self.clear()
+                pubsub.close()
+            time.sleep(1)
+
+    def _drop(self, user_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            for user_type in ['regular', 'third_party']:
+                self._principals.pop((user_type, user_id), None)
+            self._languages.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._principals.clear()
+            self._languages.clear()
+
+    def is_verified(self, user_type: str, user_id: int, token: str, team_id: int) -> bool:
+        """
+        Checks whether the access token of a user has been verified recently for the team in its payload.
+        """
+        if not self._ensure_listener():
+            return False
+        key = (user_type, user_id)
+        with self._lock:
+            entry = self._principals.get(key)
+            if entry is None:
+                return False
+            if entry[2] <= time.monotonic():
+                del self._principals[key]
+                return False
+            return entry[0] == token and entry[1] == team_id
+
+    def get_generation(self) -> int:
+        """
+        Gets the invalidation generation, to be taken before reading the values to cache from Redis or the database.
+        """
+        return self._generation
+
+    def add_verified(self, user_type: str, user_id: int, token: str, team_id: int, generation: int) -> None:
+        """
+        Caches an access token that has just been verified against Redis and the database.
+        The token is not cached if an invalidation has happened since the generation was taken.
+        """
+        if not self._ensure_listener():
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._principals[(user_type, user_id)] = (token, team_id, time.monotonic() + self.ttl)
+            self._principals.move_to_end((user_type, user_id))
+            while len(self._principals) > self.max_size:
+                self._principals.popitem(last=False)
+
+    def get_language(self, user_id: int) -> Optional[str]:
+        if not self._ensure_listener():
+            return None
+        with self._lock:
+            entry = self._languages.get(user_id)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._languages[user_id]
+                return None
+            return entry[0]
+
+    def set_language(self, user_id: int, language: str, generation: int) -> None:
+        if not self._ensure_listener():
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._languages[user_id] = (language, time.monotonic() + self.ttl)
+            self._languages.move_to_end(user_id)
+            while len(self._languages) > self.max_size:
+                self._languages.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        """
+        Drops the cached access tokens and language of a user in this process and publishes the invalidation
+        to the other processes. Must be called whenever the access token, team, role, password, status or language
+        of a user changes.
+        """
+        self._drop(user_id)
+        if self.ttl > 0:
+            redis.publish(self.channel, user_id)
+
+principal_cache = PrincipalCache(
+    settings.PRINCIPAL_CACHE_TTL,
+    settings.PRINCIPAL_CACHE_SIZE,
+    settings.PRINCIPAL_INVALIDATION_CHANNEL
+)
@@ -25,6 +25,7 @@ from api.utils.jwt import *
 from api.schema.vector import *
 from config import *
 from core.dataset import DatasetManagement
+from core.file.content_store import release_file
 logger = Logger.get_logger('vector')
 router = APIRouter()
 
@@ -216,7 +217,7 @@ async def add_document(data: AddDocumentSchema, userinfo: TokenData = Depends(ge
                 file_path=str(project_root.joinpath(file['path'])),
                 text_split_config=text_split_config
             )
-            word_count, num_tokens, indexing_latency = result
+            word_count, num_tokens, indexing_latency, _ = result
             Documents().update(
                 [
                     {'column': 'id', 'value': document_id},
@@ -321,9 +322,7 @@ async def delete_document(document_id: int, userinfo: TokenData = Depends(get_cu
         Documents().soft_delete({'column': 'id', 'value': document_id})
         path = Documents().get_file_path_by_id(document_id)
         if path:
-            file_path = project_root.joinpath(path)
-            if file_path.exists():
-                file_path.unlink()
+            release_file(path)
         return response_success({}, get_language_content("api_vector_success"))
     except Exception as e:
         msg = str(e)
@@ -350,16 +349,15 @@ async def delete_dataset(app_id: int, userinfo: TokenData = Depends(get_current_
         if indexing_status_dataset_data:
             return response_error(get_language_content("api_vector_indexing"))
         DatasetManagement.delete_dataset(dataset_id)
+        # Only the files of the documents that are not deleted yet are released, once per upload file
+        file_path_list = Documents().get_document_file_path_list(dataset_id)
         Documents().soft_delete({'column': 'dataset_id', 'value': dataset_id})
         Datasets().soft_delete({'column': 'id', 'value': dataset_id})
         Apps().soft_delete({'column': 'id', 'value': app_id})
         AgentDatasetRelation().delete({'column': 'dataset_id', 'value': dataset_id})
-        file_path_list = Documents().get_document_file_path_list(dataset_id)
         for path in file_path_list:
             if path and path.get('path'):
-                file_path = project_root.joinpath(path['path'])
-                if file_path.is_file():
-                    file_path.unlink()
+                release_file(path['path'])
         return response_success({}, get_language_content("api_vector_success"))
     except Exception as e:
         msg = str(e)
@@ -751,8 +749,11 @@ async def dataset_set(
     user_id = userinfo.uid
     team_id = userinfo.team_id
     try:
-        dataset_id = Datasets().get_dataset_id(app_id, user_id, 'api_vector_auth', check_is_reindexing=True)
+        dataset_id = Datasets().get_dataset_id(app_id, user_id, 'api_vector_auth')
         datasets_data = Datasets().get_dataset_by_id(dataset_id)
+        is_reindexing = Datasets.is_reindexing(datasets_data)
+        if is_reindexing and DatasetManagement.is_reindexing_running(dataset_id):
+            return response_error(get_language_content("api_vector_indexing"))
         conditions = [
             {'column': 'id', 'value': datasets_data['app_id']},
         ]
@@ -766,7 +767,9 @@ async def dataset_set(
             {'name': name, 'description': description, 'is_public': public}
         )
 
-        if datasets_data['embedding_model_config_id'] != embeddings_config_id:
+        # An interrupted reindexing is resumed with the same embedding model, replaced with another one,
+        # or discarded with the current one
+        if is_reindexing or datasets_data['embedding_model_config_id'] != embeddings_config_id:
             reindex_dataset.delay(dataset_id, embeddings_config_id)
         return response_success({}, get_language_content("api_vector_success"))
     except Exception as e:
@@ -5,10 +5,12 @@ from api.schema.node import *
 from core.database.models import (AppNodeExecutions, AppRuns, UploadFiles)
 from core.workflow import (
     create_variable_from_dict,
-    create_context_from_dict,
+    save_node_context,
     flatten_variable_with_values,
+    get_first_variable_value,
     replace_value_in_variable_with_new_value
 )
+from core.workflow.recursive_task import create_recursive_task_category_from_dict
 from core.workflow.nodes import create_node_from_dict, llm_correctable_node_types
 from languages import get_language_content
 from datetime import datetime
@@ -16,6 +18,7 @@ import json
 from copy import deepcopy
 
 from celery_app import import_output_variable_to_knowledge_base
+from core.helper import notify_workflow_scheduler
 
 router = APIRouter()
 node_model = AppNodeExecutions()
@@ -72,6 +75,14 @@ async def get_node_by_id(exec_id: int, userinfo: TokenData = Depends(get_current
     if outputs := result['data'].get('outputs'):
         outputs = create_variable_from_dict(outputs)
         result['data']['outputs'] = flatten_variable_with_values(outputs)
+        # Same as the node debug websocket message, whose large outputs are fetched from here
+        if result['data']['node_type'] in ['llm', 'agent']:
+            result['data']['outputs_md'] = get_first_variable_value(outputs)
+        elif result['data']['node_type'] in ['recursive_task_generation', 'recursive_task_execution']:
+            task_dict = json.loads(get_first_variable_value(outputs))
+            result['data']['outputs_md'] = create_recursive_task_category_from_dict(task_dict).to_markdown()
+        elif result['data']['node_type'] in ['skill', 'custom_code', 'end', 'tool']:
+            result['data']['file_list'] = extract_file_list_from_skill_output(result['data']['outputs'], result['data']['node_graph']['data']['output'])
 
     if result["data"]["correct_prompt"]:
         result["data"]["correct_llm_history"] = node_model.get_correct_llm_history(result["data"]["app_run_id"], result["data"]["level"], result["data"]["edge_id"])
@@ -127,6 +138,9 @@ async def node_update(exec_id: int, data: ReqNodeUpdateSchema, userinfo: TokenDa
             app_run_update_res = app_run_model.update({"column": "id", "value": node_info['app_run_id']}, {"status": 1, "need_human_confirm": 0})
             if not app_run_update_res:
                 return response_error("app run update error")
+            # Commit before notifying so the workflow scheduler can see the updated app run
+            app_run_model.commit()
+            notify_workflow_scheduler(node_info['app_run_id'])
 
         return response_success({"exec_id": exec_id})
     else:
@@ -143,10 +157,8 @@ async def node_update(exec_id: int, data: ReqNodeUpdateSchema, userinfo: TokenDa
                 human_node_for_context = create_node_from_dict(node_info['node_graph'])
                 human_node_for_node_update = deepcopy(human_node_for_context)
                 human_node_for_context.data['input'] = human_node_for_context.data['output'] = human_input_var
-                context = create_context_from_dict(node_info['context'])
-                context.add_node(node_info['level'], human_node_for_context)
+                save_node_context(node_info['app_run_id'], node_info['level'], human_node_for_context)
                 human_node_for_node_update.data['knowledge_base_mapping'] = knowledge_base_mapping if knowledge_base_mapping else {}
-                app_run_update_data['context'] = context.to_dict()
 
                 # update node
                 node_update_data = {
@@ -211,9 +223,7 @@ async def node_update(exec_id: int, data: ReqNodeUpdateSchema, userinfo: TokenDa
                 node_for_context_updated = deepcopy(node_for_context)
                 node_for_importing_to_kb = deepcopy(node_for_context)
                 node_for_context.data['output'] = variable
-                context = create_context_from_dict(node_info['context'])
-                context.add_node(node_info['level'], node_for_context)
-                app_run_update_data['context'] = context.to_dict()
+                save_node_context(node_info['app_run_id'], node_info['level'], node_for_context)
 
                 new_node_data = {
                     "workflow_id": node_info['workflow_id'],
@@ -282,5 +292,8 @@ async def node_update(exec_id: int, data: ReqNodeUpdateSchema, userinfo: TokenDa
             app_run_update_res = app_run_model.update({"column": "id", "value": node_info['app_run_id']}, app_run_update_data)
             if not app_run_update_res:
                 return response_error("app run update error")
+            # Commit before notifying so the workflow scheduler can see the updated app run
+            app_run_model.commit()
+            notify_workflow_scheduler(node_info['app_run_id'])
             
         return response_success({"exec_id": exec_id})
\ No newline at end of file
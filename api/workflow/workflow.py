@@ -22,6 +22,7 @@ from core.database.models.app_node_user_relation import AppNodeUserRelation
 from core.workflow import *
 from pydantic import BaseModel, Field
 from core.database import redis
+from core.helper import notify_workflow_scheduler
 from core.workflow.nodes import create_node_from_dict
 from fastapi.responses import HTMLResponse
 
@@ -327,6 +328,10 @@ async def update_app_run_paused(data: AppRunPauseSchema, userinfo: TokenData = D
         {"column": "id", "value": data.app_run_id},
         {"paused": data.paused}
     )
+    if data.paused == 0:
+        # Commit before notifying so the workflow scheduler can see the resumed app run
+        app_runs_model.commit()
+        notify_workflow_scheduler(data.app_run_id)
     
     # Return success message with appropriate language pack message
     success_message = get_language_content("app_run_pause_success" if data.paused == 1 else "app_run_resume_success")
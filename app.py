@@ -35,6 +35,7 @@ from sqlalchemy.engine import Engine
 from config import settings
 from log import Logger
 from api.chatroom.chatroom_api import router as chatroom_api_router
+from core.tool.sandbox_tool_registry import sandbox_tool_registry
 
 original_uvicorn_is_alive = uvicorn.supervisors.multiprocess.Process.is_alive
 def patched_is_alive(self) -> bool:
@@ -101,6 +102,11 @@ app.include_router(scheduled_tasks_router, prefix='/v1/scheduled_tasks', tags=["
 app.include_router(chatroom_api_router, prefix='/v1/chatroom-api', tags=["chatroom-api"])
 app.include_router(third_party_router, prefix='/v1/third-party', tags=["third-party"])
 
+# Load the sandbox tool registry before serving tool listings
+@app.on_event("startup")
+async def load_sandbox_tool_registry():
+    await asyncio.to_thread(sandbox_tool_registry.load)
+
 
 
 if __name__ == "__main__":
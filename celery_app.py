@@ -6,16 +6,21 @@ from datetime import datetime
 from time import time
 from typing import List, Dict, Any, Literal, Optional
 from celery import Celery
+from celery.signals import task_postrun, worker_process_init
 
 from config import settings
 from core.database.models import Models, Agents, AppNodeExecutions, AppRuns, Apps, CustomTools, NonLLMRecords, UploadFiles, Workflows
 from core.dataset import DatasetManagement, DatasetRetrieval
+from core.helper import notify_workflow_scheduler, notify_workflow_task_done
+from core.memory import AgentChatMemory
 from core.speech_recognition import SpeechRecognition
+from core.tool.sandbox_tool_registry import sandbox_tool_registry
 from core.workflow import (
     ObjectVariable,
     create_variable_from_dict,
     Context,
     create_context_from_dict,
+    load_context,
     create_recursive_task_category_from_dict,
     flatten_variable_with_values,
     get_first_variable_value
@@ -24,7 +29,7 @@ from core.workflow.nodes import AgentNode, LLMNode, SkillNode, create_node_from_
 from core.workflow.nodes.base.import_to_kb_base import ImportToKBBaseNode
 from core.llm.prompt import create_prompt_from_dict
 from languages import get_language_content
-from log import Logger
+from log import Logger, log_context_scope
 
 redis_url = f'redis://:{settings.REDIS_PASSWORD}@{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}'
 
@@ -32,6 +37,12 @@ redis_url = f'redis://:{settings.REDIS_PASSWORD}@{settings.REDIS_HOST}:{settings
 celery_app = Celery('celery_app', broker=redis_url, backend=redis_url)
 
 
+# Load the sandbox tool registry in each worker process before running tool nodes
+@worker_process_init.connect
+def load_sandbox_tool_registry(**_):
+    sandbox_tool_registry.load()
+
+
 # Define a Celery task to run a workflow node
 # This task takes two dictionaries and additional keyword arguments:
 # - node_dict: A dictionary representing a node
@@ -43,8 +54,14 @@ def run_workflow_node(
         **kwargs
 ) -> Dict[str, Any]:
     context_dict = kwargs.pop('context_dict', None)
+    context_node_ids = kwargs.pop('context_node_ids', None)
     if context_dict:
         kwargs['context'] = create_context_from_dict(context_dict)
+    elif context_node_ids:
+        # Only fetch the context records of the ancestor nodes
+        context = load_context(kwargs['app_run_id'], kwargs['level'], context_node_ids)
+        if context.records:
+            kwargs['context'] = context
 
     task = kwargs['task']
     if task:
@@ -53,8 +70,19 @@ def run_workflow_node(
 
     user_id = kwargs.get('user_id', 0)
     os.environ['ACTUAL_USER_ID'] = str(user_id)
+    kwargs.pop('scheduler_id', None)
+
+    node = create_node_from_dict(node_dict)
+    with log_context_scope(app_run_id=kwargs.get('app_run_id'), node_id=node.id):
+        return node.run(**kwargs)
+
 
-    return create_node_from_dict(node_dict).run(**kwargs)
+# Notify the workflow scheduler once a workflow node task has finished
+# The signal is sent after the task result has been stored in the result backend,
+# so the scheduler can fetch the result as soon as it receives the notification
+@task_postrun.connect(sender=run_workflow_node)
+def notify_workflow_node_done(task_id: str, kwargs: Dict[str, Any], **_):
+    notify_workflow_task_done(task_id, kwargs.get('scheduler_id'))
 
 
 @celery_app.task
@@ -251,9 +279,18 @@ def run_node(
     return result
 
 
+# The task is acknowledged after it has finished, so it is redelivered and resumed from its checkpoints
+# if the worker is lost. While the lock of the lost worker has not expired, or another worker is still reindexing,
+# the task is retried once the lock would have expired, until the dataset uses the new embedding model
+@celery_app.task(bind=True, acks_late=True, reject_on_worker_lost=True, max_retries=None)
+def reindex_dataset(self, dataset_id: int, new_embeddings_config_id: int):
+    if not DatasetManagement.reindex_dataset(dataset_id, new_embeddings_config_id):
+        raise self.retry(countdown=settings.DATASET_REINDEX_LOCK_TTL)
+
+
 @celery_app.task
-def reindex_dataset(dataset_id: int, new_embeddings_config_id: int):
-    DatasetManagement.reindex_dataset(dataset_id, new_embeddings_config_id)
+def build_lexical_index(dataset_id: int):
+    DatasetManagement.build_lexical_index(dataset_id)
 
 
 @celery_app.task
@@ -278,6 +315,7 @@ def import_output_variable_to_knowledge_base(
         {'column': 'id', 'value': app_run_id},
         {'need_human_confirm': 0}
     )
+    notify_workflow_scheduler(app_run_id)
 
 
 @celery_app.task
@@ -309,6 +347,11 @@ def run_llm_tool(
         ai_tool.schema_key = "generate_workflow_node_system_prompt"
     return ai_tool.run(app_run_id=app_run_id, return_json=return_json, correct_llm_output=correct_llm_output)
 
+@celery_app.task
+def summarize_agent_chat_memory(user_id: int, agent_id: int, last_message_id: int, model_config_id: int) -> bool:
+    os.environ['ACTUAL_USER_ID'] = str(user_id)
+    return AgentChatMemory(user_id, agent_id).summarize(last_message_id, model_config_id)
+
 @celery_app.task
 def asr(user_id: int, team_id: int, file_id: int, chatroom_id: int = 0) -> str:
     file_data = UploadFiles().get_file_by_id(file_id)
@@ -11,6 +11,9 @@ class Settings(BaseSettings):
     MYSQL_USER: str = os.environ.get('MYSQL_USER', os.getenv('MYSQL_USER'))
     MYSQL_PASSWORD: str = os.environ.get('MYSQL_PASSWORD', os.getenv('MYSQL_PASSWORD'))
     MYSQL_DB: str = os.environ.get('MYSQL_DB', os.getenv('MYSQL_DB'))
+    TABLE_SCHEMA_CHECK_INTERVAL: int = int(
+        os.environ.get('TABLE_SCHEMA_CHECK_INTERVAL', os.getenv('TABLE_SCHEMA_CHECK_INTERVAL', 30)))
+    QUERY_CACHE_SIZE: int = int(os.environ.get('QUERY_CACHE_SIZE', os.getenv('QUERY_CACHE_SIZE', 1024)))
 
     REDIS_HOST: str = os.environ.get('REDIS_HOST', os.getenv('REDIS_HOST'))
     REDIS_PORT: int = int(os.environ.get('REDIS_PORT', os.getenv('REDIS_PORT', 6379)))
@@ -18,12 +21,90 @@ class Settings(BaseSettings):
     REDIS_PASSWORD: str = os.environ.get('REDIS_PASSWORD', os.getenv('REDIS_PASSWORD'))
     WEBSOCKET_MESSAGE_QUEUE_KEY: str = os.environ.get('WEBSOCKET_MESSAGE_QUEUE_KEY',
                                                       os.getenv('WEBSOCKET_MESSAGE_QUEUE_KEY'))
+    WEBSOCKET_MESSAGE_CHANNEL_PREFIX: str = os.environ.get('WEBSOCKET_MESSAGE_CHANNEL_PREFIX',
+                                                           os.getenv('WEBSOCKET_MESSAGE_CHANNEL_PREFIX', 'websocket_messages'))
+    WEBSOCKET_MESSAGE_BATCH_SIZE: int = int(
+        os.environ.get('WEBSOCKET_MESSAGE_BATCH_SIZE', os.getenv('WEBSOCKET_MESSAGE_BATCH_SIZE', 100)))
+    WORKFLOW_SCHEDULE_QUEUE_KEY: str = os.environ.get('WORKFLOW_SCHEDULE_QUEUE_KEY',
+                                                      os.getenv('WORKFLOW_SCHEDULE_QUEUE_KEY', 'workflow_schedule_queue'))
+    WORKFLOW_TASK_DONE_QUEUE_KEY: str = os.environ.get('WORKFLOW_TASK_DONE_QUEUE_KEY',
+                                                       os.getenv('WORKFLOW_TASK_DONE_QUEUE_KEY', 'workflow_task_done_queue'))
+    WORKFLOW_RECONCILE_INTERVAL: int = int(
+        os.environ.get('WORKFLOW_RECONCILE_INTERVAL', os.getenv('WORKFLOW_RECONCILE_INTERVAL', 5)))
+    WORKFLOW_RUN_LEASE_TTL: int = int(
+        os.environ.get('WORKFLOW_RUN_LEASE_TTL', os.getenv('WORKFLOW_RUN_LEASE_TTL', 30)))
+    WORKFLOW_MESSAGE_FLUSH_INTERVAL: float = float(
+        os.environ.get('WORKFLOW_MESSAGE_FLUSH_INTERVAL', os.getenv('WORKFLOW_MESSAGE_FLUSH_INTERVAL', 0.2)))
+    WORKFLOW_DEBUG_MESSAGE_MAX_DETAILS_SIZE: int = int(
+        os.environ.get('WORKFLOW_DEBUG_MESSAGE_MAX_DETAILS_SIZE', os.getenv('WORKFLOW_DEBUG_MESSAGE_MAX_DETAILS_SIZE', 65536)))
 
     VDB_TYPE: str = os.environ.get('VDB_TYPE', os.getenv('VDB_TYPE'))
     VDB_HOST: str = os.environ.get('VDB_HOST', os.getenv('VDB_HOST'))
     VDB_PORT: int = int(os.environ.get('VDB_PORT', os.getenv('VDB_PORT', 19530)))
     VDB_USER: str = os.environ.get('VDB_USER', os.getenv('VDB_USER'))
     VDB_PASSWORD: str = os.environ.get('VDB_PASSWORD', os.getenv('VDB_PASSWORD'))
+    VDB_HANDLE_CACHE_SIZE: int = int(
+        os.environ.get('VDB_HANDLE_CACHE_SIZE', os.getenv('VDB_HANDLE_CACHE_SIZE', 64)))
+    VDB_HANDLE_CACHE_TTL: int = int(
+        os.environ.get('VDB_HANDLE_CACHE_TTL', os.getenv('VDB_HANDLE_CACHE_TTL', 600)))
+    MODEL_HANDLE_CACHE_SIZE: int = int(
+        os.environ.get('MODEL_HANDLE_CACHE_SIZE', os.getenv('MODEL_HANDLE_CACHE_SIZE', 32)))
+    MODEL_HANDLE_CACHE_TTL: int = int(
+        os.environ.get('MODEL_HANDLE_CACHE_TTL', os.getenv('MODEL_HANDLE_CACHE_TTL', 600)))
+    TOKEN_COUNT_CACHE_SIZE: int = int(
+        os.environ.get('TOKEN_COUNT_CACHE_SIZE', os.getenv('TOKEN_COUNT_CACHE_SIZE', 10000)))
+    LLM_CLIENT_POOL_SIZE: int = int(
+        os.environ.get('LLM_CLIENT_POOL_SIZE', os.getenv('LLM_CLIENT_POOL_SIZE', 64)))
+    LLM_CLIENT_POOL_TTL: int = int(
+        os.environ.get('LLM_CLIENT_POOL_TTL', os.getenv('LLM_CLIENT_POOL_TTL', 3600)))
+    LLM_CLIENT_KEEPALIVE_EXPIRY: float = float(
+        os.environ.get('LLM_CLIENT_KEEPALIVE_EXPIRY', os.getenv('LLM_CLIENT_KEEPALIVE_EXPIRY', 60)))
+    MODEL_CONFIG_CHECK_INTERVAL: int = int(
+        os.environ.get('MODEL_CONFIG_CHECK_INTERVAL', os.getenv('MODEL_CONFIG_CHECK_INTERVAL', 5)))
+    MEMORY_WINDOW_TOKENS: int = int(
+        os.environ.get('MEMORY_WINDOW_TOKENS', os.getenv('MEMORY_WINDOW_TOKENS', 0)))
+    MEMORY_PAGE_SIZE: int = int(
+        os.environ.get('MEMORY_PAGE_SIZE', os.getenv('MEMORY_PAGE_SIZE', 50)))
+    MEMORY_SUMMARY_MIN_TOKENS: int = int(
+        os.environ.get('MEMORY_SUMMARY_MIN_TOKENS', os.getenv('MEMORY_SUMMARY_MIN_TOKENS', 4000)))
+    MEMORY_SUMMARY_MAX_INPUT_TOKENS: int = int(
+        os.environ.get('MEMORY_SUMMARY_MAX_INPUT_TOKENS', os.getenv('MEMORY_SUMMARY_MAX_INPUT_TOKENS', 32000)))
+
+    DATASET_EMBEDDING_BATCH_SIZE: int = int(
+        os.environ.get('DATASET_EMBEDDING_BATCH_SIZE', os.getenv('DATASET_EMBEDDING_BATCH_SIZE', 32)))
+    DATASET_EMBEDDING_BATCH_MAX_TOKENS: int = int(
+        os.environ.get('DATASET_EMBEDDING_BATCH_MAX_TOKENS', os.getenv('DATASET_EMBEDDING_BATCH_MAX_TOKENS', 30000)))
+    DATASET_INDEXING_CONCURRENCY: int = int(
+        os.environ.get('DATASET_INDEXING_CONCURRENCY', os.getenv('DATASET_INDEXING_CONCURRENCY', 4)))
+    DATASET_INDEXING_MAX_RETRIES: int = int(
+        os.environ.get('DATASET_INDEXING_MAX_RETRIES', os.getenv('DATASET_INDEXING_MAX_RETRIES', 3)))
+    DATASET_SEARCH_CONCURRENCY: int = int(
+        os.environ.get('DATASET_SEARCH_CONCURRENCY', os.getenv('DATASET_SEARCH_CONCURRENCY', 8)))
+    DATASET_RERANK_MAX_CANDIDATES: int = int(
+        os.environ.get('DATASET_RERANK_MAX_CANDIDATES', os.getenv('DATASET_RERANK_MAX_CANDIDATES', 100)))
+    DATASET_RETRIEVAL_BACKGROUND_WRITES: int = int(
+        os.environ.get('DATASET_RETRIEVAL_BACKGROUND_WRITES', os.getenv('DATASET_RETRIEVAL_BACKGROUND_WRITES', 1)))
+    DATASET_HYBRID_SEARCH: int = int(
+        os.environ.get('DATASET_HYBRID_SEARCH', os.getenv('DATASET_HYBRID_SEARCH', 1)))
+    DATASET_LEXICAL_INDEX_PATH: str = os.environ.get('DATASET_LEXICAL_INDEX_PATH',
+                                                     os.getenv('DATASET_LEXICAL_INDEX_PATH', 'lexical_index'))
+    DATASET_LEXICAL_INDEX_LOCK_TTL: int = int(
+        os.environ.get('DATASET_LEXICAL_INDEX_LOCK_TTL', os.getenv('DATASET_LEXICAL_INDEX_LOCK_TTL', 3600)))
+    DATASET_LEXICAL_SEARCH_TIMEOUT: float = float(
+        os.environ.get('DATASET_LEXICAL_SEARCH_TIMEOUT', os.getenv('DATASET_LEXICAL_SEARCH_TIMEOUT', 2)))
+    DATASET_RRF_K: int = int(
+        os.environ.get('DATASET_RRF_K', os.getenv('DATASET_RRF_K', 60)))
+    DATASET_REINDEX_CHUNK_SIZE: int = int(
+        os.environ.get('DATASET_REINDEX_CHUNK_SIZE', os.getenv('DATASET_REINDEX_CHUNK_SIZE', 1000)))
+    DATASET_REINDEX_LOCK_TTL: int = int(
+        os.environ.get('DATASET_REINDEX_LOCK_TTL', os.getenv('DATASET_REINDEX_LOCK_TTL', 600)))
+
+    UPLOAD_OBJECT_LOCK_TTL: int = int(
+        os.environ.get('UPLOAD_OBJECT_LOCK_TTL', os.getenv('UPLOAD_OBJECT_LOCK_TTL', 60)))
+    FILE_ARTIFACT_CACHE_PATH: str = os.environ.get('FILE_ARTIFACT_CACHE_PATH',
+                                                   os.getenv('FILE_ARTIFACT_CACHE_PATH', 'cache/file_artifacts'))
+    FILE_HASH_CACHE_SIZE: int = int(
+        os.environ.get('FILE_HASH_CACHE_SIZE', os.getenv('FILE_HASH_CACHE_SIZE', 10000)))
 
     RETRIEVER_TYPE: str = os.environ.get('RETRIEVER_TYPE', os.getenv('RETRIEVER_TYPE'))
     RETRIEVER_K: int = int(os.environ.get('RETRIEVER_K', os.getenv('RETRIEVER_K', 4)))
@@ -33,11 +114,23 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_SECRET_KEY: str = os.environ.get('ACCESS_TOKEN_SECRET_KEY', os.getenv('ACCESS_TOKEN_SECRET_KEY'))
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(
         os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', 60)))
+    PRINCIPAL_CACHE_TTL: int = int(os.environ.get('PRINCIPAL_CACHE_TTL', os.getenv('PRINCIPAL_CACHE_TTL', 30)))
+    PRINCIPAL_CACHE_SIZE: int = int(os.environ.get('PRINCIPAL_CACHE_SIZE', os.getenv('PRINCIPAL_CACHE_SIZE', 10000)))
+    PRINCIPAL_INVALIDATION_CHANNEL: str = os.environ.get('PRINCIPAL_INVALIDATION_CHANNEL',
+                                                         os.getenv('PRINCIPAL_INVALIDATION_CHANNEL', 'principal_invalidation'))
 
     APP_API_TIMEOUT: int = int(os.environ.get('APP_API_TIMEOUT', os.getenv('APP_API_TIMEOUT', 60)))
 
     LOG_ROTATE_INTERVAL: int = int(os.environ.get('LOG_ROTATE_INTERVAL', os.getenv('LOG_ROTATE_INTERVAL', 6)))
     LOG_BACKUP_COUNT: int = int(os.environ.get('LOG_BACKUP_COUNT', os.getenv('LOG_BACKUP_COUNT', 40)))
+    LOG_LEVEL: str = os.environ.get('LOG_LEVEL', os.getenv('LOG_LEVEL', 'DEBUG'))
+    LOG_LEVELS: str = os.environ.get('LOG_LEVELS', os.getenv('LOG_LEVELS', ''))
+    LOG_FORMAT: str = os.environ.get('LOG_FORMAT', os.getenv('LOG_FORMAT', 'text'))
+    LOG_QUEUE_SIZE: int = int(os.environ.get('LOG_QUEUE_SIZE', os.getenv('LOG_QUEUE_SIZE', 10000)))
+    LOG_QUEUE_FULL_POLICY: str = os.environ.get('LOG_QUEUE_FULL_POLICY', os.getenv('LOG_QUEUE_FULL_POLICY', 'drop'))
+    LOG_RATE_LIMIT: int = int(os.environ.get('LOG_RATE_LIMIT', os.getenv('LOG_RATE_LIMIT', 100)))
+    LOG_RATE_LIMIT_INTERVAL: float = float(
+        os.environ.get('LOG_RATE_LIMIT_INTERVAL', os.getenv('LOG_RATE_LIMIT_INTERVAL', 10)))
 
     HTTP_CONNECT_TIMEOUT: int = int(os.environ.get('HTTP_CONNECT_TIMEOUT', os.getenv('HTTP_CONNECT_TIMEOUT', 300)))
     HTTP_READ_TIMEOUT: int = int(os.environ.get('HTTP_READ_TIMEOUT', os.getenv('HTTP_READ_TIMEOUT', 600)))
@@ -52,6 +145,13 @@ class Settings(BaseSettings):
     SANDBOX_MAX_ALIVE_SECONDS: int = int(
         os.environ.get('SANDBOX_MAX_ALIVE_SECONDS', os.getenv('SANDBOX_MAX_ALIVE_SECONDS', 300))
     )
+    TOOL_REGISTRY_CACHE_PATH: str = os.environ.get('TOOL_REGISTRY_CACHE_PATH',
+                                                   os.getenv('TOOL_REGISTRY_CACHE_PATH', 'cache/tool_registry.pkl'))
+    TOOL_REGISTRY_CHECK_INTERVAL: int = int(
+        os.environ.get('TOOL_REGISTRY_CHECK_INTERVAL', os.getenv('TOOL_REGISTRY_CHECK_INTERVAL', 30)))
+
+    PROMPT_CATALOG_CHECK_INTERVAL: int = int(
+        os.environ.get('PROMPT_CATALOG_CHECK_INTERVAL', os.getenv('PROMPT_CATALOG_CHECK_INTERVAL', 5)))
 
     DEFAULT_LLM_SUPPLIER_CONFIG_ID: int = int(
         os.environ.get('DEFAULT_LLM_SUPPLIER_CONFIG_ID', os.getenv('DEFAULT_LLM_SUPPLIER_CONFIG_ID', 1)))
@@ -66,6 +166,7 @@ class Settings(BaseSettings):
 
     FASTAPI_WORKERS: int = int(os.environ.get('FASTAPI_WORKERS', os.getenv('FASTAPI_WORKERS', 10)))
     CELERY_WORKERS: int = int(os.environ.get('CELERY_WORKERS', os.getenv('CELERY_WORKERS', 20)))
+    WEBSOCKET_WORKERS: int = int(os.environ.get('WEBSOCKET_WORKERS', os.getenv('WEBSOCKET_WORKERS', 1)))
     API_PORT: int = int(os.environ.get('API_PORT', os.getenv('API_PORT', 9472)))
     STORAGE_URL: str = str(os.environ.get('STORAGE_URL', os.getenv('STORAGE_URL', '')))
 
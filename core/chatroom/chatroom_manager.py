@@ -28,7 +28,7 @@ from core.database.models import (
 )
 from core.mcp.client import MCPClient
 from languages import get_language_content
-from log import Logger
+from log import Logger, set_log_context
 
 
 project_root = Path(__file__).parent.parent.parent
@@ -116,6 +116,8 @@ class ChatroomManager:
     ):
         chatroom_id = chatroom_info['id']
         app_id = chatroom_info['app_id']
+        # Each chatroom runs in its own task, so the log context is scoped to the chatroom
+        set_log_context(chatroom_id=chatroom_id)
         file_list = self._file_list_by_chatroom.pop(chatroom_id, None)
         storage_url = f'{chat_base_url}/nexusfile' if chat_base_url else settings.STORAGE_URL
         
@@ -185,6 +187,7 @@ class ChatroomManager:
                 }
             )
             user_message_id, user_message, topic = 0, user_input, None
+        set_log_context(app_run_id=app_run_id)
 
         chatroom_added_to_workflow_ws_manager = False
         try:
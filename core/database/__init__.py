@@ -1,4 +1,5 @@
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 
 from config import settings
 
@@ -13,9 +14,17 @@ redis = Redis(
     password=settings.REDIS_PASSWORD
 )
 
+async_redis = AsyncRedis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    db=settings.REDIS_DB,
+    password=settings.REDIS_PASSWORD
+)
+
 __all__ = [
     "SQLDatabase",
     "MySQL",
     "Conditions",
-    "redis"
+    "redis",
+    "async_redis"
 ]
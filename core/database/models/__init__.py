@@ -11,6 +11,7 @@ from .app_runs import AppRuns
 from .app_workflow_relation import AppWorkflowRelations
 from .app_node_executions import AppNodeExecutions
 from .app_node_user_relation import AppNodeUserRelation
+from .app_run_context_records import AppRunContextRecords
 
 from .agents import Agents
 from .agent_abilities import AgentAbilities
@@ -69,6 +70,7 @@ __all__ = [
     'AppNodeExecutions',
     'AppWorkflowRelations',
     'AppNodeUserRelation',
+    'AppRunContextRecords',
     
     'Agents',
     'AgentAbilities',
@@ -0,0 +1,52 @@
+from typing import Any, Dict, Optional
+from core.database import MySQL
+
+
+class AgentChatMemories(MySQL):
+    """
+    A class that extends MySQL to manage operations on the {table_name} table.
+    Each record holds the rolling summary of the chat history between a user and an agent.
+    """
+
+    table_name = "agent_chat_memories"
+    """
+    Indicates whether the `agent_chat_memories` table has an `update_time` column that tracks when a record was last updated.
+    """
+    have_updated_time = True
+
+    def get_memory(self, user_id: int, agent_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Retrieves the chat memory of a user and an agent.
+
+        :param user_id: The ID of the user.
+        :param agent_id: The ID of the agent.
+        :return: A dictionary with the summary, its token count and the ID of the last summarized message, or None.
+        """
+        return self.select_one(
+            columns=["summary", "summary_tokens", "last_message_id"],
+            conditions=[
+                {"column": "user_id", "value": user_id},
+                {"column": "agent_id", "value": agent_id}
+            ]
+        )
+
+    def save_memory(self, user_id: int, agent_id: int, summary: str, summary_tokens: int, last_message_id: int) -> None:
+        """
+        Saves the chat memory of a user and an agent, replacing the previous summary.
+
+        :param user_id: The ID of the user.
+        :param agent_id: The ID of the agent.
+        :param summary: The rolling summary of the chat history.
+        :param summary_tokens: The estimated tokens of the summary.
+        :param last_message_id: The ID of the last message covered by the summary.
+        """
+        self.upsert(
+            {
+                "user_id": user_id,
+                "agent_id": agent_id,
+                "summary": summary,
+                "summary_tokens": summary_tokens,
+                "last_message_id": last_message_id
+            },
+            update_columns=["summary", "summary_tokens", "last_message_id"]
+        )
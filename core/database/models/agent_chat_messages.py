@@ -1,6 +1,6 @@
 import math
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from config import settings
 from core.database import MySQL
@@ -143,24 +143,7 @@ class AgentChatMessages(MySQL):
         :param agent_id: The ID of the agent.
         :return: A list of chat messages.
         """
-        # Query to find the largest id where history_cleared is 1 for the given user and agent
-        # Query to find the largest id where history_cleared is 1 for the given user and agent
-        conditions = [
-            {"column": "history_cleared", "value": 1, "op": "="},
-            {"column": "user_id", "value": user_id, "op": "="},
-            {"column": "agent_id", "value": agent_id, "op": "="}
-        ]
-
-        cleared_messages = self.select_one(
-            columns=["id"],
-            conditions=conditions,
-            order_by='id DESC',  # Order by id descending to get the latest first
-        )
-
-        if cleared_messages:
-            start_id = cleared_messages['id']
-        else:
-            start_id = 0
+        start_id = self.get_history_cleared_id(user_id, agent_id)
 
         # Query to select all messages with id greater than the start_id
         conditions = [
@@ -175,6 +158,86 @@ class AgentChatMessages(MySQL):
         )
         return messages
 
+    def get_history_cleared_id(self, user_id: int, agent_id: int) -> int:
+        """
+        Retrieves the ID of the latest message that cleared the chat history of a user and an agent.
+
+        :param user_id: The ID of the user.
+        :param agent_id: The ID of the agent.
+        :return: The message ID, or 0 if the chat history has never been cleared.
+        """
+        cleared_message = self.select_one(
+            columns=["id"],
+            conditions=[
+                {"column": "user_id", "value": user_id},
+                {"column": "agent_id", "value": agent_id},
+                {"column": "history_cleared", "value": 1}
+            ],
+            order_by='id DESC'
+        )
+        return cleared_message['id'] if cleared_message else 0
+
+    def get_chat_agent_history_page(
+        self,
+        user_id: int,
+        agent_id: int,
+        after_id: int,
+        before_id: Optional[int] = None,
+        limit: int = 50,
+        oldest_first: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieves a page of the chat history of a user and an agent, newest first, without the file contents.
+
+        :param user_id: The ID of the user.
+        :param agent_id: The ID of the agent.
+        :param after_id: Only messages with a greater ID are retrieved.
+        :param before_id: Only messages with a smaller ID are retrieved, if given.
+        :param limit: The maximum number of messages to retrieve.
+        :param oldest_first: Whether to retrieve the oldest messages first instead.
+        :return: A list of chat messages with their token counts.
+        """
+        conditions = [
+            {"column": "user_id", "value": user_id},
+            {"column": "agent_id", "value": agent_id},
+            {"column": "id", "value": after_id, "op": ">"}
+        ]
+        if before_id is not None:
+            conditions.append({"column": "id", "value": before_id, "op": "<"})
+        return self.select(
+            columns=["id", "message", "agent_run_id", "file_list", "tokens"],
+            conditions=conditions,
+            order_by='id ASC' if oldest_first else 'id DESC',
+            limit=limit
+        )
+
+    def get_file_content_lists(self, ids: List[int]) -> Dict[int, Optional[List[Dict[str, Any]]]]:
+        """
+        Retrieves the file content lists of the given messages.
+
+        :param ids: The IDs of the messages.
+        :return: A dictionary mapping message IDs to their file content lists.
+        """
+        if not ids:
+            return {}
+        rows = self.select(
+            columns=["id", "file_content_list"],
+            conditions=[{"column": "id", "value": ids, "op": "in"}]
+        )
+        return {row['id']: row['file_content_list'] for row in rows}
+
+    def update_tokens(self, token_counts: Dict[int, int]) -> None:
+        """
+        Saves the token counts of messages.
+
+        :param token_counts: A dictionary mapping message IDs to their token counts.
+        """
+        if token_counts:
+            self.update_many([
+                ({"column": "id", "value": id_}, {"tokens": tokens})
+                for id_, tokens in token_counts.items()
+            ])
+
     def update_file_content_list_by_id(self, id_: int, file_content_list: List[Dict[str, Any]]):
         """
         Update the file content list for a message by its ID.
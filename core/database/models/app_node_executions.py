@@ -37,6 +37,78 @@ class AppNodeExecutions(MySQL):
         )
         return result
     
+    def get_nodes_successful_executions(self, app_run_id: int, node_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieves the latest successful node execution records of multiple nodes in one query.
+
+        Args:
+            app_run_id (int): The ID of the app run.
+            node_ids (List[str]): The IDs of the nodes.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: A dictionary mapping each node ID to its node execution record, like `get_node_successful_execution`.
+        """
+        if not node_ids:
+            return {}
+        # Find the latest execution of each node first, so that the inputs and outputs of earlier loop and retry
+        # iterations are not loaded
+        latest_executions = self.select(
+            columns=['node_id'],
+            aggregates={'id': 'max'},
+            conditions=[
+                {"column": "app_run_id", "value": app_run_id},
+                {"column": "node_id", "op": "in", "value": node_ids},
+                {"column": "correct_output", "value": 0},
+                {"column": "status", "value": 3}
+            ],
+            group_by='node_id'
+        )
+        if not latest_executions:
+            return {}
+        executions = self.select(
+            columns='*',
+            conditions=[
+                {"column": "id", "op": "in", "value": [execution['max_id'] for execution in latest_executions]}
+            ]
+        )
+        return {execution['node_id']: execution for execution in executions}
+    
+    def get_level_correct_llm_output_execution_ids(self, app_run_id: int, level: int) -> Dict[str, Tuple[int, int]]:
+        """
+        Retrieves the correct LLM output execution IDs of all edges of a level in one query.
+
+        Args:
+            app_run_id (int): The ID of the app run.
+            level (int): The level of the edges.
+
+        Returns:
+            Dict[str, Tuple[int, int]]: A dictionary mapping each edge ID to the tuple returned by `get_correct_llm_output_execution_ids`.
+        """
+        executions = self.select(
+            columns=['id', 'edge_id', 'correct_output', 'correct_prompt', 'status'],
+            conditions=[
+                {"column": "app_run_id", "value": app_run_id},
+                {"column": "level", "value": level}
+            ],
+            order_by='id DESC'
+        )
+        edge_executions = {}
+        for execution in executions:
+            edge_executions.setdefault(execution['edge_id'], [])
+            if len(edge_executions[execution['edge_id']]) < 2:  # Only the last two executions of each edge are relevant
+                edge_executions[execution['edge_id']].append(execution)
+        result = {}
+        for edge_id, executions in edge_executions.items():
+            correct_llm_output_execution_id = 0
+            last_llm_execution_id = 0
+            for execution in executions:
+                if execution["correct_output"] == 0 and execution['correct_prompt'] and execution['status'] == 2:
+                    correct_llm_output_execution_id = execution['id']
+                elif execution["correct_output"] == 1:
+                    last_llm_execution_id = execution['id']
+            result[edge_id] = (correct_llm_output_execution_id, last_llm_execution_id)
+        return result
+    
     def get_correct_llm_output_execution_ids(self, app_run_id: int, level: int, edge_id: str) -> Tuple[int, int]:
         """
         Retrieves the IDs of the node execution records associated with the specified node ID and correct output.
@@ -127,7 +199,7 @@ class AppNodeExecutions(MySQL):
                      "elapsed_time", "prompt_tokens", "completion_tokens", "total_tokens", "embedding_tokens", "reranking_tokens",
                      "created_time", "updated_time", "finished_time",
                      "apps.team_id", "apps.user_id", "app_runs.need_human_confirm", "app_runs.completed_steps", "app_runs.actual_completed_steps", "app_runs.status AS app_run_status", 
-                     "app_runs.level AS app_run_level", "app_runs.completed_edges", "app_runs.context"],
+                     "app_runs.level AS app_run_level", "app_runs.completed_edges"],
             joins=[
                 ["inner", "app_runs", "app_node_executions.app_run_id = app_runs.id"],
                 ["inner", "apps", "app_runs.app_id = apps.id"]
@@ -0,0 +1,85 @@
+from typing import Any, Dict, List, Optional
+from core.database import MySQL
+from core.database.models.app_runs import AppRuns
+
+
+class AppRunContextRecords(MySQL):
+    """
+    A class that extends MySQL to manage operations on the {table_name} table.
+    Each record holds the inputs and outputs of one node of an app run, in the format of `Context.to_dict()`.
+    The `app_runs.context` column is only written when the app run has finished.
+    """
+
+    table_name = "app_run_context_records"
+    """
+    Indicates whether the `app_run_context_records` table has an `update_time` column that tracks when a record was last updated.
+    """
+    have_updated_time = True
+
+    record_columns = ['level', 'node_id', 'node_title', 'node_type', 'inputs', 'outputs']
+
+    def _select_records(self, app_run_id: int, level: Optional[int] = None, node_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        conditions = [{"column": "app_run_id", "value": app_run_id}]
+        if level is not None:
+            conditions.append({"column": "level", "op": "<=", "value": level})
+        if node_ids is not None:
+            conditions.append({"column": "node_id", "op": "in", "value": node_ids})
+        return self.select(
+            columns=self.record_columns,
+            conditions=conditions,
+            order_by="id ASC"
+        )
+
+    def _get_materialized_records(self, app_run_id: int) -> List[Dict[str, Any]]:
+        app_run = AppRuns().select_one(
+            columns=['context'],
+            conditions=[{"column": "id", "value": app_run_id}]
+        )
+        return app_run['context'] if app_run and app_run['context'] else []
+
+    def get_records(self, app_run_id: int, level: Optional[int] = None, node_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieves the context records of an app run, filtered like `Context.get_related_records`.
+        Falls back to the `app_runs.context` column if the app run has no records in this table,
+        i.e. it has already finished or it was started before the context records were introduced.
+
+        :param app_run_id: The ID of the app run.
+        :param level: Only return records with a level less than or equal to this level.
+        :param node_ids: Only return records of these node IDs.
+        :return: A list of context records.
+        """
+        if node_ids is not None and not node_ids:
+            return []
+        records = self._select_records(app_run_id, level, node_ids)
+        if records:
+            return records
+        return [
+            record for record in self._get_materialized_records(app_run_id)
+            if (level is None or record['level'] <= level) and (node_ids is None or record['node_id'] in node_ids)
+        ]
+
+    def save_record(self, app_run_id: int, record: Dict[str, Any]) -> None:
+        """
+        Saves the context record of a node, replacing the existing record with the same level and node ID.
+        The first record of an app run whose context is still in the `app_runs.context` column
+        is preceded by the records from that column.
+
+        :param app_run_id: The ID of the app run.
+        :param record: The context record.
+        """
+        if not self.select_one(columns=['id'], conditions=[{"column": "app_run_id", "value": app_run_id}]):
+            materialized_records = self._get_materialized_records(app_run_id)
+            if materialized_records:
+                self.upsert([{**materialized_record, 'app_run_id': app_run_id} for materialized_record in materialized_records])
+        self.upsert({**record, 'app_run_id': app_run_id})
+
+    def materialize(self, app_run_id: int) -> None:
+        """
+        Writes the context records of a finished app run into the `app_runs.context` column and removes them from this table.
+
+        :param app_run_id: The ID of the app run.
+        """
+        records = self._select_records(app_run_id)
+        if records:
+            AppRuns().update({"column": "id", "value": app_run_id}, {'context': records})
+            self.delete({"column": "app_run_id", "value": app_run_id})
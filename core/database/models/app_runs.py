@@ -1,5 +1,5 @@
 from core.database import MySQL
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 import math
 from config import settings
 
@@ -31,31 +31,35 @@ class AppRuns(MySQL):
         )
         return result[0]["count_id"] if result else 0
 
-    def get_runnable_workflow_runs(self) -> List[Dict[str, Any]]:
+    def get_runnable_workflow_runs(self, app_run_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
         """
         Retrieves all runnable workflow runs that are associated with their respective workflows.
 
+        :param app_run_ids: Optional list of app run IDs to restrict the lookup to.
         :return: A list of dictionaries, each representing a runnable workflow run along with its associated workflow details.
         """
+        conditions = [
+            {"column": "status", "value": 1},
+            {"column": "paused", "value": 0},
+            {"column": "workflows.status", "value": 1},
+            {"column": "apps.status", "value": 1},
+            [
+                {"column": "need_human_confirm", "value": 0, 'logic': 'or'},
+                {"column": "need_correct_llm", "value": 1},
+            ]
+        ]
+        if app_run_ids is not None:
+            conditions.append({"column": "id", "op": "in", "value": app_run_ids})
         list = self.select(
             columns=['id AS app_run_id', 'user_id', 'app_id', 'workflow_id', 'type', 'name AS run_name', 'graph', 'inputs', 'knowledge_base_mapping',
-                'level', 'context', 'completed_edges', 'skipped_edges', 'status', 'completed_steps', 'actual_completed_steps', 'need_human_confirm', 'outputs', 'elapsed_time', 
+                'level', 'completed_edges', 'skipped_edges', 'status', 'completed_steps', 'actual_completed_steps', 'need_human_confirm', 'outputs', 'elapsed_time', 
                 'prompt_tokens', 'completion_tokens', 'total_tokens', 'embedding_tokens', 'reranking_tokens', 'total_steps', 'created_time', 'finished_time', 
                 'apps.team_id', 'apps.user_id AS app_user_id', 'apps.name AS app_name', 'apps.icon', "apps.avatar", 'apps.icon_background'],
             joins=[
                 ('inner', 'workflows', 'app_runs.workflow_id = workflows.id'),
                 ('inner', 'apps', 'app_runs.app_id = apps.id')
             ],
-            conditions=[
-                {"column": "status", "value": 1},
-                {"column": "paused", "value": 0},
-                {"column": "workflows.status", "value": 1},
-                {"column": "apps.status", "value": 1},
-                [
-                    {"column": "need_human_confirm", "value": 0, 'logic': 'or'},
-                    {"column": "need_correct_llm", "value": 1},
-                ]
-            ],
+            conditions=conditions,
         )
 
         for item in list:
@@ -80,7 +84,7 @@ class AppRuns(MySQL):
         :return: A dictionary representing the running app run.
         """
         data = self.select_one(
-            columns=['app_runs.id AS app_run_id', 'app_runs.user_id', 'app_runs.app_id', 'app_runs.workflow_id', 'app_runs.type', 'app_runs.level', 'app_runs.context', 'app_runs.completed_steps', 'app_runs.actual_completed_steps', 'app_runs.completed_edges', 'app_runs.status', 'app_runs.elapsed_time',
+            columns=['app_runs.id AS app_run_id', 'app_runs.user_id', 'app_runs.app_id', 'app_runs.workflow_id', 'app_runs.type', 'app_runs.level', 'app_runs.completed_steps', 'app_runs.actual_completed_steps', 'app_runs.completed_edges', 'app_runs.status', 'app_runs.elapsed_time',
                 'app_runs.prompt_tokens', 'app_runs.completion_tokens', 'app_runs.total_tokens', 'app_runs.embedding_tokens', 'app_runs.reranking_tokens', 'app_runs.total_steps', 'app_runs.created_time', 'app_runs.finished_time' ,'apps.avatar' ,'apps.icon'],
             conditions=[{"column": "id", "value": app_run_id}, {"column": "status", "op": "in", "value": [2, 4]}],
             joins=[
@@ -28,6 +28,7 @@ class Datasets(MySQL):
         Retrieves the dataset ID associated with the given app ID.
 
         :param app_id: The ID of the app.
+        :param check_is_reindexing: Whether to reject a dataset that is being reindexed.
         :return: The dataset ID associated with the given app ID.
         """
         conditions = [
@@ -40,12 +41,12 @@ class Datasets(MySQL):
 
 
         dataset = self.select_one(
-            columns=['id', 'collection_name'],
+            columns=['id', 'collection_name', 'reindexing_collection_name'],
             conditions=conditions,
         )
         assert dataset, get_language_content(language_key)
         if check_is_reindexing:
-            assert dataset['collection_name'] != 'reindexing', get_language_content('api_vector_indexing')
+            assert not self.is_reindexing(dataset), get_language_content('api_vector_indexing')
         return dataset['id']
 
     def get_dataset_by_id(self, dataset_id: int, check_is_reindexing: bool = False) -> Dict[str, Any]:
@@ -53,6 +54,7 @@ class Datasets(MySQL):
         Retrieves the dataset information for the given dataset ID.
 
         :param dataset_id: The ID of the dataset.
+        :param check_is_reindexing: Whether to reject a dataset that is being reindexed.
         :return: A dictionary containing the dataset information.
         """
         dataset = self.select_one(
@@ -63,6 +65,8 @@ class Datasets(MySQL):
                 'process_rule_id',
                 'collection_name',
                 'embedding_model_config_id',
+                'reindexing_collection_name',
+                'reindexing_embedding_model_config_id',
                 'retriever_config'
             ],
             conditions=[
@@ -72,9 +76,22 @@ class Datasets(MySQL):
         )
         assert dataset, get_language_content('api_vector_available_dataset')
         if check_is_reindexing:
-            assert dataset['collection_name'] != 'reindexing', get_language_content('api_vector_indexing')
+            assert not self.is_reindexing(dataset), get_language_content('api_vector_indexing')
         return dataset
 
+    @staticmethod
+    def is_reindexing(dataset: Dict[str, Any]) -> bool:
+        """
+        Checks if the dataset is being reindexed.
+        The current collection keeps serving queries while the new collection is built,
+        but the documents and segments of the dataset cannot be changed until the reindexing has finished.
+
+        :param dataset: The dataset with the `collection_name` and `reindexing_collection_name` columns.
+        :return: True if the dataset is being reindexed, False otherwise.
+        """
+        # Datasets whose reindexing was started before the blue/green reindexing have the placeholder collection name
+        return dataset['collection_name'] == 'reindexing' or bool(dataset['reindexing_collection_name'])
+
     def get_dataset_find(self, dataset_id: int, user_id: int, team_id: int) -> Dict[str, Any]:
         """
         Retrieves the dataset with the given ID, user ID, and team ID.
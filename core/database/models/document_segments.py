@@ -60,6 +60,82 @@ class DocumentSegments(MySQL):
         assert segment, 'No available document segment!'
         return segment
 
+    def get_segments_by_index_ids(self, index_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieves the available document segments with the given index IDs, together with their documents, in one query.
+
+        :param index_ids: The index IDs of the document segments.
+        :return: A dictionary mapping each found index ID to its document segment,
+            including `dataset_id`, `document_name` and `document_status` of the document.
+        """
+        if not index_ids:
+            return {}
+        segments = self.select(
+            columns=[
+                'document_segments.id',
+                'document_segments.index_id',
+                'document_segments.document_id',
+                'document_segments.hit_count',
+                'documents.dataset_id',
+                'documents.name AS document_name',
+                'documents.status AS document_status'
+            ],
+            joins=[
+                ['inner', 'documents', 'documents.id = document_segments.document_id']
+            ],
+            conditions=[
+                {'column': 'document_segments.index_id', 'op': 'in', 'value': list(set(index_ids))},
+                {'column': 'document_segments.status', 'value': 1}
+            ]
+        )
+        return {segment['index_id']: segment for segment in segments}
+
+    def get_available_segments_by_ids(self, segment_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Retrieves the indexed document segments with the given IDs whose documents are enabled, in one query.
+
+        :param segment_ids: The IDs of the document segments.
+        :return: A dictionary mapping each found segment ID to its document segment.
+        """
+        if not segment_ids:
+            return {}
+        segments = self.select(
+            columns=['document_segments.id', 'document_segments.index_id', 'document_segments.content'],
+            joins=[
+                ['inner', 'documents', 'documents.id = document_segments.document_id']
+            ],
+            conditions=[
+                {'column': 'document_segments.id', 'op': 'in', 'value': list(set(segment_ids))},
+                {'column': 'document_segments.status', 'value': 1},
+                {'column': 'document_segments.index_id', 'op': 'is not null'},
+                {'column': 'documents.status', 'value': 1},
+                {'column': 'documents.archived', 'value': 0}
+            ]
+        )
+        return {segment['id']: segment for segment in segments}
+
+    def get_segments_by_document_ids(self, document_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Retrieves the available document segments of multiple documents in one query.
+
+        :param document_ids: The IDs of the documents.
+        :return: A dictionary mapping each document ID to its document segments in ID order.
+        """
+        if not document_ids:
+            return {}
+        segments = self.select(
+            columns=['id', 'document_id', 'content'],
+            conditions=[
+                {'column': 'document_id', 'op': 'in', 'value': document_ids},
+                {'column': 'status', 'value': 1},
+            ],
+            order_by='id ASC'
+        )
+        result = {}
+        for segment in segments:
+            result.setdefault(segment['document_id'], []).append(segment)
+        return result
+
     def document_segments_file_set(self, document_id: int) -> Dict[str, Any]:
         """
         Retrieve the set of file names associated with the given document ID.
@@ -86,6 +162,74 @@ class DocumentSegments(MySQL):
         result = self.execute_query(sql)
         return result.rowcount > 0
 
+    def increment_hit_counts(self, segment_ids: List[int]) -> bool:
+        """
+        Increments the hit_count field by 1 for multiple document segments with a single update.
+
+        :param segment_ids: The IDs of the document segments to update.
+        :return: True if the update affected one or more rows, False otherwise.
+        """
+        if not segment_ids:
+            return False
+        ids = ', '.join(str(int(segment_id)) for segment_id in set(segment_ids))
+        sql = f"UPDATE {self.table_name} SET hit_count = hit_count + 1, updated_time = NOW() WHERE id IN ({ids})"
+        result = self.execute_query(sql)
+        return result.rowcount > 0
+
+    def get_segments_to_reindex(self, document_ids: List[int], after_id: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        Retrieves the next available document segments that have not been indexed into the collection being built by the reindexing.
+
+        :param document_ids: The IDs of the documents to reindex.
+        :param after_id: Only return segments with an ID greater than this ID.
+        :param limit: The maximum number of segments to return.
+        :return: A list of document segments in ID order.
+        """
+        if not document_ids:
+            return []
+        return self.select(
+            columns=['id', 'document_id', 'content'],
+            conditions=[
+                {'column': 'document_id', 'op': 'in', 'value': document_ids},
+                {'column': 'status', 'value': 1},
+                {'column': 'reindex_index_id', 'op': 'is null'},
+                {'column': 'id', 'op': '>', 'value': after_id}
+            ],
+            order_by='id ASC',
+            limit=limit
+        )
+
+    def reset_reindex(self, dataset_id: int) -> bool:
+        """
+        Clears the reindexing checkpoints of all segments of a dataset.
+
+        :param dataset_id: The ID of the dataset.
+        :return: True if the update affected one or more rows, False otherwise.
+        """
+        sql = f"""
+            UPDATE {self.table_name} AS s INNER JOIN documents AS d ON d.id = s.document_id
+            SET s.reindex_index_id = NULL, s.reindex_tokens = 0, s.updated_time = NOW()
+            WHERE d.dataset_id = {int(dataset_id)} AND s.reindex_index_id IS NOT NULL
+        """
+        result = self.execute_query(sql)
+        return result.rowcount > 0
+
+    def apply_reindex(self, dataset_id: int) -> bool:
+        """
+        Replaces the index IDs and tokens of the segments of a dataset with those of the finished reindexing in a single update.
+
+        :param dataset_id: The ID of the dataset.
+        :return: True if the update affected one or more rows, False otherwise.
+        """
+        sql = f"""
+            UPDATE {self.table_name} AS s INNER JOIN documents AS d ON d.id = s.document_id
+            SET s.index_id = s.reindex_index_id, s.tokens = s.reindex_tokens,
+                s.reindex_index_id = NULL, s.reindex_tokens = 0, s.updated_time = NOW()
+            WHERE d.dataset_id = {int(dataset_id)} AND s.reindex_index_id IS NOT NULL
+        """
+        result = self.execute_query(sql)
+        return result.rowcount > 0
+
     def get_segment_filename_content(self, index_id: str) -> Dict[str, Any]:
         """
         Retrieves the file name and content for the specified document segment.
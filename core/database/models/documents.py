@@ -186,6 +186,7 @@ class Documents(MySQL):
     def get_document_file_path_list(self,dataset_id: int) -> List[Dict[str,Any]]:
         """
         Get file path by dataset id.
+        Deleted documents are skipped, as their files have already been released.
 
         :param dataset_id: The ID of the dataset.
         :return: File path.
@@ -197,6 +198,7 @@ class Documents(MySQL):
             ],
             conditions=[
                 {'column': 'documents.dataset_id', 'value': dataset_id},
+                {'column': 'documents.status', 'value': 3, 'op': '!='},
             ],
             group_by='upload_files.id',
         )
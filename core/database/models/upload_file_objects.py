@@ -0,0 +1,75 @@
+from typing import Any, Dict, Optional
+from sqlalchemy import literal_column
+from core.database import MySQL
+
+
+class UploadFileObjects(MySQL):
+    """
+    A class that extends MySQL to manage operations on the {table_name} table.
+    Each record is a content-addressed file shared by the upload files with the same content and extension.
+    The reference count is changed in SQL, and the callers must hold the object lock of the content hash
+    and commit the change before releasing the lock.
+    """
+
+    table_name = "upload_file_objects"
+    """
+    Indicates whether the `upload_file_objects` table has an `update_time` column that tracks when a record was last updated.
+    """
+    have_updated_time = True
+
+    def get_object(self, content_hash: str, extension: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieves the object with the given content hash and extension.
+
+        :param content_hash: The SHA-256 of the file content.
+        :param extension: The file extension.
+        :return: A dictionary containing the object ID, path, size and reference count, or None.
+        """
+        return self.select_one(
+            columns=['id', 'path', 'size', 'ref_count'],
+            conditions=[
+                {'column': 'content_hash', 'value': content_hash},
+                {'column': 'extension', 'value': extension}
+            ]
+        )
+
+    def add_reference(self, content_hash: str, extension: str, path: str, size: int) -> int:
+        """
+        Adds a reference to the object, creating the object record if it does not exist.
+
+        :param content_hash: The SHA-256 of the file content.
+        :param extension: The file extension.
+        :param path: The relative path of the object file.
+        :param size: The size of the file.
+        :return: The reference count after adding the reference.
+        """
+        self.upsert(
+            {
+                'content_hash': content_hash,
+                'extension': extension,
+                'path': path,
+                'size': size,
+                'ref_count': 1
+            },
+            {'ref_count': literal_column('ref_count') + 1}
+        )
+        return self.get_object(content_hash, extension)['ref_count']
+
+    def remove_reference(self, content_hash: str, extension: str) -> bool:
+        """
+        Removes a reference to the object, deleting the object record when no reference is left.
+
+        :param content_hash: The SHA-256 of the file content.
+        :param extension: The file extension.
+        :return: Whether the object record has been deleted.
+        """
+        conditions = [
+            {'column': 'content_hash', 'value': content_hash},
+            {'column': 'extension', 'value': extension}
+        ]
+        if not self.update(
+            [*conditions, {'column': 'ref_count', 'value': 0, 'op': '>'}],
+            {'ref_count': literal_column('ref_count') - 1}
+        ):
+            return False
+        return self.delete([*conditions, {'column': 'ref_count', 'value': 0}])
@@ -47,7 +47,16 @@ class UploadFiles(MySQL):
         )
         return result
 
-    def insert_file(self, user_id: int, name: str, path: str, size: int, extension: str, mime_type: str) -> int:
+    def insert_file(
+        self,
+        user_id: int,
+        name: str,
+        path: str,
+        size: int,
+        extension: str,
+        mime_type: str,
+        content_hash: str = ''
+    ) -> int:
         """
         Inserts a new file record into the upload_files table.
 
@@ -57,6 +66,7 @@ class UploadFiles(MySQL):
         :param size: The size of the file.
         :param extension: The extension of the file.
         :param mime_type: The MIME type of the file.
+        :param content_hash: The SHA-256 of the file content, if the file is content-addressed.
         :return: The ID of the newly inserted record.
         """
         
@@ -66,5 +76,6 @@ class UploadFiles(MySQL):
             'path': path,
             'size': size,
             'extension': extension,
-            'mime_type': mime_type
+            'mime_type': mime_type,
+            'content_hash': content_hash
         })
\ No newline at end of file
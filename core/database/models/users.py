@@ -181,6 +181,8 @@ class Users(MySQL):
                             'status':3
                         }
                     )
+                    from api.utils.principal_cache import principal_cache
+                    principal_cache.invalidate(existing_user['id'])
                     team_type_id = Teams().select_one(columns=['id'], conditions=[{'column': 'type', 'value': 2}])
                     find_user_team_type_not_two = UserTeamRelations().select_one(
                         columns=['id'], 
@@ -513,6 +515,8 @@ class Users(MySQL):
                             'status':3
                         }
                     )
+                    from api.utils.principal_cache import principal_cache
+                    principal_cache.invalidate(existing_user['id'])
                     team_type_id = Teams().select_one(columns=['id'], conditions=[{'column': 'type', 'value': 2}])
                     find_user_team_type_not_two = UserTeamRelations().select_one(
                         columns=['id'], 
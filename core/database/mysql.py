@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 from core.database.orm import ORM, Conditions
 from datetime import datetime
 
@@ -19,6 +19,16 @@ class MySQL(ORM):
         """
         return super().insert(self.table_name, data)
 
+    def insert_many(self, rows: List[Dict[str, Any]], return_ids: bool = True) -> Union[List[Any], int]:
+        """
+        Inserts multiple records into the {table_name} table with a single batched statement.
+
+        :param rows: A list of dictionaries containing the data to be inserted. All rows must have the same keys.
+        :param return_ids: Whether to return the primary keys of the inserted records.
+        :return: A list of primary keys if `return_ids` is True, otherwise the number of inserted rows.
+        """
+        return super().insert_many(self.table_name, rows, return_ids)
+
     def update(self, conditions: Conditions, data: Dict[str, Any]) -> bool:
         """
         Updates records in the {table_name} table based on the specified conditions.
@@ -31,6 +41,42 @@ class MySQL(ORM):
             data['updated_time'] = datetime.now()
         return super().update(self.table_name, conditions, data)
 
+    def update_many(self, updates: List[Tuple[Conditions, Dict[str, Any]]]) -> int:
+        """
+        Applies multiple updates to the {table_name} table in a single transaction.
+
+        :param updates: A list of (conditions, data) tuples.
+        :return: The total number of rows matched by the updates.
+        """
+        if self.have_updated_time:
+            updated_time = datetime.now()
+            for _, data in updates:
+                data['updated_time'] = updated_time
+        return super().update_many(self.table_name, updates)
+
+    def upsert(
+        self,
+        data: Union[Dict[str, Any], List[Dict[str, Any]]],
+        update_columns: Optional[Union[List[str], Dict[str, Any]]] = None
+    ) -> int:
+        """
+        Inserts records into the {table_name} table, updating the existing records on duplicate keys.
+
+        :param data: A dictionary or a list of dictionaries containing the data to be upserted.
+        :param update_columns: The columns to update on duplicate keys with the inserted values, or a dictionary mapping
+            the columns to update to their new values or SQL expressions. Defaults to all columns in `data`.
+        :return: The number of affected rows.
+        """
+        if self.have_updated_time:
+            updated_time = datetime.now()
+            for row in (data if isinstance(data, List) else [data]):
+                row['updated_time'] = updated_time
+            if isinstance(update_columns, Dict):
+                update_columns = {**update_columns, 'updated_time': updated_time}
+            elif update_columns is not None and 'updated_time' not in update_columns:
+                update_columns = [*update_columns, 'updated_time']
+        return super().upsert(self.table_name, data, update_columns)
+
     def select(self, **kwargs: Any) -> List[Dict[str, Any]]:
         """
         Selects records from the {table_name} table based on the specified keyword arguments.
@@ -1,6 +1,10 @@
 import os
-from typing import Any, Dict, List, Union, Optional
-from sqlalchemy import Table, select, text, and_, or_, func, JSON
+import threading
+import time
+from typing import Any, Dict, List, Tuple, Union, Optional
+from collections import OrderedDict
+from sqlalchemy import Table, select, text, and_, or_, func, bindparam, case, literal, Integer, JSON
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 from sqlalchemy.exc import SQLAlchemyError, OperationalError, InvalidRequestError
 from . import SQLDatabase
 from config import settings
@@ -9,6 +13,9 @@ from config import settings
 Condition = Dict[str, Any]
 Conditions = Union[Condition, List[Union[Condition, List]]]
 
+# Redis key holding the table schema version; bumped by scripts/migrations.py after applying migrations
+TABLE_SCHEMA_VERSION_KEY = 'orm:table_schema_version'
+
 def is_auto_commit() -> bool:
     """
     Returns the value of the DATABASE_AUTO_COMMIT environment variable as a boolean.
@@ -17,12 +24,39 @@ def is_auto_commit() -> bool:
     """
     return os.getenv('DATABASE_AUTO_COMMIT', 'False').lower() == 'true'
 
-def build_condition(tables: Dict[str, Table], condition: Condition) -> Any:
+def map_column_types(table: Table) -> Table:
+    """
+    Maps reflected LONGTEXT columns of the given table to JSON so that values are (de)serialized automatically.
+
+    :param table: A reflected SQLAlchemy Table object.
+    :return: The same Table object with its column types mapped.
+    """
+    for column in table.columns:
+        if str(column.type) == 'LONGTEXT':
+            column.type = JSON()
+    return table
+
+def _is_bound_value(op: str, value: Any) -> bool:
+    """
+    Returns whether a condition with the given operation and value is rendered with a bind parameter.
+
+    :param op: The normalized condition operation.
+    :param value: The condition value.
+    :return: True if the value is passed as a bind parameter, False if it is rendered as IS [NOT] NULL.
+    """
+    if op in ("is null", "is not null"):
+        return False
+    if op in ("=", "!=") and value is None:
+        return False
+    return True
+
+def build_condition(tables: Dict[str, Table], condition: Condition, params: Optional[Dict[str, Any]] = None) -> Any:
     """
     Constructs a SQLAlchemy condition expression based on the provided condition dictionary.
 
     :param tables: A dictionary mapping table names to SQLAlchemy Table objects.
     :param condition: A dictionary representing a single condition with keys for column, operation, and value.
+    :param params: If given, the value is replaced by a named bind parameter and stored in this dictionary.
     :return: A SQLAlchemy condition expression.
     """
     column = condition["column"].strip()
@@ -33,6 +67,12 @@ def build_condition(tables: Dict[str, Table], condition: Condition) -> Any:
         column = tables[table_name].c[column_name]
     op = condition.get("op", "=").lower().strip()
     value = condition.get("value")
+    if op in ("in", "not in") and not isinstance(value, list):
+        value = [value]
+    if params is not None and _is_bound_value(op, value):
+        name = f"p{len(params)}"
+        params[name] = value
+        value = bindparam(name, expanding=op in ("in", "not in"))
     
     if op == "=":
         return column == value
@@ -51,9 +91,9 @@ def build_condition(tables: Dict[str, Table], condition: Condition) -> Any:
     elif op == "ilike":
         return column.ilike(value)
     elif op == "in":
-        return column.in_(value if isinstance(value, list) else [value])
+        return column.in_(value)
     elif op == "not in":
-        return column.notin_(value if isinstance(value, list) else [value])
+        return column.notin_(value)
     elif op == "is null":
         return column == None
     elif op == "is not null":
@@ -61,13 +101,19 @@ def build_condition(tables: Dict[str, Table], condition: Condition) -> Any:
     else:
         raise ValueError(f"Unsupported operation: {op}")
 
-def build_conditions(tables: Dict[str, Table], conditions: Conditions, logic: str = "and") -> Any:
+def build_conditions(
+    tables: Dict[str, Table],
+    conditions: Conditions,
+    logic: str = "and",
+    params: Optional[Dict[str, Any]] = None
+) -> Any:
     """
     Constructs a composite SQLAlchemy condition expression from a list or nested list of conditions.
 
     :param tables: A dictionary mapping table names to SQLAlchemy Table objects.
     :param conditions: A list or nested list of condition dictionaries or a single condition dictionary.
     :param logic: A string indicating the logical operator to use between conditions ("and" or "or").
+    :param params: If given, condition values are replaced by named bind parameters and stored in this dictionary.
     :return: A composite SQLAlchemy condition expression.
     """
     if isinstance(conditions, dict):
@@ -85,17 +131,119 @@ def build_conditions(tables: Dict[str, Table], conditions: Conditions, logic: st
     for condition in conditions:
         if isinstance(condition, list):
             nested_logic = condition[0].get("logic", "and").lower()
-            condition_expressions.append(build_conditions(tables, condition, nested_logic))
+            condition_expressions.append(build_conditions(tables, condition, nested_logic, params))
         else:
-            condition_expressions.append(build_condition(tables, condition))
+            condition_expressions.append(build_condition(tables, condition, params))
     
     return expr(*condition_expressions)
 
+def get_conditions_shape(conditions: Conditions, logic: str, params: Dict[str, Any]) -> tuple:
+    """
+    Computes the structure of the given conditions (columns, operations and logic, but not values)
+    and collects the values in the same order and under the same names used by build_conditions.
+
+    :param conditions: A list or nested list of condition dictionaries or a single condition dictionary.
+    :param logic: A string indicating the logical operator to use between conditions ("and" or "or").
+    :param params: A dictionary the condition values are stored in, keyed by bind parameter name.
+    :return: A hashable tuple describing the shape of the conditions.
+    """
+    if isinstance(conditions, dict):
+        conditions = [conditions]
+    
+    shape = [logic.strip()]
+    for condition in conditions:
+        if isinstance(condition, list):
+            nested_logic = condition[0].get("logic", "and").lower()
+            shape.append(get_conditions_shape(condition, nested_logic, params))
+        else:
+            op = condition.get("op", "=").lower().strip()
+            value = condition.get("value")
+            if op in ("in", "not in") and not isinstance(value, list):
+                value = [value]
+            bound = _is_bound_value(op, value)
+            if bound:
+                params[f"p{len(params)}"] = value
+            shape.append((condition["column"].strip(), op, bound))
+    return tuple(shape)
+
+class QueryCache:
+    """
+    A bounded LRU cache of select statements keyed by the normalized query shape.
+    Cached statements carry named bind parameters, so a cache hit only needs the values to be bound.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """
+        Initializes the cache.
+
+        :param max_size: The maximum number of statements kept in the cache.
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._statements: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Any:
+        """
+        Returns the cached statement for the given key, or None if it is not cached.
+
+        :param key: The query shape key.
+        :return: The cached statement or None.
+        """
+        with self._lock:
+            statement = self._statements.get(key)
+            if statement is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._statements.move_to_end(key)
+            return statement
+
+    def set(self, key: tuple, statement: Any) -> None:
+        """
+        Stores a statement in the cache, evicting the least recently used one if the cache is full.
+
+        :param key: The query shape key.
+        :param statement: The statement to cache.
+        """
+        with self._lock:
+            self._statements[key] = statement
+            self._statements.move_to_end(key)
+            while len(self._statements) > self.max_size:
+                self._statements.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Removes all cached statements. The hit and miss counters are kept.
+        """
+        with self._lock:
+            self._statements.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the cache counters.
+
+        :return: A dictionary with the hits, misses, current size and maximum size of the cache.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._statements),
+                'max_size': self.max_size
+            }
+
 class ORM(SQLDatabase):
     """
     A class representing a MySQL database, providing methods to execute various SQL operations.
     Inherits from SQLDatabase which is assumed to provide basic database interaction functionality.
     """
+    _tables: Dict[str, Table] = {}
+    _tables_lock = threading.RLock()
+    _tables_schema_version: Optional[int] = None
+    _tables_checked_at: float = float('-inf')
+    _query_cache = QueryCache(settings.QUERY_CACHE_SIZE)
     
     def __init__(self):
         """
@@ -108,6 +256,76 @@ class ORM(SQLDatabase):
         )
         super().__init__(db_url)
 
+    @classmethod
+    def get_table(cls, table_name: str) -> Table:
+        """
+        Returns the Table object for the specified table from the process-wide table registry.
+        The table is reflected only on first use and its LONGTEXT columns are mapped to JSON once.
+
+        :param table_name: The name of the table.
+        :return: A SQLAlchemy Table object.
+        """
+        cls._check_table_schema_version()
+        table = ORM._tables.get(table_name)
+        if table is None:
+            with ORM._tables_lock:
+                table = ORM._tables.get(table_name)
+                if table is None:
+                    table = map_column_types(
+                        Table(table_name, cls._metadata, autoload_with=cls._engine, extend_existing=True)
+                    )
+                    ORM._tables[table_name] = table
+        return table
+
+    @classmethod
+    def reflect_tables(cls, table_names: Optional[List[str]] = None) -> None:
+        """
+        Reflects the specified tables (or all tables in the database) into the table registry in one pass.
+        Intended to be called at process startup so that no query pays for reflection later.
+
+        :param table_names: A list of table names to reflect. Reflects all tables if None.
+        """
+        with ORM._tables_lock:
+            cls._metadata.reflect(bind=cls._engine, only=table_names, extend_existing=True)
+            for table_name, table in cls._metadata.tables.items():
+                ORM._tables[table_name] = map_column_types(table)
+
+    @classmethod
+    def invalidate_tables(cls, table_names: Optional[List[str]] = None) -> None:
+        """
+        Removes the specified tables (or all tables) from the table registry so that they are reflected again on next use.
+        Should be called after the database schema has been migrated.
+
+        :param table_names: A list of table names to invalidate. Invalidates all tables if None.
+        """
+        with ORM._tables_lock:
+            if table_names is None:
+                table_names = list(ORM._tables.keys())
+            for table_name in table_names:
+                table = ORM._tables.pop(table_name, None)
+                if table is not None and cls._metadata is not None:
+                    cls._metadata.remove(table)
+            ORM._query_cache.clear()
+
+    @classmethod
+    def _check_table_schema_version(cls) -> None:
+        """
+        Invalidates the table registry if the table schema version in Redis has changed since the last check.
+        Redis is consulted at most once per TABLE_SCHEMA_CHECK_INTERVAL seconds.
+        """
+        now = time.monotonic()
+        if now - ORM._tables_checked_at < settings.TABLE_SCHEMA_CHECK_INTERVAL:
+            return
+        ORM._tables_checked_at = now
+        try:
+            from core.database import redis
+            version = int(redis.get(TABLE_SCHEMA_VERSION_KEY) or 0)
+        except Exception:
+            return
+        if ORM._tables_schema_version is not None and ORM._tables_schema_version != version:
+            cls.invalidate_tables()
+        ORM._tables_schema_version = version
+
     @classmethod
     def execute_query(cls, query: str) -> Any:
         """
@@ -146,10 +364,7 @@ class ORM(SQLDatabase):
         """
         session = cls.get_session()
         auto_commit = is_auto_commit()
-        table = Table(table_name, cls._metadata, autoload_with=cls._engine)
-        for column in table.columns:
-            if str(column.type) == 'LONGTEXT':
-                column.type = JSON()
+        table = cls.get_table(table_name)
         try:
             query = table.insert().values(data)
             # print(str(query.compile(compile_kwargs={"literal_binds": True})))
@@ -185,10 +400,7 @@ class ORM(SQLDatabase):
         """
         session = cls.get_session()
         auto_commit = is_auto_commit()
-        table = Table(table_name, cls._metadata, autoload_with=cls._engine)
-        for column in table.columns:
-            if str(column.type) == 'LONGTEXT':
-                column.type = JSON()
+        table = cls.get_table(table_name)
         try:
             if conditions:
                 if isinstance(conditions, List) and isinstance(conditions[0], Dict):
@@ -222,7 +434,255 @@ class ORM(SQLDatabase):
                 session.close()
 
     @classmethod
-    def _build_select_query(cls, table_name: str, **kwargs: Any) -> Any:
+    def insert_many(cls, table_name: str, rows: List[Dict[str, Any]], return_ids: bool = True) -> Union[List[Any], int]:
+        """
+        Inserts multiple records into the specified table with a single batched statement.
+        All rows must contain the same set of columns.
+
+        :param table_name: The name of the table to insert the records into.
+        :param rows: A list of dictionaries mapping column names to their respective values.
+        :param return_ids: Whether to return the primary keys of the inserted records.
+        :return: A list of primary keys in the order of `rows` if `return_ids` is True, otherwise the number of inserted rows.
+        """
+        if not rows:
+            return [] if return_ids else 0
+        session = cls.get_session()
+        auto_commit = is_auto_commit()
+        table = cls.get_table(table_name)
+        try:
+            if return_ids:
+                if cls._engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+                    # MariaDB >= 10.5 supports INSERT ... RETURNING, so all keys come back from batched statements,
+                    # sorted in the order of `rows` so that callers can zip them back onto their rows
+                    primary_key = list(table.primary_key.columns)[0]
+                    result = session.execute(table.insert().returning(primary_key, sort_by_parameter_order=True), rows)
+                    ids = [row[0] for row in result]
+                else:
+                    # Only for servers without INSERT ... RETURNING (MySQL, MariaDB < 10.5): there is no reliable way
+                    # to get every generated key of a multi-row insert, so insert row by row within the same transaction
+                    ids = [session.execute(table.insert().values(row)).inserted_primary_key[0] for row in rows]
+                if auto_commit:
+                    session.commit()
+                return ids
+            result = session.execute(table.insert(), rows)
+            if auto_commit:
+                session.commit()
+            return result.rowcount
+        except SQLAlchemyError as e:
+            session.rollback()
+            if isinstance(e, (OperationalError, InvalidRequestError)):
+                try:
+                    cls._Session.remove()
+                except:
+                    pass
+            raise e
+        finally:
+            if auto_commit:
+                session.close()
+
+    @classmethod
+    def update_many(cls, table_name: str, updates: List[Tuple[Conditions, Dict[str, Any]]]) -> int:
+        """
+        Applies multiple updates to the specified table in a single transaction.
+        Consecutive updates whose conditions are a single equality on one column of this table and which set the same
+        columns are merged into one `UPDATE ... SET column = CASE ... END WHERE key IN (...)` statement.
+
+        :param table_name: The name of the table to update.
+        :param updates: A list of (conditions, data) tuples, applied in order.
+        :return: The total number of rows matched by the updates.
+        """
+        if not updates:
+            return 0
+        session = cls.get_session()
+        auto_commit = is_auto_commit()
+        table = cls.get_table(table_name)
+        
+        # Split the updates into batches of key-based updates grouped by key column and updated columns.
+        # A batch is closed whenever the order of application could matter: an update that cannot be grouped,
+        # or a key that is already updated by another group of the current batch.
+        batches: List[Union[Dict[Tuple[str, Tuple[str, ...]], Dict[Any, Dict[str, Any]]], Tuple[Conditions, Dict[str, Any]]]] = []
+        grouped_updates = {}
+        for conditions, data in updates:
+            if isinstance(conditions, List) and len(conditions) == 1 and isinstance(conditions[0], Dict):
+                conditions = conditions[0]
+            column = conditions.get("column", "").strip() if isinstance(conditions, Dict) else ""
+            if column.startswith(f"{table_name}."):
+                column = column[len(table_name) + 1:]
+            value = conditions.get("value") if isinstance(conditions, Dict) else None
+            if (
+                column and "." not in column
+                and conditions.get("op", "=").lower().strip() == "="
+                and value is not None and not isinstance(value, (list, dict))
+            ):
+                group_key = (column, tuple(sorted(data.keys())))
+                if any(
+                    other_key != group_key and other_key[0] == column and value in group
+                    for other_key, group in grouped_updates.items()
+                ):
+                    batches.append(grouped_updates)
+                    grouped_updates = {}
+                # Later updates of the same key win, as they would when applied one by one
+                grouped_updates.setdefault(group_key, {}).setdefault(value, {}).update(data)
+            else:
+                if grouped_updates:
+                    batches.append(grouped_updates)
+                    grouped_updates = {}
+                batches.append((conditions, data))
+        if grouped_updates:
+            batches.append(grouped_updates)
+        
+        try:
+            rowcount = 0
+            for batch in batches:
+                if isinstance(batch, tuple):
+                    conditions, data = batch
+                    if conditions:
+                        if isinstance(conditions, List) and isinstance(conditions[0], Dict):
+                            nested_logic = conditions[0].get("logic", "and").lower()
+                            query = table.update().where(build_conditions({table_name: table}, conditions, nested_logic)).values(data)
+                        else:
+                            query = table.update().where(build_conditions({table_name: table}, conditions)).values(data)
+                    else:
+                        query = table.update().values(data)
+                    rowcount += session.execute(query).rowcount
+                    continue
+                for (column, data_columns), group in batch.items():
+                    key_column = table.c[column]
+                    if len(group) == 1:
+                        key, data = next(iter(group.items()))
+                        query = table.update().where(key_column == key).values(data)
+                    else:
+                        values = {
+                            data_column: case(
+                                *[
+                                    (key_column == key, literal(data[data_column], type_=table.c[data_column].type))
+                                    for key, data in group.items()
+                                ],
+                                else_=table.c[data_column]
+                            )
+                            for data_column in data_columns
+                        }
+                        query = table.update().where(key_column.in_(list(group.keys()))).values(values)
+                    rowcount += session.execute(query).rowcount
+            if auto_commit:
+                session.commit()
+            return rowcount
+        except SQLAlchemyError as e:
+            session.rollback()
+            if isinstance(e, (OperationalError, InvalidRequestError)):
+                try:
+                    cls._Session.remove()
+                except:
+                    pass
+            raise e
+        finally:
+            if auto_commit:
+                session.close()
+
+    @classmethod
+    def upsert(
+        cls,
+        table_name: str,
+        data: Union[Dict[str, Any], List[Dict[str, Any]]],
+        update_columns: Optional[Union[List[str], Dict[str, Any]]] = None
+    ) -> int:
+        """
+        Inserts one or more records, updating the existing records on duplicate keys (INSERT ... ON DUPLICATE KEY UPDATE).
+
+        :param table_name: The name of the table to upsert the records into.
+        :param data: A dictionary or a list of dictionaries mapping column names to their respective values.
+        :param update_columns: The columns to update on duplicate keys with the inserted values, or a dictionary mapping
+            the columns to update to their new values or SQL expressions. Defaults to all columns in `data`.
+        :return: The number of affected rows as reported by MySQL (1 per inserted row, 2 per updated row).
+        """
+        rows = data if isinstance(data, List) else [data]
+        if not rows:
+            return 0
+        session = cls.get_session()
+        auto_commit = is_auto_commit()
+        table = cls.get_table(table_name)
+        try:
+            query = mysql_insert(table).values(rows)
+            if update_columns is None:
+                update_columns = list(rows[0].keys())
+            if not isinstance(update_columns, Dict):
+                update_columns = {column: query.inserted[column] for column in update_columns}
+            query = query.on_duplicate_key_update(update_columns)
+            result = session.execute(query)
+            if auto_commit:
+                session.commit()
+            return result.rowcount
+        except SQLAlchemyError as e:
+            session.rollback()
+            if isinstance(e, (OperationalError, InvalidRequestError)):
+                try:
+                    cls._Session.remove()
+                except:
+                    pass
+            raise e
+        finally:
+            if auto_commit:
+                session.close()
+
+    @classmethod
+    def get_query_cache_stats(cls) -> Dict[str, int]:
+        """
+        Returns the hit/miss counters and size of the process-wide select statement cache.
+
+        :return: A dictionary with the hits, misses, current size and maximum size of the cache.
+        """
+        return ORM._query_cache.stats()
+
+    @classmethod
+    def _get_select_query(cls, table_name: str, **kwargs: Any) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Returns the select statement for the given query arguments together with its bind parameter values.
+        Statements are cached by query shape (table, columns, joins, condition structure, grouping and ordering),
+        so repeated queries of the same shape only bind new values.
+
+        :param table_name: The name of the table to select records from.
+        :param kwargs: The same keyword arguments accepted by `select`.
+        :return: A tuple of the SQLAlchemy select statement and a dictionary of bind parameter values.
+        """
+        columns = kwargs.get('columns')
+        joins = kwargs.get('joins')
+        conditions = kwargs.get('conditions')
+        limit = kwargs.get('limit')
+        offset = kwargs.get('offset')
+        
+        params = {}
+        conditions_shape = None
+        if conditions:
+            if isinstance(conditions, List) and isinstance(conditions[0], Dict):
+                conditions_shape = get_conditions_shape(conditions, conditions[0].get("logic", "and").lower(), params)
+            else:
+                conditions_shape = get_conditions_shape(conditions, "and", params)
+        if limit:
+            params['limit'] = limit
+        if offset:
+            params['offset'] = offset
+        
+        cls._check_table_schema_version()
+        key = (
+            table_name,
+            columns if columns == '*' or not columns else tuple(columns),
+            tuple((kwargs.get('aggregates') or {}).items()),
+            tuple(tuple(join) for join in joins) if joins else None,
+            conditions_shape,
+            kwargs.get('group_by'),
+            kwargs.get('having'),
+            kwargs.get('order_by'),
+            bool(limit),
+            bool(offset)
+        )
+        query = ORM._query_cache.get(key)
+        if query is None:
+            query = cls._build_select_query(table_name, params={}, **kwargs)
+            ORM._query_cache.set(key, query)
+        return query, params
+
+    @classmethod
+    def _build_select_query(cls, table_name: str, params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
         """
         Helper method to build the select query.
 
@@ -236,10 +696,12 @@ class ORM(SQLDatabase):
         :param order_by: A string specifying the column names to order the result set by.
         :param limit: An integer specifying the maximum number of records to return.
         :param offset: An integer specifying the number of records to skip before starting to return records from the query.
+        :param params: If given, condition values, limit and offset are rendered as named bind parameters
+            and their values are stored in this dictionary.
         :return: A SQLAlchemy select query object.
         """
         columns = kwargs.get('columns')
-        aggregates = kwargs.get('aggregates', {})
+        aggregates = kwargs.get('aggregates') or {}
         joins = kwargs.get('joins')
         conditions = kwargs.get('conditions')
         group_by = kwargs.get('group_by')
@@ -248,10 +710,7 @@ class ORM(SQLDatabase):
         limit = kwargs.get('limit')
         offset = kwargs.get('offset')
         
-        table = Table(table_name, cls._metadata, autoload_with=cls._engine)
-        for column in table.columns:
-            if str(column.type) == 'LONGTEXT':
-                column.type = JSON()
+        table = cls.get_table(table_name)
         tables = {table_name: table}
         
         if joins:
@@ -259,10 +718,7 @@ class ORM(SQLDatabase):
                 join_type = join_type.strip()
                 join_table_name = join_table_name.strip()
                 if join_table_name not in tables:
-                    tables[join_table_name] = Table(join_table_name, cls._metadata, autoload_with=cls._engine)
-                    for column in tables[join_table_name].columns:
-                        if str(column.type) == 'LONGTEXT':
-                            column.type = JSON()
+                    tables[join_table_name] = cls.get_table(join_table_name)
         
         query = select()
         
@@ -320,9 +776,9 @@ class ORM(SQLDatabase):
         if conditions:
             if isinstance(conditions, List) and isinstance(conditions[0], Dict):
                 nested_logic = conditions[0].get("logic", "and").lower()
-                query = query.where(build_conditions(tables, conditions, nested_logic))
+                query = query.where(build_conditions(tables, conditions, nested_logic, params))
             else:
-                query = query.where(build_conditions(tables, conditions))
+                query = query.where(build_conditions(tables, conditions, params=params))
         if group_by:
             query = query.group_by(text(group_by))
         if having:
@@ -330,9 +786,9 @@ class ORM(SQLDatabase):
         if order_by:
             query = query.order_by(text(order_by))
         if limit:
-            query = query.limit(limit)
+            query = query.limit(limit if params is None else bindparam('limit', type_=Integer))
         if offset:
-            query = query.offset(offset)
+            query = query.offset(offset if params is None else bindparam('offset', type_=Integer))
         
         return query
     
@@ -354,7 +810,7 @@ class ORM(SQLDatabase):
         :return: A list of dictionaries, each representing a row from the result set.
         """
         session = cls.get_session()
-        query = cls._build_select_query(table_name, **kwargs)
+        query, params = cls._get_select_query(table_name, **kwargs)
         
         # print(str(query.compile(compile_kwargs={"literal_binds": True})))
         # print('SQL:')
@@ -363,7 +819,7 @@ class ORM(SQLDatabase):
         # pp(kwargs)
         
         try:
-            result = session.execute(query)
+            result = session.execute(query, params)
             rows = result.fetchall()
             columns = result.keys()
             dict_rows = [dict(zip(columns, row)) for row in rows]
@@ -400,7 +856,7 @@ class ORM(SQLDatabase):
         kwargs['offset'] = 0
         
         session = cls.get_session()
-        query = cls._build_select_query(table_name, **kwargs)
+        query, params = cls._get_select_query(table_name, **kwargs)
         
         # print('SQL:')
         # pp(str(query.compile()))
@@ -408,7 +864,7 @@ class ORM(SQLDatabase):
         # pp(kwargs)
         
         try:
-            result = session.execute(query)
+            result = session.execute(query, params)
             row = result.fetchone()
             columns = result.keys()
             if row:
@@ -438,10 +894,7 @@ class ORM(SQLDatabase):
         """
         session = cls.get_session()
         auto_commit = is_auto_commit()
-        table = Table(table_name, cls._metadata, autoload_with=cls._engine)
-        for column in table.columns:
-            if str(column.type) == 'LONGTEXT':
-                column.type = JSON()
+        table = cls.get_table(table_name)
         try:
             if conditions:
                 if isinstance(conditions, List) and isinstance(conditions[0], Dict):
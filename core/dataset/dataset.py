@@ -1,20 +1,26 @@
 import base64
+import heapq
 import json
 import re
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import wraps
 from pathlib import Path
-from time import monotonic
-from typing import Any, Dict, List, Literal, Optional, Tuple
-from uuid import uuid4
+from time import monotonic, sleep
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
 
 import tiktoken
 
+from redis.exceptions import LockError
+from redis.lock import Lock
+
 from langchain_core.documents import Document
 from langchain_core.runnables import chain, Runnable
 from langchain_core.runnables.utils import Input, Output
 
 from config import enable_reranking_on_single_retrival, LOCAL_MODEL_PATHS, settings
+from core.database import redis
 from core.database.models import (
     Apps,
     DatasetProcessRules,
@@ -28,7 +34,10 @@ from core.database.models import (
     UploadFiles,
     Users
 )
+from core.dataset.handle_cache import HandleCache
+from core.dataset.lexical_index import LexicalIndex, reciprocal_rank_fusion, tokenize
 from core.document import DocumentLoader, TextSplitter
+from core.file.content_store import store_bytes
 from core.helper import convert_document_to_markdown
 from core.embeddings import Embeddings
 from core.reranker import Reranker
@@ -54,51 +63,112 @@ rag_records = RagRecords()
 upload_files = UploadFiles()
 users = Users()
 
-all_embeddings = {}
-all_rerankers = {}
+# Model and vector database handles are reused across calls; local models are kept until they are evicted,
+# API model clients and collection handles are recreated after their TTL to pick up configuration changes
+embeddings_cache = HandleCache(settings.MODEL_HANDLE_CACHE_SIZE, settings.MODEL_HANDLE_CACHE_TTL)
+reranker_cache = HandleCache(settings.MODEL_HANDLE_CACHE_SIZE, settings.MODEL_HANDLE_CACHE_TTL)
+vdb_cache = HandleCache(settings.VDB_HANDLE_CACHE_SIZE, settings.VDB_HANDLE_CACHE_TTL)
+
+reindex_lock_key = 'dataset_reindex_lock:{}'
+lexical_index_version_key = 'dataset_lexical_index_version:{}'
+lexical_index_lock_key = 'dataset_lexical_index_lock:{}'
+lexical_index_build_key = 'dataset_lexical_index_build:{}'
+
+retrieval_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='retrieval_writer')
+dataset_searcher = ThreadPoolExecutor(max_workers=max(1, settings.DATASET_SEARCH_CONCURRENCY), thread_name_prefix='dataset_searcher')
+# Lexical searches run alongside vector searches that may themselves run in the dataset searcher
+lexical_searcher = ThreadPoolExecutor(max_workers=max(1, settings.DATASET_SEARCH_CONCURRENCY), thread_name_prefix='lexical_searcher')
+
+def write_segment_hits(segment_ids: List[int], segment_rag_records: List[Dict[str, Any]], in_background: bool = False) -> None:
+    '''
+    Increment the hit counts of the retrieved segments and insert their RAG records.
+    In the background, the writes are committed in their own session and errors are only logged.
+    '''
+    try:
+        document_segments.increment_hit_counts(segment_ids)
+        document_segment_rag_records.insert_many(segment_rag_records, return_ids=False)
+        if in_background:
+            document_segments.commit()
+    except Exception as e:
+        if not in_background:
+            raise
+        document_segments.rollback()
+        logger.exception('Failed to write segment hits: %s', e)
+    finally:
+        if in_background:
+            document_segments.close()
+
+def closing_session(func: Callable[..., Any]) -> Callable[..., Any]:
+    '''
+    Wrap a task run by a pool thread so that the database session of the thread is closed after the task.
+    Pool threads never commit, so otherwise each of them would keep a connection and the snapshot of its first
+    transaction, and later tasks would read stale rows.
+    '''
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            document_segments.close()
+    return wrapper
+
+def get_embeddings(embeddings_config_id: int) -> Embeddings:
+    embeddings = embeddings_cache.get(embeddings_config_id)
+    if embeddings is not None:
+        return embeddings
+    
+    embeddings_config = {}
+    embeddings_data = models.get_model_by_config_id(embeddings_config_id)
+    for key, value in embeddings_data['supplier_config'].items():
+        embeddings_config[key] = value
+    for key, value in embeddings_data['model_config'].items():
+        # Override supplier config with model config
+        embeddings_config[key] = value
+    embeddings_type, embeddings_config = convert_to_type_and_config(embeddings_config)
+    match embeddings_type:
+        case 'OpenAIEmbeddings':
+            embeddings_kwargs = {
+                'openai_api_key': embeddings_config['api_key'],
+                'model': embeddings_config['model']
+            }
+        case 'Text2vecEmbeddings':
+            embeddings_kwargs = {
+                'model_name_or_path': LOCAL_MODEL_PATHS[(
+                    embeddings_data['supplier_name'],
+                    embeddings_data['model_name']
+                )]
+            }
+        case 'SentenceTransformerEmbeddings':
+            embeddings_kwargs = {
+                'model_name': LOCAL_MODEL_PATHS[(
+                    embeddings_data['supplier_name'],
+                    embeddings_data['model_name']
+                )],
+                'encode_kwargs': {'normalize_embeddings': True}
+            }
+        case _:
+            embeddings_kwargs = {}
+    embeddings = Embeddings(embeddings_type, **embeddings_kwargs)
+    embeddings_cache.set(
+        embeddings_config_id,
+        embeddings,
+        None if embeddings_data['model_mode'] == 2 else settings.MODEL_HANDLE_CACHE_TTL
+    )
+    return embeddings
 
 def get_embeddings_and_vector_database(
     embeddings_config_id: int,
     collection_name: str,
 ) -> Tuple[Embeddings, VectorDatabase]:
-    if embeddings_config_id in all_embeddings:
-        embeddings = all_embeddings[embeddings_config_id]
-    else:
-        embeddings_config = {}
-        embeddings_data = models.get_model_by_config_id(embeddings_config_id)
-        for key, value in embeddings_data['supplier_config'].items():
-            embeddings_config[key] = value
-        for key, value in embeddings_data['model_config'].items():
-            # Override supplier config with model config
-            embeddings_config[key] = value
-        embeddings_type, embeddings_config = convert_to_type_and_config(embeddings_config)
-        match embeddings_type:
-            case 'OpenAIEmbeddings':
-                embeddings_kwargs = {
-                    'openai_api_key': embeddings_config['api_key'],
-                    'model': embeddings_config['model']
-                }
-            case 'Text2vecEmbeddings':
-                embeddings_kwargs = {
-                    'model_name_or_path': LOCAL_MODEL_PATHS[(
-                        embeddings_data['supplier_name'],
-                        embeddings_data['model_name']
-                    )]
-                }
-            case 'SentenceTransformerEmbeddings':
-                embeddings_kwargs = {
-                    'model_name': LOCAL_MODEL_PATHS[(
-                        embeddings_data['supplier_name'],
-                        embeddings_data['model_name']
-                    )],
-                    'encode_kwargs': {'normalize_embeddings': True}
-                }
-            case _:
-                embeddings_kwargs = {}
-        embeddings = Embeddings(embeddings_type, **embeddings_kwargs)
-        if embeddings_data['model_mode'] == 2:
-            # Cache local models
-            all_embeddings[embeddings_config_id] = embeddings
+    '''
+    Get the embeddings and the vector database handle of a collection, reusing the cached ones.
+    Milvus clients of the same endpoint and user share one connection, so a new handle only opens the collection.
+    '''
+    embeddings = get_embeddings(embeddings_config_id)
+    vdb = vdb_cache.get((embeddings_config_id, collection_name))
+    # A handle created with expired embeddings is recreated along with them
+    if vdb is not None and vdb.embeddings is embeddings:
+        return embeddings, vdb
     
     vdb_type, vdb_config = get_vdb_type_and_config()
     match vdb_type:
@@ -124,9 +194,17 @@ def get_embeddings_and_vector_database(
         case _:
             vdb_kwargs = {}
     vdb = VectorDatabase(vdb_type, **vdb_kwargs)
+    vdb_cache.set((embeddings_config_id, collection_name), vdb)
     
     return embeddings, vdb
 
+def invalidate_vector_database(collection_name: str) -> None:
+    '''
+    Remove the cached handles of a collection that has been dropped or replaced.
+    Handles cached by other processes expire after `VDB_HANDLE_CACHE_TTL`.
+    '''
+    vdb_cache.invalidate(lambda key: key[1] == collection_name)
+
 def get_retriever(retriever_config: Dict[str, Any]) -> Dict[str, Any]:
     _, retriever_config = convert_to_type_and_config(retriever_config)
     return {
@@ -134,12 +212,68 @@ def get_retriever(retriever_config: Dict[str, Any]) -> Dict[str, Any]:
         'score_threshold': retriever_config['score_threshold']
     }
 
+def get_document_source(document: Dict[str, Any]) -> str:
+    '''
+    Get the source metadata of the segments of a document, by which searches are restricted to documents.
+    '''
+    if document['upload_file_id']:
+        file = upload_files.get_file_by_id(document['upload_file_id'])
+        return str(project_root.joinpath(file['path']))
+    return f'{document["name"]}-{document["node_exec_id"]}'
+
+def schedule_lexical_index_build(dataset_id: int) -> None:
+    '''
+    Start a Celery task building the lexical index of a dataset, unless one has been started
+    within `DATASET_LEXICAL_INDEX_LOCK_TTL` seconds and has not finished yet.
+    '''
+    if redis.set(lexical_index_build_key.format(dataset_id), 1, nx=True, ex=settings.DATASET_LEXICAL_INDEX_LOCK_TTL):
+        from celery_app import build_lexical_index
+        build_lexical_index.delay(dataset_id)
+
+def get_lexical_index(dataset_id: int) -> Optional[LexicalIndex]:
+    '''
+    Get the lexical index of a dataset for searching.
+    An index that is missing or misses segment changes made by other processes or hosts is never built here:
+    a build is scheduled, and a stale index is still searched, as removed segments are dropped by the caller.
+
+    Return: the lexical index, None if it does not exist yet
+    '''
+    index = LexicalIndex(dataset_id)
+    version = int(redis.get(lexical_index_version_key.format(dataset_id)) or 0)
+    index_version = index.get_version()
+    if index_version == version:
+        return index
+    schedule_lexical_index_build(dataset_id)
+    return None if index_version is None else index
+
+def update_lexical_index(
+    dataset_id: int,
+    added_segments: Optional[List[Tuple[int, str, str]]] = None,
+    deleted_segment_ids: Optional[List[int]] = None
+) -> None:
+    '''
+    Apply segment changes to the lexical index of a dataset and bump its version.
+    The local index is only updated if it reflects all previous changes; otherwise a rebuild from the database is scheduled.
+    '''
+    version = redis.incr(lexical_index_version_key.format(dataset_id))
+    index = LexicalIndex(dataset_id)
+    if index.get_version() != version - 1:
+        schedule_lexical_index_build(dataset_id)
+        return
+    try:
+        index.update(version, added_segments or (), deleted_segment_ids or ())
+    except Exception as e:
+        logger.exception('Failed to update lexical index of dataset %s, dropping it: %s', dataset_id, e)
+        index.drop()
+        schedule_lexical_index_build(dataset_id)
+
 def get_reranker(team_id: int) -> Reranker:
     reranker_config = {}
     reranker_data = models.get_model_by_type(3, team_id)
     reranker_config_id = reranker_data['model_config_id']
-    if reranker_config_id in all_rerankers:
-        return all_rerankers[reranker_config_id]
+    reranker = reranker_cache.get(reranker_config_id)
+    if reranker is not None:
+        return reranker
     
     for key, value in reranker_data['supplier_config'].items():
         reranker_config[key] = value
@@ -163,9 +297,11 @@ def get_reranker(team_id: int) -> Reranker:
             reranker_kwargs['api_key'] = reranker_config['api_key']
     reranker_kwargs['top_n'] = settings.RETRIEVER_K
     reranker = Reranker(reranker_type, **reranker_kwargs)
-    if reranker_data['model_mode'] == 2:
-        # Cache local models
-        all_rerankers[reranker_config_id] = reranker
+    reranker_cache.set(
+        reranker_config_id,
+        reranker,
+        None if reranker_data['model_mode'] == 2 else settings.MODEL_HANDLE_CACHE_TTL
+    )
     return reranker
 
 
@@ -206,17 +342,6 @@ class DatasetManagement:
         if not keep_data_uris:
             return markdown_text
             
-        # Create upload_files directory structure
-        current_time = datetime.now()
-
-        today_path = project_root.joinpath(
-            'upload_files',
-            str(current_time.year),
-            str(current_time.month),
-            str(current_time.day)
-        )
-        today_path.mkdir(parents=True, exist_ok=True)
-        
         # Find all base64 encoded files
         file_pattern = r'!\[.*?\]\(data:([^/]+)/([^;]+);base64,(.+?)\)'
         file_matches = re.finditer(file_pattern, markdown_text)
@@ -230,27 +355,20 @@ class DatasetManagement:
             if mime_type == 'image/x-emf':
                 file_type = 'emf'
             
-            # Generate unique filename
-            timestamp = current_time.strftime('%Y%m%d%H%M%S%f')
-            filename = f'file_{timestamp}'
-            file_path_obj = today_path / f'{uuid4().hex}.{file_type}'
-            
-            # Save file
-            with file_path_obj.open('wb') as f:
-                f.write(base64.b64decode(base64_data))
-            
-            # Get file size
-            file_size = file_path_obj.stat().st_size
+            # Save file, once per content
+            file_data = base64.b64decode(base64_data)
+            relative_path, content_hash = store_bytes(file_data, f'.{file_type}')
+            file_path_obj = project_root.joinpath(relative_path)
             
             # Insert into database
-            relative_path = str(file_path_obj.relative_to(project_root)).replace("\\", "/")
             upload_files.insert_file(
                 user_id=user_id,
                 name=file_path_obj.stem,
                 path=relative_path,
-                size=file_size,
+                size=len(file_data),
                 extension=f'.{file_type}',
-                mime_type=mime_type
+                mime_type=mime_type,
+                content_hash=content_hash
             )
             
             # Replace base64 with path in markdown (only once)
@@ -321,6 +439,135 @@ class DatasetManagement:
         collection_name = get_new_collection_name()
         return collection_name
 
+    @classmethod
+    def split_into_embedding_batches(cls, segments: List[Document]) -> List[List[int]]:
+        '''
+        Split segments into batches of at most `DATASET_EMBEDDING_BATCH_SIZE` segments
+        and `DATASET_EMBEDDING_BATCH_MAX_TOKENS` estimated tokens.
+        A segment exceeding the token limit on its own forms a batch by itself.
+
+        Return: list of batches of segment indexes
+        '''
+        enc = tiktoken.get_encoding("cl100k_base")
+        batches = []
+        batch = []
+        batch_num_tokens = 0
+        for index, segment in enumerate(segments):
+            num_tokens = len(enc.encode(segment.page_content, disallowed_special=()))
+            if batch and (
+                len(batch) >= settings.DATASET_EMBEDDING_BATCH_SIZE
+                or batch_num_tokens + num_tokens > settings.DATASET_EMBEDDING_BATCH_MAX_TOKENS
+            ):
+                batches.append(batch)
+                batch = []
+                batch_num_tokens = 0
+            batch.append(index)
+            batch_num_tokens += num_tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @classmethod
+    def index_segments(
+        cls,
+        embeddings_config_id: int,
+        collection_name: str,
+        segments: List[Document],
+        segment_ids: List[int],
+        reindexing: bool = False
+    ) -> int:
+        '''
+        Embed segments and insert them into the vector database in batches, with `DATASET_INDEXING_CONCURRENCY` batches in parallel.
+        The embedding of each batch is retried up to `DATASET_INDEXING_MAX_RETRIES` times, while the insert is not, so that
+        no vector is inserted twice. The segment rows of a batch are updated
+        as soon as it has been indexed, so indexed batches are kept when other batches fail.
+        Raises the error of the first failed batch after all batches have been processed.
+        When reindexing, the index IDs and tokens are saved as the reindexing checkpoints of the segments,
+        and their current index IDs and indexing status are left unchanged.
+
+        Return: total number of embedding tokens
+        '''
+        # The worker threads share the vector database handle, the token counts of the embeddings are kept per thread
+        _, vdb = get_embeddings_and_vector_database(embeddings_config_id, collection_name)
+
+        def index_batch(batch: List[int]) -> Tuple[List[str], int]:
+            documents = [segments[index] for index in batch]
+            # Only the embedding is retried, as it has no side effects. The embeddings are cached, so the insert below
+            # does not embed the batch again, and it is not retried, as retrying an insert that was partly or entirely
+            # applied would add the vectors of the batch to the collection twice
+            for attempt in range(settings.DATASET_INDEXING_MAX_RETRIES + 1):
+                try:
+                    vdb.embeddings.embed_documents([document.page_content for document in documents])
+                    break
+                except Exception as e:
+                    if attempt == settings.DATASET_INDEXING_MAX_RETRIES:
+                        vdb.embeddings.get_and_reset_num_tokens()
+                        raise
+                    logger.warning('Embedding batch of %s segments failed (attempt %s): %s', len(batch), attempt + 1, e)
+                    sleep(2 ** attempt)
+            try:
+                index_ids = vdb.add_documents(documents)
+            finally:
+                num_tokens = vdb.embeddings.get_and_reset_num_tokens()
+            return index_ids, num_tokens
+
+        total_num_tokens = 0
+        first_error = None
+        batches = cls.split_into_embedding_batches(segments)
+        with ThreadPoolExecutor(max_workers=max(1, settings.DATASET_INDEXING_CONCURRENCY)) as executor:
+            futures = {executor.submit(index_batch, batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    index_ids, num_tokens = future.result()
+                except Exception as e:
+                    logger.exception('Indexing batch of %s segments failed: %s', len(batch), e)
+                    if first_error is None:
+                        first_error = e
+                        # Batches that have not started yet will not be indexed
+                        for pending_future in futures:
+                            pending_future.cancel()
+                    if reindexing:
+                        continue
+                    segment_updates = [
+                        ({'column': 'id', 'value': segment_ids[index]}, {'indexing_status': 3})
+                        for index in batch
+                    ]
+                else:
+                    total_num_tokens += num_tokens
+                    completed_time = datetime.now()
+                    # The batch tokens are divided among its segments in proportion to their length
+                    total_length = sum(len(segments[index].page_content) for index in batch) or 1
+                    segment_updates = []
+                    for index, index_id in zip(batch, index_ids):
+                        tokens = round(num_tokens * len(segments[index].page_content) / total_length)
+                        if reindexing:
+                            segment_update = {'reindex_index_id': index_id, 'reindex_tokens': tokens}
+                        else:
+                            segment_update = {
+                                'index_id': index_id,
+                                'tokens': tokens,
+                                'indexing_status': 2,
+                                'completed_time': completed_time
+                            }
+                        segment_updates.append(({'column': 'id', 'value': segment_ids[index]}, segment_update))
+                document_segments.update_many(segment_updates)
+                document_segments.commit()
+        cancelled_segment_ids = [
+            segment_ids[index]
+            for future, batch in futures.items() if future.cancelled()
+            for index in batch
+        ]
+        if cancelled_segment_ids and not reindexing:
+            document_segments.update(
+                {'column': 'id', 'op': 'in', 'value': cancelled_segment_ids},
+                {'indexing_status': 3}
+            )
+            document_segments.commit()
+        if first_error is not None:
+            raise first_error
+        return total_num_tokens
+
     @classmethod
     def add_document_to_dataset(
         cls,
@@ -333,11 +580,12 @@ class DatasetManagement:
         is_json: bool = False,
         source: str = '',
         text_split_config: Optional[Dict[str, Any]] = None
-    ) -> Tuple[int, int, float]:
+    ) -> Tuple[int, int, float, Dict[str, float]]:
         '''
         `text`, `is_json` and `source` is only used when `file_path` is empty
         
-        Return: Tuple of (total_word_count, total_num_tokens, indexing_latency)
+        Return: Tuple of (total_word_count, total_num_tokens, indexing_latency, throughput)
+        where throughput contains `segments_per_second` and `tokens_per_second`
         '''
         def get_text_splitter(document_type: Literal['markdown', 'text', 'json']) -> TextSplitter:
             process_rule = DatasetProcessRules().get_process_rule_by_id(process_rule_id)['config']
@@ -367,7 +615,6 @@ class DatasetManagement:
         dataset = datasets.get_dataset_by_id(dataset_id, check_is_reindexing=True)
         collection_name = dataset['collection_name']
         embeddings_config_id = dataset['embedding_model_config_id']
-        _, vdb = get_embeddings_and_vector_database(embeddings_config_id, collection_name)
         if file_path:
             # dl = DocumentLoader(file_path=file_path)
             # segments = dl.load_and_split(text_splitter=ts)
@@ -402,50 +649,47 @@ class DatasetManagement:
         total_word_count = 0
         total_num_tokens = 0
         overall_indexing_start_time = monotonic()
+        indexing_time = datetime.now()
+        segment_rows = []
         for segment in segments:
             segment_source = segment.metadata.get('source')
             if not segment_source:
                 segment_source = source
             segment.metadata = {'source': segment_source}
-            page_content = segment.page_content
-            word_count = len(page_content)
+            word_count = len(segment.page_content)
             total_word_count += word_count
-            indexing_time = datetime.now()
-            segment_id = document_segments.insert(
+            segment_rows.append(
                 {
                     'document_id': document_id,
-                    'content': page_content,
+                    'content': segment.page_content,
                     'word_count': word_count,
                     'indexing_status': 1,
                     'indexing_time': indexing_time
                 }
             )
-            try:
-                index_id = vdb.add_documents([segment])[0]
-            except:
-                document_segments.update(
-                    {'column': 'id', 'value': segment_id},
-                    {'indexing_status': 3}
-                )
-                document_segments.commit()
-                raise
-            else:
-                completed_time = datetime.now()
-                num_tokens = vdb.embeddings.get_and_reset_num_tokens()
-                total_num_tokens += num_tokens
-                document_segments.update(
-                    {'column': 'id', 'value': segment_id},
-                    {
-                        'index_id': index_id,
-                        'tokens': num_tokens,
-                        'indexing_status': 2,
-                        'completed_time': completed_time
-                    }
-                )
-                document_segments.commit()
+        segment_ids = document_segments.insert_many(segment_rows)
+        document_segments.commit()
+        # Segments that fail to be indexed are left out by lexical searches, as they have no index ID
+        update_lexical_index(
+            dataset_id,
+            added_segments=[
+                (segment_id, segment.page_content, segment.metadata['source'])
+                for segment_id, segment in zip(segment_ids, segments)
+            ]
+        )
+        total_num_tokens = cls.index_segments(embeddings_config_id, collection_name, segments, segment_ids)
                 
         indexing_latency = monotonic() - overall_indexing_start_time
-        return total_word_count, total_num_tokens, indexing_latency
+        throughput = {
+            'segments_per_second': len(segments) / indexing_latency if indexing_latency > 0 else 0.0,
+            'tokens_per_second': total_num_tokens / indexing_latency if indexing_latency > 0 else 0.0
+        }
+        logger.info(
+            'Document %s indexed: %s segments, %s tokens in %.2fs (%.2f segments/s, %.2f tokens/s)',
+            document_id, len(segments), total_num_tokens, indexing_latency,
+            throughput['segments_per_second'], throughput['tokens_per_second']
+        )
+        return total_word_count, total_num_tokens, indexing_latency, throughput
 
     @classmethod
     def enable_document(cls, document_id: int) -> Optional[bool]:
@@ -505,6 +749,10 @@ class DatasetManagement:
                     update_data
                 )
                 document_segments.commit()
+        update_lexical_index(
+            dataset['id'],
+            added_segments=[(segment['id'], segment['content'], source_string) for segment in segments]
+        )
                 
         return True
 
@@ -529,6 +777,7 @@ class DatasetManagement:
             {'indexing_status': 0}
         )
         document_segments.commit()
+        update_lexical_index(dataset['id'], deleted_segment_ids=[segment['id'] for segment in segments])
         return result
 
     @classmethod
@@ -544,7 +793,7 @@ class DatasetManagement:
             return True
         dataset = datasets.get_dataset_by_id(document['dataset_id'], check_is_reindexing=True)
         segments = document_segments.select(
-            columns=['index_id', 'content', 'status'],
+            columns=['id', 'index_id', 'content', 'status'],
             conditions=[
                 {'column': 'document_id', 'value': document_id},
                 {'column': 'status', 'op': '<', 'value': 3}
@@ -566,6 +815,7 @@ class DatasetManagement:
             }
         )
         document_segments.commit()
+        update_lexical_index(dataset['id'], deleted_segment_ids=[segment['id'] for segment in segments])
         return result
 
     @classmethod
@@ -627,6 +877,7 @@ class DatasetManagement:
             update_data
         )
         document_segments.commit()
+        update_lexical_index(dataset['id'], added_segments=[(segment_id, segment['content'], source_string)])
         
         return index_id
 
@@ -656,154 +907,207 @@ class DatasetManagement:
             }
         )
         document_segments.commit()
+        update_lexical_index(dataset['id'], deleted_segment_ids=[segment['id']])
         
         return result
 
     @classmethod
-    def reindex_dataset(cls, dataset_id: int, new_embeddings_config_id: int) -> None:
-        dataset = datasets.get_dataset_by_id(dataset_id, check_is_reindexing=True)
+    def is_reindexing_running(cls, dataset_id: int) -> bool:
+        '''
+        Return: whether a worker is currently reindexing the dataset
+        '''
+        return bool(redis.exists(reindex_lock_key.format(dataset_id)))
+
+    @classmethod
+    def reindex_dataset(cls, dataset_id: int, new_embeddings_config_id: int) -> bool:
+        '''
+        Re-index a dataset with a new embedding model without taking it offline.
+        The new collection is built in batches while queries are still served from the current collection,
+        then the dataset is switched to the new collection and the old collection is dropped.
+        The new index ID of each segment is saved as a checkpoint, so an interrupted reindexing resumes
+        from the remaining segments when it is started again with the same embedding model.
+
+        Return: False if the reindexing lock is held by another worker, possibly one that has been lost,
+        and the dataset does not use the new embedding model yet, so the reindexing must be started again later
+        '''
+        lock = redis.lock(reindex_lock_key.format(dataset_id), timeout=settings.DATASET_REINDEX_LOCK_TTL)
+        if not lock.acquire(blocking=False):
+            dataset = datasets.get_dataset_by_id(dataset_id)
+            if (
+                dataset['embedding_model_config_id'] == new_embeddings_config_id
+                and not dataset['reindexing_collection_name']
+            ):
+                logger.info('Dataset %s has already been reindexed', dataset_id)
+                return True
+            logger.info('Dataset %s is being reindexed by another worker', dataset_id)
+            return False
+        try:
+            cls._reindex_dataset(dataset_id, new_embeddings_config_id, lock)
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                logger.warning('Reindexing lock of dataset %s has expired', dataset_id)
+        return True
+
+    @classmethod
+    def _discard_reindexing(cls, dataset: Dict[str, Any]) -> None:
+        '''
+        Drop the collection of an unfinished reindexing and clear its checkpoints.
+        '''
+        reindexing_collection_name = dataset['reindexing_collection_name']
+        if reindexing_collection_name:
+            logger.info('Discarding reindexing of dataset %s into %s', dataset['id'], reindexing_collection_name)
+            _, vdb = get_embeddings_and_vector_database(
+                dataset['reindexing_embedding_model_config_id'],
+                reindexing_collection_name
+            )
+            if vdb.delete_dataset() != DeleteDatasetStatus.OK:
+                logger.warning('Cannot drop collection %s of the discarded reindexing', reindexing_collection_name)
+            invalidate_vector_database(reindexing_collection_name)
+        document_segments.reset_reindex(dataset['id'])
+        datasets.update(
+            {'column': 'id', 'value': dataset['id']},
+            {
+                'reindexing_collection_name': '',
+                'reindexing_embedding_model_config_id': 0
+            }
+        )
+        datasets.commit()
+
+    @classmethod
+    def _reindex_dataset(cls, dataset_id: int, new_embeddings_config_id: int, lock: Lock) -> None:
+        dataset = datasets.get_dataset_by_id(dataset_id)
         
         embeddings_config_id = dataset['embedding_model_config_id']
-        new_collection_name = get_new_collection_name()
+        collection_name = dataset['collection_name']
         
         if embeddings_config_id == 0:
             # Create dataset
             datasets.update(
                 {'column': 'id', 'value': dataset_id},
                 {
-                    'collection_name': new_collection_name,
+                    'collection_name': get_new_collection_name(),
                     'embedding_model_config_id': new_embeddings_config_id
                 }
             )
             return
+        
+        if (
+            dataset['reindexing_collection_name']
+            and dataset['reindexing_embedding_model_config_id'] == new_embeddings_config_id
+        ):
+            new_collection_name = dataset['reindexing_collection_name']
+            logger.info('Resuming reindexing of dataset %s into %s', dataset_id, new_collection_name)
+        else:
+            # An unfinished reindexing with another embedding model is replaced
+            cls._discard_reindexing(dataset)
+            if new_embeddings_config_id == embeddings_config_id and collection_name != 'reindexing':
+                return
+            new_collection_name = get_new_collection_name()
+            datasets.update(
+                {'column': 'id', 'value': dataset_id},
+                {
+                    'reindexing_collection_name': new_collection_name,
+                    'reindexing_embedding_model_config_id': new_embeddings_config_id
+                }
+            )
+            datasets.commit()
+            logger.info('Reindexing dataset %s into %s', dataset_id, new_collection_name)
 
-        # ------ Re-index dataset ------
-
-        # Initialize old and new vector databases
-        collection_name = dataset['collection_name']
-        _, vdb = get_embeddings_and_vector_database(embeddings_config_id, collection_name)
-        _, new_vdb = get_embeddings_and_vector_database(new_embeddings_config_id, new_collection_name)
-
-        # Update dataset status to reindexing
-        datasets.update(
-            {'column': 'id', 'value': dataset_id},
-            {
-                'collection_name': 'reindexing',
-                'embedding_model_config_id': new_embeddings_config_id
-            }
-        )
+        # ------ Build the new collection from the remaining segments ------
 
-        # Get all enabled documents and segments and update their status to not indexed
-        enabled_documents = documents.select(
-            columns=['id', 'name', 'upload_file_id', 'node_exec_id'],
-            conditions=[
-                {'column': 'dataset_id', 'value': dataset_id},
-                {'column': 'archived', 'value': 0},
-                {'column': 'status', 'value': 1}
-            ]
-        )
-        enabled_segments_by_document_id = {}
-        for document in enabled_documents:
-            segments = document_segments.select(
-                columns=['id', 'index_id', 'content'],
+        sources = {
+            document['id']: get_document_source(document)
+            for document in documents.select(
+                columns=['id', 'name', 'upload_file_id', 'node_exec_id'],
                 conditions=[
-                    {'column': 'document_id', 'value': document['id']},
+                    {'column': 'dataset_id', 'value': dataset_id},
+                    {'column': 'archived', 'value': 0},
                     {'column': 'status', 'value': 1}
                 ]
             )
-            enabled_segments_by_document_id[document['id']] = segments
-            document_segments.update(
+        }
+        
+        start_time = monotonic()
+        num_segments = 0
+        total_num_tokens = 0
+        last_segment_id = 0
+        while segments := document_segments.get_segments_to_reindex(
+            list(sources), last_segment_id, settings.DATASET_REINDEX_CHUNK_SIZE
+        ):
+            last_segment_id = segments[-1]['id']
+            total_num_tokens += cls.index_segments(
+                new_embeddings_config_id,
+                new_collection_name,
                 [
-                    {'column': 'document_id', 'value': document['id']},
-                    {'column': 'status', 'value': 1}
+                    Document(page_content=segment['content'], metadata={'source': sources[segment['document_id']]})
+                    for segment in segments
                 ],
-                {
-                    'tokens': 0,
-                    'indexing_status': 0
-                }
+                [segment['id'] for segment in segments],
+                reindexing=True
+            )
+            num_segments += len(segments)
+            # Fails if the lock has expired and another worker has taken over the reindexing
+            lock.reacquire()
+            logger.info(
+                'Reindexing dataset %s: %s segments, %s tokens in %.2fs',
+                dataset_id, num_segments, total_num_tokens, monotonic() - start_time
             )
         
-        # Delete dataset from vector database
+        # ------ Switch the dataset to the new collection ------
+
+        # The segments are switched first: until the dataset is switched, queries served from the old collection
+        # miss the switched segments, but they never map index IDs of one collection to the other
+        document_segments.apply_reindex(dataset_id)
+        datasets.update(
+            {'column': 'id', 'value': dataset_id},
+            {
+                'collection_name': new_collection_name,
+                'embedding_model_config_id': new_embeddings_config_id,
+                'reindexing_collection_name': '',
+                'reindexing_embedding_model_config_id': 0
+            }
+        )
+        datasets.commit()
+        logger.info('Dataset %s switched to %s', dataset_id, new_collection_name)
+
+        if collection_name == 'reindexing':
+            # The old collection has already been dropped by a reindexing started before the blue/green reindexing
+            return
+        
+        # ------ Drop the old collection ------
+
+        _, vdb = get_embeddings_and_vector_database(embeddings_config_id, collection_name)
         status = vdb.delete_dataset()
-        if status == DeleteDatasetStatus.ERROR:
-            raise Exception('Cannot delete dataset from vector database!')
-        if status == DeleteDatasetStatus.NOT_SUPPORTED:
-            vdb.delete(
-                [
-                    segment['index_id']
-                    for segments in enabled_segments_by_document_id.values()
-                    for segment in segments
-                ]
-            )
+        if status != DeleteDatasetStatus.OK:
+            logger.error('Cannot drop old collection %s of dataset %s: %s', collection_name, dataset_id, status.name)
+        invalidate_vector_database(collection_name)
         
         # Clear embedding cache
-        for document in documents.select(
-            columns=['id'],
-            conditions=[
-                {'column': 'dataset_id', 'value': dataset_id},
-                {'column': 'status', 'op': '<', 'value': 3}
-            ],
-        ):
-            segments = document_segments.select(
-                columns=['id', 'content', 'status'],
+        document_ids = [
+            document['id']
+            for document in documents.select(
+                columns=['id'],
                 conditions=[
-                    {'column': 'document_id', 'value': document['id']},
+                    {'column': 'dataset_id', 'value': dataset_id},
                     {'column': 'status', 'op': '<', 'value': 3}
                 ],
             )
-            contents = [segment['content'] for segment in segments]
+        ]
+        for i in range(0, len(document_ids), 100):
+            contents = [
+                segment['content']
+                for segment in document_segments.select(
+                    columns=['content'],
+                    conditions=[
+                        {'column': 'document_id', 'op': 'in', 'value': document_ids[i:i + 100]},
+                        {'column': 'status', 'op': '<', 'value': 3}
+                    ],
+                )
+            ]
             if contents:
                 vdb.embeddings.document_embedding_store.mdelete(contents)
-        
-        # Add documents to new dataset
-        for document in enabled_documents:
-            if document['upload_file_id']:
-                file = upload_files.get_file_by_id(document['upload_file_id'])
-                source_string = str(project_root.joinpath(file['path']))
-            else:
-                source_string = f'{document["name"]}-{document["node_exec_id"]}'
-            segments = enabled_segments_by_document_id[document['id']]
-            for segment in segments:
-                segment_id = segment['id']
-                indexing_time = datetime.now()
-                document_segments.update(
-                    {'column': 'id', 'value': segment_id},
-                    {
-                        'indexing_status': 1,
-                        'indexing_time': indexing_time
-                    }
-                )
-                
-                try:
-                    index_id = new_vdb.add_texts(
-                        [segment['content']],
-                        [{'source': source_string}]
-                    )[0]
-                except:
-                    document_segments.update(
-                        {'column': 'id', 'value': segment_id},
-                        {'indexing_status': 3}
-                    )
-                    document_segments.commit()
-                    raise
-                else:
-                    completed_time = datetime.now()
-                    num_tokens = new_vdb.embeddings.get_and_reset_num_tokens()
-                    document_segments.update(
-                        {'column': 'id', 'value': segment_id},
-                        {
-                            'index_id': index_id,
-                            'tokens': num_tokens,
-                            'indexing_status': 2,
-                            'completed_time': completed_time
-                        }
-                    )
-                    document_segments.commit()
-        
-        datasets.update(
-            {'column': 'id', 'value': dataset_id},
-            {'collection_name': new_collection_name}
-        )
 
     @classmethod
     def delete_dataset(cls, dataset_id: int):
@@ -833,6 +1137,9 @@ class DatasetManagement:
                     )
                 ]
             )
+        invalidate_vector_database(collection_name)
+        LexicalIndex(dataset_id).drop()
+        redis.delete(lexical_index_version_key.format(dataset_id))
         # Clear embedding cache
         for document in documents.select(
             columns=['id'],
@@ -861,6 +1168,240 @@ class DatasetManagement:
 
 
 class DatasetRetrieval:
+    @classmethod
+    def process_retrieved_segments(
+        cls,
+        rag_record_id: int,
+        retrieved_documents: List[Document],
+        index_vdbs: Dict[str, VectorDatabase]
+    ) -> List[Tuple[Document, Dict[str, Any]]]:
+        '''
+        Look up the segments of the retrieved documents with one query and record the hits.
+        Documents whose segment no longer exists are deleted from their vector database and dropped.
+
+        Return: list of (retrieved document, document segment) in retrieval order
+        '''
+        segments = document_segments.get_segments_by_index_ids(
+            [str(document.metadata['index_id']) for document in retrieved_documents]
+        )
+        hits = []
+        missing_index_ids: Dict[int, List[str]] = {}
+        for document in retrieved_documents:
+            index_id = str(document.metadata['index_id'])
+            segment = segments.get(index_id)
+            if not segment:
+                logger.warning(f'Segment {index_id} not found! Deleting from vector database...')
+                missing_index_ids.setdefault(id(index_vdbs[index_id]), []).append(index_id)
+                continue
+            if segment['document_status'] >= 3:
+                logger.warning(f'Document {segment["document_id"]} of segment {index_id} is not available!')
+                continue
+            hits.append((document, segment))
+        for index_ids in missing_index_ids.values():
+            index_vdbs[index_ids[0]].delete(index_ids)
+
+        segment_ids = [segment['id'] for _, segment in hits]
+        segment_rag_records = [
+            {
+                'rag_record_id': rag_record_id,
+                'dataset_id': segment['dataset_id'],
+                'document_id': segment['document_id'],
+                'segment_id': segment['id'],
+                'score': document.metadata.get('score', 0.0),
+                'reranking_score': document.metadata.get('relevance_score', 0.0)
+            }
+            for document, segment in hits
+        ]
+        if hits:
+            if settings.DATASET_RETRIEVAL_BACKGROUND_WRITES:
+                retrieval_writer.submit(write_segment_hits, segment_ids, segment_rag_records, True)
+            else:
+                write_segment_hits(segment_ids, segment_rag_records)
+        return hits
+
+    @classmethod
+    def build_lexical_index(cls, dataset_id: int) -> None:
+        '''
+        Build the lexical index of a dataset from its enabled segments in the database, if it is missing or stale.
+        Only one process builds the index of a dataset at a time; searches use the previous index, if any, meanwhile.
+        '''
+        lock = redis.lock(lexical_index_lock_key.format(dataset_id), timeout=settings.DATASET_LEXICAL_INDEX_LOCK_TTL)
+        if not lock.acquire(blocking=False):
+            logger.info('Lexical index of dataset %s is already being built', dataset_id)
+            return
+        try:
+            index = LexicalIndex(dataset_id)
+            version = int(redis.get(lexical_index_version_key.format(dataset_id)) or 0)
+            if index.get_version() == version:
+                return
+            start_time = monotonic()
+            sources = {
+                document['id']: get_document_source(document)
+                for document in documents.select(
+                    columns=['id', 'name', 'upload_file_id', 'node_exec_id'],
+                    conditions=[
+                        {'column': 'dataset_id', 'value': dataset_id},
+                        {'column': 'archived', 'value': 0},
+                        {'column': 'status', 'value': 1}
+                    ]
+                )
+            }
+            document_ids = list(sources)
+
+            def get_segments():
+                for i in range(0, len(document_ids), 100):
+                    for document_id, segments in document_segments.get_segments_by_document_ids(document_ids[i:i + 100]).items():
+                        for segment in segments:
+                            yield segment['id'], segment['content'], sources[document_id]
+
+            # Changes made while building carry a later version, so the index is rebuilt again after them
+            index.build(get_segments(), version)
+            logger.info('Lexical index of dataset %s built in %.2fs', dataset_id, monotonic() - start_time)
+        finally:
+            redis.delete(lexical_index_build_key.format(dataset_id))
+            try:
+                lock.release()
+            except LockError:
+                logger.warning('Lexical index lock of dataset %s has expired', dataset_id)
+
+    @classmethod
+    def lexical_search(
+        cls,
+        dataset_id: int,
+        query: str,
+        k: int,
+        search_in_documents: Optional[List[str]] = None
+    ) -> List[Document]:
+        '''
+        Search the segments of a dataset by BM25 over their tokens.
+        Segments that have been disabled or removed since they were indexed are dropped.
+
+        Return: list of documents by descending BM25 score, with the `lexical_score` metadata
+        and the `lexical_full_match` metadata telling whether the segment contains every token of the query
+        '''
+        index = get_lexical_index(dataset_id)
+        if index is None:
+            return []
+        # Over-fetch to make up for segments that are no longer available
+        results = index.search(query, k * 2, search_in_documents)
+        segments = document_segments.get_available_segments_by_ids([segment_id for segment_id, _, _ in results])
+        query_tokens = set(tokenize(query))
+        lexical_documents = []
+        for segment_id, score, source in results:
+            segment = segments.get(segment_id)
+            if not segment:
+                continue
+            lexical_documents.append(
+                Document(
+                    page_content=segment['content'],
+                    metadata={
+                        'index_id': segment['index_id'],
+                        'source': source,
+                        'lexical_score': score,
+                        'lexical_full_match': query_tokens <= set(tokenize(segment['content']))
+                    }
+                )
+            )
+            if len(lexical_documents) >= k:
+                break
+        return lexical_documents
+
+    @classmethod
+    def hybrid_search(
+        cls,
+        dataset: Dict[str, Any],
+        vdb: VectorDatabase,
+        query: str,
+        query_embedding: Optional[List[float]] = None,
+        search_in_documents: Optional[List[str]] = None
+    ) -> List[Tuple[Document, float]]:
+        '''
+        Search a dataset by vector similarity and, if `DATASET_HYBRID_SEARCH` is enabled, by BM25 at the same time,
+        fusing both rankings with reciprocal rank fusion.
+        Vector results are subject to the score threshold of the retriever config. Segments found by BM25 only
+        are kept if they contain every token of the query, and they are scored by their vector similarity as well,
+        so that the scores of all results can be compared and cut off alike.
+        The query is embedded in the calling thread, where its embedding tokens are counted.
+        Falls back to the vector search results if the lexical index is not built yet, or if the lexical search
+        fails or does not finish within `DATASET_LEXICAL_SEARCH_TIMEOUT` seconds after the vector search.
+
+        Return: list of (document, vector similarity), at most `k` of the retriever config; with hybrid search,
+        ordered by the fused score in the `fused_score` metadata, and fused documents keep their BM25 score
+        in the `lexical_score` metadata
+        '''
+        retriever_config = get_retriever(dataset['retriever_config'])
+        lexical_future = None
+        if settings.DATASET_HYBRID_SEARCH:
+            lexical_future = lexical_searcher.submit(
+                closing_session(cls.lexical_search),
+                dataset['id'],
+                query,
+                retriever_config['k'],
+                search_in_documents
+            )
+            if query_embedding is None:
+                # Segments found by BM25 only are scored against the same embedding
+                query_embedding = vdb.embeddings.embed_query(query)
+        if query_embedding is None:
+            docs_and_similarities = vdb.similarity_search_with_relevance_scores(
+                query,
+                search_in_documents=search_in_documents,
+                **retriever_config
+            )
+        else:
+            docs_and_similarities = vdb.similarity_search_with_relevance_scores_by_vector(
+                query_embedding,
+                search_in_documents=search_in_documents,
+                **retriever_config
+            )
+        if lexical_future is None:
+            return docs_and_similarities
+        try:
+            lexical_documents = lexical_future.result(timeout=settings.DATASET_LEXICAL_SEARCH_TIMEOUT)
+        except TimeoutError:
+            logger.warning(f'Lexical search of dataset {dataset["id"]} timed out, using the vector search results')
+            return docs_and_similarities
+        except Exception as e:
+            logger.exception(f'Lexical search of dataset {dataset["id"]} failed: {e}')
+            return docs_and_similarities
+
+        fused_documents: Dict[str, Tuple[Document, float]] = {}
+        for doc, similarity in docs_and_similarities:
+            fused_documents[str(doc.metadata['index_id'])] = (doc, similarity)
+        lexical_only_documents = {}
+        for doc in lexical_documents:
+            index_id = str(doc.metadata['index_id'])
+            if index_id in fused_documents:
+                fused_documents[index_id][0].metadata['lexical_score'] = doc.metadata['lexical_score']
+            elif doc.metadata['lexical_full_match']:
+                lexical_only_documents[index_id] = doc
+        # Segments that are not in the collection, e.g. not indexed yet, have no similarity and are dropped
+        for vector_doc, similarity in vdb.similarity_search_with_relevance_scores_by_ids(
+            query_embedding,
+            list(lexical_only_documents)
+        ):
+            index_id = str(vector_doc.metadata['index_id'])
+            if doc := lexical_only_documents.get(index_id):
+                del doc.metadata['lexical_full_match']
+                fused_documents[index_id] = (doc, similarity)
+        fused_scores = reciprocal_rank_fusion(
+            [
+                [str(doc.metadata['index_id']) for doc, _ in docs_and_similarities],
+                [str(doc.metadata['index_id']) for doc in lexical_documents]
+            ],
+            settings.DATASET_RRF_K
+        )
+        result = []
+        for index_id, fused_score in fused_scores:
+            if index_id not in fused_documents:
+                continue
+            doc, similarity = fused_documents[index_id]
+            doc.metadata['fused_score'] = fused_score
+            result.append((doc, similarity))
+            if len(result) >= retriever_config['k']:
+                break
+        return result
+
     @classmethod
     def single_retrieve(
         cls,
@@ -902,18 +1443,19 @@ class DatasetRetrieval:
                 user = users.get_user_by_id(user_id)
                 assert user, 'User not found!'
                 team_id = user['team_id']
-                dataset = datasets.get_dataset_by_id(dataset_id, check_is_reindexing=True)
+                # Datasets being reindexed are searched in their current collection
+                dataset = datasets.get_dataset_by_id(dataset_id)
                 app = apps.get_app_by_id(dataset['app_id'])
                 apps.increment_execution_times(app['id'])
                 collection_name = dataset['collection_name']
                 embeddings_config_id = dataset['embedding_model_config_id']
                 _, vdb = get_embeddings_and_vector_database(embeddings_config_id, collection_name)
-                retriever_config = get_retriever(dataset['retriever_config'])
                 logger.info(f'Retrieving documents from dataset {dataset_id}...')
-                docs_and_similarities = vdb.similarity_search_with_relevance_scores(
+                docs_and_similarities = cls.hybrid_search(
+                    dataset,
+                    vdb,
                     query,
-                    search_in_documents=search_in_documents,
-                    **retriever_config
+                    search_in_documents=search_in_documents
                 )
                 logger.info(f'Retrieved {len(docs_and_similarities)} documents.')
                 result = []
@@ -933,30 +1475,16 @@ class DatasetRetrieval:
                     result.sort(
                         key=lambda doc: (
                             -doc.metadata.get('relevance_score', 0.0),
+                            -doc.metadata.get('fused_score', 0.0),
                             -doc.metadata.get('score', 0.0)
                         )
                     )
-                    for document_segment in result:
-                        index_id = str(document_segment.metadata['index_id'])
-                        try:
-                            segment = document_segments.get_segment_by_index_id(index_id)
-                        except AssertionError:
-                            logger.warning(f'Segment {index_id} not found! Deleting from vector database...')
-                            vdb.delete([index_id])
-                            continue
-                        retrieval_result.append(document_segment)
-                        document = documents.get_document_by_id(segment['document_id'])
-                        document_segments.increment_hit_count(segment['id'])
-                        document_segment_rag_records.insert(
-                            {
-                                'rag_record_id': rag_record_id,
-                                'dataset_id': dataset_id,
-                                'document_id': document['id'],
-                                'segment_id': segment['id'],
-                                'score': document_segment.metadata.get('score', 0.0),
-                                'reranking_score': document_segment.metadata.get('relevance_score', 0.0)
-                            }
-                        )
+                    hits = cls.process_retrieved_segments(
+                        rag_record_id,
+                        result,
+                        {str(doc.metadata['index_id']): vdb for doc in result}
+                    )
+                    retrieval_result.extend(document_segment for document_segment, _ in hits)
                 rag_records.update(
                     {'column': 'id', 'value': rag_record_id},
                     {
@@ -1023,28 +1551,61 @@ class DatasetRetrieval:
                 user = users.get_user_by_id(user_id)
                 assert user, 'User not found!'
                 team_id = user['team_id']
-                for dataset_id in dataset_ids:
-                    dataset = datasets.get_dataset_by_id(dataset_id)
+                # Datasets being reindexed are searched in their current collection
+                dataset_list = [
+                    datasets.get_dataset_by_id(dataset_id)
+                    for dataset_id in dataset_ids
+                ]
+                for dataset in dataset_list:
                     app = apps.get_app_by_id(dataset['app_id'])
                     apps.increment_execution_times(app['id'])
-                overall_result = []
-                for dataset_id in dataset_ids:
-                    dataset = datasets.get_dataset_by_id(dataset_id, check_is_reindexing=True)
-                    collection_name = dataset['collection_name']
-                    embeddings_config_id = dataset['embedding_model_config_id']
-                    _, vdb = get_embeddings_and_vector_database(embeddings_config_id, collection_name)
-                    retriever_config = get_retriever(dataset['retriever_config'])
-                    logger.info(f'Retrieving documents from dataset {dataset_id}...')
-                    docs_and_similarities = vdb.similarity_search_with_relevance_scores(
+                vdbs = list(dataset_searcher.map(
+                    closing_session(lambda dataset: get_embeddings_and_vector_database(
+                        dataset['embedding_model_config_id'],
+                        dataset['collection_name']
+                    )[1]),
+                    dataset_list
+                ))
+                # Embed the query once per embedding model
+                model_vdbs = {}
+                for dataset, vdb in zip(dataset_list, vdbs):
+                    model_vdbs.setdefault(dataset['embedding_model_config_id'], vdb)
+
+                def embed_query(vdb: VectorDatabase) -> Tuple[List[float], int]:
+                    # Token counts are kept per thread, so they are read in the thread that embedded the query
+                    return vdb.embeddings.embed_query(query), vdb.embeddings.get_and_reset_num_tokens()
+
+                query_embeddings = {}
+                for embeddings_config_id, (query_embedding, num_tokens) in zip(
+                    model_vdbs,
+                    dataset_searcher.map(closing_session(embed_query), model_vdbs.values())
+                ):
+                    query_embeddings[embeddings_config_id] = query_embedding
+                    token_counter['embedding'] += num_tokens
+
+                def search_dataset(dataset: Dict[str, Any], vdb: VectorDatabase) -> List[Tuple[Document, float]]:
+                    logger.info(f'Retrieving documents from dataset {dataset["id"]}...')
+                    return cls.hybrid_search(
+                        dataset,
+                        vdb,
                         query,
-                        search_in_documents=search_in_documents,
-                        **retriever_config
+                        query_embedding=query_embeddings[dataset['embedding_model_config_id']],
+                        search_in_documents=search_in_documents
                     )
+
+                overall_result = []
+                index_vdbs = {}
+                for vdb, docs_and_similarities in zip(vdbs, dataset_searcher.map(closing_session(search_dataset), dataset_list, vdbs)):
                     for doc, score in docs_and_similarities:
                         logger.debug(f'ID and score: {doc.metadata["index_id"]}, {score}')
                         doc.metadata['score'] = score
                         overall_result.append(doc)
-                    token_counter['embedding'] += vdb.embeddings.get_and_reset_num_tokens()
+                        index_vdbs[str(doc.metadata['index_id'])] = vdb
+                overall_result = heapq.nlargest(
+                    settings.DATASET_RERANK_MAX_CANDIDATES,
+                    overall_result,
+                    key=lambda doc: doc.metadata['score']
+                )
                 if overall_result:
                     reranker = get_reranker(team_id)
                     logger.info('Reranking documents...')
@@ -1055,31 +1616,13 @@ class DatasetRetrieval:
                     overall_result.sort(
                         key=lambda doc: (
                             -doc.metadata.get('relevance_score', 0.0),
+                            -doc.metadata.get('fused_score', 0.0),
                             -doc.metadata.get('score', 0.0)
                         )
                     )
-                    for document_segment in overall_result:
-                        index_id = str(document_segment.metadata['index_id'])
-                        try:
-                            segment = document_segments.get_segment_by_index_id(index_id)
-                        except AssertionError:
-                            logger.warning(f'Segment {index_id} not found! Deleting from vector database...')
-                            vdb.delete([index_id])
-                            continue
-                        document = documents.get_document_by_id(segment['document_id'])
-                        dataset = datasets.get_dataset_by_id(document['dataset_id'])
-                        retrieval_result.setdefault(document['dataset_id'], []).append(document_segment)
-                        document_segments.increment_hit_count(segment['id'])
-                        document_segment_rag_records.insert(
-                            {
-                                'rag_record_id': rag_record_id,
-                                'dataset_id': dataset_id,
-                                'document_id': document['id'],
-                                'segment_id': segment['id'],
-                                'score': document_segment.metadata.get('score', 0.0),
-                                'reranking_score': document_segment.metadata.get('relevance_score', 0.0)
-                            }
-                        )
+                    hits = cls.process_retrieved_segments(rag_record_id, overall_result, index_vdbs)
+                    for document_segment, segment in hits:
+                        retrieval_result.setdefault(segment['dataset_id'], []).append(document_segment)
                 rag_records.update(
                     {'column': 'id', 'value': rag_record_id},
                     {
@@ -1107,20 +1650,19 @@ class DatasetRetrieval:
 
     @classmethod
     def get_full_documents(cls, retrieval_result: List[Document]) -> List[Dict[str, str]]:
-        full_documents = []
-        document_ids = set()
+        segments = document_segments.get_segments_by_index_ids(
+            [str(document.metadata['index_id']) for document in retrieval_result]
+        )
+        document_names = {}
         for document in retrieval_result:
-            index_id = str(document.metadata['index_id'])
-            segment = document_segments.get_segment_by_index_id(index_id)
-            document = documents.get_document_by_id(segment['document_id'])
-            document_id = document['id']    
-            if document_id not in document_ids:  
-                document_ids.add(document_id)
-                all_segments = document_segments.get_segments_by_document_id(document_id)
-                full_documents.append(
-                {
-                    'name': document['name'],
-                    'content': '\n'.join(segment['content'] for segment in all_segments)
-                }
-            )
-        return full_documents
+            segment = segments.get(str(document.metadata['index_id']))
+            if segment and segment['document_status'] < 3:
+                document_names.setdefault(segment['document_id'], segment['document_name'])
+        all_segments = document_segments.get_segments_by_document_ids(list(document_names))
+        return [
+            {
+                'name': name,
+                'content': '\n'.join(segment['content'] for segment in all_segments.get(document_id, []))
+            }
+            for document_id, name in document_names.items()
+        ]
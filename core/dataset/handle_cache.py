@@ -0,0 +1,79 @@
+import threading
+
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+
+class HandleCache:
+    """
+    A thread-safe LRU cache of reusable handles, such as embedding models, rerankers and vector database collections.
+    Entries can expire after a TTL so that changed model configurations are picked up again.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None):
+        """
+        :param max_size: Maximum number of cached handles, the least recently used handle is evicted first.
+        :param ttl: Default number of seconds after which a handle expires, None for no expiration.
+        """
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, Tuple[Any, Optional[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached handle of the key, or None if it is not cached or has expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            handle, expire_time = entry
+            if expire_time is not None and expire_time <= monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return handle
+
+    def set(self, key: Hashable, handle: Any, ttl: Optional[float] = ...) -> None:
+        """
+        Caches the handle of the key.
+
+        :param ttl: Number of seconds after which the handle expires, None for no expiration.
+            Defaults to the TTL of the cache.
+        """
+        if ttl is ...:
+            ttl = self.ttl
+        with self._lock:
+            self._entries[key] = (handle, None if ttl is None else monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any], ttl: Optional[float] = ...) -> Any:
+        """
+        Returns the cached handle of the key, or creates and caches it with the factory.
+        The factory is called outside the lock, so a slow factory does not block other keys.
+        """
+        handle = self.get(key)
+        if handle is None:
+            handle = factory()
+            self.set(key, handle, ttl)
+        return handle
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Removes the handles whose keys match the predicate.
+
+        :return: The number of removed handles.
+        """
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,176 @@
+import os
+import re
+import sqlite3
+
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from config import settings
+
+
+project_root = Path(__file__).absolute().parent.parent.parent
+
+word_pattern = re.compile(r'[^\W_]+(?:[-_.][^\W_]+)*')
+cjk_pattern = re.compile(r'([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]+)')
+separator_pattern = re.compile(r'[-_.]')
+
+def tokenize(text: str) -> List[str]:
+    '''
+    Split a text into lexical tokens.
+    Words keep their inner `-`, `_` and `.` so that codes such as `ERR-1042` or `v2.1` match exactly,
+    and their parts are added as well; runs of CJK characters are split into character bigrams.
+    '''
+    tokens = []
+    for word in word_pattern.findall(text.lower()):
+        for i, part in enumerate(cjk_pattern.split(word)):
+            if i % 2:
+                tokens.extend(part[j:j + 2] for j in range(max(1, len(part) - 1)))
+                continue
+            part = part.strip('-_.')
+            if not part:
+                continue
+            tokens.append(part)
+            if separator_pattern.search(part):
+                tokens.extend(sub_part for sub_part in separator_pattern.split(part) if sub_part)
+    return tokens
+
+def reciprocal_rank_fusion(ranked_lists: Sequence[Sequence[Hashable]], rrf_k: int = 60) -> List[Tuple[Hashable, float]]:
+    '''
+    Merge ranked lists of keys with reciprocal rank fusion, each key scoring the sum of 1 / (rrf_k + rank) over the lists.
+
+    Return: list of (key, fused score) by descending score
+    '''
+    scores: Dict[Hashable, float] = {}
+    for ranked_list in ranked_lists:
+        for rank, key in enumerate(ranked_list, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class LexicalIndex:
+    """
+    A BM25 inverted index of the segments of one dataset, kept in a local SQLite FTS5 database next to the vector collection.
+    Rows are keyed by segment ID, so the index is not affected by reindexing the dataset with another embedding model.
+    Removed segments may remain in the index; callers check the returned segments against the database.
+    The index records the version of the segment changes it reflects, so that indexes of other hosts can tell they are stale.
+    """
+
+    def __init__(self, dataset_id: int, index_path: Optional[str] = None):
+        """
+        :param dataset_id: The ID of the dataset.
+        :param index_path: Directory of the index databases, defaults to `DATASET_LEXICAL_INDEX_PATH`.
+        """
+        self.dataset_id = dataset_id
+        self.path = project_root.joinpath(index_path or settings.DATASET_LEXICAL_INDEX_PATH, f'dataset_{dataset_id}.db')
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _connect(self, path: Optional[Path] = None) -> sqlite3.Connection:
+        connection = sqlite3.connect(path or self.path, timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS segments USING fts5('
+            'tokens, source UNINDEXED, tokenize="unicode61 remove_diacritics 0 tokenchars \'-_.\'")'
+        )
+        connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        return connection
+
+    @staticmethod
+    def _set_version(connection: sqlite3.Connection, version: int) -> None:
+        connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (version,))
+
+    @staticmethod
+    def _insert(connection: sqlite3.Connection, segments: Iterable[Tuple[int, str, str]]) -> None:
+        connection.executemany(
+            'INSERT OR REPLACE INTO segments(rowid, tokens, source) VALUES (?, ?, ?)',
+            ((segment_id, ' '.join(tokenize(content)), source) for segment_id, content, source in segments)
+        )
+
+    def get_version(self) -> Optional[int]:
+        '''
+        Return: version of the index, None if the index does not exist
+        '''
+        if not self.exists():
+            return None
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            return row[0] if row else 0
+        finally:
+            connection.close()
+
+    def build(self, segments: Iterable[Tuple[int, str, str]], version: int = 0) -> None:
+        '''
+        Build the index from all available segments, replacing the existing index at once.
+
+        :param segments: (segment ID, content, source) of the segments.
+        :param version: Version of the segment changes reflected by the segments.
+        '''
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        build_path = self.path.with_name(f'{self.path.name}.{uuid4().hex}.tmp')
+        try:
+            with self._connect(build_path) as connection:
+                connection.execute('PRAGMA journal_mode=DELETE')
+                self._insert(connection, segments)
+                self._set_version(connection, version)
+                connection.execute("INSERT INTO segments(segments) VALUES ('optimize')")
+            connection.close()
+            os.replace(build_path, self.path)
+            for suffix in ('-wal', '-shm'):
+                self.path.with_name(self.path.name + suffix).unlink(missing_ok=True)
+        finally:
+            build_path.unlink(missing_ok=True)
+
+    def update(
+        self,
+        version: int,
+        added_segments: Iterable[Tuple[int, str, str]] = (),
+        deleted_segment_ids: Iterable[int] = ()
+    ) -> None:
+        '''
+        Apply segment changes to the index in one transaction.
+
+        :param version: Version of the segment changes after this update.
+        :param added_segments: (segment ID, content, source) of the segments to add or replace.
+        :param deleted_segment_ids: IDs of the segments to delete.
+        '''
+        with self._connect() as connection:
+            connection.executemany(
+                'DELETE FROM segments WHERE rowid = ?',
+                ((segment_id,) for segment_id in deleted_segment_ids)
+            )
+            self._insert(connection, added_segments)
+            self._set_version(connection, version)
+        connection.close()
+
+    def drop(self) -> None:
+        for suffix in ('', '-wal', '-shm'):
+            self.path.with_name(self.path.name + suffix).unlink(missing_ok=True)
+
+    def search(self, query: str, k: int = 4, search_in_documents: Optional[List[str]] = None) -> List[Tuple[int, float, str]]:
+        '''
+        Search the segments matching any token of the query, ranked by BM25.
+
+        :param query: The query text.
+        :param k: The maximum number of segments to return.
+        :param search_in_documents: Optional list of document sources to search in.
+        Return: list of (segment ID, BM25 score, source) by descending score
+        '''
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+        sql = 'SELECT rowid, bm25(segments), source FROM segments WHERE segments MATCH ?'
+        params = [' OR '.join(f'"{token}"' for token in tokens)]
+        if search_in_documents:
+            sql += f' AND source IN ({", ".join("?" * len(search_in_documents))})'
+            params.extend(search_in_documents)
+        sql += ' ORDER BY rank LIMIT ?'
+        params.append(k)
+        connection = self._connect()
+        try:
+            # FTS5 BM25 scores are negative, lower is better
+            return [(segment_id, -score, source) for segment_id, score, source in connection.execute(sql, params)]
+        finally:
+            connection.close()
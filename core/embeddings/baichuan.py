@@ -1,6 +1,9 @@
+import threading
+
 from typing import List, Optional
 
 from langchain_community.embeddings import BaichuanTextEmbeddings as OriginalBaichuanTextEmbeddings
+from pydantic import PrivateAttr
 
 from requests import RequestException
 
@@ -12,11 +15,17 @@ class BaichuanTextEmbeddings(OriginalBaichuanTextEmbeddings):
         "extra": "allow",
         "arbitrary_types_allowed": True,
     }
-        
-        
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.num_tokens: int = 0
+    # Token counts are kept per thread, as one instance is shared by concurrent requests
+    _token_usage: threading.local = PrivateAttr(default_factory=threading.local)
+
+    @property
+    def num_tokens(self) -> int:
+        """Number of tokens used by the calling thread since the last reset."""
+        return getattr(self._token_usage, 'num_tokens', 0)
+
+    @num_tokens.setter
+    def num_tokens(self, value: int) -> None:
+        self._token_usage.num_tokens = value
 
     def _embed(self, texts: List[str]) -> Optional[List[List[float]]]:
         """Internal method to call Baichuan Embedding API and return embeddings.
@@ -1,8 +1,11 @@
+import threading
+
 from typing import Any, Literal, cast
 
 
 from langchain_openai import OpenAIEmbeddings as OriginalOpenAIEmbeddings
 from langchain_openai.embeddings.base import _process_batched_chunked_embeddings
+from pydantic import PrivateAttr
 
 MAX_TOKENS_PER_REQUEST = 300000
 """API limit per request for embedding tokens."""
@@ -13,10 +16,17 @@ class OpenAIEmbeddings(OriginalOpenAIEmbeddings):
         "extra": "allow",
         "arbitrary_types_allowed": True,
     }
-        
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.num_tokens: int = 0
+    # Token counts are kept per thread, as one instance is shared by concurrent requests
+    _token_usage: threading.local = PrivateAttr(default_factory=threading.local)
+
+    @property
+    def num_tokens(self) -> int:
+        """Number of tokens used by the calling thread since the last reset."""
+        return getattr(self._token_usage, 'num_tokens', 0)
+
+    @num_tokens.setter
+    def num_tokens(self, value: int) -> None:
+        self._token_usage.num_tokens = value
 
     # please refer to
     # https://github.com/openai/openai-cookbook/blob/main/examples/Embedding_long_inputs.ipynb
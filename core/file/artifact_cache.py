@@ -0,0 +1,127 @@
+import hashlib
+import os
+import threading
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from uuid import uuid4
+
+from config import settings
+
+
+project_root = Path(__file__).absolute().parent.parent.parent
+cache_path = project_root.joinpath(settings.FILE_ARTIFACT_CACHE_PATH)
+
+# Incremented whenever the conversion of documents changes; part of the artifact keys, so that artifacts of the previous
+# converters are not used
+CONVERTER_VERSION = 1
+
+# The objects of content-addressed uploads are named by their content hash
+objects_path = project_root.joinpath('upload_files', 'objects')
+
+# Content hashes of other files by path, size and modification time
+file_hashes: OrderedDict[Tuple[str, int, int], str] = OrderedDict()
+file_hashes_lock = threading.Lock()
+
+artifact_cache_stats = {'hits': 0, 'misses': 0}
+artifact_cache_stats_lock = threading.Lock()
+
+def get_file_hash(file_path: Path) -> str:
+    """
+    Gets the SHA-256 of the content of a file.
+    Content-addressed uploads are not read, as they are named by their content hash; the hashes of other files
+    are cached per process until the files are modified.
+
+    :param file_path: The path of the file.
+    :return: The hexadecimal SHA-256 of the file content.
+    """
+    file_path = Path(file_path)
+    if file_path.parent.parent.parent == objects_path and len(file_path.stem) == 64:
+        return file_path.stem
+    stat = file_path.stat()
+    key = (str(file_path), stat.st_size, stat.st_mtime_ns)
+    with file_hashes_lock:
+        content_hash = file_hashes.get(key)
+        if content_hash is not None:
+            file_hashes.move_to_end(key)
+            return content_hash
+    sha256 = hashlib.sha256()
+    with file_path.open('rb') as file_io:
+        while chunk := file_io.read(1_048_576):
+            sha256.update(chunk)
+    content_hash = sha256.hexdigest()
+    with file_hashes_lock:
+        file_hashes[key] = content_hash
+        while len(file_hashes) > settings.FILE_HASH_CACHE_SIZE:
+            file_hashes.popitem(last=False)
+    return content_hash
+
+def get_artifact_key(content_hash: str, extension: str) -> str:
+    """
+    Gets the key of the artifacts of a file content, made of the content hash, the file extension and the converter
+    version, since the converters choose how to read a file by its extension.
+    """
+    return f'{content_hash}{extension.lower()}.v{CONVERTER_VERSION}'
+
+def get_artifact_path(content_hash: str, extension: str, kind: str) -> Path:
+    return cache_path.joinpath(kind, content_hash[:2], f'{get_artifact_key(content_hash, extension)}.txt')
+
+def get_artifact(content_hash: str, extension: str, kind: str) -> Optional[str]:
+    """
+    Gets an artifact derived from a file content, or None if it has not been cached.
+
+    :param content_hash: The SHA-256 of the file content.
+    :param extension: The extension of the file, e.g. '.pdf'.
+    :param kind: The kind of the artifact, e.g. 'markdown', 'ocr' or 'tokens'.
+    """
+    try:
+        return get_artifact_path(content_hash, extension, kind).read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return None
+
+def save_artifact(content_hash: str, extension: str, kind: str, artifact: str) -> None:
+    """
+    Saves an artifact derived from a file content.
+    The artifact is written to a temporary file first, so that readers never see a partial artifact.
+
+    :param content_hash: The SHA-256 of the file content.
+    :param extension: The extension of the file, e.g. '.pdf'.
+    :param kind: The kind of the artifact, e.g. 'markdown', 'ocr' or 'tokens'.
+    :param artifact: The artifact.
+    """
+    artifact_path = get_artifact_path(content_hash, extension, kind)
+    artifact_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = artifact_path.with_name(f'{artifact_path.name}.{uuid4().hex}.tmp')
+    try:
+        temp_path.write_text(artifact, encoding='utf-8')
+        os.replace(temp_path, artifact_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+def get_or_create_artifact(file_path: Path, kind: str, create: Callable[[], str]) -> str:
+    """
+    Gets an artifact derived from the content of a file, creating and caching it if it has not been cached.
+    Files with the same content and extension share their artifacts, whatever their paths are.
+
+    :param file_path: The path of the file.
+    :param kind: The kind of the artifact, e.g. 'markdown', 'ocr' or 'tokens'.
+    :param create: Creates the artifact from the file.
+    :return: The artifact.
+    """
+    file_path = Path(file_path)
+    content_hash = get_file_hash(file_path)
+    artifact = get_artifact(content_hash, file_path.suffix, kind)
+    with artifact_cache_stats_lock:
+        artifact_cache_stats['hits' if artifact is not None else 'misses'] += 1
+    if artifact is None:
+        artifact = create()
+        save_artifact(content_hash, file_path.suffix, kind, artifact)
+    return artifact
+
+def get_artifact_cache_stats() -> Dict[str, int]:
+    """
+    Gets the numbers of artifacts served from the cache and created in this process.
+    """
+    with artifact_cache_stats_lock:
+        return dict(artifact_cache_stats)
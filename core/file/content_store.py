@@ -0,0 +1,96 @@
+import hashlib
+import os
+
+from pathlib import Path
+from typing import Tuple
+from uuid import uuid4
+
+from config import settings
+from core.database import redis
+from core.database.models.upload_file_objects import UploadFileObjects
+
+
+project_root = Path(__file__).absolute().parent.parent.parent
+
+# Upload files are stored once per content and extension under this directory, relative to the project root
+OBJECTS_DIR = 'upload_files/objects'
+objects_path = project_root.joinpath(OBJECTS_DIR)
+
+# Held while the reference count of an object changes, so that an object is not deleted while it is being stored again
+object_lock_key = 'upload_file_object:{}'
+
+upload_file_objects = UploadFileObjects()
+
+def get_temp_path() -> Path:
+    """
+    Gets a new path to write an upload to before it is stored, on the same file system as the objects.
+    """
+    temp_dir = objects_path.joinpath('tmp')
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    return temp_dir.joinpath(uuid4().hex)
+
+def get_object_path(content_hash: str, extension: str) -> str:
+    """
+    Gets the path of the object of a content hash and extension, relative to the project root.
+    """
+    return f'{OBJECTS_DIR}/{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{extension}'
+
+def is_object_path(path: str) -> bool:
+    return path.replace('\\', '/').startswith(f'{OBJECTS_DIR}/')
+
+def store_file(temp_path: Path, content_hash: str, extension: str) -> str:
+    """
+    Stores a file as the object of its content, or drops it if the object already exists,
+    and adds a reference to the object.
+
+    :param temp_path: The path of the file, usually from `get_temp_path`. The file is moved or deleted.
+    :param content_hash: The SHA-256 of the file content.
+    :param extension: The file extension.
+    :return: The path of the object relative to the project root, to be saved as the path of the upload file.
+    """
+    relative_path = get_object_path(content_hash, extension)
+    object_path = project_root.joinpath(relative_path)
+    size = temp_path.stat().st_size
+    with redis.lock(object_lock_key.format(content_hash), timeout=settings.UPLOAD_OBJECT_LOCK_TTL):
+        if object_path.is_file():
+            temp_path.unlink()
+        else:
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(temp_path, object_path)
+        upload_file_objects.add_reference(content_hash, extension, relative_path, size)
+        # Commit before releasing the lock, so that a release of the object cannot miss this reference
+        upload_file_objects.commit()
+    return relative_path
+
+def store_bytes(data: bytes, extension: str) -> Tuple[str, str]:
+    """
+    Stores the content of a file as an object and adds a reference to the object.
+
+    :param data: The file content.
+    :param extension: The file extension.
+    :return: A tuple of the path of the object relative to the project root and the content hash.
+    """
+    content_hash = hashlib.sha256(data).hexdigest()
+    temp_path = get_temp_path()
+    temp_path.write_bytes(data)
+    return store_file(temp_path, content_hash, extension), content_hash
+
+def release_file(path: str) -> None:
+    """
+    Releases a stored file, deleting the object when it is no longer referenced.
+    Files stored before content addressing are deleted directly.
+
+    :param path: The path of the file relative to the project root.
+    """
+    file_path = project_root.joinpath(path)
+    if not is_object_path(path):
+        if file_path.is_file():
+            file_path.unlink()
+        return
+    content_hash, extension = file_path.stem, file_path.suffix
+    with redis.lock(object_lock_key.format(content_hash), timeout=settings.UPLOAD_OBJECT_LOCK_TTL):
+        is_deleted = upload_file_objects.remove_reference(content_hash, extension)
+        upload_file_objects.commit()
+        # The object file is deleted only once the deletion of its record is committed
+        if is_deleted:
+            file_path.unlink(missing_ok=True)
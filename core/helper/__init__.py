@@ -14,12 +14,13 @@ from Crypto.Cipher import AES
 
 from config import settings
 from core.database import redis
+from core.file.artifact_cache import get_or_create_artifact
 
 import tiktoken
 from markitdown import MarkItDown
 from pdf2image import convert_from_path
 from pytesseract import image_to_string
-from typing import List, Dict, Any, Callable, Union
+from typing import List, Dict, Any, Callable, Optional, Union
 try:
     from anthropic import Anthropic
     ANTHROPIC_AVAILABLE = True
@@ -45,35 +46,94 @@ def convert_json_to_basic_types(data):
     else:
         return data
 
+def get_websocket_channel(user_id: int) -> str:
+    """
+    Get the Redis pub/sub channel of the WebSocket messages of a user.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        str: The channel name.
+    """
+    return f'{settings.WEBSOCKET_MESSAGE_CHANNEL_PREFIX}:{user_id}'
+
 def push_to_websocket_queue(message: dict):
     """
-    Push a message to the WebSocket message queue in Redis.
+    Publish a message to the WebSocket channel of its user in Redis.
+    Every WebSocket server worker holding a connection of the user receives and delivers it.
 
     Args:
-        message (str): The message to be pushed to the queue.
+        message (dict): The message to be published, including the `user_id` of the recipient.
     """
-    redis.rpush(settings.WEBSOCKET_MESSAGE_QUEUE_KEY, json.dumps(convert_json_to_basic_types(message)))
-    
-def pop_from_websocket_queue() -> dict:
+    redis.publish(get_websocket_channel(message['user_id']), json.dumps(convert_json_to_basic_types(message)))
+
+def push_to_websocket_queue_batch(messages: List[dict]):
     """
-    Pop a message from the WebSocket message queue in Redis.
+    Publish multiple messages to the WebSocket channels of their users in one Redis round trip, keeping their order.
 
-    Returns:
-        str: The message popped from the queue.
+    Args:
+        messages (List[dict]): The messages to be published, each including the `user_id` of the recipient.
     """
-    data = redis.lpop(settings.WEBSOCKET_MESSAGE_QUEUE_KEY)
-    if data:
-        return json.loads(data)
-    return {}
-    
-def get_websocket_queue_length():
+    pipeline = redis.pipeline(transaction=False)
+    for message in messages:
+        pipeline.publish(get_websocket_channel(message['user_id']), json.dumps(convert_json_to_basic_types(message)))
+    pipeline.execute()
+
+def _push_to_scheduler_queue(key: str, value: Union[int, str], scheduler_id: Optional[str] = None):
+    """
+    Push a value to a workflow scheduler queue, or to the private queue of the given scheduler.
+    Private queues expire together with the run leases so that queues of stopped schedulers do not pile up.
+    """
+    if scheduler_id:
+        pipeline = redis.pipeline()
+        pipeline.rpush(f'{key}:{scheduler_id}', value)
+        pipeline.expire(f'{key}:{scheduler_id}', settings.WORKFLOW_RUN_LEASE_TTL)
+        pipeline.execute()
+    else:
+        redis.rpush(key, value)
+
+def notify_workflow_scheduler(app_run_id: int, scheduler_id: Optional[str] = None):
+    """
+    Notify the workflow scheduler that the given app run may have become runnable.
+    Must be called after the app run changes have been committed.
+
+    Args:
+        app_run_id (int): The ID of the app run.
+        scheduler_id (Optional[str]): The ID of the scheduler owning the app run, if known.
+    """
+    _push_to_scheduler_queue(settings.WORKFLOW_SCHEDULE_QUEUE_KEY, app_run_id, scheduler_id)
+
+def notify_workflow_task_done(task_id: str, scheduler_id: Optional[str] = None):
+    """
+    Notify the workflow scheduler that the Celery task with the given ID has finished.
+
+    Args:
+        task_id (str): The Celery task ID.
+        scheduler_id (Optional[str]): The ID of the scheduler that dispatched the task, if known.
+    """
+    _push_to_scheduler_queue(settings.WORKFLOW_TASK_DONE_QUEUE_KEY, task_id, scheduler_id)
+
+def wait_for_queue_items(keys: List[str], timeout: float) -> List[str]:
     """
-    Get the length of the WebSocket message queue in Redis.
+    Block until at least one item is available in any of the given Redis lists, then pop all pending items.
+
+    Args:
+        keys (List[str]): The Redis list keys.
+        timeout (float): The maximum number of seconds to wait.
 
     Returns:
-        int: The length of the WebSocket message queue.
+        List[str]: The popped items in queue order, or an empty list if the timeout expired.
     """
-    return redis.llen(settings.WEBSOCKET_MESSAGE_QUEUE_KEY)
+    item = redis.blpop(keys, timeout=max(timeout, 0.01))
+    if not item:
+        return []
+    pipeline = redis.pipeline()
+    for key in keys:
+        pipeline.lrange(key, 0, -1)
+        pipeline.delete(key)
+    results = pipeline.execute()
+    return [value.decode() for value in [item[1], *[value for rest in results[::2] for value in rest]]]
 
 def generate_api_token() -> str:
     """
@@ -293,17 +353,42 @@ def format_iso_time(dt: Union[datetime, None]) -> str:
     except Exception as e:
         return ""
     
-def convert_document_to_markdown(file_path: Path, keep_data_uris: bool = False) -> str:
-    result = md.convert(file_path, keep_data_uris=keep_data_uris).markdown
-    if file_path.suffix != '.pdf':
-        return result
-    if not re.search(r'\(cid:\d+\)', result):
-        return result
+def _ocr_pdf(file_path: Path) -> str:
     ocr_text = []
     images = convert_from_path(file_path)
     for image in images:
         ocr_text.append(image_to_string(image, 'eng+chi_sim+chi_sim_vert'))
     return '\n\n'.join(ocr_text)
+
+def _convert_document_to_markdown(file_path: Path, keep_data_uris: bool) -> str:
+    result = md.convert(file_path, keep_data_uris=keep_data_uris).markdown
+    if file_path.suffix != '.pdf':
+        return result
+    if not re.search(r'\(cid:\d+\)', result):
+        return result
+    # The OCR text does not depend on `keep_data_uris`, so it is cached on its own
+    return get_or_create_artifact(file_path, 'ocr', lambda: _ocr_pdf(file_path))
+
+def convert_document_to_markdown(file_path: Path, keep_data_uris: bool = False) -> str:
+    """
+    Converts a document to Markdown, using OCR for scanned PDFs.
+    The results are cached by file content, so the same file is converted only once.
+    """
+    file_path = Path(file_path)
+    kind = 'markdown_with_data_uris' if keep_data_uris else 'markdown'
+    return get_or_create_artifact(file_path, kind, lambda: _convert_document_to_markdown(file_path, keep_data_uris))
+
+def count_document_tokens(file_path: Path) -> int:
+    """
+    Estimates the tokens of the Markdown of a document with the `cl100k_base` encoding, cached by file content.
+    """
+    file_path = Path(file_path)
+    return int(get_or_create_artifact(
+        file_path, 'tokens',
+        lambda: str(len(tiktoken.get_encoding("cl100k_base").encode(
+            convert_document_to_markdown(file_path), disallowed_special=()
+        )))
+    ))
     
 def get_file_content_list(file_list: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     from core.database.models import UploadFiles
@@ -330,21 +415,26 @@ def get_file_content_list(file_list: List[Dict[str, Any]]) -> List[Dict[str, Any
             if file_path.suffix in ['.jpg', '.jpeg', '.png', '.gif', '.webp']:
                 # Use OCR for image files
                 file_type = 'image'
-                dl = DocumentLoader(file_path=str(file_path))
-                try:
-                    file_content = '\n'.join([doc.page_content for doc in dl.load()])
-                except TypeError:
-                    # TypeError occurs when using Unstructured to OCR an image without text
-                    file_content = ''
+                def ocr_image() -> str:
+                    dl = DocumentLoader(file_path=str(file_path))
+                    try:
+                        return '\n'.join([doc.page_content for doc in dl.load()])
+                    except TypeError:
+                        # TypeError occurs when using Unstructured to OCR an image without text
+                        return ''
+                file_content = get_or_create_artifact(file_path, 'image_ocr', ocr_image)
+                file_tokens = None
             else:
                 # Use Markdown for document files
                 file_type = 'document'
                 file_content = convert_document_to_markdown(file_path)
+                file_tokens = count_document_tokens(file_path)
             file_content_list.append({
                 'id': file_id,
                 'name': file_name,
                 'type': file_type,
                 'path': str(file_path),
-                'content': file_content
+                'content': file_content,
+                'tokens': file_tokens
             })
     return file_content_list
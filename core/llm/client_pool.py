@@ -0,0 +1,159 @@
+import hashlib
+import json
+import threading
+
+from collections import OrderedDict
+from copy import deepcopy
+from time import monotonic
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import httpx
+
+from config import settings
+from core.database import redis
+from core.database.models import Models
+from log import Logger
+from .models import LLMPipeline
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+logger = Logger.get_logger('celery-app')
+
+# Incremented whenever supplier or model configurations are edited, so that every process drops its cached configurations
+MODEL_CONFIG_VERSION_KEY = 'llm:model_config_version'
+
+# Suppliers served by ChatOpenAI, which accepts the HTTP clients to use
+openai_compatible_suppliers = {'OpenAI', 'Doubao', 'Tongyi', 'DeepSeek'}
+
+
+class _ExpiringCache:
+    """
+    A thread-safe LRU cache whose entries expire after a TTL.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, Tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expire_time = entry
+                if expire_time > monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+        # Created outside the lock, so that a slow factory does not block other keys
+        value = factory()
+        with self._lock:
+            self._entries[key] = (value, monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+pipeline_pool = _ExpiringCache(settings.LLM_CLIENT_POOL_SIZE, settings.LLM_CLIENT_POOL_TTL)
+model_info_cache = _ExpiringCache(settings.LLM_CLIENT_POOL_SIZE, settings.LLM_CLIENT_POOL_TTL)
+_model_config_version: Optional[int] = None
+_model_config_checked_at = 0.0
+_model_config_lock = threading.Lock()
+
+def _hash(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+def _check_model_config_version() -> None:
+    """
+    Clears the cached configurations and clients if the configurations have been edited since the last check.
+    Redis is consulted at most once per MODEL_CONFIG_CHECK_INTERVAL seconds.
+    """
+    global _model_config_version, _model_config_checked_at
+    now = monotonic()
+    if now - _model_config_checked_at < settings.MODEL_CONFIG_CHECK_INTERVAL:
+        return
+    with _model_config_lock:
+        if now - _model_config_checked_at < settings.MODEL_CONFIG_CHECK_INTERVAL:
+            return
+        _model_config_checked_at = now
+        try:
+            version = int(redis.get(MODEL_CONFIG_VERSION_KEY) or 0)
+        except Exception as e:
+            logger.warning('Failed to check the model configuration version: %s', e)
+            return
+        if _model_config_version is not None and _model_config_version != version:
+            model_info_cache.clear()
+            pipeline_pool.clear()
+        _model_config_version = version
+
+def invalidate_model_configs() -> None:
+    """
+    Drops the cached supplier and model configurations and LLM clients of all processes.
+    Must be called after edits of supplier or model configurations have been committed, as other processes may reload
+    the configurations as soon as it is called.
+    """
+    redis.incr(MODEL_CONFIG_VERSION_KEY)
+    model_info_cache.clear()
+    pipeline_pool.clear()
+
+def get_model_info(model_config_id: int) -> Dict[str, Any]:
+    """
+    Gets the model details by model configuration ID like `Models.get_model_by_config_id`, cached per process.
+
+    :param model_config_id: The ID of the model configuration.
+    :return: A copy of the model details, which can be modified by the caller.
+    """
+    _check_model_config_version()
+    return deepcopy(model_info_cache.get_or_create(
+        model_config_id,
+        lambda: Models().get_model_by_config_id(model_config_id)
+    ))
+
+def _create_pipeline(
+    supplier: str,
+    config: Dict[str, Any],
+    schema_key: Optional[str],
+    tools: Optional[List[Dict[str, Any]]]
+) -> LLMPipeline:
+    config = deepcopy(config)
+    if supplier in openai_compatible_suppliers:
+        # Keep connections open between calls, so that calls do not wait for TCP and TLS handshakes
+        limits = httpx.Limits(keepalive_expiry=settings.LLM_CLIENT_KEEPALIVE_EXPIRY)
+        config.setdefault('http_client', httpx.Client(http2=HTTP2_AVAILABLE, limits=limits))
+        config.setdefault('http_async_client', httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=limits))
+    llm_pipeline = LLMPipeline(supplier=supplier, config=config, schema_key=schema_key)
+    if tools:
+        llm_pipeline.llm = llm_pipeline.llm.bind_tools(tools)
+    return llm_pipeline
+
+def get_llm_pipeline(
+    supplier: str,
+    config: Dict[str, Any],
+    schema_key: Optional[str] = None,
+    tools: Optional[List[Dict[str, Any]]] = None
+) -> LLMPipeline:
+    """
+    Gets an LLM pipeline from the pool, creating it if there is none with the same supplier, configuration,
+    output schema and bound tools.
+    Pooled pipelines are shared by threads and must not be modified; bind tools with the `tools` argument instead.
+
+    :param supplier: The name of the supplier.
+    :param config: The configuration of the supplier and model.
+    :param schema_key: Optional key of the output schema from output_schemas.py.
+    :param tools: Optional tools to bind to the LLM.
+    :return: The LLM pipeline.
+    """
+    _check_model_config_version()
+    key = (supplier, _hash(config), schema_key, _hash(tools) if tools else None)
+    return pipeline_pool.get_or_create(key, lambda: _create_pipeline(supplier, config, schema_key, tools))
@@ -0,0 +1,8 @@
+from .agent_chat_memory import AgentChatMemory, count_tokens, format_file_contents, get_history_token_limit
+
+__all__ = [
+    'AgentChatMemory',
+    'count_tokens',
+    'format_file_contents',
+    'get_history_token_limit'
+]
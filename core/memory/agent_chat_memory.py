@@ -0,0 +1,311 @@
+import json
+
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import tiktoken
+from redis.exceptions import LockError
+
+from config import settings
+from core.database import redis
+from core.database.models.agent_chat_memories import AgentChatMemories
+from core.database.models.agent_chat_messages import AgentChatMessages
+from core.helper import get_file_content_list
+from core.llm import Prompt
+from languages import get_language_content
+from log import Logger
+
+
+logger = Logger.get_logger('celery-app')
+
+project_root = Path(__file__).absolute().parent.parent.parent
+
+# Held while the chat history of a user and an agent is being summarized
+SUMMARY_LOCK_KEY = 'memory:agent_chat:summary_lock:{user_id}:{agent_id}'
+SUMMARY_LOCK_TTL = 600
+
+agent_chat_messages = AgentChatMessages()
+agent_chat_memories = AgentChatMemories()
+
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> tiktoken.Encoding:
+    return tiktoken.get_encoding("cl100k_base")
+
+def count_tokens(text: str) -> int:
+    """
+    Estimates the tokens of a text with the `cl100k_base` encoding.
+    The estimates do not depend on the model, so they can be saved with the messages and reused by every model.
+    """
+    return len(_get_encoding().encode(text, disallowed_special=()))
+
+def format_file_contents(
+    file_list: Optional[List[Union[int, str]]],
+    file_content_list: Optional[List[Dict[str, Any]]]
+) -> Tuple[str, List[Union[int, str]]]:
+    """
+    Formats the contents of the files of a chat message to be appended to the message.
+
+    :param file_list: The upload file IDs or storage paths of the message.
+    :param file_content_list: The content of each file in the file list.
+    :return: A tuple of the formatted contents of the non-image files and the file values of the images.
+    """
+    formatted_contents = ''
+    image_list = []
+    if not file_list or not file_content_list:
+        return formatted_contents, image_list
+    for file_var_value in file_list:
+        if isinstance(file_var_value, int):
+            attr = 'id'
+            value = file_var_value
+        elif isinstance(file_var_value, str):
+            attr = 'path'
+            value = file_var_value[1:] if file_var_value[0] == '/' else file_var_value
+            value = str(project_root.joinpath('storage').joinpath(value))
+        else:
+            raise Exception('Unsupported value type!')
+        for file_content in file_content_list:
+            if file_content[attr] == value:
+                if file_content['type'] == 'image':
+                    image_list.append(file_var_value)
+                else:
+                    formatted_contents += (
+                        '\n\n'
+                        '---\n\n'
+                        f'##{file_content["name"]}\n\n'
+                        f'**{attr}**: `{value}`\n\n'
+                        '```\n'
+                        f'{file_content["content"]}\n'
+                        '```\n\n'
+                        '---\n\n'
+                    )
+    return formatted_contents, image_list
+
+def get_history_token_limit(model_info: Dict[str, Any]) -> int:
+    """
+    Gets the maximum tokens of the chat history in the prompt of a model.
+
+    :param model_info: The model details from `get_model_info`.
+    :return: 90% of the context window that is not reserved for the output, capped by `MEMORY_WINDOW_TOKENS`.
+    """
+    token_limit = int((model_info['max_context_tokens'] - model_info['max_output_tokens']) * 0.9)
+    if settings.MEMORY_WINDOW_TOKENS > 0:
+        token_limit = min(token_limit, settings.MEMORY_WINDOW_TOKENS)
+    return token_limit
+
+
+class AgentChatMemory:
+    """
+    The memory of the chat between a user and an agent.
+
+    The prompt gets a window of the newest messages that fits in the token limit and a rolling summary
+    of the messages before the window. The token count of each message is estimated once and saved with
+    the message, and the messages are loaded newest first page by page, so loading the memory reads
+    the window instead of the whole conversation.
+    Messages that fall out of the window are summarized in the background by `summarize`.
+    """
+
+    def __init__(self, user_id: int, agent_id: int):
+        self.user_id = user_id
+        self.agent_id = agent_id
+
+    def _get_start(self) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """
+        Gets the ID after which the unsummarized messages start, and the memory if its summary is still valid.
+        """
+        start_id = agent_chat_messages.get_history_cleared_id(self.user_id, self.agent_id)
+        memory = agent_chat_memories.get_memory(self.user_id, self.agent_id)
+        if memory and memory['last_message_id'] > start_id:
+            return memory['last_message_id'], memory
+        # The summary was made before the history was cleared
+        return start_id, None
+
+    def _count_messages(self, messages: List[Dict[str, Any]], file_content_lists: Dict[int, Any]) -> None:
+        """
+        Counts the tokens of the messages that have not been counted yet and saves the counts.
+        """
+        uncounted_messages = [message for message in messages if message['tokens'] <= 0]
+        if not uncounted_messages:
+            return
+        file_content_lists.update(agent_chat_messages.get_file_content_lists([
+            message['id'] for message in uncounted_messages
+            if message['file_list'] and message['id'] not in file_content_lists
+        ]))
+        token_counts = {}
+        for message in uncounted_messages:
+            # File contents with cached token counts are not encoded again
+            file_content_list = file_content_lists.get(message['id']) or []
+            file_tokens = sum(file_content['tokens'] for file_content in file_content_list if file_content.get('tokens'))
+            file_contents, _ = format_file_contents(message['file_list'], [
+                {**file_content, 'content': ''} if file_content.get('tokens') else file_content
+                for file_content in file_content_list
+            ])
+            # Empty messages count as one token, so that they are not counted again
+            message['tokens'] = max(1, count_tokens(message['message'] + file_contents) + file_tokens)
+            token_counts[message['id']] = message['tokens']
+        agent_chat_messages.update_tokens(token_counts)
+
+    def load(self, token_limit: int) -> Dict[str, Any]:
+        """
+        Loads the memory for the prompt.
+        The newest message, which is the user message being replied to, is always included, and the contents
+        of its files are extracted and saved on first load.
+
+        :param token_limit: The maximum tokens of the summary and the messages.
+        :return: A dictionary containing:
+        - "summary": The rolling summary of the messages before the window, or None.
+        - "messages": The messages in the window, oldest first. Each message has the "id", "message", "agent_run_id"
+          and "tokens" of the chat message, the "file_contents" to append to the message and the "image_list" of its files.
+        - "overflow_message_id": The ID of the newest message before the window that is not covered by the summary,
+          or 0 if the window covers all of the unsummarized messages.
+        """
+        start_id, memory = self._get_start()
+        summary = memory['summary'] if memory else None
+        token_budget = token_limit - (memory['summary_tokens'] if memory else 0)
+
+        window = deque()
+        file_content_lists = {}
+        current_tokens = 0
+        overflow_message_id = 0
+        before_id = None
+        while not overflow_message_id:
+            messages = agent_chat_messages.get_chat_agent_history_page(
+                self.user_id, self.agent_id, start_id, before_id, settings.MEMORY_PAGE_SIZE
+            )
+            if not messages:
+                break
+            if before_id is None:
+                newest_message = messages[0]
+                if newest_message['agent_run_id'] == 0 and newest_message['file_list'] and newest_message['tokens'] <= 0:
+                    file_content_list = get_file_content_list(newest_message['file_list'])
+                    agent_chat_messages.update_file_content_list_by_id(newest_message['id'], file_content_list)
+                    file_content_lists[newest_message['id']] = file_content_list
+            self._count_messages(messages, file_content_lists)
+            for message in messages:
+                # Ensure at least ONE message will be reserved
+                if window and current_tokens + message['tokens'] > token_budget:
+                    overflow_message_id = message['id']
+                    break
+                current_tokens += message['tokens']
+                window.appendleft(message)
+            if len(messages) < settings.MEMORY_PAGE_SIZE:
+                break
+            before_id = messages[-1]['id']
+
+        file_content_lists.update(agent_chat_messages.get_file_content_lists([
+            message['id'] for message in window
+            if message['file_list'] and message['id'] not in file_content_lists
+        ]))
+        for message in window:
+            message['file_contents'], message['image_list'] = format_file_contents(
+                message.pop('file_list'), file_content_lists.get(message['id'])
+            )
+        return {
+            'summary': summary,
+            'messages': list(window),
+            'overflow_message_id': overflow_message_id
+        }
+
+    def _get_summary_chunk(
+        self,
+        start_id: int,
+        last_message_id: int,
+        file_content_lists: Dict[int, Any]
+    ) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """
+        Gets the oldest unsummarized messages up to the given message that fit in `MEMORY_SUMMARY_MAX_INPUT_TOKENS`.
+        The oldest message is always included.
+
+        :return: A tuple of the messages, oldest first, their tokens, and whether more messages are left to summarize.
+        """
+        messages = []
+        total_tokens = 0
+        after_id = start_id
+        while True:
+            page = agent_chat_messages.get_chat_agent_history_page(
+                self.user_id, self.agent_id, after_id, last_message_id + 1, settings.MEMORY_PAGE_SIZE, oldest_first=True
+            )
+            if not page:
+                return messages, total_tokens, False
+            self._count_messages(page, file_content_lists)
+            for message in page:
+                if messages and total_tokens + message['tokens'] > settings.MEMORY_SUMMARY_MAX_INPUT_TOKENS:
+                    return messages, total_tokens, True
+                total_tokens += message['tokens']
+                messages.append(message)
+            if len(page) < settings.MEMORY_PAGE_SIZE:
+                return messages, total_tokens, False
+            after_id = page[-1]['id']
+
+    def _summarize_messages(self, summary: str, messages: List[Dict[str, Any]], model_config_id: int) -> str:
+        """
+        Generates the summary of the given summary followed by the given messages.
+        """
+        # Imported here, since the LLM nodes load the memory
+        from core.workflow.nodes import LLMNode
+
+        system_prompt = get_language_content('agent_chat_summary_system', self.user_id)
+        user_prompt = get_language_content(
+            'agent_chat_summary_user',
+            self.user_id,
+            append_ret_lang_prompt=False
+        ).format(
+            summary=summary,
+            messages=json.dumps([
+                {'role': 'agent' if message['agent_run_id'] > 0 else 'user', 'message': message['message']}
+                for message in messages
+            ], ensure_ascii=False)
+        )
+        llm_node = LLMNode(
+            title='Chat History Summary Generator',
+            desc='Generate chat history summary',
+            model_config_id=model_config_id,
+            prompt=Prompt(system_prompt, user_prompt)
+        )
+        result = llm_node.run()
+        assert result['status'] == 'success', result['message']
+        return result['data']['outputs']['value']
+
+    def summarize(self, last_message_id: int, model_config_id: int) -> bool:
+        """
+        Summarizes the messages up to the given message into the rolling summary, once the unsummarized messages
+        reach `MEMORY_SUMMARY_MIN_TOKENS`. Only one summary of a user and an agent is made at a time.
+        The messages are summarized oldest first in chunks of up to `MEMORY_SUMMARY_MAX_INPUT_TOKENS`, and the summary
+        is saved after each chunk, covering the messages up to the newest message of the chunk.
+
+        :param last_message_id: The ID of the newest message to summarize.
+        :param model_config_id: The ID of the model configuration that makes the summary.
+        :return: Whether the summary has been updated.
+        """
+        lock = redis.lock(
+            SUMMARY_LOCK_KEY.format(user_id=self.user_id, agent_id=self.agent_id), timeout=SUMMARY_LOCK_TTL
+        )
+        if not lock.acquire(blocking=False):
+            return False
+        is_updated = False
+        try:
+            start_id, memory = self._get_start()
+            summary = memory['summary'] if memory else ''
+            file_content_lists = {}
+            while start_id < last_message_id:
+                messages, total_tokens, has_more = self._get_summary_chunk(start_id, last_message_id, file_content_lists)
+                if not messages:
+                    break
+                if not is_updated and not has_more and total_tokens < settings.MEMORY_SUMMARY_MIN_TOKENS:
+                    break
+                summary = self._summarize_messages(summary, messages, model_config_id)
+                # Fails if the lock has expired and another summary may have been saved meanwhile
+                lock.reacquire()
+                start_id = messages[-1]['id']
+                agent_chat_memories.save_memory(self.user_id, self.agent_id, summary, count_tokens(summary), start_id)
+                is_updated = True
+                logger.debug('Summarized agent chat history of user %s and agent %s up to message %s',
+                             self.user_id, self.agent_id, start_id)
+            return is_updated
+        finally:
+            try:
+                lock.release()
+            except LockError:
+                logger.warning('Summary lock of user %s and agent %s has expired', self.user_id, self.agent_id)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import threading
+
 from copy import deepcopy
 from typing import Any, Dict, List, Optional, Sequence, Union
 
@@ -8,7 +10,7 @@ import httpx
 from langchain_core.callbacks.manager import Callbacks
 from langchain_core.documents import BaseDocumentCompressor, Document
 from langchain_core.utils import secret_from_env
-from pydantic import ConfigDict, Field, SecretStr, model_validator
+from pydantic import ConfigDict, Field, PrivateAttr, SecretStr, model_validator
 from typing_extensions import Self
 
 
@@ -29,9 +31,19 @@ class SiliconFlowReranker(BaseDocumentCompressor):
         arbitrary_types_allowed=True,
     )
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.num_tokens: int = 0
+    # The HTTP connections are kept alive between requests, as one instance is shared by concurrent requests
+    _client: httpx.Client = PrivateAttr(default_factory=httpx.Client)
+    # Token counts are kept per thread
+    _token_usage: threading.local = PrivateAttr(default_factory=threading.local)
+
+    @property
+    def num_tokens(self) -> int:
+        """Number of tokens used by the calling thread since the last reset."""
+        return getattr(self._token_usage, 'num_tokens', 0)
+
+    @num_tokens.setter
+    def num_tokens(self, value: int) -> None:
+        self._token_usage.num_tokens = value
 
     def rerank(
         self,
@@ -57,7 +69,7 @@ class SiliconFlowReranker(BaseDocumentCompressor):
             "Authorization": f"Bearer {self.api_key.get_secret_value()}",
             "Content-Type": "application/json"
         }
-        response = httpx.post(self.base_url, json=payload, headers=headers).json()
+        response = self._client.post(self.base_url, json=payload, headers=headers).json()
         result_dicts = []
         for res in response["results"]:
             result_dicts.append(
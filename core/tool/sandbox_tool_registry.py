@@ -0,0 +1,322 @@
+import ast
+import os
+import pickle
+import threading
+
+from copy import deepcopy
+from pathlib import Path
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from config import settings
+from core.tool.provider.builtin_tool_provider import get_icon_file_info
+from core.tool.utils.yaml_utils import load_yaml_file
+from core.workflow.variables import ObjectVariable, create_variable_from_dict
+from log import Logger
+
+logger = Logger.get_logger('celery-app')
+
+
+project_root = Path(__file__).absolute().parent.parent.parent
+sandbox_tools_path = project_root.joinpath('docker', 'sandbox', 'tools')
+assets_tool_path = project_root.joinpath('assets', 'tool')
+
+# Incremented whenever the format of the indexed entries changes, so that older cache files are ignored
+REGISTRY_CACHE_VERSION = 1
+
+error_types = {'FileNotFoundError': FileNotFoundError, 'ValueError': ValueError}
+
+def find_tool_class(python_file_path: str) -> str:
+    """
+    Finds the name of the first class in a Python file that inherits from the Tool base class.
+
+    :param python_file_path: The path of the Python file.
+    :return: The name of the Tool class.
+    """
+    try:
+        with open(python_file_path, 'r', encoding='utf-8') as python_file:
+            tree = ast.parse(python_file.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ClassDef):
+                for base in node.bases:
+                    if isinstance(base, ast.Name) and base.id == 'Tool':
+                        return node.name
+                    elif isinstance(base, ast.Attribute) and base.attr == 'Tool':
+                        return node.name
+        raise ValueError(f"No Tool class found in {python_file_path}")
+    except Exception as e:
+        raise ValueError(f"Error parsing tool file {python_file_path}: {e}")
+
+def get_directory_signature(directory: Path) -> Tuple[int, int]:
+    """
+    Gets the number of entries and the latest modification time of a directory tree,
+    which change whenever a file is added, removed or edited.
+    """
+    count, latest_mtime = 0, 0
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [dirname for dirname in dirnames if dirname != '__pycache__']
+        for name in [dirpath, *(os.path.join(dirpath, filename) for filename in filenames)]:
+            try:
+                latest_mtime = max(latest_mtime, os.stat(name).st_mtime_ns)
+                count += 1
+            except OSError:
+                pass
+    return count, latest_mtime
+
+def load_requirements(provider_dir: Path) -> List[str]:
+    # Load pip packages from requirements.txt if it exists, skipping empty lines and comments
+    requirements_file = provider_dir.joinpath('requirements.txt')
+    packages = []
+    if requirements_file.exists():
+        try:
+            with open(requirements_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#'):
+                        packages.append(line)
+        except Exception:
+            logger.exception('Error reading requirements.txt %s', requirements_file)
+    return packages
+
+def index_provider(category: str, provider: str, provider_dir: Path) -> Dict[str, Any]:
+    """
+    Indexes a sandbox tool provider.
+
+    :return: The entry of the provider, with
+        `listing`: the provider configuration returned by tool listings, None if the provider cannot be listed,
+        `requirements`: the pip packages of the provider,
+        `tools_configured`: whether the provider configuration lists any tools,
+        `tools`: tool name -> Tool class name, Python source relative to the provider directory and schema,
+        `error`: (exception type, message) of the provider configuration error, if any.
+    """
+    entry = {
+        'listing': None,
+        'requirements': load_requirements(provider_dir),
+        'tools_configured': False,
+        'tools': {},
+        'error': None
+    }
+    provider_config_dir = provider_dir.joinpath('provider')
+    yaml_path = provider_config_dir.joinpath(f'{provider}.yaml')
+    if not yaml_path.exists():
+        logger.warning('YAML file missing for provider %s in %s', provider, provider_config_dir)
+        entry['error'] = ('FileNotFoundError', f"Provider YAML file not found: {yaml_path}")
+        return entry
+    try:
+        provider_yaml = load_yaml_file(str(yaml_path), ignore_error=False)
+    except Exception as e:
+        logger.exception('Cannot load provider YAML for %s', provider)
+        entry['error'] = ('ValueError', f"Failed to parse provider YAML file {yaml_path}: {e}")
+        return entry
+
+    tools_config = provider_yaml.get('tools') or []
+    entry['tools_configured'] = bool(tools_config)
+    listed_tools = []
+    for tool_path_relative in tools_config:
+        if not tool_path_relative:
+            continue
+        tool_path = provider_dir.joinpath(tool_path_relative)
+        if not tool_path.exists():
+            logger.warning('Tool file not found: %s', tool_path)
+            continue
+        try:
+            tool_yaml = load_yaml_file(str(tool_path), ignore_error=False)
+        except Exception:
+            logger.exception('Cannot load tool YAML %s', tool_path)
+            continue
+
+        # Tools are listed with a single text output
+        listed_tool = deepcopy(tool_yaml)
+        output_variable = ObjectVariable(name='output')
+        output_variable.add_property("output", create_variable_from_dict({"name": "output", "type": "string"}))
+        listed_tool['output'] = output_variable.to_dict()
+        listed_tools.append(listed_tool)
+
+        # The first tool with an identity name is invoked by that name
+        tool_name = (tool_yaml.get('identity') or {}).get('name', '')
+        if not tool_name or tool_name in entry['tools']:
+            continue
+        tool = {'class_name': None, 'python_source': None, 'schema': tool_yaml, 'error': None}
+        entry['tools'][tool_name] = tool
+        python_source = ((tool_yaml.get('extra') or {}).get('python') or {}).get('source', '')
+        if not python_source:
+            tool['error'] = ('ValueError', f"No python.source specified in YAML config: {tool_path}")
+            continue
+        # The python source path is relative to the provider directory, not the tool YAML directory
+        python_file_path = provider_dir.joinpath(python_source if python_source.endswith('.py') else f'{python_source}.py')
+        if not python_file_path.exists():
+            tool['error'] = ('FileNotFoundError', f"Python file not found: {python_file_path}")
+            continue
+        try:
+            tool['class_name'] = find_tool_class(str(python_file_path))
+        except ValueError as e:
+            tool['error'] = ('ValueError', str(e))
+            continue
+        tool['python_source'] = python_source
+
+    listing = deepcopy(provider_yaml)
+    if 'identity' in listing and 'icon' in listing['identity']:
+        icon_name, icon_extension = get_icon_file_info(listing['identity']['name'])
+        listing['identity']['icon'] = f"{settings.ICON_URL}/tool_icon/{icon_name}.{icon_extension}"
+    if listing.get('credentials_for_provider') is not None:
+        for credential_name, credential_info in listing['credentials_for_provider'].items():
+            credential_info['name'] = credential_name
+    listing['tools'] = listed_tools
+    entry['listing'] = listing
+    return entry
+
+
+class SandboxToolRegistry:
+    """
+    An index of the sandbox tools by category and provider, so that invoking and listing tools are dictionary lookups.
+    The index is persisted to a cache file and validated against the modification times of the provider directories,
+    reindexing only the providers that changed. Each process revalidates it at most once per check interval.
+    """
+
+    def __init__(self, tools_path: Path, cache_path: str, check_interval: float):
+        """
+        :param tools_path: Directory of the tool categories.
+        :param cache_path: Path of the cache file, relative to the project root.
+        :param check_interval: Minimum seconds between validations of the index.
+        """
+        self.tools_path = tools_path
+        self.cache_path = project_root.joinpath(cache_path)
+        self.check_interval = check_interval
+        self._providers: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _get_cache_key(self) -> Tuple[Any, ...]:
+        # Listings embed icon URLs, which depend on the icon URL setting and the icon assets
+        assets_mtime = assets_tool_path.stat().st_mtime_ns if assets_tool_path.exists() else 0
+        return REGISTRY_CACHE_VERSION, str(self.tools_path), settings.ICON_URL, assets_mtime
+
+    def _read_cache(self, cache_key: Tuple[Any, ...]) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        try:
+            with open(self.cache_path, 'rb') as cache_file:
+                cache = pickle.load(cache_file)
+            if cache['key'] == cache_key:
+                return cache['providers']
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logger.exception('Cannot load tool registry cache %s', self.cache_path)
+        return {}
+
+    def _write_cache(self, cache_key: Tuple[Any, ...]) -> None:
+        temp_path = self.cache_path.with_name(f'{self.cache_path.name}.{uuid4().hex}.tmp')
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, 'wb') as cache_file:
+                pickle.dump({'key': cache_key, 'providers': self._providers}, cache_file)
+            os.replace(temp_path, self.cache_path)
+        except Exception:
+            logger.exception('Cannot write tool registry cache %s', self.cache_path)
+            temp_path.unlink(missing_ok=True)
+
+    def _load(self) -> None:
+        cache_key = self._get_cache_key()
+        cached_providers = self._providers or self._read_cache(cache_key)
+        providers = {}
+        changed = not self._providers
+        if self.tools_path.is_dir():
+            for category in sorted(os.listdir(self.tools_path)):
+                category_dir = self.tools_path.joinpath(category)
+                if not category_dir.is_dir():
+                    continue
+                for provider in sorted(os.listdir(category_dir)):
+                    provider_dir = category_dir.joinpath(provider)
+                    if not provider_dir.is_dir():
+                        continue
+                    signature = get_directory_signature(provider_dir)
+                    entry = cached_providers.get((category, provider))
+                    if entry is None or entry['signature'] != signature:
+                        entry = index_provider(category, provider, provider_dir)
+                        entry['signature'] = signature
+                        changed = True
+                    providers[(category, provider)] = entry
+        changed = changed or providers.keys() != cached_providers.keys()
+        self._providers = providers
+        self._checked_at = monotonic()
+        if changed:
+            self._write_cache(cache_key)
+
+    def load(self) -> None:
+        """
+        Loads the index from the cache file on first use and reindexes the providers that changed since they were indexed.
+        """
+        with self._lock:
+            self._load()
+
+    def _get_providers(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        if self._checked_at is None or monotonic() - self._checked_at >= self.check_interval:
+            with self._lock:
+                # Another thread may have validated the index while this one waited for the lock
+                if self._checked_at is None or monotonic() - self._checked_at >= self.check_interval:
+                    self._load()
+        return self._providers
+
+    def get_tool(self, category: str, provider: str, tool_name: str) -> Dict[str, Any]:
+        """
+        Gets a tool to invoke.
+
+        :param category: Tool category (e.g., 't1').
+        :param provider: Provider name.
+        :param tool_name: Tool name, matching the identity name in the tool YAML.
+        :return: The Tool class name `class_name`, the Python source relative to the provider directory `python_source`
+            and the tool YAML `schema`, which must not be modified.
+        """
+        providers = self._get_providers()
+        entry = providers.get((category, provider))
+        if entry is None:
+            category_dir = self.tools_path.joinpath(category)
+            if not any(key[0] == category for key in providers):
+                raise FileNotFoundError(f"Category directory not found: {category_dir}")
+            raise FileNotFoundError(f"Provider directory not found: {category_dir.joinpath(provider)}")
+        if entry['error']:
+            error_type, message = entry['error']
+            raise error_types[error_type](message)
+        if not entry['tools_configured']:
+            raise ValueError(f"No tools configuration found in provider YAML: {provider}")
+        tool = entry['tools'].get(tool_name)
+        if tool is None:
+            raise ValueError(f"No tool found with identity.name matching tool_name: {tool_name}")
+        if tool['error']:
+            error_type, message = tool['error']
+            raise error_types[error_type](message)
+        return tool
+
+    def get_requirements(self, category: str, provider: str) -> List[str]:
+        """
+        Gets the pip packages of a provider, an empty list if the provider does not exist.
+        """
+        entry = self._get_providers().get((category, provider))
+        return list(entry['requirements']) if entry else []
+
+    def get_provider_listing(self, category: str, provider: str) -> Dict[str, Any]:
+        """
+        Gets a copy of the configuration of a provider and its tools, an empty dictionary if it cannot be listed.
+        """
+        entry = self._get_providers().get((category, provider))
+        if not entry or entry['listing'] is None:
+            logger.warning('Provider not found: %s/%s', category, provider)
+            return {}
+        return deepcopy(entry['listing'])
+
+    def get_listing(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Gets a copy of the configurations of all listable providers and their tools by category.
+        """
+        categories = {}
+        for (category, provider), entry in self._get_providers().items():
+            if entry['listing'] is not None:
+                categories.setdefault(category, {})[provider] = entry['listing']
+        return deepcopy(categories)
+
+
+sandbox_tool_registry = SandboxToolRegistry(
+    sandbox_tools_path,
+    settings.TOOL_REGISTRY_CACHE_PATH,
+    settings.TOOL_REGISTRY_CHECK_INTERVAL
+)
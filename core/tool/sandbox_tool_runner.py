@@ -4,11 +4,11 @@ Sandbox Tool Runner Module
 """
 
 import os
-import ast
 import json
 import uuid
 from typing import Any
 from core.workflow.nodes.base.sandbox_base import SandboxBaseNode
+from core.tool.sandbox_tool_registry import sandbox_tool_registry
 from core.workflow.variables import ObjectVariable, Variable
 from datetime import datetime
 
@@ -61,14 +61,8 @@ class SandboxToolRunner(SandboxBaseNode):
         """
         Discover tool configuration and generate Python code to invoke the tool.
         
-        This method follows a step-by-step process:
-        1. Locate the category directory
-        2. Locate the provider directory within the category
-        3. Find the provider's YAML configuration file
-        4. Traverse through the tools directory
-        5. Search for tool YAML files and match by identity.name
-        6. Extract the Python source file from extra.python.source
-        7. Find the Tool class that inherits from Tool base class
+        The tool is looked up in the sandbox tool registry, which indexes the provider YAML, the tool YAML
+        files by identity.name, their extra.python.source files and the Tool classes in those files.
         
         Args:
             category (str): Tool category (e.g., 't1')
@@ -86,87 +80,9 @@ class SandboxToolRunner(SandboxBaseNode):
         if not isinstance(parameters, dict):
             parameters = flatten_variable_with_values(parameters)
         
-        # Step 1: Locate the category directory
-        current_file = os.path.realpath(__file__)
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_file)))
-        sandbox_path = os.path.join(project_root, 'docker', 'sandbox')
-        category_dir = os.path.join(sandbox_path, 'tools', category)
-        
-        if not os.path.exists(category_dir):
-            raise FileNotFoundError(f"Category directory not found: {category_dir}")
-        
-        # Step 2: Locate the provider directory within the category
-        provider_dir = os.path.join(category_dir, provider)
-        if not os.path.exists(provider_dir):
-            raise FileNotFoundError(f"Provider directory not found: {provider_dir}")
-        
-        # Step 3: Find the provider's YAML configuration file and read tools paths
-        provider_yaml_path = os.path.join(provider_dir, 'provider', f'{provider}.yaml')
-        if not os.path.exists(provider_yaml_path):
-            raise FileNotFoundError(f"Provider YAML file not found: {provider_yaml_path}")
-        
-        # Read the provider YAML file to get tools configuration
-        try:
-            import yaml
-            with open(provider_yaml_path, 'r', encoding='utf-8') as provider_yaml_file:
-                provider_config = yaml.safe_load(provider_yaml_file)
-        except Exception as e:
-            raise ValueError(f"Failed to parse provider YAML file {provider_yaml_path}: {e}")
-        
-        # Step 4: Get tools paths from provider YAML configuration
-        tools_config = provider_config.get('tools', [])
-        if not tools_config:
-            raise ValueError(f"No tools configuration found in provider YAML: {provider_yaml_path}")
-        
-        # Step 5: Search for tool YAML files and match by identity.name
-        tool_yaml_path = None
-        tool_config = None
-        
-        # Iterate through tools list in provider YAML to find matching tool_name
-        for tool_yaml_relative_path in tools_config:
-            if not tool_yaml_relative_path:
-                continue
-            
-            # Construct full path to tool YAML file
-            tool_yaml_full_path = os.path.join(provider_dir, tool_yaml_relative_path)
-            
-            if not os.path.exists(tool_yaml_full_path):
-                print(f"Warning: Tool YAML file not found: {tool_yaml_full_path}")
-                continue
-            
-            try:
-                with open(tool_yaml_full_path, 'r', encoding='utf-8') as tool_yaml_file:
-                    config = yaml.safe_load(tool_yaml_file)
-                    # Check if identity.name matches the tool_name
-                    identity_name = config.get('identity', {}).get('name', '')
-                    
-                    if identity_name == tool_name:
-                        tool_yaml_path = tool_yaml_full_path
-                        tool_config = config
-                        break
-            except Exception as e:
-                print(f"Warning: Could not parse tool YAML config {tool_yaml_full_path}: {e}")
-                continue
-        
-        if not tool_yaml_path:
-            raise ValueError(f"No tool found with identity.name matching tool_name: {tool_name}")
-        
-        # Step 6: Extract the Python source file from extra.python.source
-        python_source = tool_config.get('extra', {}).get('python', {}).get('source', '')
-        if not python_source:
-            raise ValueError(f"No python.source specified in YAML config: {tool_yaml_path}")
-        
-        # Determine the Python file path relative to the provider directory
-        # The python source path should be relative to the provider directory, not the tool YAML directory
-        if python_source.endswith('.py'):
-            python_file_path = os.path.join(provider_dir, python_source)
-        else:
-            python_file_path = os.path.join(provider_dir, f"{python_source}.py")
-        
-        if not os.path.exists(python_file_path):
-            raise FileNotFoundError(f"Python file not found: {python_file_path}")
-        # Step 7: Find the Tool class that inherits from Tool base class
-        tool_class_name = self._find_tool_class_in_file(python_file_path, tool_name)
+        tool = sandbox_tool_registry.get_tool(category, provider, tool_name)
+        tool_class_name = tool['class_name']
+        python_source = tool['python_source']
         import_module = python_source.replace('.py', '').replace('/','.')
         
         # Generate credentials code for the tool invocation
@@ -470,60 +386,6 @@ run_tool()
 '''
         return tool_class_name, code
     
-    def _find_tool_class_in_file(self, tool_file_path: str, tool_name: str = None) -> str:
-        """
-        Find the Tool class name in a Python file that matches the tool_name.
-        
-        Args:
-            tool_file_path (str): Path to the tool Python file
-            tool_name (str): Expected tool name to match against
-            
-        Returns:
-            str: Name of the Tool class
-        """
-        try:
-            with open(tool_file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            tree = ast.parse(content)
-            
-            if tool_name:
-                yaml_file_path = tool_file_path.replace('.py', '.yaml')
-                if os.path.exists(yaml_file_path):
-                    try:
-                        import yaml
-                        with open(yaml_file_path, 'r', encoding='utf-8') as yaml_file:
-                            yaml_config = yaml.safe_load(yaml_file)
-                            yaml_tool_name = yaml_config.get('identity', {}).get('name', '')
-                            
-                            if yaml_tool_name == tool_name:
-                                for node in ast.walk(tree):
-                                    if isinstance(node, ast.ClassDef):
-                                        for base in node.bases:
-                                            if isinstance(base, ast.Name) and base.id == 'Tool':
-                                                return node.name
-                                            elif isinstance(base, ast.Attribute) and base.attr == 'Tool':
-                                                return node.name
-                                
-                                raise ValueError(f"No Tool class found in {tool_file_path} for tool_name: {tool_name}")
-                            else:
-                                raise ValueError(f"Tool name mismatch. Expected: {tool_name}, Found: {yaml_tool_name}")
-                    except Exception as yaml_error:
-                        print(f"Warning: Could not parse YAML config for {tool_file_path}: {yaml_error}")
-            
-            for node in ast.walk(tree):
-                if isinstance(node, ast.ClassDef):
-                    for base in node.bases:
-                        if isinstance(base, ast.Name) and base.id == 'Tool':
-                            return node.name
-                        elif isinstance(base, ast.Attribute) and base.attr == 'Tool':
-                            return node.name
-            
-            raise ValueError(f"No Tool class found in {tool_file_path}")
-        
-        except Exception as e:
-            raise ValueError(f"Error parsing tool file {tool_file_path}: {e}")
-    
     def _generate_tool_invocation_code(self, category: str, provider: str, 
                                      tool_name: str, credentials: dict, 
                                      parameters) -> str:
@@ -558,12 +420,7 @@ run_tool()
         Returns:
             dict: Raw response from sandbox API
         """
-        current_file = os.path.realpath(__file__)
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(current_file)))
-        sandbox_path = os.path.join(project_root, 'docker', 'sandbox')
-        tool_dir = os.path.join(sandbox_path, 'tools', category, provider)
-        
-        pip_packages = self.load_requirements_from_file(tool_dir)
+        pip_packages = sandbox_tool_registry.get_requirements(category, provider)
         
         _, code = self._discover_tool_and_generate_code(category, provider, 
                                                        tool_name, credentials, parameters)
@@ -43,6 +43,10 @@ class GeneralVectorDatabase(VectorStore):
                 import json
                 return 'expr', f'source in {json.dumps(documents, ensure_ascii=False)}'
 
+    def _generate_id_filter(self, ids: List[str]) -> Optional[Tuple[str, Any]]:
+        if self._vector_type == 'Milvus':
+            return 'expr', f'{self._vector_store._primary_field} in {[int(id_) for id_ in ids]}'
+
     def add_texts(
         self,
         texts: Iterable[str],
@@ -332,6 +336,75 @@ class GeneralVectorDatabase(VectorStore):
             **kwargs
         )
 
+    def similarity_search_with_relevance_scores_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        search_in_documents: Optional[List[str]] = None,
+        score_threshold: Optional[float] = None,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Return docs most similar to an embedding vector and relevance scores in the range [0, 1].
+
+        The same as `similarity_search_with_relevance_scores`, for a query whose
+        embedding has already been computed, e.g. to share it between collections.
+
+        Args:
+            embedding: Embedding to look up documents similar to.
+            k: Number of Documents to return. Defaults to 4.
+            search_in_documents: Optional list of document names to search in.
+            score_threshold: Optional, a floating point value between 0 to 1 to
+                filter the resulting set of retrieved docs
+
+        Returns:
+            List of Tuples of (doc, similarity_score)
+        """
+        if search_in_documents and (key_value := self._generate_filter(search_in_documents)):
+            key, value = key_value
+            kwargs[key] = value
+        docs_and_scores = self._vector_store.similarity_search_with_score_by_vector(
+            embedding=embedding,
+            k=k,
+            **kwargs
+        )
+        relevance_score_fn = self._vector_store._select_relevance_score_fn()
+        docs_and_similarities = [(doc, relevance_score_fn(score)) for doc, score in docs_and_scores]
+        if score_threshold is not None:
+            docs_and_similarities = [
+                (doc, similarity) for doc, similarity in docs_and_similarities
+                if similarity >= score_threshold
+            ]
+        return docs_and_similarities
+
+    def similarity_search_with_relevance_scores_by_ids(
+        self,
+        embedding: List[float],
+        ids: List[str],
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """Return the given docs and their relevance scores to an embedding vector in the range [0, 1].
+
+        Used to score documents found by other means, e.g. by a lexical search,
+        the same way as the results of a similarity search.
+
+        Args:
+            embedding: Embedding to score the documents against.
+            ids: IDs of the documents to score.
+
+        Returns:
+            List of Tuples of (doc, similarity_score), without the documents
+            that are not found; empty if the vector store cannot filter by ID
+        """
+        if not ids or not (key_value := self._generate_id_filter(ids)):
+            return []
+        key, value = key_value
+        kwargs[key] = value
+        return self.similarity_search_with_relevance_scores_by_vector(
+            embedding=embedding,
+            k=len(ids),
+            **kwargs
+        )
+
     async def asimilarity_search(
         self,
         query: str,
@@ -1,6 +1,9 @@
+import asyncio
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from typing import Dict, Optional, Set
 from api.utils.jwt import *
+from core.database import async_redis
+from core.helper import get_websocket_channel
 from log import Logger
 
 logger = Logger.get_logger('websocket')
@@ -9,12 +12,17 @@ class ConnectionManager():
     def __init__(self):
         self.active_connections: Dict[int, Set[WebSocket]] = {}
         self.user_team: Dict[int, Set[int]] = {}
+        # Subscriptions to the message channels of the users connected to this worker
+        self.pubsub = async_redis.pubsub()
+        self.subscribed = asyncio.Event()
 
     async def connect(self, websocket: WebSocket, user_id: int, team_id: Optional[int] = None):
         await websocket.accept()
 
         if user_id not in self.active_connections:
             self.active_connections[user_id] = set()
+            await self.pubsub.subscribe(get_websocket_channel(user_id))
+            self.subscribed.set()
         self.active_connections[user_id].add(websocket)
         # print(f"User {user_id} connected.")
         logger.info('User %s connected.', user_id)
@@ -26,11 +34,12 @@ class ConnectionManager():
             # print(f"User {user_id} joined team {team_id}.")
             logger.info('User %s joined team %s.', user_id, team_id)
 
-    def disconnect(self, websocket: WebSocket, user_id: int):
+    async def disconnect(self, websocket: WebSocket, user_id: int):
         if user_id in self.active_connections:
             self.active_connections[user_id].discard(websocket)
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
+                await self.pubsub.unsubscribe(get_websocket_channel(user_id))
             for team_users in self.user_team.values():
                 team_users.discard(user_id)
 
@@ -62,7 +71,7 @@ class WebSocketHandler:
                 data = await websocket.receive_json()
                 # Optional: Do something with the data received from client
         except WebSocketDisconnect:
-            self.manager.disconnect(websocket, user_id)
+            await self.manager.disconnect(websocket, user_id)
 
     async def send_data_to_user(self, message: str, user_id: int):
         await self.manager.send_personal_message(message, user_id)
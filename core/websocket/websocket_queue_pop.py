@@ -1,20 +1,57 @@
 import asyncio
 import json
-from core.helper import pop_from_websocket_queue, get_websocket_queue_length
+from config import settings
+from core.database import async_redis
+from core.helper import get_websocket_channel
 from core.websocket.websocket_manager import get_ws_handler
 from log import Logger
 
 logger = Logger.get_logger('websocket')
 
-async def queue_processor():
+async def channel_processor():
+    """
+    Delivers the messages published to the channels of the users connected to this worker.
+    """
+    ws_handler = get_ws_handler()
+    pubsub = ws_handler.manager.pubsub
+    # The pub/sub connection is only created by the first subscription
+    await ws_handler.manager.subscribed.wait()
     while True:
+        try:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception('Error reading websocket channels: %s', e)
+            await asyncio.sleep(1)
+            continue
+        if message:
+            try:
+                data = message['data'].decode()
+                await ws_handler.send_data_to_user(data, json.loads(data)['user_id'])
+            except Exception as e:
+                logger.exception('Error delivering websocket message: %s', e)
 
-        item = pop_from_websocket_queue()
-        if item:
-            # logger.info(f"Get Redis Data: {json.dumps(item)}")
-
-            ws_handler = get_ws_handler()
+async def legacy_queue_processor():
+    """
+    Moves the messages still pushed to the WebSocket message queue, e.g. by processes of a previous version
+    during a rolling deployment, to the channels of their users in batches.
+    """
+    while True:
+        try:
+            item = await async_redis.blpop([settings.WEBSOCKET_MESSAGE_QUEUE_KEY], timeout=5)
+            if not item:
+                continue
+            data = [item[1], *(await async_redis.lpop(settings.WEBSOCKET_MESSAGE_QUEUE_KEY, settings.WEBSOCKET_MESSAGE_BATCH_SIZE - 1) or [])]
+            pipeline = async_redis.pipeline(transaction=False)
+            for value in data:
+                pipeline.publish(get_websocket_channel(json.loads(value)['user_id']), value)
+            await pipeline.execute()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.exception('Error moving websocket queue messages: %s', e)
+            await asyncio.sleep(1)
 
-            await ws_handler.send_data_to_user(json.dumps(item), item['user_id'])
-        else:
-            await asyncio.sleep(1)
\ No newline at end of file
+async def queue_processor():
+    await asyncio.gather(channel_processor(), legacy_queue_processor())
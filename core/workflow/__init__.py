@@ -11,6 +11,7 @@ from .context import *
 from .recursive_task import *
 from core.database.models.chatroom_driven_records import ChatroomDrivenRecords
 from core.database.models import Apps, Workflows, AppRuns, AppNodeUserRelation
+from core.helper import notify_workflow_scheduler
 
 def start_workflow(
     team_id: int, 
@@ -107,6 +108,9 @@ def start_workflow(
         AppNodeUserRelation().create_data(app_run_id, node_confirm_users)
     
     Apps().increment_execution_times(app_id)
+    # Commit before notifying so the workflow scheduler can see the new app run
+    app_runs.commit()
+    notify_workflow_scheduler(app_run_id)
     
     return {'app_id': app_id, 'workflow_id': workflow['id'], 'app_run_id': app_run_id}
 
@@ -135,6 +139,8 @@ __all__ = [
     
     "Context",
     "create_context_from_dict",
+    "load_context",
+    "save_node_context",
     "replace_variable_value_with_context",
     
     "RecursiveTaskCategory",
@@ -1,5 +1,5 @@
 import re
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from .nodes.base import Node
 from .variables import Variable, ArrayVariable, ObjectVariable, VariableTypes, create_variable_from_dict, replace_value_in_variable
 
@@ -102,6 +102,36 @@ def create_context_from_dict(context_dict: List[Dict[str, Any]]) -> Context:
         })
     return context
 
+def load_context(app_run_id: int, level: Optional[int] = None, node_ids: Optional[List[str]] = None) -> Context:
+    """
+    Loads the context of an app run from the context records, filtered like `Context.get_related_records`.
+
+    Args:
+        app_run_id (int): The ID of the app run.
+        level (Optional[int]): Only load records with a level less than or equal to this level.
+        node_ids (Optional[List[str]]): Only load records of these node IDs.
+
+    Returns:
+        Context: An instance of the Context class.
+    """
+    from core.database.models import AppRunContextRecords
+    return create_context_from_dict(AppRunContextRecords().get_records(app_run_id, level, node_ids))
+
+def save_node_context(app_run_id: int, level: int, node: Node) -> None:
+    """
+    Saves the input and output data of a node to the context records of an app run.
+    Only the record of this node is written, instead of the whole context.
+
+    Args:
+        app_run_id (int): The ID of the app run.
+        level (int): The level of the node in the workflow.
+        node (Node): The node object.
+    """
+    from core.database.models import AppRunContextRecords
+    context = Context()
+    context.add_node(level, node)
+    AppRunContextRecords().save_record(app_run_id, context.to_dict()[0])
+
 def replace_variable_value_with_context(original_variable: VariableTypes, context: Context, partial_replacement: bool = False):
     """
     Searches for placeholders in the original variable's value (if it's a Variable type) or in its properties/values
@@ -559,7 +559,7 @@ class AgentNode(ImportToKBBaseNode, LLMBaseNode):
                 thinking=thinking
             )
             model_data['tools'] = all_mcp_tools
-            print(model_data)
+            logger.debug('Agent model data: %s', model_data)
             AppRuns().update(
                 {'column': 'id', 'value': agent_run_id},
                 {'model_data': model_data}
@@ -900,8 +900,8 @@ class AgentNode(ImportToKBBaseNode, LLMBaseNode):
                 chat_base_url=chat_base_url,
                 thinking=thinking
             )
-            from core.database.models.models import Models
-            model_info = Models().get_model_by_config_id(self.data['model_config_id'])
+            from core.llm.client_pool import get_model_info
+            model_info = get_model_info(self.data['model_config_id'])
             supplier_name = model_info['supplier_name']
 
             full_chunk: Optional[AIMessageChunk] = None
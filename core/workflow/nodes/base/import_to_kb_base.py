@@ -97,7 +97,7 @@ class ImportToKBBaseNode(Node):
                 case _:
                     # This should never happen
                     raise Exception('Invalid variable type!')
-            word_count, num_tokens, indexing_latency = result
+            word_count, num_tokens, indexing_latency, _ = result
             Documents().update(
                 [
                     {'column': 'id', 'value': document_id},
@@ -1,9 +1,11 @@
-import asyncio, sys, json, re
+import asyncio, sys, json, re, threading
 from pathlib import Path
 sys.path.append(str(Path(__file__).absolute().parent.parent.parent.parent))
 
-from collections import deque
+from collections import deque, OrderedDict
 from copy import deepcopy
+from functools import lru_cache
+from hashlib import sha1
 from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 import dashscope
@@ -18,24 +20,34 @@ from langchain_core.runnables import Runnable, RunnableParallel, RunnablePassthr
 from langchain_core.runnables.utils import Input, Output
 
 
-from core.database.models.agent_chat_messages import AgentChatMessages
 from core.document import DocumentLoader
 
 from . import Node
 from ...variables import ArrayVariable, Variable
 from ...context import Context
 from database.models import Models, AppNodeExecutions, DocumentSegments, Documents, AIToolLLMRecords, UploadFiles
-from llm.models import LLMPipeline
+from core.llm.client_pool import get_llm_pipeline, get_model_info
 from llm.prompt import create_prompt_from_dict, replace_prompt_with_context
 from llm.messages import Messages, create_messages_from_serialized_format
 
 from config import settings
-from core.helper import truncate_agent_messages_by_token_limit, get_file_content_list
+from core.memory import AgentChatMemory, get_history_token_limit
 from core.database.models import (Models, Users)
+from languages import get_language_content
+from log import Logger
 
 
+logger = Logger.get_logger('celery-app')
+
 project_root = Path(__file__).absolute().parent.parent.parent.parent.parent
 
+# Suppliers whose exact token counts require a request to their API
+remote_tokenizer_suppliers = {'Anthropic', 'Doubao', 'Google'}
+
+# Token counts of chatroom messages by local tokenizer and content hash
+message_token_counts: OrderedDict[Tuple[str, str, str], int] = OrderedDict()
+message_token_counts_lock = threading.Lock()
+
 document_segments = DocumentSegments()
 documents = Documents()
 models = Models()
@@ -66,16 +78,16 @@ class LLMBaseNode(Node):
         """
         return text.replace("{", "{{").replace("}", "}}")
 
-    @classmethod
-    def _get_tokenizer(cls, supplier_name: str, model_name: str, api_key: str) -> Callable[[str], int]:
-
+    @staticmethod
+    @lru_cache(maxsize=32)
+    def _get_local_tokenizer(supplier_name: str, model_name: str) -> Callable[[str], int]:
         """
-        Get the appropriate tokenizer based on the model name
+        Get a tokenizer that counts tokens locally, loaded once per process.
+        Suppliers without a local tokenizer get the `cl100k_base` encoding as an approximation.
         
         Args:
             supplier_name (str): Supplier name, e.g., 'OpenAI', 'Anthropic'
             model_name (str): Model name, e.g., 'gpt-3.5-turbo', 'gpt-4', 'claude-3-opus'
-            api_key (str): API key for the supplier
             
         Returns:
             Callable[[str], int]: A function that takes a string and returns the number of tokens.
@@ -86,14 +98,7 @@ class LLMBaseNode(Node):
                     encoding = tiktoken.encoding_for_model(model_name)
                 except:
                     encoding = tiktoken.get_encoding("cl100k_base")
-                return lambda text: len(encoding.encode(text))
-            case 'Anthropic':
-                anthropic = Anthropic(api_key=api_key)
-                return lambda text: anthropic.messages.count_tokens(
-                    model=model_name,
-                    messages=[{'role': 'user', 'content': text}],
-                    timeout=120
-                ).input_tokens
+                return lambda text: len(encoding.encode(text, disallowed_special=()))
             case 'Tongyi':
                 tokenizer = dashscope.get_tokenizer('qwen-turbo')
                 return lambda text: len(tokenizer.encode(text))
@@ -102,6 +107,32 @@ class LLMBaseNode(Node):
                 chat_tokenizer_dir = project_root.joinpath('core/helper/deepseek-tokenizer')
                 tokenizer = AutoTokenizer.from_pretrained(chat_tokenizer_dir, trust_remote_code=True)
                 return lambda text: len(tokenizer.encode(text))
+            case _:
+                encoding = tiktoken.get_encoding("cl100k_base")
+                return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+    @classmethod
+    def _get_tokenizer(cls, supplier_name: str, model_name: str, api_key: str) -> Callable[[str], int]:
+
+        """
+        Get the tokenizer that counts tokens exactly like the model does, requesting the supplier API if needed
+        
+        Args:
+            supplier_name (str): Supplier name, e.g., 'OpenAI', 'Anthropic'
+            model_name (str): Model name, e.g., 'gpt-3.5-turbo', 'gpt-4', 'claude-3-opus'
+            api_key (str): API key for the supplier
+            
+        Returns:
+            Callable[[str], int]: A function that takes a string and returns the number of tokens.
+        """
+        match supplier_name:
+            case 'Anthropic':
+                anthropic = Anthropic(api_key=api_key)
+                return lambda text: anthropic.messages.count_tokens(
+                    model=model_name,
+                    messages=[{'role': 'user', 'content': text}],
+                    timeout=120
+                ).input_tokens
             case 'Doubao':
                 def _count_tokens(text: str) -> int:
                     response = httpx.post(
@@ -128,7 +159,37 @@ class LLMBaseNode(Node):
                     config={'http_options': {'timeout': 120_000}}
                 ).total_tokens
             case _:
-                return lambda _: 0
+                return cls._get_local_tokenizer(supplier_name, model_name)
+
+    @classmethod
+    def _count_message_tokens(
+        cls,
+        supplier_name: str,
+        model_name: str,
+        message: Dict[str, Union[int, str]],
+        use_cache: bool = True
+    ) -> int:
+        """
+        Count the tokens a chatroom message adds to the prompt with the local tokenizer.
+        The message is embedded in the prompt as JSON inside a JSON string, so it is counted in that form.
+        Counts are cached by content hash, as the same history messages are counted on every turn.
+        """
+        text = json.dumps(json.dumps(message, ensure_ascii=False), ensure_ascii=False)[1:-1] + ', '
+        tokenizer = cls._get_local_tokenizer(supplier_name, model_name)
+        if not use_cache:
+            return tokenizer(text)
+        key = (supplier_name, model_name, sha1(text.encode('utf-8')).hexdigest())
+        with message_token_counts_lock:
+            num_tokens = message_token_counts.get(key)
+            if num_tokens is not None:
+                message_token_counts.move_to_end(key)
+                return num_tokens
+        num_tokens = tokenizer(text)
+        with message_token_counts_lock:
+            message_token_counts[key] = num_tokens
+            while len(message_token_counts) > settings.TOKEN_COUNT_CACHE_SIZE:
+                message_token_counts.popitem(last=False)
+        return num_tokens
 
 
     @classmethod
@@ -223,9 +284,6 @@ class LLMBaseNode(Node):
         max_context_tokens = model_config['max_context_tokens']
         max_output_tokens = model_config['max_output_tokens']
         token_limit = max_context_tokens - max_output_tokens - 8192
-        
-        # Get appropriate tokenizer
-        tokenizer = self._get_tokenizer(supplier_name, model_name, api_key)
 
         # Find the start index of current dialog (last user message)
         current_dialog_start = 0
@@ -238,59 +296,73 @@ class LLMBaseNode(Node):
         # Split messages into history and current dialog
         history_messages = chatroom_messages[:current_dialog_start]
         current_dialog_messages = chatroom_messages[current_dialog_start:]
-        
-        truncated_messages = deque(current_dialog_messages)
-        chatroom_prompt_args['messages'] = list(truncated_messages)
-        current_tokens = self._count_tokens(
-            tokenizer,
-            messages, chatroom_prompt_args, mcp_tool_list, group_messages,
-            model_config, restrict_max_rounds, input_variables.copy()
-        )
-        
-        if current_tokens > token_limit:
-            stop_truncating = False
-            for msg in truncated_messages:
-                if msg['type'] == 'tool_result':
+
+        def count_prompt_tokens(tokenizer: Callable[[str], int], prompt_messages: Iterable[Dict[str, Union[int, str]]]) -> int:
+            chatroom_prompt_args['messages'] = list(prompt_messages)
+            return self._count_tokens(
+                tokenizer,
+                messages, chatroom_prompt_args, mcp_tool_list, group_messages,
+                model_config, restrict_max_rounds, input_variables.copy()
+            )
+
+        def select_messages(limit: int) -> Tuple[deque, int, bool]:
+            # The prompt of the current dialog is counted once; the counts of the other messages are added to it
+            truncated_messages = deque(current_dialog_messages)
+            current_tokens = count_prompt_tokens(self._get_local_tokenizer(supplier_name, model_name), truncated_messages)
+            is_truncated = current_tokens > limit
+            if is_truncated:
+                for i, msg in enumerate(truncated_messages):
+                    if msg['type'] != 'tool_result':
+                        continue
                     # Skip if already truncated
                     if msg['message'] == '...':
                         continue
 
                     original_content = msg['message']
+                    other_tokens = current_tokens - self._count_message_tokens(supplier_name, model_name, msg)
 
                     # Binary search for maximum allowable content length
+                    truncated_msg = None
                     low, high = 0, len(original_content)
                     while low <= high:
                         mid = (low + high) // 2
-                        truncated_content = original_content[:mid] + '...'
-                        msg['message'] = truncated_content
-
-                        # Check if this truncation would bring total under limit
-                        chatroom_prompt_args['messages'] = list(truncated_messages)
-                        current_tokens = self._count_tokens(
-                            tokenizer,
-                            messages, chatroom_prompt_args, mcp_tool_list, group_messages,
-                            model_config, restrict_max_rounds, input_variables.copy()
+                        candidate_msg = {**msg, 'message': original_content[:mid] + '...'}
+                        candidate_tokens = other_tokens + self._count_message_tokens(
+                            supplier_name, model_name, candidate_msg, use_cache=False
                         )
-                        if current_tokens <= token_limit:
-                            stop_truncating = True
+                        if candidate_tokens <= limit:
+                            truncated_msg, current_tokens = candidate_msg, candidate_tokens
                             low = mid + 1
                         else:
-                            stop_truncating = False
                             high = mid - 1
-                    if stop_truncating:
+                    if truncated_msg:
+                        truncated_messages[i] = truncated_msg
                         break
-        else:
-            # Traverse messages from newest to oldest
-            for message in reversed(history_messages):
-                chatroom_prompt_args['messages'] = [message] + list(truncated_messages)
-                current_tokens = self._count_tokens(
-                    tokenizer,
-                    messages, chatroom_prompt_args, mcp_tool_list, group_messages,
-                    model_config, restrict_max_rounds, input_variables.copy()
-                )
-                if current_tokens > token_limit:
-                    break
-                truncated_messages.appendleft(message)
+                    truncated_messages[i] = {**msg, 'message': '...'}
+                    current_tokens = other_tokens + self._count_message_tokens(supplier_name, model_name, truncated_messages[i])
+            else:
+                # Traverse messages from newest to oldest
+                for message in reversed(history_messages):
+                    message_tokens = self._count_message_tokens(supplier_name, model_name, message)
+                    if current_tokens + message_tokens > limit:
+                        is_truncated = True
+                        break
+                    current_tokens += message_tokens
+                    truncated_messages.appendleft(message)
+            return truncated_messages, current_tokens, is_truncated
+
+        truncated_messages, estimated_tokens, is_truncated = select_messages(token_limit)
+        # Calibrate the local estimate with one exact count of the selected messages,
+        # and select again with the limit scaled accordingly if the estimate is off
+        try:
+            exact_tokens = count_prompt_tokens(self._get_tokenizer(supplier_name, model_name, api_key), truncated_messages)
+        except Exception as e:
+            logger.warning('Failed to count tokens of %s %s, using the local estimate: %s', supplier_name, model_name, e)
+            exact_tokens = estimated_tokens
+        if exact_tokens > 0 and estimated_tokens > 0 and (
+            exact_tokens > token_limit or (is_truncated and exact_tokens < estimated_tokens)
+        ):
+            truncated_messages, _, _ = select_messages(int(token_limit * estimated_tokens / exact_tokens))
         if group_messages:
             chatroom_messages = self._group_chatroom_messages(truncated_messages)
         else:
@@ -356,68 +428,33 @@ class LLMBaseNode(Node):
                 replace_prompt_with_context(self.data["prompt"], context, duplicate_braces=True)
             messages = Messages()
             if is_chat:
-                chat_history = AgentChatMessages().get_chat_agent_history(agent_id=agent_id, user_id=user_id)
-                assert chat_history, 'Chat history not found.'
-
-                # Get content of each file in the user message and fill into database
-                last_user_message = chat_history[-1]
-                if last_user_message['agent_run_id'] == 0 and last_user_message['file_list']:
-                    file_content_list = get_file_content_list(last_user_message['file_list'])
-                    last_user_message['file_content_list'] = file_content_list
-                    AgentChatMessages().update_file_content_list_by_id(last_user_message['id'], file_content_list)
-
-                # Add file content to the message content
-                new_user_prompt = input['user_prompt']
-                image_list = []
-                for index, message in enumerate(chat_history):
-                    if message['file_list'] and message['file_content_list']:
-                        for file_var_value in message['file_list']:
-                            if isinstance(file_var_value, int):
-                                attr = 'id'
-                                value = file_var_value
-                            elif isinstance(file_var_value, str):
-                                attr = 'path'
-                                if file_var_value[0] == '/':
-                                    value = file_var_value[1:]
-                                file_path = project_root.joinpath('storage').joinpath(value)
-                                value = str(file_path)
-                            else:
-                                raise Exception('Unsupported value type!')
-                            for file_content in message['file_content_list']:
-                                if file_content[attr] == value:
-                                    if index == len(chat_history) - 1:
-                                        if file_content['type'] == 'image':
-                                            image_list.append(file_var_value)
-                                        else:
-                                            new_user_prompt += (
-                                                '\n\n'
-                                                '---\n\n'
-                                                f'##{file_content["name"]}\n\n'
-                                                f'**{attr}**: `{value}`\n\n'
-                                                '```\n'
-                                                f'{file_content["content"]}\n'
-                                                '```\n\n'
-                                                '---\n\n'
-                                            )
-                                    else:
-                                        message['message'] += (
-                                            '\n\n'
-                                            '---\n\n'
-                                            f'##{file_content["name"]}\n\n'
-                                            f'**{attr}**: `{value}`\n\n'
-                                            '```\n'
-                                            f'{file_content["content"]}\n'
-                                            '```\n\n'
-                                            '---\n\n'
-                                        )
-
-                # Truncate Messages By Token Limit
+                # Load the window of the chat history within the token limit of the model
                 userinfo = users.get_user_by_id(user_id)
                 model_info = models.get_model_by_type(1, userinfo['team_id'], uid=user_id)
-                model_info = models.get_model_by_config_id(model_info['model_config_id'])
-                chat_message_list = truncate_agent_messages_by_token_limit(chat_history, model_info)
-                
-                messages.add_system_message(Variable(name="text", type="string", value=self.data["prompt"].get_system()))
+                model_config_id = model_info['model_config_id']
+                model_info = get_model_info(model_config_id)
+                memory = AgentChatMemory(user_id, agent_id).load(get_history_token_limit(model_info))
+                chat_message_list = memory['messages']
+                assert chat_message_list, 'Chat history not found.'
+                if memory['overflow_message_id'] and settings.MEMORY_SUMMARY_MIN_TOKENS > 0:
+                    from celery_app import summarize_agent_chat_memory
+                    summarize_agent_chat_memory.delay(user_id, agent_id, memory['overflow_message_id'], model_config_id)
+
+                # Add file content to the message content
+                new_user_prompt = input['user_prompt'] + chat_message_list[-1]['file_contents']
+                image_list = chat_message_list[-1]['image_list']
+                for chat in chat_message_list[:-1]:
+                    chat['message'] += chat['file_contents']
+
+                system_prompt = self.data["prompt"].get_system()
+                if memory['summary']:
+                    summary_prompt = get_language_content(
+                        'agent_chat_history_summary',
+                        user_id,
+                        append_ret_lang_prompt=False
+                    ).format(summary=memory['summary'])
+                    system_prompt += self.duplicate_braces(summary_prompt)
+                messages.add_system_message(Variable(name="text", type="string", value=system_prompt))
                 human_message = ArrayVariable(name="human", type="array[any]")
 
                 for index, chat in enumerate(chat_message_list):
@@ -520,7 +557,7 @@ class LLMBaseNode(Node):
         Returns:
             Dict[str, Any]: A dictionary containing the model data, content, prompt tokens, completion tokens, and total tokens.
         """
-        model_info = Models().get_model_by_config_id(self.data["model_config_id"])
+        model_info = get_model_info(self.data["model_config_id"])
         if not model_info:
             raise Exception("Model configuration not found.")
         
@@ -534,7 +571,16 @@ class LLMBaseNode(Node):
                         "type": "enabled",
                         "budget_tokens": 10_000
                     }
-        llm_pipeline = LLMPipeline(supplier=model_info["supplier_name"], config=llm_config, schema_key=self.schema_key)
+        llm_pipeline = get_llm_pipeline(
+            model_info["supplier_name"],
+            llm_config,
+            schema_key=self.schema_key,
+            tools=[{
+                'name': tool['name'],
+                'description': tool['description'],
+                'input_schema': tool['inputSchema']
+            } for tool in mcp_tool_list] if mcp_tool_list else None
+        )
 
         messages, input = self._prepare_messages_and_input(
             app_run_id=app_run_id,
@@ -564,12 +610,6 @@ class LLMBaseNode(Node):
             not is_chat,
             input_variables=input
         )
-        if mcp_tool_list:
-            llm_pipeline.llm = llm_pipeline.llm.bind_tools([{
-                'name': tool['name'],
-                'description': tool['description'],
-                'input_schema': tool['inputSchema']
-            } for tool in mcp_tool_list])
         ai_message = llm_pipeline.invoke_llm(messages_as_langchain_format)
         content = ai_message.content
         if return_json:
@@ -625,7 +665,7 @@ class LLMBaseNode(Node):
         Returns:
             Dict[str, Any]: A dictionary containing the model data, content, prompt tokens, completion tokens, and total tokens.
         """
-        model_info = Models().get_model_by_config_id(self.data["model_config_id"])
+        model_info = get_model_info(self.data["model_config_id"])
         if not model_info:
             raise Exception("Model configuration not found.")
         
@@ -639,7 +679,16 @@ class LLMBaseNode(Node):
                         "type": "enabled",
                         "budget_tokens": 10_000
                     }
-        llm_pipeline = LLMPipeline(supplier=model_info["supplier_name"], config=llm_config, schema_key=self.schema_key)
+        llm_pipeline = get_llm_pipeline(
+            model_info["supplier_name"],
+            llm_config,
+            schema_key=self.schema_key,
+            tools=[{
+                'name': tool['name'],
+                'description': tool['description'],
+                'input_schema': tool['inputSchema']
+            } for tool in mcp_tool_list] if mcp_tool_list else None
+        )
         messages, input = self._prepare_messages_and_input(
             app_run_id=app_run_id,
             edge_id=edge_id,
@@ -667,12 +716,6 @@ class LLMBaseNode(Node):
                 model_info["supplier_name"],
                 False, input
             )
-            if mcp_tool_list:
-                llm_pipeline.llm = llm_pipeline.llm.bind_tools([{
-                    'name': tool['name'],
-                    'description': tool['description'],
-                    'input_schema': tool['inputSchema']
-                } for tool in mcp_tool_list])
             for _ in range(5):
                 try:
                     if model_info["supplier_name"] in ["Anthropic", "Google"]:
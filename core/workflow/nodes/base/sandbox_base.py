@@ -4,7 +4,8 @@ import json
 import os
 import uuid
 import shutil
-from typing import Optional, List
+from functools import lru_cache
+from typing import Optional, List, Tuple
 
 sys.path.append(str(Path(__file__).absolute().parent.parent.parent.parent.parent))
 import traceback
@@ -105,7 +106,7 @@ class SandboxBaseNode(Node):
                         f"Parameter '{param_name}' is expected to be of type '{expected_type_name}' "
                         f"but got '{type(params_value).__name__}'.")
 
-                print(f"Parameter '{param_name}' is of the correct type '{expected_type_name}' ({expected_type}).")
+                logger.debug("Parameter '%s' is of the correct type '%s' (%s).", param_name, expected_type_name, expected_type)
 
         # Helper function to generate code for assigning input parameters
         def generate_input_assignments(input_params):
@@ -261,12 +262,11 @@ class SandboxBaseNode(Node):
         # Convert source and target paths to absolute paths
         source_path = os.path.abspath(source_path)
         target_path = os.path.abspath(target_path)
-        print(f'[[[[[[[[[[[[[[{target_path}]]]]]]]]]]]]]]')
+        logger.debug('Copying %s to %s', source_path, target_path)
         # Check if the source file exists
         if not os.path.exists(source_path):
             return False, f"Source file does not exist: {source_path}"
         try:
-            print(os.path.dirname(target_path))
             # Ensure the target directory exists
             os.makedirs(os.path.dirname(target_path), exist_ok=True)
 
@@ -309,7 +309,7 @@ class SandboxBaseNode(Node):
                     fixed_directory = 'storage'
                     original_path = value.split('file:///')[-1]
                     file_suffix = original_path.split('.')[-1]
-                    print(f"Found skill file path - Key: {key}, Original path: {original_path}")
+                    logger.debug('Found skill file path - Key: %s, Original path: %s', key, original_path)
                     unique_id = str(uuid.uuid4())
                     if workflow_id > 0:
                         relative_path = f"/workflow/wf{workflow_id}/run{app_run_id}/{self.id}/{unique_id}.{file_suffix}"
@@ -332,6 +332,14 @@ class SandboxBaseNode(Node):
             logger.exception('ERROR!!')
             raise ValueError(str(e))
     
+    # Calculate the cache key of the virtual environment of the sorted pip packages, like the sandbox
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _get_requirements_hash(sorted_packages: Tuple[str, ...]) -> str:
+        # Join the sorted package names into a single string separated by newlines
+        requirements_content = '\n'.join(sorted_packages)
+        return hashlib.sha256(requirements_content.encode('utf-8')).hexdigest()
+
     # Check if the virtual environment exists in the cache for the given pip packages
     @staticmethod
     def check_venv_exists(pip_packages: Optional[List[str]]) -> bool:
@@ -352,18 +360,11 @@ class SandboxBaseNode(Node):
             # Check if the base venv directory and its python binary exist
             return (os.path.exists(base_venv_path))
 
-        # Sort the package list to ensure consistent hash regardless of order
-        sorted_packages = sorted(pip_packages)
-        # Join the sorted package names into a single string separated by newlines
-        requirements_content = '\n'.join(sorted_packages)
-
-        # Calculate the SHA-256 hash of the requirements content
-        hasher = hashlib.sha256()
-        hasher.update(requirements_content.encode('utf-8'))
-        pip_packages_hash = hasher.hexdigest()
+        # Sort the package list to ensure consistent hash regardless of order, the hash is memoized per package set
+        pip_packages_hash = SandboxBaseNode._get_requirements_hash(tuple(sorted(pip_packages)))
         # Construct the path to the cached virtual environment
+        # The sandbox renames an environment into the cache only when its build is complete
         venv_path = os.path.join(VENV_CACHE_DIR, pip_packages_hash)
-        # Check if the venv directory and its python binary exist
         return (os.path.exists(venv_path))
         
     def run_custom_code(self, is_tool=False):
@@ -398,7 +399,7 @@ class SandboxBaseNode(Node):
                     verify_code = code
                 else:
                     verify_code = self.check_code(input, output, code)
-                    print(verify_code)
+                    logger.debug('Sandbox code: %s', verify_code)
                 # Create the data payload with custom_unique_id instead of flow_id
                 data = {
                     "custom_unique_id": str(uuid.uuid4()),
@@ -429,7 +430,7 @@ class SandboxBaseNode(Node):
                 raise NotImplementedError('Other languages are not supported at this time')
 
             # Send the POST request to the API endpoint
-            print(data)
+            logger.debug('Sandbox request: %s', data)
             response = httpx.post(
                 url=f"http://{settings.SANDBOX_HOST}:{settings.SANDBOX_PORT}/run_code",
                 headers=headers,
@@ -441,8 +442,9 @@ class SandboxBaseNode(Node):
             if not response.content:
                 raise ValueError("Empty response from the server")
 
-            print(response.json())
-            return response.json()
+            result = response.json()
+            logger.debug('Sandbox response: %s', result)
+            return result
 
         except Exception as e:
             logger.exception('ERROR!!')
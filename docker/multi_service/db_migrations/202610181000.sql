@@ -0,0 +1,19 @@
+CREATE TABLE `app_run_context_records` (
+	`id` INT(11) NOT NULL AUTO_INCREMENT COMMENT 'Context record ID',
+	`app_run_id` INT(11) NOT NULL COMMENT 'App run ID',
+	`level` INT(11) NOT NULL DEFAULT '0' COMMENT 'The level of the node',
+	`node_id` VARCHAR(100) NOT NULL COMMENT 'Node ID' COLLATE 'utf8mb4_general_ci',
+	`node_title` VARCHAR(255) NULL DEFAULT NULL COMMENT 'Node title' COLLATE 'utf8mb4_general_ci',
+	`node_type` VARCHAR(50) NOT NULL COMMENT 'Node type' COLLATE 'utf8mb4_general_ci',
+	`inputs` LONGTEXT NULL DEFAULT NULL COMMENT 'Node inputs' COLLATE 'utf8mb4_bin',
+	`outputs` LONGTEXT NULL DEFAULT NULL COMMENT 'Node outputs' COLLATE 'utf8mb4_bin',
+	`created_time` DATETIME NOT NULL DEFAULT current_timestamp() COMMENT 'Record created time',
+	`updated_time` DATETIME NULL DEFAULT NULL COMMENT 'Record updated time',
+	PRIMARY KEY (`id`),
+	UNIQUE INDEX `app_run_level_node` (`app_run_id`, `level`, `node_id`),
+	CONSTRAINT `app_run_context_records_chk_1` CHECK (json_valid(`inputs`)),
+	CONSTRAINT `app_run_context_records_chk_2` CHECK (json_valid(`outputs`))
+)
+COMMENT='App Run Context Record Data Table'
+COLLATE='utf8mb4_general_ci'
+;
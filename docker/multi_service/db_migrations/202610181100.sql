@@ -0,0 +1,7 @@
+ALTER TABLE `datasets`
+	ADD COLUMN `reindexing_collection_name` VARCHAR(50) NOT NULL DEFAULT '' COMMENT 'Vector storage collection being built by an unfinished reindexing' COLLATE 'utf8mb4_general_ci' AFTER `embedding_model_config_id`,
+	ADD COLUMN `reindexing_embedding_model_config_id` INT(11) NOT NULL DEFAULT '0' COMMENT 'Embedding model configuration ID of the reindexing' AFTER `reindexing_collection_name`;
+
+ALTER TABLE `document_segments`
+	ADD COLUMN `reindex_index_id` VARCHAR(100) NULL DEFAULT NULL COMMENT 'Corresponding to the id in the vector library being built by the reindexing of the dataset' COLLATE 'utf8mb4_general_ci' AFTER `index_id`,
+	ADD COLUMN `reindex_tokens` INT(11) NOT NULL DEFAULT '0' COMMENT 'Segment tokens of the reindexing' AFTER `tokens`;
@@ -0,0 +1,20 @@
+ALTER TABLE `agent_chat_messages`
+	ADD COLUMN `tokens` INT(11) NOT NULL DEFAULT '0' COMMENT 'Estimated tokens of the message and its file contents in the chat history (0 when not counted yet)' AFTER `total_tokens`,
+	ADD INDEX `user_agent_id` (`user_id`, `agent_id`, `id`),
+	ADD INDEX `user_agent_history_cleared` (`user_id`, `agent_id`, `history_cleared`, `id`);
+
+CREATE TABLE `agent_chat_memories` (
+	`id` INT(11) NOT NULL AUTO_INCREMENT COMMENT 'Agent chat memory ID',
+	`user_id` INT(11) NOT NULL COMMENT 'User ID',
+	`agent_id` INT(11) NOT NULL COMMENT 'Agent ID',
+	`summary` MEDIUMTEXT NOT NULL COMMENT 'Rolling summary of the chat history up to the last summarized message' COLLATE 'utf8mb4_general_ci',
+	`summary_tokens` INT(11) NOT NULL DEFAULT '0' COMMENT 'Estimated tokens of the summary',
+	`last_message_id` INT(11) NOT NULL DEFAULT '0' COMMENT 'Agent chat message ID of the last summarized message',
+	`created_time` DATETIME NOT NULL DEFAULT current_timestamp() COMMENT 'Memory created time',
+	`updated_time` DATETIME NULL DEFAULT NULL COMMENT 'Memory updated time',
+	PRIMARY KEY (`id`),
+	UNIQUE INDEX `user_agent` (`user_id`, `agent_id`)
+)
+COMMENT='Agent Chat Memory Data Table'
+COLLATE='utf8mb4_general_ci'
+;
@@ -0,0 +1,18 @@
+ALTER TABLE `upload_files`
+	ADD COLUMN `content_hash` CHAR(64) NOT NULL DEFAULT '' COMMENT 'SHA-256 of the file content (empty for files stored before content addressing)' COLLATE 'utf8mb4_general_ci' AFTER `mime_type`;
+
+CREATE TABLE `upload_file_objects` (
+	`id` INT(11) NOT NULL AUTO_INCREMENT COMMENT 'Upload file object ID',
+	`content_hash` CHAR(64) NOT NULL COMMENT 'SHA-256 of the file content' COLLATE 'utf8mb4_general_ci',
+	`extension` VARCHAR(10) NOT NULL COMMENT 'File extension' COLLATE 'utf8mb4_general_ci',
+	`path` VARCHAR(255) NOT NULL COMMENT 'Local path relative to project root path' COLLATE 'utf8mb4_general_ci',
+	`size` INT(11) NOT NULL COMMENT 'File size',
+	`ref_count` INT(11) NOT NULL DEFAULT '0' COMMENT 'Number of upload files stored in this object',
+	`created_time` DATETIME NOT NULL DEFAULT current_timestamp() COMMENT 'Object created time',
+	`updated_time` DATETIME NULL DEFAULT NULL COMMENT 'Object updated time',
+	PRIMARY KEY (`id`),
+	UNIQUE INDEX `content_hash_extension` (`content_hash`, `extension`)
+)
+COMMENT='Content-Addressed Upload File Object Data Table'
+COLLATE='utf8mb4_general_ci'
+;
@@ -1,6 +1,7 @@
 import os
 import time
 import pymysql
+from redis import Redis
 
 MYSQL_HOST = os.getenv('MYSQL_HOST')
 MYSQL_PORT = int(os.getenv('MYSQL_PORT', 3306))
@@ -8,6 +9,9 @@ MYSQL_USER = os.getenv('MYSQL_USER')
 MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD')
 MYSQL_DB = os.getenv('MYSQL_DB')
 
+# Must match core.database.orm.TABLE_SCHEMA_VERSION_KEY
+TABLE_SCHEMA_VERSION_KEY = 'orm:table_schema_version'
+
 def wait_for_mysql():
     while True:
         try:
@@ -24,6 +28,21 @@ def wait_for_mysql():
             print("Waiting for MySQL to be ready...")
             time.sleep(2)
 
+def bump_table_schema_version():
+    """
+    Bumps the table schema version in Redis so that running processes invalidate their reflected table registry.
+    """
+    try:
+        redis = Redis(
+            host=os.getenv('REDIS_HOST'),
+            port=int(os.getenv('REDIS_PORT', 6379)),
+            db=int(os.getenv('REDIS_DB', 0)),
+            password=os.getenv('REDIS_PASSWORD')
+        )
+        redis.incr(TABLE_SCHEMA_VERSION_KEY)
+    except Exception as e:
+        print(f"Failed to bump table schema version: {e}")
+
 def run_migrations():
     migrated_dir = "/NexusAI/logs/migrations"
     if not os.path.exists(migrated_dir):
@@ -38,6 +57,7 @@ def run_migrations():
             password=MYSQL_PASSWORD,
             db=MYSQL_DB
         )
+        migrated = False
         try:
             migrations = sorted(os.listdir(migrations_dir))
             for migration in migrations:
@@ -54,8 +74,11 @@ def run_migrations():
                                 cursor.execute(statement)
                     connection.commit()
                     open(migrated_file, 'a').close()
+                    migrated = True
         finally:
             connection.close()
+        if migrated:
+            bump_table_schema_version()
 
 if __name__ == "__main__":
     wait_for_mysql()
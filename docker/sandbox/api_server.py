@@ -1,17 +1,25 @@
 from fastapi import FastAPI, HTTPException, Header, Depends
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from uuid import uuid4
 import subprocess
 import tempfile
 import os
 import json
 import hashlib
+import fcntl
+import threading
+import time
 import logging
 from logging.handlers import TimedRotatingFileHandler
 from jinja2 import Template
 import uvicorn
 import shutil
 
+from worker_pool import WorkerError, WorkerPools
+
 # Configure logging with console and file output
 def setup_logging():
     """
@@ -77,9 +85,45 @@ API_KEY = "Kp7wRJ9LzF3qX2hN"
 
 # Virtual environment cache directory
 VENV_CACHE_DIR = '/app/venv_cache'
+# Lock files of virtual environment builds, shared by all server processes
+VENV_LOCK_DIR = os.path.join(VENV_CACHE_DIR, '.locks')
+# File in each virtual environment recording its size in bytes
+VENV_SIZE_FILE = '.venv_size'
+# Directory of the built-in tools, each with an optional requirements.txt
+TOOLS_DIR = '/app/tools'
+
+# Maximum total size of the cached virtual environments in MB, least recently used environments are removed first (0: no limit)
+SANDBOX_VENV_CACHE_MAX_MB = int(os.environ.get("SANDBOX_VENV_CACHE_MAX_MB", 20480))
+# Number of virtual environments built concurrently in the background
+SANDBOX_PREWARM_WORKERS = int(os.environ.get("SANDBOX_PREWARM_WORKERS", 2))
+# Build the virtual environments of the built-in tools at startup (1: enabled, 0: disabled)
+SANDBOX_PREWARM_TOOLS = int(os.environ.get("SANDBOX_PREWARM_TOOLS", 1))
 
 SANDBOX_MAX_ALIVE_SECONDS = int(os.environ.get("SANDBOX_MAX_ALIVE_SECONDS", 300))
 
+# Warm interpreter workers (1: run code in pooled workers of each virtual environment, 0: start a new process per run)
+SANDBOX_WORKER_POOL = int(os.environ.get("SANDBOX_WORKER_POOL", 1))
+# Maximum number of workers per virtual environment and server process
+SANDBOX_POOL_MAX_WORKERS = int(os.environ.get("SANDBOX_POOL_MAX_WORKERS", 4))
+# Number of runs after which a worker is replaced
+SANDBOX_POOL_MAX_JOBS = int(os.environ.get("SANDBOX_POOL_MAX_JOBS", 100))
+# Seconds after which an idle worker is shut down
+SANDBOX_POOL_IDLE_SECONDS = int(os.environ.get("SANDBOX_POOL_IDLE_SECONDS", 300))
+# Modules imported by every worker, in addition to the modules named like the packages of its environment
+SANDBOX_PRELOAD_MODULES = os.environ.get("SANDBOX_PRELOAD_MODULES", "json,re,math,datetime,collections,requests,numpy,pandas")
+
+worker_pools = WorkerPools(
+    ['firejail', '--quiet', '--private-tmp'],
+    [module for module in SANDBOX_PRELOAD_MODULES.split(',') if module],
+    SANDBOX_POOL_MAX_WORKERS,
+    SANDBOX_POOL_MAX_JOBS,
+    SANDBOX_POOL_IDLE_SECONDS,
+    wipe_tmp=True
+) if SANDBOX_WORKER_POOL else None
+
+# Background builder of prewarmed virtual environments
+venv_builder = ThreadPoolExecutor(max_workers=max(1, SANDBOX_PREWARM_WORKERS))
+
 # Request model for running code
 class CodeRequest(BaseModel):
     custom_unique_id: str
@@ -90,6 +134,10 @@ class CodeRequest(BaseModel):
     tool_type: Optional[str] = None  # Tool type (t1, t2, etc.)
     tool_name: Optional[str] = None  # Tool name (specific tool in tool_type)
 
+# Request model for prewarming a virtual environment
+class PrewarmRequest(BaseModel):
+    pip_packages: Optional[List[str]] = []
+
 # Dependency to verify API Key from request header
 def verify_api_key(authorization: str = Header(...)) -> str:
     if not authorization.startswith("Bearer "):
@@ -132,10 +180,12 @@ def create_venv_with_uv(venv_path: str, pip_packages: List[str]) -> bool:
         os.makedirs(os.path.dirname(venv_path), exist_ok=True)
         
         # Create virtual environment with uv
+        # Relocatable, since the environment is built in a temporary directory and renamed when complete
         logger.info(f"Creating virtual environment at: {venv_path}")
         create_cmd = [
             'uv', 'venv', venv_path,
             '--python', '3.12.10',
+            '--relocatable',
             # '--seed'  # Include pip, setuptools, wheel
         ]
         
@@ -178,44 +228,183 @@ def create_venv_with_uv(venv_path: str, pip_packages: List[str]) -> bool:
         logger.error(f"Error creating virtual environment: {str(e)}")
         return False
 
+# Get the cache name of the virtual environment of pip packages
+def get_venv_name(pip_packages: List[str]) -> str:
+    """
+    Environments without dependencies share the fixed base environment.
+    """
+    return get_requirements_hash(pip_packages) if pip_packages else 'base'
+
+# Exclusive lock of a cached virtual environment across threads and server processes
+@contextmanager
+def venv_lock(venv_name: str, blocking: bool = True):
+    """
+    Hold the file lock of a virtual environment, yielding whether the lock was acquired.
+    """
+    os.makedirs(VENV_LOCK_DIR, exist_ok=True)
+    with open(os.path.join(VENV_LOCK_DIR, f'{venv_name}.lock'), 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Function to get the size of a cached virtual environment
+def get_venv_size(venv_path: str) -> int:
+    """
+    Get the size of a virtual environment in bytes, recorded in the environment after it is measured once.
+    """
+    size_path = os.path.join(venv_path, VENV_SIZE_FILE)
+    try:
+        with open(size_path) as size_file:
+            return int(size_file.read())
+    except (OSError, ValueError):
+        pass
+    size = 0
+    for dirpath, _, filenames in os.walk(venv_path):
+        for filename in filenames:
+            try:
+                size += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    try:
+        with open(size_path, 'w') as size_file:
+            size_file.write(str(size))
+    except OSError:
+        pass
+    return size
+
+# Function to remove the least recently used virtual environments beyond the cache size limit
+def trim_venv_cache() -> None:
+    """
+    Remove the least recently used virtual environments until the cache fits in SANDBOX_VENV_CACHE_MAX_MB.
+    The last use of an environment is the modification time of its directory. Environments used within
+    the maximum run time and worker idle time may still be running code and are kept, as is the base environment.
+    """
+    if SANDBOX_VENV_CACHE_MAX_MB <= 0:
+        return
+    # Only one process trims the cache at a time
+    with venv_lock('.trim', blocking=False) as locked:
+        if not locked:
+            return
+        venvs = []
+        for venv_name in os.listdir(VENV_CACHE_DIR):
+            venv_path = os.path.join(VENV_CACHE_DIR, venv_name)
+            if venv_name == 'base' or venv_name.startswith('.') or '.building-' in venv_name or not os.path.isdir(venv_path):
+                continue
+            try:
+                venvs.append((os.stat(venv_path).st_mtime, venv_name, get_venv_size(venv_path)))
+            except OSError:
+                pass
+        total_size = sum(size for _, _, size in venvs)
+        max_size = SANDBOX_VENV_CACHE_MAX_MB * 1024 * 1024
+        if total_size <= max_size:
+            return
+        min_idle_seconds = SANDBOX_MAX_ALIVE_SECONDS + (SANDBOX_POOL_IDLE_SECONDS if worker_pools else 0)
+        for _, venv_name, size in sorted(venvs):
+            if total_size <= max_size:
+                break
+            venv_path = os.path.join(VENV_CACHE_DIR, venv_name)
+            trash_path = os.path.join(VENV_CACHE_DIR, f'.trash-{uuid4().hex}')
+            with venv_lock(venv_name):
+                try:
+                    if time.time() - os.stat(venv_path).st_mtime < min_idle_seconds:
+                        continue
+                    # Renamed first, so that no request sees a partly removed environment
+                    os.rename(venv_path, trash_path)
+                except OSError:
+                    continue
+            shutil.rmtree(trash_path, ignore_errors=True)
+            total_size -= size
+            logger.info(f"Removed least recently used virtual environment {venv_name} ({size / 1024 / 1024:.1f} MB)")
+
+# Function to remove incomplete builds and removals left by a previous server
+def clean_venv_cache() -> None:
+    if not os.path.isdir(VENV_CACHE_DIR):
+        return
+    for venv_name in os.listdir(VENV_CACHE_DIR):
+        if '.building-' in venv_name or venv_name.startswith('.trash-'):
+            shutil.rmtree(os.path.join(VENV_CACHE_DIR, venv_name), ignore_errors=True)
+
 # Function to get or create cached virtual environment
 def get_or_create_venv(pip_packages: List[str]) -> str:
     """
     Get existing virtual environment or create new one based on requirements hash.
-    Returns path to the virtual environment.
+    Concurrent requests for the same packages wait for a single build, which is renamed into the cache
+    only when complete. Returns path to the virtual environment.
     """
-    # Handle empty pip_packages - use fixed base environment
-    if not pip_packages:
-        base_venv_path = os.path.join(VENV_CACHE_DIR, 'base')
-        
-        # Check if base environment already exists
-        if os.path.exists(base_venv_path) and os.path.exists(os.path.join(base_venv_path, 'bin', 'python')):
-            logger.info("Using existing base virtual environment (no dependencies)")
-            return base_venv_path
-        
-        # Create base environment
-        logger.info("Creating base virtual environment (no dependencies)")
-        if create_venv_with_uv(base_venv_path, []):
-            return base_venv_path
+    venv_name = get_venv_name(pip_packages)
+    venv_path = os.path.join(VENV_CACHE_DIR, venv_name)
+    python_path = os.path.join(venv_path, 'bin', 'python')
+    created = False
+
+    with venv_lock(venv_name):
+        if os.path.exists(python_path):
+            logger.info(f"Cache hit: Using existing virtual environment {venv_name}")
         else:
-            raise RuntimeError("Failed to create base virtual environment")
-    
-    # Calculate requirements hash for non-empty packages
-    req_hash = get_requirements_hash(pip_packages)
-    venv_path = os.path.join(VENV_CACHE_DIR, req_hash)
-    
-    # Check if virtual environment already exists
-    if os.path.exists(venv_path) and os.path.exists(os.path.join(venv_path, 'bin', 'python')):
-        logger.info(f"Cache hit: Using existing virtual environment {req_hash}")
-        return venv_path
-    
-    # Cache miss: create new virtual environment
-    logger.info(f"Cache miss: Creating new virtual environment {req_hash}")
-    
-    if create_venv_with_uv(venv_path, pip_packages):
-        return venv_path
-    else:
-        raise RuntimeError(f"Failed to create virtual environment for hash: {req_hash}")
+            # Cache miss: create new virtual environment
+            logger.info(f"Cache miss: Creating new virtual environment {venv_name}")
+            build_path = os.path.join(VENV_CACHE_DIR, f'{venv_name}.building-{uuid4().hex}')
+            try:
+                if not create_venv_with_uv(build_path, pip_packages):
+                    raise RuntimeError(f"Failed to create virtual environment for hash: {venv_name}")
+                get_venv_size(build_path)
+                # Remove an incomplete environment left by an older server before replacing it
+                if os.path.exists(venv_path):
+                    shutil.rmtree(venv_path)
+                os.rename(build_path, venv_path)
+                created = True
+            finally:
+                shutil.rmtree(build_path, ignore_errors=True)
+        # Record the use for the least recently used removal
+        os.utime(venv_path)
+
+    if created:
+        venv_builder.submit(trim_venv_cache)
+    return venv_path
+
+# Function to build a virtual environment in the background
+def prewarm_venv(pip_packages: List[str]) -> None:
+    try:
+        get_or_create_venv(pip_packages)
+    except Exception as e:
+        logger.error(f"Error prewarming virtual environment for {pip_packages}: {str(e)}")
+
+# Function to load the pip packages of a built-in tool
+def load_tool_requirements(tool_path: str) -> List[str]:
+    """
+    Load pip packages from the requirements.txt of a tool, like the tool runner of the backend.
+    """
+    requirements_path = os.path.join(tool_path, 'requirements.txt')
+    if not os.path.exists(requirements_path):
+        return []
+    with open(requirements_path, 'r', encoding='utf-8') as requirements_file:
+        return [line.strip() for line in requirements_file if line.strip() and not line.strip().startswith('#')]
+
+# Function to build the virtual environments of all built-in tools in the background
+def prewarm_tool_venvs() -> None:
+    """
+    Queue a background build of the virtual environment of each distinct requirements.txt of the t1 tools.
+    """
+    tools_path = os.path.join(TOOLS_DIR, 't1')
+    if not os.path.isdir(tools_path):
+        return
+    venv_names = set()
+    for tool_name in sorted(os.listdir(tools_path)):
+        try:
+            pip_packages = load_tool_requirements(os.path.join(tools_path, tool_name))
+        except Exception as e:
+            logger.error(f"Error reading requirements of tool {tool_name}: {str(e)}")
+            continue
+        venv_name = get_venv_name(pip_packages)
+        if venv_name not in venv_names:
+            venv_names.add(venv_name)
+            venv_builder.submit(prewarm_venv, pip_packages)
+    logger.info(f"Prewarming {len(venv_names)} tool virtual environments")
 
 # Function to execute user code with Firejail and cached environment
 def execute_user_code_with_cache(custom_unique_id: str, user_code: str, pip_packages: List[str], tool_type: Optional[str] = None, tool_name: Optional[str] = None) -> Tuple[str, str]:
@@ -227,71 +416,99 @@ def execute_user_code_with_cache(custom_unique_id: str, user_code: str, pip_pack
         venv_path = get_or_create_venv(pip_packages)
         python_path = os.path.join(venv_path, 'bin', 'python')
         
-        # Create temporary directory for user code
-        with tempfile.TemporaryDirectory() as tempdir:
-            user_code_filename = f"user_code_{custom_unique_id}.py"
-            user_code_path = os.path.join(tempdir, user_code_filename)
+        user_code_filename = f"user_code_{custom_unique_id}.py"
+        
+        # Prepare final code with tool support if needed
+        final_code = user_code
+        tool_directories = {}
+        if tool_type == 't1' and tool_name:
+            tool_path = f'/app/tools/{tool_type}/{tool_name}'
             
-            # Prepare final code with tool support if needed
-            final_code = user_code
-            if tool_type == 't1' and tool_name:
-                tool_path = f'/app/tools/{tool_type}/{tool_name}'
+            if os.path.exists(tool_path):
+                # Tool files are copied next to the user code
+                tool_directories[tool_name] = tool_path
                 
-                if os.path.exists(tool_path):
-                    # Copy tool files to temp directory
-                    tool_temp_dir = os.path.join(tempdir, tool_name)
-                    shutil.copytree(tool_path, tool_temp_dir)
-                    
-                    # Add Python path setup for copied tools
-                    path_setup = f"""
+                # Add Python path setup for copied tools
+                path_setup = f"""
 import sys
 import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '{tool_name}'))
 """
-                    final_code = path_setup + "\n" + user_code
-                else:
-                    logger.error(f"Tool source path does not exist: {tool_path}")
-                    return "", f"Tool directory not found: {tool_path}"
-            
-            # Write final code to file
-            with open(user_code_path, 'w') as code_file:
-                code_file.write(final_code)
-            
-            # Build Firejail command with cached environment
-            firejail_cmd = [
-                'firejail',
-                '--quiet',
-                '--private-tmp',                    # Keep /tmp ephemeral
-                python_path,                        # Python interpreter from cached venv
-                user_code_path                      # User code to execute
-            ]
-            logger.info(f"Executing code with Firejail: {' '.join(firejail_cmd)}")
-            
-            # Execute user code
-            result = subprocess.run(
-                firejail_cmd,
-                capture_output=True,
-                text=True,
-                timeout=SANDBOX_MAX_ALIVE_SECONDS
+                final_code = path_setup + "\n" + user_code
+            else:
+                logger.error(f"Tool source path does not exist: {tool_path}")
+                return "", f"Tool directory not found: {tool_path}"
+        
+        if worker_pools:
+            # Execute user code in a warm worker of the cached environment, in a private directory of the worker's sandbox
+            logger.info(f"Executing code in worker pool of {venv_path}: {user_code_filename}")
+            result = worker_pools.run(
+                venv_path,
+                pip_packages,
+                final_code,
+                user_code_filename,
+                SANDBOX_MAX_ALIVE_SECONDS,
+                tool_directories
             )
-            stdout, stderr = result.stdout.strip(), result.stderr.strip()
-            
-            # Try to parse stdout as JSON if it looks like a dictionary
-            try:
-                stdout_dict = eval(stdout)
-                if isinstance(stdout_dict, dict):
-                    stdout = json.dumps(stdout_dict)
-            except (SyntaxError, NameError, TypeError, ValueError):
-                pass  # Keep original stdout if not a valid dictionary
-            
-            return stdout, stderr
+            if result['timed_out']:
+                return "", f"Execution timed out after {SANDBOX_MAX_ALIVE_SECONDS} seconds"
+            stdout, stderr = result['stdout'].strip(), result['stderr'].strip()
+        else:
+            # Create temporary directory for user code
+            with tempfile.TemporaryDirectory() as tempdir:
+                user_code_path = os.path.join(tempdir, user_code_filename)
+                for name, source_path in tool_directories.items():
+                    # Copy tool files to temp directory
+                    shutil.copytree(source_path, os.path.join(tempdir, name))
+                
+                # Write final code to file
+                with open(user_code_path, 'w') as code_file:
+                    code_file.write(final_code)
+                
+                # Build Firejail command with cached environment
+                firejail_cmd = [
+                    'firejail',
+                    '--quiet',
+                    '--private-tmp',                    # Keep /tmp ephemeral
+                    python_path,                        # Python interpreter from cached venv
+                    user_code_path                      # User code to execute
+                ]
+                logger.info(f"Executing code with Firejail: {' '.join(firejail_cmd)}")
+                
+                # Execute user code
+                result = subprocess.run(
+                    firejail_cmd,
+                    capture_output=True,
+                    text=True,
+                    timeout=SANDBOX_MAX_ALIVE_SECONDS
+                )
+                stdout, stderr = result.stdout.strip(), result.stderr.strip()
+        
+        # Try to parse stdout as JSON if it looks like a dictionary
+        try:
+            stdout_dict = eval(stdout)
+            if isinstance(stdout_dict, dict):
+                stdout = json.dumps(stdout_dict)
+        except (SyntaxError, NameError, TypeError, ValueError):
+            pass  # Keep original stdout if not a valid dictionary
+        
+        return stdout, stderr
             
     except subprocess.TimeoutExpired:
         return "", f"Execution timed out after {SANDBOX_MAX_ALIVE_SECONDS} seconds"
+    except WorkerError as e:
+        logger.error(f"Worker error: {str(e)}")
+        return "", f"Execution failed: {str(e)}"
     except Exception as e:
         logger.error(f"Error executing user code: {str(e)}")
         return "", f"Execution failed: {str(e)}"
 
+# Endpoint to build a virtual environment in the background before it is used
+@app.post("/prewarm")
+def prewarm(request: PrewarmRequest, api_key: str = Depends(verify_api_key)) -> Dict[str, Any]:
+    venv_builder.submit(prewarm_venv, request.pip_packages)
+    return response_success(data={"venv": get_venv_name(request.pip_packages)})
+
 # Function to render Jinja2 template
 def render_jinja2_template(template_code: str, template_params: Dict[str, Any]) -> Tuple[str, str]:
     """
@@ -360,6 +577,11 @@ def run_code(request: CodeRequest, api_key: str = Depends(verify_api_key)) -> Di
 if __name__ == "__main__":
     # Ensure cache directory exists
     os.makedirs(VENV_CACHE_DIR, exist_ok=True)
+    clean_venv_cache()
+
+    # Build the virtual environments of the built-in tools while the server starts
+    if SANDBOX_PREWARM_TOOLS:
+        threading.Thread(target=prewarm_tool_venvs, daemon=True).start()
     
     # Start the FastAPI server
     uvicorn.run(
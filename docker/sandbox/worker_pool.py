@@ -0,0 +1,553 @@
+"""
+Warm interpreter workers for the sandbox code runner.
+
+A worker is a long-lived Python process of a virtual environment, started in Firejail, which imports common
+modules once and then runs jobs read from its stdin. Each job runs in a child forked from the worker, so that
+jobs start with the modules already imported but do not share any state; the child is killed with its process
+group when the job times out. The code and output files of a job live in a private directory in the /tmp of the
+worker, which no other worker can see and which is removed after the job. The worker is the child subreaper of
+its jobs, so every process left by a job, even one that started a new session or double-forked, is reparented to
+the worker and killed after the job; a worker that had to kill such processes is replaced. Workers are also
+recycled after a bounded number of jobs.
+
+The server side keeps one pool of workers per virtual environment. A pool grows with the number of concurrent
+jobs up to a maximum, keeps a spare worker warm while it is in demand, and shuts down workers that have been
+idle for a while.
+
+This module is also the worker program: `python worker_pool.py --preload json,requests`.
+"""
+import argparse
+import ctypes
+import gc
+import importlib
+import json
+import logging
+import os
+import re
+import runpy
+import select
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds a new worker may take to import the preloaded modules
+WORKER_START_TIMEOUT = 120
+# Seconds a worker may take to report a job in addition to the job timeout
+WORKER_RESPONSE_GRACE = 5
+# prctl option making a process the reaper of its orphaned descendants
+PR_SET_CHILD_SUBREAPER = 36
+# Maximum rounds of killing the processes left by a job before the worker gives up and exits
+MAX_KILL_ROUNDS = 100
+
+
+def _set_child_subreaper() -> None:
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.prctl(PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0) != 0:
+        raise OSError(ctypes.get_errno(), 'Cannot become the child subreaper of the jobs')
+
+def _get_children() -> List[int]:
+    """
+    Gets the child processes of the worker, including the orphaned descendants of jobs reparented to it.
+    """
+    worker_pid = os.getpid()
+    children = []
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as stat_file:
+                stat = stat_file.read()
+        except OSError:
+            continue
+        # The fields after the command name, which may contain spaces, start with the state and the parent PID
+        if int(stat[stat.rindex(')') + 2:].split()[1]) == worker_pid:
+            children.append(int(name))
+    return children
+
+def _kill_stray_processes() -> int:
+    """
+    Kills all processes left by a job after it has exited. Killing a process reparents its own children
+    to the worker, so the children are killed round by round until none is left.
+
+    Returns: number of killed processes
+    """
+    num_killed = 0
+    for _ in range(MAX_KILL_ROUNDS):
+        children = _get_children()
+        if not children:
+            return num_killed
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        num_killed += len(children)
+    # The processes keep forking faster than they are killed; exiting the worker ends its sandbox with them
+    os._exit(1)
+
+def _wait_for_child(pid: int, timeout: float) -> Tuple[Optional[int], bool]:
+    """
+    Waits for a job process to exit, killing its process group when the timeout expires.
+
+    Returns: (exit code, whether the job timed out)
+    """
+    deadline = time.monotonic() + timeout
+    try:
+        pidfd = os.pidfd_open(pid)
+    except (AttributeError, OSError):
+        pidfd = None
+    try:
+        while True:
+            exited_pid, status = os.waitpid(pid, os.WNOHANG)
+            if exited_pid == pid:
+                return os.waitstatus_to_exitcode(status), False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                try:
+                    os.killpg(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                os.waitpid(pid, 0)
+                return None, True
+            if pidfd is not None:
+                select.select([pidfd], [], [], remaining)
+            else:
+                time.sleep(min(remaining, 0.005))
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
+
+def _run_job(job: Dict[str, Any], job_dir: str, response_fd: int) -> None:
+    """
+    Runs the code file of a job as `__main__` in the forked child, like `python <code_path>`, and exits.
+    """
+    os.setsid()
+    os.close(response_fd)
+    for fd, path, flags in (
+        (0, os.devnull, os.O_RDONLY),
+        (1, os.path.join(job_dir, 'stdout'), os.O_WRONLY | os.O_CREAT | os.O_TRUNC),
+        (2, os.path.join(job_dir, 'stderr'), os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+    ):
+        new_fd = os.open(path, flags, 0o600)
+        os.dup2(new_fd, fd)
+        os.close(new_fd)
+    exit_code = 0
+    try:
+        code_path = os.path.join(job_dir, job['code_filename'])
+        sys.argv = [code_path]
+        sys.path[0] = job_dir
+        runpy.run_path(code_path, run_name='__main__')
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            exit_code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException:
+        traceback.print_exc()
+        exit_code = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+    os._exit(exit_code)
+
+def _prepare_job_dir(job: Dict[str, Any]) -> str:
+    """
+    Creates the private directory of a job, readable by the worker only, with the code file
+    and copies of the directories the code needs, such as the files of a tool.
+    """
+    job_dir = tempfile.mkdtemp(prefix='sandbox_job_')
+    with open(os.path.join(job_dir, job['code_filename']), 'w') as code_file:
+        code_file.write(job['code'])
+    for name, source_path in job.get('directories', {}).items():
+        shutil.copytree(source_path, os.path.join(job_dir, name))
+    return job_dir
+
+def _read_output(job_dir: str, name: str) -> str:
+    try:
+        with open(os.path.join(job_dir, name), encoding='utf-8', errors='replace') as output_file:
+            return output_file.read()
+    except OSError:
+        return ''
+
+def _wipe_tmp() -> None:
+    # The private /tmp of the Firejail sandbox is shared by the jobs of a worker, so it is emptied after each job
+    for name in os.listdir('/tmp'):
+        path = os.path.join('/tmp', name)
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+def worker_main() -> None:
+    parser = argparse.ArgumentParser(description='Sandbox interpreter worker')
+    parser.add_argument('--preload', default='', help='Comma-separated modules to import before running jobs')
+    parser.add_argument('--wipe-tmp', action='store_true', help='Empty /tmp after each job')
+    args = parser.parse_args()
+
+    # Jobs report on a private copy of stdout; output of the worker itself must not corrupt the responses
+    response_fd = os.dup(1)
+    response = os.fdopen(response_fd, 'w', buffering=1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    # Processes left by jobs are reparented to the worker instead of escaping it
+    _set_child_subreaper()
+    for module_name in filter(None, args.preload.split(',')):
+        try:
+            importlib.import_module(module_name)
+        except Exception:
+            pass
+    # Keep the preloaded objects out of garbage collection, so that forked jobs do not copy their pages
+    gc.freeze()
+    response.write(json.dumps({'ready': True}) + '\n')
+
+    for line in sys.stdin:
+        job = json.loads(line)
+        job_dir = _prepare_job_dir(job)
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            _run_job(job, job_dir, response_fd)
+        exit_code, timed_out = _wait_for_child(pid, job['timeout'])
+        num_stray_processes = _kill_stray_processes()
+        stdout = _read_output(job_dir, 'stdout')
+        stderr = _read_output(job_dir, 'stderr')
+        shutil.rmtree(job_dir, ignore_errors=True)
+        if args.wipe_tmp:
+            _wipe_tmp()
+        response.write(json.dumps({
+            'exit_code': exit_code,
+            'timed_out': timed_out,
+            'stdout': stdout,
+            'stderr': stderr,
+            'stray_processes': num_stray_processes
+        }) + '\n')
+
+
+class WorkerError(Exception):
+    """
+    Raised when a worker cannot be started or stops responding.
+    """
+
+
+class Worker:
+    """
+    The server side of a worker process.
+    """
+
+    def __init__(self, command: List[str]):
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        self.num_jobs = 0
+        self.idle_since = time.monotonic()
+        # Whether a job has left processes behind, after which the worker and its sandbox are replaced
+        self.tainted = False
+        if not self._read_response(WORKER_START_TIMEOUT):
+            self.kill()
+            raise WorkerError(f'Worker did not start: {" ".join(command)}')
+
+    def _read_response(self, timeout: float) -> Optional[Dict[str, object]]:
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            return None
+        line = self.process.stdout.readline()
+        return json.loads(line) if line else None
+
+    def run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Runs a job in the worker. A worker that had to kill processes left by the job is marked as tainted.
+
+        Returns: exit_code, timed_out, stdout and stderr of the job
+        """
+        self.num_jobs += 1
+        try:
+            self.process.stdin.write((json.dumps(job) + '\n').encode('utf-8'))
+            self.process.stdin.flush()
+        except OSError as e:
+            raise WorkerError(f'Worker {self.process.pid} is not running: {e}')
+        response = self._read_response(job['timeout'] + WORKER_RESPONSE_GRACE)
+        if response is None:
+            raise WorkerError(f'Worker {self.process.pid} stopped responding')
+        if response['stray_processes']:
+            logger.warning(f"Killed {response['stray_processes']} processes left by a job in worker {self.process.pid}")
+            self.tainted = True
+        return response
+
+    def kill(self) -> None:
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.process.wait()
+
+    def close(self) -> None:
+        # Closing stdin ends the job loop of the worker
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+
+class WorkerPool:
+    """
+    The workers of one virtual environment.
+    """
+
+    def __init__(self, command: List[str], max_workers: int, max_jobs: int, idle_seconds: float):
+        """
+        :param command: Command starting a worker.
+        :param max_workers: Maximum number of workers, including the ones being started.
+        :param max_jobs: Number of jobs after which a worker is replaced.
+        :param idle_seconds: Seconds after which an idle worker is shut down.
+        """
+        self.command = command
+        self.max_workers = max(1, max_workers)
+        self.max_jobs = max(1, max_jobs)
+        self.idle_seconds = idle_seconds
+        self.idle_workers: List[Worker] = []
+        self.num_workers = 0
+        # Number of callers about to run or running jobs in the pool, counted by WorkerPools under its lock
+        self.num_users = 0
+        self.closed = False
+        self._condition = threading.Condition()
+
+    def _start_spare(self) -> None:
+        try:
+            worker = Worker(self.command)
+        except Exception as e:
+            logger.error(f"Failed to start spare worker: {str(e)}")
+            with self._condition:
+                self.num_workers -= 1
+                self._condition.notify()
+            return
+        self._release(worker)
+
+    def _acquire(self, timeout: float) -> Worker:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not self.idle_workers and self.num_workers >= self.max_workers:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    raise WorkerError('No worker available')
+            if self.idle_workers:
+                worker = self.idle_workers.pop()
+            else:
+                worker = None
+                self.num_workers += 1
+            # Keep a spare worker warm while all warm workers are busy, so that the next job does not wait for one to start
+            start_spare = worker is not None and not self.idle_workers and self.num_workers < self.max_workers
+            if start_spare:
+                self.num_workers += 1
+        if start_spare:
+            threading.Thread(target=self._start_spare, daemon=True).start()
+        if worker is None:
+            try:
+                worker = Worker(self.command)
+            except Exception:
+                with self._condition:
+                    self.num_workers -= 1
+                    self._condition.notify()
+                raise
+        return worker
+
+    def _release(self, worker: Worker, healthy: bool = True) -> None:
+        with self._condition:
+            retire = not healthy or worker.num_jobs >= self.max_jobs or self.closed
+            if retire:
+                self.num_workers -= 1
+            else:
+                worker.idle_since = time.monotonic()
+                self.idle_workers.append(worker)
+            self._condition.notify()
+        if retire:
+            if healthy:
+                worker.close()
+            else:
+                worker.kill()
+
+    def run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Runs a job in a worker of the pool.
+
+        Returns: exit_code, timed_out, stdout and stderr of the job
+        """
+        worker = self._acquire(job['timeout'])
+        try:
+            result = worker.run(job)
+        except WorkerError:
+            self._release(worker, healthy=False)
+            raise
+        # Killing a tainted worker ends its Firejail sandbox with every process in it
+        self._release(worker, healthy=not worker.tainted)
+        return result
+
+    def trim(self) -> int:
+        """
+        Shuts down the workers that have been idle for longer than `idle_seconds`.
+
+        Returns: number of remaining workers
+        """
+        now = time.monotonic()
+        with self._condition:
+            expired_workers = [worker for worker in self.idle_workers if now - worker.idle_since > self.idle_seconds]
+            self.idle_workers = [worker for worker in self.idle_workers if worker not in expired_workers]
+            self.num_workers -= len(expired_workers)
+            num_workers = self.num_workers
+        for worker in expired_workers:
+            worker.close()
+        return num_workers
+
+    def close(self) -> None:
+        """
+        Shuts down the idle workers; the busy workers are shut down when they are released.
+        """
+        with self._condition:
+            self.closed = True
+            workers, self.idle_workers = self.idle_workers, []
+            self.num_workers -= len(workers)
+        for worker in workers:
+            worker.close()
+
+
+def get_preload_modules(common_modules: List[str], pip_packages: List[str]) -> List[str]:
+    """
+    Get the modules imported by the workers of a virtual environment: the common modules and the modules named
+    like the installed packages, which cover most packages; modules that cannot be imported are skipped.
+    """
+    modules = list(common_modules)
+    for package in pip_packages:
+        name = re.split(r'[\s\[<>=!~;@]', package.strip(), maxsplit=1)[0]
+        if name:
+            modules.append(name.lower().replace('-', '_'))
+    return list(dict.fromkeys(modules))
+
+
+class WorkerPools:
+    """
+    The worker pools of all virtual environments, trimmed in the background.
+    """
+
+    def __init__(
+        self,
+        command_prefix: List[str],
+        common_modules: List[str],
+        max_workers: int,
+        max_jobs: int,
+        idle_seconds: float,
+        wipe_tmp: bool = False
+    ):
+        """
+        :param command_prefix: Command prefix of the workers, such as the Firejail command.
+        :param common_modules: Modules imported by all workers.
+        :param max_workers: Maximum number of workers per virtual environment.
+        :param max_jobs: Number of jobs after which a worker is replaced.
+        :param idle_seconds: Seconds after which an idle worker is shut down.
+        :param wipe_tmp: Whether workers empty /tmp after each job, for workers with a private /tmp.
+        """
+        self.command_prefix = command_prefix
+        self.common_modules = common_modules
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self.idle_seconds = idle_seconds
+        self.wipe_tmp = wipe_tmp
+        self.pools: Dict[str, WorkerPool] = {}
+        self._lock = threading.Lock()
+        threading.Thread(target=self._trim_loop, daemon=True).start()
+
+    def _trim_loop(self) -> None:
+        while True:
+            time.sleep(min(10.0, max(1.0, self.idle_seconds / 2)))
+            with self._lock:
+                pools = list(self.pools.items())
+            for venv_path, pool in pools:
+                if pool.trim() == 0:
+                    with self._lock:
+                        # A pool in use may be about to start workers, so it is kept until no caller uses it
+                        if pool.num_users == 0 and pool.num_workers == 0 and self.pools.get(venv_path) is pool:
+                            del self.pools[venv_path]
+
+    @contextmanager
+    def use_pool(self, venv_path: str, pip_packages: List[str]):
+        """
+        Gets the pool of a virtual environment, creating it if needed, and keeps the trimming from removing it
+        while it is in use.
+        """
+        with self._lock:
+            pool = self.pools.get(venv_path)
+            if pool is None:
+                command = self.command_prefix + [
+                    os.path.join(venv_path, 'bin', 'python'),
+                    os.path.abspath(__file__),
+                    '--preload', ','.join(get_preload_modules(self.common_modules, pip_packages))
+                ]
+                if self.wipe_tmp:
+                    command.append('--wipe-tmp')
+                pool = WorkerPool(command, self.max_workers, self.max_jobs, self.idle_seconds)
+                self.pools[venv_path] = pool
+            pool.num_users += 1
+        try:
+            yield pool
+        finally:
+            with self._lock:
+                pool.num_users -= 1
+
+    def run(
+        self,
+        venv_path: str,
+        pip_packages: List[str],
+        code: str,
+        code_filename: str,
+        timeout: float,
+        directories: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Runs code in a worker of the virtual environment.
+
+        :param code: The code to run as `__main__`.
+        :param code_filename: Name of the code file in the job directory.
+        :param timeout: Seconds after which the job is killed.
+        :param directories: Directories copied into the job directory, by name.
+        Returns: exit_code, timed_out, stdout and stderr of the job
+        """
+        job = {'code': code, 'code_filename': code_filename, 'timeout': timeout, 'directories': directories or {}}
+        with self.use_pool(venv_path, pip_packages) as pool:
+            return pool.run(job)
+
+    def close(self) -> None:
+        with self._lock:
+            pools, self.pools = list(self.pools.values()), {}
+        for pool in pools:
+            pool.close()
+
+
+if __name__ == '__main__':
+    worker_main()
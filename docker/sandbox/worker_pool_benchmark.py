@@ -0,0 +1,89 @@
+"""
+Benchmark of cold and warm sandbox code runs.
+
+A cold run starts a new interpreter of the virtual environment per run, like the sandbox without worker pool;
+a warm run executes the code in a pooled worker. Each mode runs a trivial function and a tool importing
+requests and pandas, and reports the p50 and p99 latency per run, including writing the code and outputs to files.
+
+Usage:
+    python worker_pool_benchmark.py --venv /app/venv_cache/<hash> --runs 100 [--firejail]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from worker_pool import WorkerPools
+
+workloads = {
+    'trivial': 'def main(x):\n    return x + 1\n\nprint(main(1))\n',
+    'requests_pandas': (
+        'import requests\n'
+        'import pandas as pd\n\n'
+        'def main():\n'
+        '    return pd.DataFrame({"status": [requests.codes.ok]}).to_json()\n\n'
+        'print(main())\n'
+    )
+}
+
+def percentile(values, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+def run_cold(command_prefix, python_path: str, code_path: str, stdout_path: str, stderr_path: str) -> None:
+    with open(stdout_path, 'wb') as stdout_file, open(stderr_path, 'wb') as stderr_file:
+        subprocess.run(command_prefix + [python_path, code_path], stdout=stdout_file, stderr=stderr_file, check=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold and warm sandbox code run benchmark')
+    parser.add_argument('--venv', default=sys.prefix, help='Virtual environment with requests and pandas')
+    parser.add_argument('--runs', type=int, default=100)
+    parser.add_argument('--workloads', default=','.join(workloads), help='Comma-separated workloads to run')
+    parser.add_argument('--firejail', action='store_true', help='Run in Firejail like the sandbox')
+    args = parser.parse_args()
+
+    command_prefix = ['firejail', '--quiet', '--private-tmp'] if args.firejail else []
+    python_path = os.path.join(args.venv, 'bin', 'python')
+    worker_pools = WorkerPools(command_prefix, ['json', 'requests', 'pandas'], 1, args.runs + 1, 300, wipe_tmp=args.firejail)
+    try:
+        with tempfile.TemporaryDirectory() as tempdir:
+            stdout_path = os.path.join(tempdir, 'stdout')
+            stderr_path = os.path.join(tempdir, 'stderr')
+            for name in args.workloads.split(','):
+                code = workloads[name]
+                code_path = os.path.join(tempdir, f'{name}.py')
+
+                # The first warm run includes the start of the worker
+                start_time = time.perf_counter()
+                worker_pools.run(args.venv, [], code, f'{name}.py', 60)
+                first_warm = (time.perf_counter() - start_time) * 1000
+
+                timings = {'cold': [], 'warm': []}
+                for _ in range(args.runs):
+                    # Cold runs write the code file per run, as warm runs do in their job directory
+                    start_time = time.perf_counter()
+                    with open(code_path, 'w') as code_file:
+                        code_file.write(code)
+                    run_cold(command_prefix, python_path, code_path, stdout_path, stderr_path)
+                    timings['cold'].append((time.perf_counter() - start_time) * 1000)
+
+                    start_time = time.perf_counter()
+                    result = worker_pools.run(args.venv, [], code, f'{name}.py', 60)
+                    timings['warm'].append((time.perf_counter() - start_time) * 1000)
+                    if result['exit_code'] != 0 or result['timed_out']:
+                        raise RuntimeError(f"Warm run of {name} failed: {result['stderr']}")
+
+                for mode, values in timings.items():
+                    print(
+                        f'{name} {mode}: p50:{statistics.median(values):.1f}ms p99:{percentile(values, 99):.1f}ms '
+                        f'mean:{statistics.mean(values):.1f}ms'
+                    )
+                print(f'{name} first warm run (worker start): {first_warm:.1f}ms')
+    finally:
+        worker_pools.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,16 @@
 import os
 import sys
-import importlib
-from typing import Any
+import threading
+import time
+import importlib.util
+from typing import Any, Dict, Optional, Tuple
 from datetime import datetime
 
+from config import settings
+from log import Logger
+
+logger = Logger.get_logger('celery-app')
+
 # Dictionary to store language codes and their corresponding language names
 language_names = {
     "en": "English",
@@ -263,6 +270,31 @@ language_packs = {
             {formatted_docs}
             ********************End of information retrieved from the knowledge base********************
         ''',
+        "agent_chat_history_summary": '''
+            Below is the summary of the earlier chat history with the user, which is not included in the messages:
+            ********************Start of the summary of the earlier chat history********************
+            {summary}
+            ********************End of the summary of the earlier chat history********************
+        ''',
+        "agent_chat_summary_system": '''
+            You maintain the memory of a chat between a user and an AI agent.
+            I will provide the current summary of the earlier chat history, which may be empty, and the messages that followed it.
+            The messages are in the following JSON format: [message 1, (message 2,) ...]
+            The JSON structure for each message is as follows:
+            {"role": "speaker role, user or agent", "message": message content}.
+            Update the summary so that it covers the current summary and all of the messages.
+            Keep the facts, decisions, requirements and preferences of the user, results of the agent and open questions that later replies may depend on, and leave out greetings and repetition.
+            The summary must not exceed 500 words. Reply with the updated summary only, as plain text.
+        ''',
+        "agent_chat_summary_user": '''
+            Below is the current summary of the earlier chat history:
+            {summary}
+
+            Below are the messages that followed:
+            {messages}
+
+            Please generate the updated summary according to the requirements.
+        ''',
         "llm_reply_requirement_with_task_splitting": "Please select the part of the overall task that you should be responsible for and process it.",
         "recursive_task_generation": {
             "system": """
@@ -2059,6 +2091,9 @@ prompt_keys = [
     "agent_team_members",
     "agent_user_prompt",
     "agent_user_prompt_with_retrieved_docs",
+    "agent_chat_history_summary",
+    "agent_chat_summary_system",
+    "agent_chat_summary_user",
     
     "chatroom_manager_system",
     "chatroom_manager_system_with_optional_selection",
@@ -2139,7 +2174,10 @@ prompt_descriptions = {
                 # "agent_output_format_2_md": "Agent Output Format: JSON in Markdown",
                 "agent_team_members": "Team Members List [Sub]",
                 "agent_user_prompt": "Agent User Prompt (Not Bound to Knowledge Base)",
-                "agent_user_prompt_with_retrieved_docs": "Agent User Prompt (With Knowledge Base Retrieval)"
+                "agent_user_prompt_with_retrieved_docs": "Agent User Prompt (With Knowledge Base Retrieval)",
+                "agent_chat_history_summary": "Agent Chat History Summary [Sub]",
+                "agent_chat_summary_system": "Agent Chat History Summary Generator System Prompt",
+                "agent_chat_summary_user": "Agent Chat History Summary Generator User Prompt"
             }
         },
         {
@@ -2244,7 +2282,10 @@ prompt_descriptions = {
                 # "agent_output_format_2_md": "智能体输出格式：Markdown形式的JSON【子】",
                 "agent_team_members": "团队成员列表【子】",
                 "agent_user_prompt": "智能体用户提示词（未绑定知识库）",
-                "agent_user_prompt_with_retrieved_docs": "智能体用户提示词（检索知识库）"
+                "agent_user_prompt_with_retrieved_docs": "智能体用户提示词（检索知识库）",
+                "agent_chat_history_summary": "智能体对话历史摘要【子】",
+                "agent_chat_summary_system": "智能体对话历史摘要生成器系统提示词",
+                "agent_chat_summary_user": "智能体对话历史摘要生成器用户提示词"
             }
         },
         {
@@ -2330,77 +2371,8 @@ prompt_descriptions = {
     ]
 }
 
-def get_language_content(key: str, uid: int = 0, append_ret_lang_prompt: bool = True) -> Any:
-    """
-    Retrieves the content for the specified key based on the current language.
-    Supports nested keys separated by dots.
-
-    :param key: The key for the desired content, with nested keys separated by dots.
-    :param uid: The user ID.
-    :param append_ret_lang_prompt: Whether to append the language prompt to the content.
-    :return: The content string in the current language.
-    """
-
-    try:
-        from api.utils.auth import get_current_language
-        actual_uid = uid if uid > 0 else int(os.getenv('ACTUAL_USER_ID', 0))
-        current_language = get_current_language(actual_uid)
-    except:
-        current_language = "en"
-    
-    keys = key.split('.')
-
-    if key in prompt_keys:
-        # Check if prompt.py exists in current directory
-        prompt_file_path = os.path.join(os.path.dirname(__file__), 'prompt.py')
-        
-        if not os.path.exists(prompt_file_path):
-            # If not exists, create prompt.py file
-            _create_prompt_file()
-        
-        # Dynamic import of prompt.py
-        try:
-            # If module already imported, reload to get latest content
-            if 'prompt' in sys.modules:
-                prompt_module = importlib.reload(sys.modules['prompt'])
-            else:
-                import prompt as prompt_module
-            
-            if hasattr(prompt_module, 'PROMPTS') and key in prompt_module.PROMPTS:
-                content = prompt_module.PROMPTS[key]
-            else:
-                # If no corresponding key in prompt.py, fallback to language_packs
-                content = language_packs.get("en", {})
-                for k in keys:
-                    if isinstance(content, dict):
-                        content = content.get(k, None)
-                    else:
-                        return None
-        except ImportError:
-            # If import fails, fallback to language_packs
-            content = language_packs.get("en", {})
-            for k in keys:
-                if isinstance(content, dict):
-                    content = content.get(k, None)
-                else:
-                    return None
-        
-        if append_ret_lang_prompt:
-            # Get detailed time information
-            now = datetime.now()
-            current_time = now.strftime("%Y-%m-%d %H:%M:%S")
-            year = now.year
-            month = now.month
-            day = now.day
-            hour = now.hour
-            minute = now.minute
-            second = now.second
-            weekday = now.strftime("%A")  # Full weekday name
-            weekday_num = now.weekday()  # Monday is 0, Sunday is 6
-            week_number = now.isocalendar()[1]  # ISO week number
-            day_of_year = now.timetuple().tm_yday
-            
-            return_language_prompt = f"""
+# Notice prepended to prompts, filled with the current time and the name of the language of the returned content
+return_language_prompt_template = """
 ================ IMPORTANT NOTICE ================
 CURRENT DATE AND TIME: {current_time}
 DETAILED TIME INFORMATION:
@@ -2410,7 +2382,7 @@ DETAILED TIME INFORMATION:
 - Hour: {hour}
 - Minute: {minute}
 - Second: {second}
-- Weekday: {weekday} (Day {weekday_num + 1} of the week)
+- Weekday: {weekday} (Day {weekday_num} of the week)
 - Week Number: {week_number} (ISO week)
 - Day of Year: {day_of_year}
 
@@ -2418,7 +2390,7 @@ When interpreting dates or times mentioned by the user, reason based on the curr
 For any parts of a date or time not explicitly specified by the user (e.g., year or hour), infer them logically from the current time;  
 if inference is unnecessary, default to using the corresponding value from the current time.
 
-Please note that the language of the returned content should be {language_names[current_language]}, unless the user explicitly specifies the language of the returned content in a subsequent instruction.
+Please note that the language of the returned content should be {language_name}, unless the user explicitly specifies the language of the returned content in a subsequent instruction.
 
 If the user requests any type of chart, diagram, graph, or visual representation (including but not limited to flowcharts, sequence diagrams, Gantt charts, pie charts, bar charts, line graphs, mind maps, organizational charts, network diagrams, etc.), you MUST respond with complete Mermaid diagram code.
 The Mermaid code must be fully valid and syntactically correct, so that it can be directly rendered in any Mermaid-compatible viewer without errors.
@@ -2427,21 +2399,134 @@ If multiple diagram types are possible, choose the one that best fits the user
 Double-check the logic, structure, and syntax to ensure correctness and renderability before responding.
 ==================================================
 """
+
+def _compile_language_packs() -> Dict[Tuple[str, str], Any]:
+    """
+    Flattens the language packs into a dictionary keyed by language and dotted key,
+    containing the nested dictionaries as well as their values.
+    """
+    catalog = {}
+    def add(language: str, prefix: str, content: Dict[str, Any]):
+        for k, v in content.items():
+            key = f'{prefix}.{k}' if prefix else k
+            catalog[(language, key)] = v
+            if isinstance(v, dict):
+                add(language, key, v)
+    for language, pack in language_packs.items():
+        add(language, '', pack)
+    return catalog
+
+language_catalog = _compile_language_packs()
+prompt_key_set = frozenset(prompt_keys)
+
+prompt_file_path = os.path.join(os.path.dirname(__file__), 'prompt.py')
+# Prompts by key, loaded from prompt.py with the English language pack as fallback
+prompt_catalog: Dict[str, Any] = {}
+# Modification time and size of prompt.py when the prompt catalog was loaded
+prompt_file_signature: Optional[Tuple[int, int]] = None
+prompt_file_checked_time = float('-inf')
+prompt_catalog_lock = threading.Lock()
+
+def reload_prompt_catalog() -> None:
+    """
+    Loads the prompt catalog from prompt.py, creating the file if it does not exist.
+    Called when prompt.py changes; prompt lookups then read the catalog without touching the file.
+    """
+    global prompt_catalog, prompt_file_signature, prompt_file_checked_time
+    with prompt_catalog_lock:
+        if not os.path.exists(prompt_file_path):
+            # If not exists, create prompt.py file
+            _create_prompt_file()
+        stat = os.stat(prompt_file_path)
+        prompts = {}
+        try:
+            spec = importlib.util.spec_from_file_location('prompt', prompt_file_path)
+            prompt_module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(prompt_module)
+            sys.modules['prompt'] = prompt_module
+            prompts = getattr(prompt_module, 'PROMPTS', {})
+        except Exception:
+            # If import fails, fallback to language_packs
+            logger.exception('Failed to load prompt.py, falling back to the language packs')
+        prompt_catalog = {
+            # If no corresponding key in prompt.py, fallback to language_packs
+            key: prompts[key] if key in prompts else language_catalog.get(('en', key))
+            for key in prompt_keys
+        }
+        prompt_file_signature = (stat.st_mtime_ns, stat.st_size)
+        prompt_file_checked_time = time.monotonic()
+
+def _check_prompt_file() -> None:
+    """
+    Reloads the prompt catalog if prompt.py has changed, checking the file at most every PROMPT_CATALOG_CHECK_INTERVAL seconds.
+    """
+    global prompt_file_checked_time
+    now = time.monotonic()
+    if now - prompt_file_checked_time < settings.PROMPT_CATALOG_CHECK_INTERVAL:
+        return
+    prompt_file_checked_time = now
+    try:
+        stat = os.stat(prompt_file_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        signature = None
+    if signature is None or signature != prompt_file_signature:
+        reload_prompt_catalog()
+
+_get_current_language = None
+
+def get_language_content(key: str, uid: int = 0, append_ret_lang_prompt: bool = True) -> Any:
+    """
+    Retrieves the content for the specified key based on the current language.
+    Supports nested keys separated by dots.
+
+    :param key: The key for the desired content, with nested keys separated by dots.
+    :param uid: The user ID.
+    :param append_ret_lang_prompt: Whether to append the language prompt to the content.
+    :return: The content string in the current language.
+    """
+    global _get_current_language
+    try:
+        if _get_current_language is None:
+            from api.utils.auth import get_current_language
+            _get_current_language = get_current_language
+        actual_uid = uid if uid > 0 else int(os.getenv('ACTUAL_USER_ID', 0))
+        current_language = _get_current_language(actual_uid)
+    except:
+        current_language = "en"
+
+    if key in prompt_key_set:
+        _check_prompt_file()
+        content = prompt_catalog.get(key)
+        
+        if append_ret_lang_prompt:
+            # Get detailed time information
+            now = datetime.now()
+            return_language_prompt = return_language_prompt_template.format(
+                current_time=now.strftime("%Y-%m-%d %H:%M:%S"),
+                year=now.year,
+                month=now.month,
+                day=now.day,
+                hour=now.hour,
+                minute=now.minute,
+                second=now.second,
+                weekday=now.strftime("%A"),  # Full weekday name
+                weekday_num=now.weekday() + 1,  # Monday is 1, Sunday is 7
+                week_number=now.isocalendar()[1],  # ISO week number
+                day_of_year=now.timetuple().tm_yday,
+                language_name=language_names[current_language]
+            )
             if isinstance(content, str):
                 content = return_language_prompt + "\n\n" + content
             elif isinstance(content, dict):
                 content = content.copy()
                 if 'system' in content:
                     content['system'] = return_language_prompt + "\n\n" + content['system']
+        elif isinstance(content, dict):
+            content = content.copy()
         return content
 
-    content = language_packs.get(current_language, {})
-    for k in keys:
-        if isinstance(content, dict):
-            content = content.get(k, None)
-        else:
-            return None
-
+    content = language_catalog.get((current_language, key))
     if isinstance(content, dict):
         return content.copy()
     return content
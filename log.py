@@ -1,9 +1,280 @@
+import atexit
+import json
 import logging
-from logging.handlers import TimedRotatingFileHandler
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from config import settings
-from typing import Dict
+from typing import Any, Dict, Optional, Tuple
+
+# Identifiers of the workflow run, node and chatroom that the current task or coroutine works on,
+# attached to every log record it emits
+log_context: ContextVar[Dict[str, Any]] = ContextVar('log_context', default={})
+LOG_CONTEXT_FIELDS = ('app_run_id', 'node_id', 'chatroom_id')
+
+def set_log_context(**kwargs) -> Token:
+    """
+    Adds identifiers such as app_run_id, node_id or chatroom_id to the log context of the current task or coroutine.
+
+    :return: A token to restore the previous log context with `log_context.reset`.
+    """
+    return log_context.set({**log_context.get(), **kwargs})
+
+@contextmanager
+def log_context_scope(**kwargs):
+    """
+    Adds identifiers to the log context for the duration of a block.
+    """
+    token = set_log_context(**kwargs)
+    try:
+        yield
+    finally:
+        log_context.reset(token)
+
+def get_log_level(log_name: str) -> int:
+    """
+    Gets the level of a logger from LOG_LEVELS, e.g. 'sql=WARNING,celery-app=INFO', or LOG_LEVEL by default.
+    """
+    for item in settings.LOG_LEVELS.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() == log_name and level.strip():
+            return logging.getLevelName(level.strip().upper())
+    return logging.getLevelName(settings.LOG_LEVEL.upper())
+
+class ContextFilter(logging.Filter):
+    """
+    Attaches the log context of the emitting task or coroutine to the record.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = log_context.get()
+        for field in LOG_CONTEXT_FIELDS:
+            setattr(record, field, context.get(field))
+        return True
+
+class RateLimitFilter(logging.Filter):
+    """
+    Samples high-frequency records: at most `rate` records with the same logger and message template are let through
+    per `interval` seconds. The number of suppressed records is attached to the next record let through.
+    Warnings and errors are never suppressed.
+    """
+    def __init__(self, rate: int, interval: float, max_keys: int = 1000):
+        super().__init__()
+        self.rate = rate
+        self.interval = interval
+        self.max_keys = max_keys
+        # (logger name, message template) -> [window start time, records in the window, suppressed records]
+        self.windows: OrderedDict[Tuple[str, str], list] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.suppressed = 0
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None:
+                window = self.windows[key] = [now, 0, 0]
+                while len(self.windows) > self.max_keys:
+                    self.windows.popitem(last=False)
+            else:
+                self.windows.move_to_end(key)
+            if now - window[0] >= self.interval:
+                window[0], window[1] = now, 0
+            if window[1] >= self.rate:
+                window[2] += 1
+                return False
+            window[1] += 1
+            record.suppressed, window[2] = window[2], 0
+        return True
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        context = ' '.join(
+            f'{field}={value}' for field in LOG_CONTEXT_FIELDS
+            if (value := getattr(record, field, None)) is not None
+        )
+        if context:
+            text += f' [{context}]'
+        if suppressed := getattr(record, 'suppressed', 0):
+            text += f' ({suppressed} similar messages suppressed)'
+        return text
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as a JSON line carrying the log context.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName
+        }
+        for field in LOG_CONTEXT_FIELDS:
+            if (value := getattr(record, field, None)) is not None:
+                data[field] = value
+        if suppressed := getattr(record, 'suppressed', 0):
+            data['suppressed'] = suppressed
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+class LogRouter(logging.Handler):
+    """
+    Writes the records taken from the log queue to the console and to the file of their logger.
+    Runs on the thread of the queue listener only.
+    """
+    def __init__(self, pipeline: 'LogPipeline'):
+        super().__init__()
+        self.pipeline = pipeline
+        self.setFormatter(JsonFormatter() if settings.LOG_FORMAT == 'json' else TextFormatter())
+        self.console_handler = logging.StreamHandler()
+        self.console_handler.setFormatter(self.formatter)
+        self.file_handlers: Dict[str, logging.Handler] = {}
+
+    def get_file_handler(self, log_name: str) -> logging.Handler:
+        file_handler = self.file_handlers.get(log_name)
+        if file_handler is None:
+            # Log directory fixed to 'logs' under the current directory
+            base_dir = 'logs'
+            if not os.path.exists(base_dir):
+                os.makedirs(base_dir, mode=0o777, exist_ok=True)
+            # Create file handler with expiration period imported from config.settings
+            file_handler = TimedRotatingFileHandler(
+                os.path.join(base_dir, f"{log_name}.log"),
+                when='h', interval=settings.LOG_ROTATE_INTERVAL, backupCount=settings.LOG_BACKUP_COUNT
+            )
+            file_handler.setFormatter(self.formatter)
+            self.file_handlers[log_name] = file_handler
+        return file_handler
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if dropped := self.pipeline.take_dropped():
+            dropped_record = logging.makeLogRecord({
+                'name': record.name,
+                'levelno': logging.WARNING,
+                'levelname': 'WARNING',
+                'msg': f'{dropped} log records dropped because the log queue was full'
+            })
+            self.console_handler.handle(dropped_record)
+            self.get_file_handler(record.name).handle(dropped_record)
+        self.console_handler.handle(record)
+        self.get_file_handler(record.name).handle(record)
+
+    def close(self) -> None:
+        for file_handler in self.file_handlers.values():
+            file_handler.close()
+        super().close()
+
+class LogListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Wait for room in a full queue instead of failing, so that the records before the sentinel are written
+        self.queue.put(self._sentinel)
+
+class LogPipeline:
+    """
+    A bounded queue of log records of this process, written by a listener thread, so that emitting a record
+    never does file or console I/O on the emitting thread or event loop.
+    When the queue is full, records are dropped and counted, or the emitting thread blocks,
+    according to LOG_QUEUE_FULL_POLICY.
+    """
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+        self.block_when_full = settings.LOG_QUEUE_FULL_POLICY == 'block'
+        self.dropped = 0
+        self.dropped_lock = threading.Lock()
+        self.router = LogRouter(self)
+        self.listener = LogListener(self.queue, self.router)
+        self.listener.start()
+
+    def put(self, record: logging.LogRecord) -> None:
+        if self.block_when_full:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self.dropped_lock:
+                self.dropped += 1
+
+    def take_dropped(self) -> int:
+        if not self.dropped:
+            return 0
+        with self.dropped_lock:
+            dropped, self.dropped = self.dropped, 0
+        return dropped
+
+    def stop(self) -> None:
+        """
+        Writes the queued records and stops the listener thread.
+        """
+        self.listener.stop()
+        self.router.close()
+
+_pipeline: Optional[LogPipeline] = None
+_pipeline_pid: Optional[int] = None
+_pipeline_lock = threading.Lock()
+
+def get_log_pipeline() -> LogPipeline:
+    """
+    Gets the log pipeline of this process, starting it on first use and again in forked child processes,
+    which do not inherit the listener thread.
+    """
+    global _pipeline, _pipeline_pid
+    pid = os.getpid()
+    if _pipeline_pid != pid:
+        with _pipeline_lock:
+            if _pipeline_pid != pid:
+                _pipeline = LogPipeline()
+                _pipeline_pid = pid
+    return _pipeline
+
+@atexit.register
+def stop_log_pipeline() -> None:
+    global _pipeline, _pipeline_pid
+    with _pipeline_lock:
+        if _pipeline is not None and _pipeline_pid == os.getpid():
+            _pipeline.stop()
+            _pipeline, _pipeline_pid = None, None
+
+class PipelineHandler(QueueHandler):
+    """
+    Puts records into the log pipeline of the current process.
+    """
+    def __init__(self):
+        super().__init__(None)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render the message on the emitting thread, as the arguments may change after the record is queued
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        get_log_pipeline().put(record)
 
 class Logger:
     """
@@ -15,8 +286,10 @@ class Logger:
     def get_logger(log_name: str = 'app') -> logging.Logger:
         """
         Retrieves a logger instance by name. If the logger does not exist, it creates a new one.
-        The logger is configured to write logs to both the console and a file, with the file logs
-        organized into directories by date.
+        The records of the logger are queued on the emitting thread and written to both the console and
+        the file 'logs/<log_name>.log' by the listener thread of the log pipeline.
+        The level of the logger is set by LOG_LEVELS or LOG_LEVEL, and high-frequency messages below WARNING
+        are sampled according to LOG_RATE_LIMIT.
 
         :param log_name: The name of the logger to retrieve or create.
         :return: A configured logger instance.
@@ -24,34 +297,15 @@ class Logger:
         if log_name in Logger._loggers:
             return Logger._loggers[log_name]
 
-        # Log directory fixed to 'logs' under the current directory
-        base_dir = 'logs'
-        if not os.path.exists(base_dir):
-            os.makedirs(base_dir, mode=0o777, exist_ok=True)
-
-        # Log file name
-        log_file = os.path.join(base_dir, f"{log_name}.log")
-
         # Create logger
         logger = logging.getLogger(log_name)
-        logger.setLevel(logging.DEBUG)  # Set to DEBUG to capture all levels of logs
-
-        # Create console handler
-        ch = logging.StreamHandler()
-        ch.setLevel(logging.DEBUG)  # Set to DEBUG to capture all levels of logs
-
-        # Create file handler with expiration period imported from config.settings
-        fh = TimedRotatingFileHandler(log_file, when='h', interval=settings.LOG_ROTATE_INTERVAL, backupCount=settings.LOG_BACKUP_COUNT)
-        fh.setLevel(logging.DEBUG)  # Set to DEBUG to capture all levels of logs
-
-        # Create formatter
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        ch.setFormatter(formatter)
-        fh.setFormatter(formatter)
+        logger.setLevel(get_log_level(log_name))
 
-        # Add handlers to logger
-        logger.addHandler(ch)
-        logger.addHandler(fh)
+        # Create queue handler; the rate limit is applied after the context is attached, before anything is queued
+        handler = PipelineHandler()
+        handler.addFilter(ContextFilter())
+        handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMIT, settings.LOG_RATE_LIMIT_INTERVAL))
+        logger.addHandler(handler)
 
         Logger._loggers[log_name] = logger
-        return logger
\ No newline at end of file
+        return logger
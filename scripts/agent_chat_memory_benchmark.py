@@ -0,0 +1,115 @@
+"""
+Benchmark of loading the agent chat history for the prompt.
+
+Inserts a synthetic chat history of alternating user and agent messages for an unused user and agent, then
+compares the prompt assembly of the full history, which loads every message since the history was cleared
+and tokenizes all of them on every turn, with the memory window, which loads the newest messages page by
+page with their saved token counts. The first memory load counts and saves the tokens of the window;
+the following loads reuse them. Reports the mean, p50 and p95 latency per turn and the number of messages
+in the prompt, and deletes the synthetic history afterwards.
+
+Requires the MySQL from the environment configuration, with the 202610181200 migration applied.
+
+Usage:
+    python scripts/agent_chat_memory_benchmark.py --messages 10000 --runs 20 --context-tokens 128000
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).absolute().parent.parent))
+
+from config import settings
+from core.database.models.agent_chat_memories import AgentChatMemories
+from core.database.models.agent_chat_messages import AgentChatMessages
+from core.helper import truncate_agent_messages_by_token_limit
+from core.memory import AgentChatMemory, get_history_token_limit
+
+words = [
+    'report', 'customer', 'deadline', 'budget', 'invoice', 'server', 'migration', 'feature', 'meeting',
+    'schedule', 'release', 'database', 'analysis', 'forecast', 'contract', 'design', 'review', 'metric'
+]
+
+def generate_message(rng: random.Random) -> str:
+    return ' '.join(rng.choice(words) for _ in range(rng.randint(20, 300))) + '.'
+
+def insert_history(user_id: int, agent_id: int, num_messages: int, seed: int) -> None:
+    rng = random.Random(seed)
+    rows = []
+    for index in range(num_messages):
+        is_agent = index % 2 == 1
+        rows.append({
+            'user_id': user_id,
+            'agent_id': agent_id,
+            'agent_run_id': index if is_agent else 0,
+            'message': generate_message(rng)
+        })
+        if len(rows) == 1000:
+            AgentChatMessages().insert_many(rows, return_ids=False)
+            rows = []
+    if rows:
+        AgentChatMessages().insert_many(rows, return_ids=False)
+
+def delete_history(user_id: int, agent_id: int) -> None:
+    conditions = [
+        {'column': 'user_id', 'value': user_id},
+        {'column': 'agent_id', 'value': agent_id}
+    ]
+    AgentChatMessages().delete(conditions)
+    AgentChatMemories().delete(conditions)
+
+def load_full_history(user_id: int, agent_id: int, model_info: dict) -> int:
+    chat_history = AgentChatMessages().get_chat_agent_history(user_id=user_id, agent_id=agent_id)
+    return len(truncate_agent_messages_by_token_limit(chat_history, model_info))
+
+def load_memory_window(user_id: int, agent_id: int, model_info: dict) -> int:
+    memory = AgentChatMemory(user_id, agent_id).load(get_history_token_limit(model_info))
+    return len(memory['messages'])
+
+def main():
+    parser = argparse.ArgumentParser(description='Agent chat history loading benchmark')
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--context-tokens', type=int, default=128000, help='Context window of the simulated model')
+    parser.add_argument('--output-tokens', type=int, default=4096, help='Maximum output tokens of the simulated model')
+    parser.add_argument('--window-tokens', type=int, default=settings.MEMORY_WINDOW_TOKENS)
+    parser.add_argument('--user-id', type=int, default=2147480000, help='Unused user ID of the synthetic history')
+    parser.add_argument('--agent-id', type=int, default=2147480000, help='Unused agent ID of the synthetic history')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    settings.MEMORY_WINDOW_TOKENS = args.window_tokens
+    model_info = {
+        'model_name': 'gpt-4o',
+        'supplier_config': {'api_key': ''},
+        'max_context_tokens': args.context_tokens,
+        'max_output_tokens': args.output_tokens
+    }
+
+    delete_history(args.user_id, args.agent_id)
+    start_time = time.perf_counter()
+    insert_history(args.user_id, args.agent_id, args.messages, args.seed)
+    print(f'Inserted {args.messages} messages in {(time.perf_counter() - start_time) * 1000:.1f}ms')
+    try:
+        start_time = time.perf_counter()
+        num_messages = load_memory_window(args.user_id, args.agent_id, model_info)
+        print(f'memory first load (counting the window): {(time.perf_counter() - start_time) * 1000:.1f}ms')
+
+        for name, load in [('full history', load_full_history), ('memory window', load_memory_window)]:
+            timings = []
+            for _ in range(args.runs):
+                start_time = time.perf_counter()
+                num_messages = load(args.user_id, args.agent_id, model_info)
+                timings.append((time.perf_counter() - start_time) * 1000)
+            p95 = sorted(timings)[min(len(timings) - 1, int(round(0.95 * (len(timings) - 1))))]
+            print(
+                f'{name}: messages in prompt:{num_messages} mean:{statistics.mean(timings):.1f}ms '
+                f'p50:{statistics.median(timings):.1f}ms p95:{p95:.1f}ms'
+            )
+    finally:
+        delete_history(args.user_id, args.agent_id)
+
+if __name__ == '__main__':
+    main()
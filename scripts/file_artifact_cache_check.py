@@ -0,0 +1,61 @@
+"""
+Check of the file artifact cache of document conversion.
+
+Converts a document to Markdown twice, then converts a copy of it under another path, and asserts that
+the second conversion and the conversion of the copy are served from the cache with the same result as the
+first one. Reports the latency of each conversion. The artifacts of the document are removed first, so that
+the first conversion always runs the converter.
+
+Usage:
+    python scripts/file_artifact_cache_check.py --file path/to/document.pdf
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).absolute().parent.parent))
+
+from core.file.artifact_cache import get_artifact_cache_stats, get_artifact_path, get_file_hash
+from core.helper import convert_document_to_markdown
+
+def convert(file_path: Path):
+    stats = get_artifact_cache_stats()
+    start_time = time.perf_counter()
+    markdown = convert_document_to_markdown(file_path)
+    elapsed_time = (time.perf_counter() - start_time) * 1000
+    new_stats = get_artifact_cache_stats()
+    return markdown, elapsed_time, new_stats['hits'] - stats['hits'], new_stats['misses'] - stats['misses']
+
+def main():
+    parser = argparse.ArgumentParser(description='File artifact cache check')
+    parser.add_argument('--file', required=True, help='Document to convert')
+    args = parser.parse_args()
+
+    file_path = Path(args.file).absolute()
+    content_hash = get_file_hash(file_path)
+    for kind in ['markdown', 'ocr']:
+        get_artifact_path(content_hash, file_path.suffix, kind).unlink(missing_ok=True)
+
+    markdown, elapsed_time, hits, misses = convert(file_path)
+    assert hits == 0 and misses >= 1, f'First conversion should run the converter, got {hits} hits and {misses} misses'
+    print(f'first conversion: {elapsed_time:.1f}ms')
+
+    cached_markdown, elapsed_time, hits, misses = convert(file_path)
+    assert (hits, misses) == (1, 0), f'Second conversion should be served from the cache, got {hits} hits and {misses} misses'
+    assert cached_markdown == markdown, 'Cached Markdown differs from the converted Markdown'
+    print(f'second conversion: {elapsed_time:.1f}ms (cached)')
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        copy_path = Path(temp_dir).joinpath(f'copy{file_path.suffix}')
+        shutil.copyfile(file_path, copy_path)
+        copy_markdown, elapsed_time, hits, misses = convert(copy_path)
+        assert (hits, misses) == (1, 0), f'Conversion of an identical file should be served from the cache, got {hits} hits and {misses} misses'
+        assert copy_markdown == markdown, 'Cached Markdown of the identical file differs from the converted Markdown'
+        print(f'conversion of an identical file: {elapsed_time:.1f}ms (cached)')
+
+    print('OK')
+
+if __name__ == '__main__':
+    main()
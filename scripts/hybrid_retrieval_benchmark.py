@@ -0,0 +1,132 @@
+"""
+Offline benchmark of dense, lexical and hybrid retrieval.
+
+Generates a synthetic knowledge base whose segments mention product codes, error codes and version numbers,
+and queries that ask for one code each in natural language, so that the relevant segment of every query is known.
+The dense retriever ranks the segments by cosine similarity of embeddings of the given embedding model
+configuration, the lexical retriever searches a temporary lexical index of the segments, and the hybrid
+retriever fuses both rankings with reciprocal rank fusion like the dataset retrieval.
+Reports recall@k and the mean and p95 latency per query of each retriever; the query embedding is part
+of the dense and hybrid latency.
+
+Requires the MySQL from the environment configuration for the embedding model configuration.
+
+Usage:
+    python scripts/hybrid_retrieval_benchmark.py --embeddings-config-id 1 --segments 2000 --queries 200 --k 4
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+sys.path.append(str(Path(__file__).absolute().parent.parent))
+
+import numpy as np
+
+from config import settings
+from core.dataset.dataset import get_embeddings
+from core.dataset.lexical_index import LexicalIndex, reciprocal_rank_fusion
+
+components = ['pump', 'valve', 'controller', 'sensor', 'gateway', 'inverter', 'compressor', 'router']
+symptoms = [
+    'stops responding after a firmware update',
+    'reports an overheating warning',
+    'loses its network connection',
+    'fails the self test at startup',
+    'shows a calibration mismatch',
+    'restarts repeatedly under load'
+]
+actions = [
+    'Power cycle the unit and clear the fault log.',
+    'Roll back to the previous firmware and contact support.',
+    'Check the cabling and replace the connector if it is damaged.',
+    'Recalibrate the unit with the maintenance tool.',
+    'Reduce the load and inspect the cooling fan.'
+]
+
+def generate_corpus(num_segments: int, seed: int):
+    rng = random.Random(seed)
+    segments = []
+    for segment_id in range(1, num_segments + 1):
+        component = rng.choice(components)
+        product_code = f'{component[:3].upper()}-{rng.randint(1000, 9999)}{rng.choice("ABCDEFGH")}'
+        error_code = f'E{rng.randint(100, 999)}-{rng.randint(10, 99)}'
+        version = f'v{rng.randint(1, 9)}.{rng.randint(0, 20)}.{rng.randint(0, 9)}'
+        content = (
+            f'Troubleshooting the {component} {product_code}: if the {component} {rng.choice(symptoms)} '
+            f'with error {error_code} on firmware {version}, {rng.choice(actions)}'
+        )
+        segments.append({'id': segment_id, 'content': content, 'product_code': product_code, 'error_code': error_code})
+    return segments
+
+def generate_queries(segments, num_queries: int, seed: int):
+    rng = random.Random(seed + 1)
+    queries = []
+    for segment in rng.sample(segments, min(num_queries, len(segments))):
+        if rng.random() < 0.5:
+            text = f'What should I do about error {segment["error_code"]}?'
+        else:
+            text = f'How do I troubleshoot {segment["product_code"]}?'
+        queries.append((text, segment['id']))
+    return queries
+
+def percentile(values, q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description='Dense, lexical and hybrid retrieval benchmark')
+    parser.add_argument('--embeddings-config-id', type=int, required=True)
+    parser.add_argument('--segments', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=4)
+    parser.add_argument('--rrf-k', type=int, default=settings.DATASET_RRF_K)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    segments = generate_corpus(args.segments, args.seed)
+    queries = generate_queries(segments, args.queries, args.seed)
+    segment_ids = np.array([segment['id'] for segment in segments])
+
+    embeddings = get_embeddings(args.embeddings_config_id)
+    print(f'Embedding {len(segments)} segments...')
+    segment_vectors = np.array(embeddings.embed_documents([segment['content'] for segment in segments]), dtype=np.float32)
+    segment_vectors /= np.linalg.norm(segment_vectors, axis=1, keepdims=True)
+
+    def dense_search(query: str):
+        query_vector = np.array(embeddings.embed_query(query), dtype=np.float32)
+        similarities = segment_vectors @ (query_vector / np.linalg.norm(query_vector))
+        top = np.argpartition(-similarities, min(args.k, len(segments) - 1))[:args.k]
+        return [int(segment_ids[i]) for i in top[np.argsort(-similarities[top])]]
+
+    with tempfile.TemporaryDirectory() as index_path, ThreadPoolExecutor(max_workers=1) as lexical_searcher:
+        index = LexicalIndex(0, index_path)
+        start_time = time.perf_counter()
+        index.build((segment['id'], segment['content'], 'benchmark') for segment in segments)
+        print(f'Lexical index built in {(time.perf_counter() - start_time) * 1000:.1f}ms')
+
+        def lexical_search(query: str):
+            return [segment_id for segment_id, _, _ in index.search(query, args.k)]
+
+        def hybrid_search(query: str):
+            lexical_future = lexical_searcher.submit(lexical_search, query)
+            dense_result = dense_search(query)
+            fused = reciprocal_rank_fusion([dense_result, lexical_future.result()], args.rrf_k)
+            return [segment_id for segment_id, _ in fused[:args.k]]
+
+        for name, search in [('dense', dense_search), ('lexical', lexical_search), ('hybrid', hybrid_search)]:
+            hits = 0
+            timings = []
+            for query, relevant_segment_id in queries:
+                start_time = time.perf_counter()
+                result = search(query)
+                timings.append((time.perf_counter() - start_time) * 1000)
+                hits += relevant_segment_id in result
+            print(
+                f'{name}: recall@{args.k}:{hits / len(queries):.3f} '
+                f'mean:{sum(timings) / len(timings):.1f}ms p95:{percentile(timings, 95):.1f}ms'
+            )
+
+if __name__ == '__main__':
+    main()
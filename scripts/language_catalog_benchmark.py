@@ -0,0 +1,81 @@
+"""
+Benchmark of looking up language and prompt content.
+
+Compares the previous lookup, which checked for prompt.py and reloaded the prompt module on every prompt
+lookup and walked the nested language packs on every message lookup, with the compiled catalog of
+`get_language_content`. Reports the mean cost per lookup of a prompt, with and without the language notice,
+and of a nested message. Both lookups resolve the language without a current user, so that only the catalog
+is measured.
+
+Usage:
+    python scripts/language_catalog_benchmark.py --lookups 10000
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).absolute().parent.parent))
+
+import languages
+from languages import get_language_content, language_packs, prompt_keys
+
+def get_language_content_without_catalog(key: str, append_ret_lang_prompt: bool = True):
+    """
+    The lookup before the catalog, without the language notice, which is unchanged.
+    """
+    try:
+        from api.utils.auth import get_current_language
+        current_language = get_current_language(int(os.getenv('ACTUAL_USER_ID', 0)))
+    except:
+        current_language = 'en'
+    keys = key.split('.')
+    if key in prompt_keys:
+        if not os.path.exists(languages.prompt_file_path):
+            languages._create_prompt_file()
+        if 'prompt' in sys.modules:
+            prompt_module = importlib.reload(sys.modules['prompt'])
+        else:
+            import prompt as prompt_module
+        if key in prompt_module.PROMPTS:
+            return prompt_module.PROMPTS[key]
+        current_language = 'en'
+    content = language_packs.get(current_language, {})
+    for k in keys:
+        if isinstance(content, dict):
+            content = content.get(k, None)
+        else:
+            return None
+    if isinstance(content, dict):
+        return content.copy()
+    return content
+
+def measure(lookup, key: str, num_lookups: int, **kwargs) -> float:
+    lookup(key, **kwargs)
+    start_time = time.perf_counter()
+    for _ in range(num_lookups):
+        lookup(key, **kwargs)
+    return (time.perf_counter() - start_time) / num_lookups * 1_000_000
+
+def main():
+    parser = argparse.ArgumentParser(description='Language catalog benchmark')
+    parser.add_argument('--lookups', type=int, default=10000)
+    parser.add_argument('--prompt-key', default='agent_system_prompt_common_prefix')
+    parser.add_argument('--message-key', default='graph_validation_errors.node_missing_input')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(languages.prompt_file_path))
+    cases = [
+        ('prompt', args.prompt_key, {'append_ret_lang_prompt': False}),
+        ('nested message', args.message_key, {}),
+    ]
+    for name, key, kwargs in cases:
+        before = measure(get_language_content_without_catalog, key, args.lookups, **kwargs)
+        after = measure(get_language_content, key, args.lookups, **kwargs)
+        print(f'{name} ({key}): before:{before:.2f}us after:{after:.2f}us')
+    with_notice = measure(get_language_content, args.prompt_key, args.lookups)
+    print(f'prompt with language notice ({args.prompt_key}): {with_notice:.2f}us')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Check that logging does not block the event loop when the log sink is slow.
+
+Runs an event loop with a ticker that measures how late each tick is, while a coroutine emits log records in
+bursts, yielding to the event loop between bursts, to a sink that sleeps on every record. The records are first
+written by a synchronous handler, as before the log pipeline, then through a logger of the log pipeline, whose
+sink is slowed down the same way. Asserts that the worst tick lag with the log pipeline stays under the given
+limit, and reports the lag of both.
+
+Usage:
+    python scripts/log_pipeline_check.py --records 200 --sink-delay-ms 20 --max-lag-ms 50
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).absolute().parent.parent))
+
+from config import settings
+
+class SlowHandler(logging.Handler):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    def emit(self, record: logging.LogRecord) -> None:
+        time.sleep(self.delay)
+
+async def measure_lag(logger: logging.Logger, num_records: int, burst: int, tick: float) -> float:
+    """
+    Emits the records while ticking, and returns the worst tick lag in milliseconds.
+    """
+    max_lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_lag
+        while not done.is_set():
+            start_time = time.perf_counter()
+            await asyncio.sleep(tick)
+            max_lag = max(max_lag, time.perf_counter() - start_time - tick)
+
+    async def producer():
+        for index in range(num_records):
+            logger.info('record %d of the log pipeline check', index)
+            if index % burst == burst - 1:
+                await asyncio.sleep(0)
+        done.set()
+
+    await asyncio.gather(ticker(), producer())
+    return max_lag * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Log pipeline check')
+    parser.add_argument('--records', type=int, default=200)
+    parser.add_argument('--burst', type=int, default=10, help='Records emitted between two yields to the event loop')
+    parser.add_argument('--sink-delay-ms', type=float, default=20, help='Time the sink takes to write each record')
+    parser.add_argument('--tick-ms', type=float, default=5)
+    parser.add_argument('--max-lag-ms', type=float, default=50, help='Maximum tick lag allowed with the log pipeline')
+    args = parser.parse_args()
+
+    # Let every record through, so that both loggers write the same records
+    settings.LOG_RATE_LIMIT = 0
+    settings.LOG_QUEUE_SIZE = args.records + 1
+    import log
+
+    delay = args.sink_delay_ms / 1000
+    sync_logger = logging.getLogger('log-pipeline-check-sync')
+    sync_logger.setLevel(logging.INFO)
+    sync_logger.propagate = False
+    sync_logger.addHandler(SlowHandler(delay))
+    sync_lag = asyncio.run(measure_lag(sync_logger, args.records, args.burst, args.tick_ms / 1000))
+    print(f'synchronous handler: worst tick lag {sync_lag:.1f}ms')
+
+    router_emit = log.LogRouter.emit
+    def slow_emit(self, record: logging.LogRecord) -> None:
+        time.sleep(delay)
+        router_emit(self, record)
+    log.LogRouter.emit = slow_emit
+
+    pipeline_logger = log.Logger.get_logger('log-pipeline-check')
+    pipeline_logger.setLevel(logging.INFO)
+    pipeline_logger.propagate = False
+    pipeline_lag = asyncio.run(measure_lag(pipeline_logger, args.records, args.burst, args.tick_ms / 1000))
+    print(f'log pipeline: worst tick lag {pipeline_lag:.1f}ms')
+
+    start_time = time.perf_counter()
+    log.stop_log_pipeline()
+    print(f'log pipeline drained in {(time.perf_counter() - start_time) * 1000:.0f}ms after the burst')
+
+    assert pipeline_lag < args.max_lag_ms, \
+        f'Event loop blocked for {pipeline_lag:.1f}ms by the log pipeline, limit is {args.max_lag_ms}ms'
+    print('OK')
+
+if __name__ == '__main__':
+    main()
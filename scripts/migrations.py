@@ -3,7 +3,9 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).absolute().parent.parent))
 import time
 import pymysql
+from redis import Redis
 from config import settings
+from core.database.orm import TABLE_SCHEMA_VERSION_KEY
 
 MYSQL_HOST = settings.MYSQL_HOST
 MYSQL_PORT = settings.MYSQL_PORT
@@ -27,6 +29,21 @@ def wait_for_mysql():
             print("Waiting for MySQL to be ready...")
             time.sleep(2)
 
+def bump_table_schema_version():
+    """
+    Bumps the table schema version in Redis so that running processes invalidate their reflected table registry.
+    """
+    try:
+        redis = Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            password=settings.REDIS_PASSWORD
+        )
+        redis.incr(TABLE_SCHEMA_VERSION_KEY)
+    except Exception as e:
+        print(f"Failed to bump table schema version: {e}")
+
 def run_migrations():
     project_root = Path(__file__).absolute().parent.parent
     migrated_dir = project_root / "logs/migrations"
@@ -42,6 +59,7 @@ def run_migrations():
             password=MYSQL_PASSWORD,
             db=MYSQL_DB
         )
+        migrated = False
         try:
             migrations = sorted(os.listdir(migrations_dir))
             for migration in migrations:
@@ -58,8 +76,11 @@ def run_migrations():
                                 cursor.execute(statement)
                     connection.commit()
                     migrated_file.touch()
+                    migrated = True
         finally:
             connection.close()
+        if migrated:
+            bump_table_schema_version()
 
 if __name__ == "__main__":
     wait_for_mysql()
@@ -0,0 +1,172 @@
+"""
+Benchmark of authenticating requests with the principal cache.
+
+Serves a protected endpoint that authenticates the access token and looks up a message in the language of
+the user, with Redis replaced by an in-memory fake and the users table by an SQLite database, both of which
+sleep for the given latency on every call to stand in for the network round trip. Reports the requests per
+second and the Redis and database calls per request with the principal cache disabled and enabled, and
+checks that an invalidation published on logout makes the next request verify the token again.
+
+Usage:
+    python scripts/principal_cache_benchmark.py --requests 2000 --latency-ms 0.5
+"""
+import argparse
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).absolute().parent.parent))
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import api.utils.auth
+import api.utils.jwt
+import api.utils.principal_cache
+from api.utils.jwt import TokenData, create_access_token, get_current_user
+from api.utils.principal_cache import principal_cache
+from languages import get_language_content
+
+class FakePubSub:
+    def __init__(self, fake_redis: 'FakeRedis'):
+        self.fake_redis = fake_redis
+        self.messages = queue.Queue()
+
+    def subscribe(self, channel: str) -> None:
+        self.fake_redis.subscribers.setdefault(channel, []).append(self.messages)
+        self.messages.put({'type': 'subscribe', 'channel': channel, 'data': 1})
+
+    def listen(self):
+        while True:
+            yield self.messages.get()
+
+    def close(self) -> None:
+        pass
+
+class FakeRedis:
+    """
+    An in-memory stand-in of the Redis commands used by authentication, counting the calls.
+    """
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.data = {}
+        self.subscribers = {}
+        self.calls = 0
+
+    def _call(self) -> None:
+        self.calls += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def get(self, key: str):
+        self._call()
+        return self.data.get(key)
+
+    def set(self, key: str, value, ex: int = None) -> None:
+        self._call()
+        self.data[key] = value.encode('utf-8') if isinstance(value, str) else value
+
+    def delete(self, key: str) -> None:
+        self._call()
+        self.data.pop(key, None)
+
+    def publish(self, channel: str, message) -> None:
+        self._call()
+        for messages in self.subscribers.get(channel, []):
+            messages.put({'type': 'message', 'channel': channel, 'data': str(message).encode('utf-8')})
+
+    def pubsub(self) -> FakePubSub:
+        return FakePubSub(self)
+
+class SQLiteUsers:
+    """
+    A stand-in of the users model backed by an SQLite database, counting the queries.
+    """
+    connection = sqlite3.connect(':memory:', check_same_thread=False)
+    lock = threading.Lock()
+    latency = 0.0
+    calls = 0
+
+    @classmethod
+    def setup(cls, latency: float) -> None:
+        cls.latency = latency
+        cls.connection.execute(
+            'CREATE TABLE users (id INTEGER PRIMARY KEY, team_id INTEGER, nickname TEXT, language TEXT, status INTEGER)'
+        )
+        cls.connection.execute("INSERT INTO users VALUES (1, 1, 'benchmark', 'en', 1)")
+
+    def _query(self, sql: str, params: tuple):
+        SQLiteUsers.calls += 1
+        if SQLiteUsers.latency > 0:
+            time.sleep(SQLiteUsers.latency)
+        with SQLiteUsers.lock:
+            return SQLiteUsers.connection.execute(sql, params).fetchone()
+
+    def get_user_by_id(self, user_id: int):
+        row = self._query('SELECT team_id, id, nickname FROM users WHERE id = ? AND status = 1', (user_id,))
+        return {'team_id': row[0], 'id': row[1], 'nickname': row[2]} if row else None
+
+    def get_user_language(self, user_id: int) -> str:
+        return self._query('SELECT language FROM users WHERE id = ?', (user_id,))[0]
+
+    def commit(self) -> None:
+        pass
+
+app = FastAPI()
+
+@app.get('/protected')
+async def protected(userinfo: TokenData = Depends(get_current_user)):
+    return {'uid': userinfo.uid, 'msg': get_language_content('login_access_denied')}
+
+def run(client: TestClient, token: str, num_requests: int, fake_redis: FakeRedis):
+    headers = {'Authorization': f'Bearer {token}'}
+    fake_redis.calls = SQLiteUsers.calls = 0
+    start_time = time.perf_counter()
+    for _ in range(num_requests):
+        response = client.get('/protected', headers=headers)
+        assert response.status_code == 200, response.text
+    elapsed_time = time.perf_counter() - start_time
+    return num_requests / elapsed_time, fake_redis.calls / num_requests, SQLiteUsers.calls / num_requests
+
+def main():
+    parser = argparse.ArgumentParser(description='Principal cache benchmark')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=0.5, help='Simulated latency of each Redis and database call')
+    parser.add_argument('--ttl', type=int, default=30, help='Principal cache TTL in seconds')
+    args = parser.parse_args()
+
+    fake_redis = FakeRedis(args.latency_ms / 1000)
+    SQLiteUsers.setup(args.latency_ms / 1000)
+    for module in [api.utils.jwt, api.utils.auth, api.utils.principal_cache]:
+        module.redis = fake_redis
+    api.utils.jwt.Users = api.utils.auth.Users = SQLiteUsers
+
+    token = create_access_token(data={'uid': 1, 'team_id': 1, 'nickname': 'benchmark'})
+    fake_redis.set('access_token:1', token)
+    fake_redis.set('user_language:1', 'en')
+
+    with TestClient(app) as client:
+        principal_cache.ttl = 0
+        rps, redis_calls, db_calls = run(client, token, args.requests, fake_redis)
+        print(f'without cache: {rps:.0f} requests/s, {redis_calls:.2f} Redis calls and {db_calls:.2f} queries per request')
+
+        principal_cache.ttl = args.ttl
+        principal_cache._ensure_listener()
+        while not principal_cache._subscribed.wait(1):
+            pass
+        rps, redis_calls, db_calls = run(client, token, args.requests, fake_redis)
+        print(f'with cache: {rps:.0f} requests/s, {redis_calls:.2f} Redis calls and {db_calls:.2f} queries per request')
+
+        # A logout in another process deletes the token and publishes an invalidation,
+        # so the next request in this process verifies the token against Redis and is rejected
+        fake_redis.delete('access_token:1')
+        fake_redis.publish(principal_cache.channel, 1)
+        time.sleep(0.1)
+        response = client.get('/protected', headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 401, f'Token should be rejected after logout, got {response.status_code}'
+        print('token rejected after invalidation: OK')
+
+if __name__ == '__main__':
+    main()
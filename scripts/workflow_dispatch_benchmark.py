@@ -0,0 +1,98 @@
+"""
+Benchmark of the workflow scheduler dispatch of a wide level.
+
+Compares dispatching the edges of one level one by one (source execution query, node execution insert
+and `apply_async` per edge) with the batched dispatch of the scheduler (one source execution query,
+one bulk insert and one Celery group). The tasks are sent to a separate queue that no worker consumes,
+which is purged afterwards, and the inserted node execution records are deleted.
+
+Requires the local Redis/MySQL from the environment configuration and an existing app run.
+
+Usage:
+    python scripts/workflow_dispatch_benchmark.py --app-run-id 1 --width 50 --rounds 5
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from uuid import uuid4
+sys.path.append(str(Path(__file__).absolute().parent.parent))
+os.environ['DATABASE_AUTO_COMMIT'] = 'True'
+
+from celery import group
+
+from celery_app import celery_app, run_workflow_node
+from core.database.models import AppNodeExecutions, AppRuns
+
+benchmark_queue = 'workflow_dispatch_benchmark'
+
+def create_node_exec_data(run, index: int):
+    return {
+        'workflow_id': run['workflow_id'],
+        'user_id': run['user_id'],
+        'app_run_id': run['id'],
+        'type': run['type'],
+        'level': 0,
+        'child_level': 0,
+        'edge_id': f'benchmark_edge_{index}',
+        'pre_node_id': 'benchmark_source',
+        'node_id': f'benchmark_node_{index}',
+        'node_type': 'custom_code',
+        'node_name': f'Benchmark {index}',
+        'node_graph': {},
+        'status': 2,
+        'need_human_confirm': 0
+    }
+
+def create_signature(exec_id: int):
+    return run_workflow_node.signature(kwargs={'node_exec_id': exec_id}, task_id=str(uuid4()), queue=benchmark_queue)
+
+def dispatch_serial(run, width: int):
+    app_node_exec = AppNodeExecutions()
+    exec_ids = []
+    for index in range(width):
+        app_node_exec.get_node_successful_execution(run['id'], 'benchmark_source')
+        exec_id = app_node_exec.insert(create_node_exec_data(run, index))
+        create_signature(exec_id).apply_async()
+        exec_ids.append(exec_id)
+    return exec_ids
+
+def dispatch_batched(run, width: int):
+    app_node_exec = AppNodeExecutions()
+    app_node_exec.get_nodes_successful_executions(run['id'], ['benchmark_source'])
+    exec_ids = app_node_exec.insert_many([create_node_exec_data(run, index) for index in range(width)])
+    group([create_signature(exec_id) for exec_id in exec_ids]).apply_async()
+    return exec_ids
+
+def main():
+    parser = argparse.ArgumentParser(description='Workflow level dispatch benchmark')
+    parser.add_argument('--app-run-id', type=int, required=True)
+    parser.add_argument('--width', type=int, default=50, help='Number of edges of the level')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    run = AppRuns().select_one(
+        columns=['id', 'user_id', 'workflow_id', 'type'],
+        conditions=[{'column': 'id', 'value': args.app_run_id}]
+    )
+    if not run:
+        sys.exit(f'App run {args.app_run_id} not found')
+
+    exec_ids = []
+    try:
+        for name, dispatch in [('serial', dispatch_serial), ('batched', dispatch_batched)]:
+            timings = []
+            for _ in range(args.rounds):
+                start_time = time.perf_counter()
+                exec_ids.extend(dispatch(run, args.width))
+                timings.append(time.perf_counter() - start_time)
+            print(f'{name}: width:{args.width} min:{min(timings) * 1000:.1f}ms avg:{sum(timings) / len(timings) * 1000:.1f}ms')
+    finally:
+        with celery_app.connection_for_write() as connection:
+            connection.default_channel.queue_purge(benchmark_queue)
+        for i in range(0, len(exec_ids), 500):
+            AppNodeExecutions().delete({'column': 'id', 'op': 'in', 'value': exec_ids[i:i + 500]})
+
+if __name__ == '__main__':
+    main()
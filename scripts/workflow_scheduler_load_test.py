@@ -0,0 +1,125 @@
+"""
+Load test for the workflow scheduler.
+
+Starts several `task/workflow_run.py` scheduler processes, creates many concurrent runs of a small workflow app
+and waits until all of them have finished. Optionally kills one scheduler while the runs are in progress,
+so its in-flight tasks have to be adopted by the remaining schedulers once its run leases expire.
+
+Requires the local Redis/MySQL from the environment configuration, running Celery workers and a published
+workflow app without human confirmation nodes, e.g. a start node connected to an end node.
+
+Usage:
+    python scripts/workflow_scheduler_load_test.py --team-id 1 --user-id 1 --app-id 1 --inputs '{...}' --runs 1000 --schedulers 4 --kill-after 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+sys.path.append(str(Path(__file__).absolute().parent.parent))
+os.environ['DATABASE_AUTO_COMMIT'] = 'True'
+
+from core.database.models import AppRuns, AppNodeExecutions
+from core.workflow import start_workflow
+
+project_root = Path(__file__).absolute().parent.parent
+
+def start_schedulers(count: int):
+    return [
+        subprocess.Popen([sys.executable, str(project_root.joinpath('task', 'workflow_run.py'))], cwd=project_root,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for _ in range(count)
+    ]
+
+def create_runs(args):
+    inputs = json.loads(args.inputs)
+
+    def create_run(index: int) -> int:
+        result = start_workflow(args.team_id, args.user_id, args.app_id, 1, f'Scheduler_Load_Test_{index}', inputs)
+        return result['app_run_id']
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        return list(executor.map(create_run, range(args.runs)))
+
+def get_runs(app_run_ids):
+    runs = []
+    for i in range(0, len(app_run_ids), 500):
+        runs.extend(AppRuns().select(
+            columns=['id', 'status', 'created_time', 'finished_time'],
+            conditions=[{'column': 'id', 'op': 'in', 'value': app_run_ids[i:i + 500]}]
+        ))
+    return runs
+
+def get_duplicate_node_executions(app_run_ids):
+    duplicates = []
+    for i in range(0, len(app_run_ids), 500):
+        duplicates.extend(AppNodeExecutions().select(
+            aggregates={'id': 'count'},
+            columns=['app_run_id', 'edge_id', 'node_id'],
+            conditions=[{'column': 'app_run_id', 'op': 'in', 'value': app_run_ids[i:i + 500]}],
+            group_by='app_run_id, edge_id, node_id',
+            having='count(id) > 1'
+        ))
+    return duplicates
+
+def percentile(values, p):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+def main():
+    parser = argparse.ArgumentParser(description='Workflow scheduler load test')
+    parser.add_argument('--team-id', type=int, required=True)
+    parser.add_argument('--user-id', type=int, required=True)
+    parser.add_argument('--app-id', type=int, required=True)
+    parser.add_argument('--inputs', type=str, required=True, help='Workflow inputs as a JSON object variable')
+    parser.add_argument('--runs', type=int, default=1000)
+    parser.add_argument('--schedulers', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=50, help='Number of threads creating runs')
+    parser.add_argument('--kill-after', type=float, default=0, help='Kill one scheduler after this many seconds (0: never)')
+    parser.add_argument('--timeout', type=float, default=600)
+    args = parser.parse_args()
+
+    schedulers = start_schedulers(args.schedulers)
+    print(f'Started {len(schedulers)} schedulers')
+    try:
+        start_time = time.time()
+        app_run_ids = create_runs(args)
+        print(f'Created {len(app_run_ids)} runs in {time.time() - start_time:.2f}s')
+
+        killed = False
+        while True:
+            runs = get_runs(app_run_ids)
+            finished = [run for run in runs if run['status'] in [3, 4]]
+            elapsed = time.time() - start_time
+            print(f'{elapsed:.1f}s finished:{len(finished)}/{len(app_run_ids)}')
+            if len(finished) == len(app_run_ids) or elapsed > args.timeout:
+                break
+            if args.kill_after and not killed and elapsed >= args.kill_after:
+                schedulers[0].kill()
+                killed = True
+                print(f'Killed scheduler pid:{schedulers[0].pid}')
+            time.sleep(1)
+
+        total_time = time.time() - start_time
+        latencies = [(run['finished_time'] - run['created_time']).total_seconds() for run in finished if run['finished_time']]
+        duplicates = get_duplicate_node_executions(app_run_ids)
+        print(f'Total time: {total_time:.2f}s')
+        print(f'Succeeded: {len([run for run in finished if run["status"] == 3])}')
+        print(f'Failed: {len([run for run in finished if run["status"] == 4])}')
+        print(f'Unfinished: {len(app_run_ids) - len(finished)}')
+        print(f'Throughput: {len(finished) / total_time:.2f} runs/s')
+        print(f'Latency p50:{percentile(latencies, 50):.2f}s p95:{percentile(latencies, 95):.2f}s p99:{percentile(latencies, 99):.2f}s')
+        print(f'Duplicate node executions: {len(duplicates)}')
+    finally:
+        for scheduler in schedulers:
+            scheduler.terminate()
+        for scheduler in schedulers:
+            scheduler.wait()
+
+if __name__ == '__main__':
+    main()
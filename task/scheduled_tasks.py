@@ -35,6 +35,7 @@ from core.workflow.variables import validate_required_variable, create_variable_
 from core.workflow.graph import create_graph_from_dict
 from core.database.models import Apps, Workflows, AppRuns, AppNodeUserRelation, NonLLMRecords, UploadFiles
 from core.database.models.chatroom_driven_records import ChatroomDrivenRecords
+from core.helper import notify_workflow_scheduler
 from copy import deepcopy
 from log import Logger
 
@@ -162,6 +163,7 @@ class ScheduledTaskExecutor:
             AppNodeUserRelation().create_data(app_run_id, node_confirm_users)
         
         Apps().increment_execution_times(app_id)
+        notify_workflow_scheduler(app_run_id)
         
         return {'app_id': app_id, 'workflow_id': workflow['id'], 'app_run_id': app_run_id}
     
@@ -1,21 +1,23 @@
 """
 This script is designed to execute node tasks within a workflow.
 """
-import json, os, sys, time, threading, traceback
+import itertools, json, os, sys, time, socket, threading, traceback, uuid
 os.environ['DATABASE_AUTO_COMMIT'] = 'True'
 from datetime import datetime
 from pathlib import Path
 sys.path.append(str(Path(__file__).absolute().parent.parent))
 
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any
 from log import Logger
 from core.database import redis
-from core.database.models import AppRuns, AppNodeExecutions, AppNodeUserRelation, CustomTools, UploadFiles, Users
-from core.tool.sandbox_tool_runner import SandboxToolRunner
+from core.database.models import AppRuns, AppNodeExecutions, AppNodeUserRelation, AppRunContextRecords, CustomTools, UploadFiles, Users
+from core.tool.sandbox_tool_registry import sandbox_tool_registry
 from core.workflow import *
 from core.workflow.nodes import *
+from celery import group
 from celery_app import run_workflow_node
-from core.helper import push_to_websocket_queue, get_websocket_queue_length
+from core.helper import convert_json_to_basic_types, push_to_websocket_queue_batch, notify_workflow_scheduler, wait_for_queue_items
+from config import settings
 from languages import get_language_content
 
 logger = Logger.get_logger('workflow_run')
@@ -25,10 +27,53 @@ global_tasks = [] # List to store tasks
 running = True  # Global flag to control thread loops
 level_tasks = {}  # Dictionary to store tasks status for each level
 
+# Run ownership.
+# Each app run is processed by the scheduler process holding its lease, so any number of scheduler processes can run in parallel.
+# A lease is held while the delay thread processes the run or while the run has in-flight tasks, and it is renewed by the heartbeat thread.
+# In-flight tasks are persisted per app run, so when a scheduler stops, another one adopts its tasks once the lease expires.
+scheduler_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'  # Unique ID of this scheduler process
+processing_runs = set()  # App run IDs currently being processed by the delay thread
+ownership_lock = threading.RLock()  # Lock for ownership changes of app runs
+run_lease_key = 'workflow_run_lease:{}'  # Redis key of the app run lease, holding the owner scheduler ID
+run_tasks_key = 'workflow_run_tasks:{}'  # Redis hash of the in-flight tasks of an app run
+run_tasks_index_key = 'workflow_run_tasks_index'  # Redis set of the app run IDs with in-flight tasks
+
+websocket_message_lock = threading.Lock()  # Lock for the pending websocket messages
+pending_websocket_messages = {}  # Websocket messages waiting for the next flush, in push order
+websocket_message_sequence = itertools.count()  # Keys of the pending websocket messages that are not merged
+debug_message_detail_fields = ['inputs', 'outputs', 'outputs_md', 'prompt_data']  # Fields omitted from large debug messages
+
+# Acquire the lease if it is free, or renew it if it is already held by this scheduler
+claim_run_script = redis.register_script("""
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+if redis.call('set', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+    return 1
+end
+return 0
+""")
+# Release the lease only if it is still held by this scheduler
+release_run_script = redis.register_script("""
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+""")
+# Remove a persisted task and drop the app run from the index once it has no more in-flight tasks
+remove_persisted_task_script = redis.register_script("""
+redis.call('hdel', KEYS[1], ARGV[1])
+if redis.call('hlen', KEYS[1]) == 0 then
+    redis.call('srem', KEYS[2], ARGV[2])
+end
+return 1
+""")
+
 # Database models
 app_run = AppRuns()
 app_node_exec = AppNodeExecutions()
 app_node_user_relation = AppNodeUserRelation()
+context_records = AppRunContextRecords()
 users_model = Users()
 
 def update_app_run(app_run_id: int, data: dict) -> bool:
@@ -42,7 +87,75 @@ def update_app_run(app_run_id: int, data: dict) -> bool:
     data_copy = data.copy()
     if data_copy.get('need_human_confirm', None) == 0 and app_node_exec.has_human_confirm_node(app_run_id):
         data_copy.pop('need_human_confirm')
-    return app_run.update(conditions={'column': 'id', 'value': app_run_id}, data=data_copy)
+    result = app_run.update(conditions={'column': 'id', 'value': app_run_id}, data=data_copy)
+    if data_copy.get('status') in [3, 4]:
+        context_records.materialize(app_run_id)  # Write the full context into the app run record once the run has finished
+    return result
+
+def claim_run(app_run_id: int) -> bool:
+    """
+    Acquires or renews the lease of an app run for this scheduler.
+
+    :param app_run_id: The ID of the app run.
+    :return: True if this scheduler owns the app run, False if it is owned by another scheduler.
+    """
+    return bool(claim_run_script(keys=[run_lease_key.format(app_run_id)], args=[scheduler_id, settings.WORKFLOW_RUN_LEASE_TTL]))
+
+def release_run(app_run_id: int):
+    """
+    Releases the lease of an app run unless it is still being processed or has in-flight tasks.
+
+    :param app_run_id: The ID of the app run.
+    """
+    with ownership_lock:
+        if app_run_id in processing_runs or app_run_id in level_tasks:
+            return
+        release_run_script(keys=[run_lease_key.format(app_run_id)], args=[scheduler_id])
+
+def get_run_owner(app_run_id: int) -> Optional[str]:
+    """
+    Gets the ID of the scheduler owning an app run.
+
+    :param app_run_id: The ID of the app run.
+    :return: The owner scheduler ID, or None if the app run is not owned.
+    """
+    owner = redis.get(run_lease_key.format(app_run_id))
+    return owner.decode() if owner else None
+
+def claim_runs(runs: List[Dict[str, Any]], notified_app_run_ids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Claims the given runnable app runs for processing by the delay thread.
+    Notifications for app runs owned by other schedulers are forwarded to their owners.
+
+    :param runs: The runnable app runs.
+    :param notified_app_run_ids: The app run IDs received from the schedule queue.
+    :return: The app runs claimed by this scheduler.
+    """
+    claimed_runs = []
+    for run in runs:
+        app_run_id = run['app_run_id']
+        with ownership_lock:
+            if claim_run(app_run_id):
+                processing_runs.add(app_run_id)
+                claimed_runs.append(run)
+                continue
+        if str(app_run_id) in notified_app_run_ids:
+            owner = get_run_owner(app_run_id)
+            if owner:
+                notify_workflow_scheduler(app_run_id, owner)
+    return claimed_runs
+
+def release_runs(runs: List[Dict[str, Any]]):
+    """
+    Finishes the processing of app runs by the delay thread and releases the leases that are no longer needed.
+
+    :param runs: The app runs claimed by `claim_runs`.
+    """
+    for run in runs:
+        app_run_id = run['app_run_id']
+        with ownership_lock:
+            processing_runs.discard(app_run_id)
+        release_run(app_run_id)
 
 def update_node_exec(exec_id: int, data: dict) -> bool:
     """
@@ -85,7 +198,7 @@ def skip_edges_from_node(node_id, edge_maps, skipped_edges):
             else:
                 logger.debug(f"Can not skip node:{edge.target_node_id} as there are other edges leading to it not skipped")
                 
-def create_celery_task(
+def prepare_celery_task(
     team_id: int,
     app_id: int,
     app_name: str,
@@ -104,13 +217,12 @@ def create_celery_task(
     task_data: Optional[Dict[str, Any]] = None,
     task_operation: str = '', 
     parent_exec_id: int = 0,
-    context: Optional[Context] = None,
-    ancestor_context: Optional[Context] = None,
+    context_node_ids: Optional[List[str]] = None,
     correct_llm_output: bool = False,
     override_rag_input: Optional[str] = None
-):
+) -> Dict[str, Any]:
     """
-    Creates a Celery task to execute a node asynchronously.
+    Prepares a Celery task to execute a node asynchronously. The task is sent by `dispatch_celery_tasks`.
     
     :param team_id: The ID of the team.
     :param app_id: The ID of the app.
@@ -128,55 +240,199 @@ def create_celery_task(
     :param task_data: A dictionary containing task-specific information.
     :param task_operation: The task operation.
     :param parent_exec_id: The ID of the parent node execution record.
-    :param context: The context object.
-    :param ancestor_context: The ancestor context object.
+    :param context_node_ids: The IDs of the nodes whose context records are passed to the node.
     :param correct_llm_output: Flag to indicate if correct LLM output is found.
     :param override_rag_input: The input to override the RAG input.
+    :return: A dictionary containing the task ID, the Celery signature, the persisted task record and the task item.
     """
     level = edge.level if edge else 0
-    # Execute the node asynchronously using Celery
-    task = run_workflow_node.delay(
-        node_dict=node.to_dict(), 
-        context_dict=ancestor_context.to_dict() if ancestor_context else None, 
-        app_id=app_id,
-        workflow_id=workflow_id,
-        user_id=user_id,
-        app_run_id=app_run_id,
-        type=run_type,
-        node_exec_id=exec_id,
-        edge_id=edge.id if edge else None,
-        source_node_type=edge.source_node_type if edge else None,
-        level=level,
-        task_level=task_level,
-        task=task_data,
-        correct_llm_output=correct_llm_output,
-        override_rag_input=override_rag_input
-    )
-    # Add task to global tasks list
-    global_tasks.append((task, team_id, app_user_id, app_name, icon, icon_background, app_run_id, run_name, level, edge if edge else None, node, context if context else None, exec_id, task_operation, parent_exec_id))
-    # Add task to level tasks dictionary
-    if app_run_id not in level_tasks:
-        level_tasks[app_run_id] = {}
-    if level not in level_tasks[app_run_id]:
-        level_tasks[app_run_id][level] = []
-    level_tasks[app_run_id][level].append(task.id)
-    logger.info(f"Task added for run:{app_run_id} level:{level} node:{node.id}:{node.data['type']}:{node.data['title']} task_id:{task.id}")
+    task_id = str(uuid.uuid4())
+    record = {
+        'team_id': team_id,
+        'app_user_id': app_user_id,
+        'app_name': app_name,
+        'icon': icon,
+        'icon_background': icon_background,
+        'run_name': run_name,
+        'level': level,
+        'edge': edge.to_dict() if edge else None,
+        'node': node.to_dict(),
+        'exec_id': exec_id,
+        'task_operation': task_operation,
+        'parent_exec_id': parent_exec_id
+    }
+    signature = run_workflow_node.signature(kwargs={
+        'node_dict': node.to_dict(),
+        'context_node_ids': context_node_ids,
+        'app_id': app_id,
+        'workflow_id': workflow_id,
+        'user_id': user_id,
+        'app_run_id': app_run_id,
+        'type': run_type,
+        'node_exec_id': exec_id,
+        'edge_id': edge.id if edge else None,
+        'source_node_type': edge.source_node_type if edge else None,
+        'level': level,
+        'task_level': task_level,
+        'task': task_data,
+        'correct_llm_output': correct_llm_output,
+        'override_rag_input': override_rag_input,
+        'scheduler_id': scheduler_id
+    }, task_id=task_id)
+    item = (run_workflow_node.AsyncResult(task_id), team_id, app_user_id, app_name, icon, icon_background, app_run_id, run_name, level, edge if edge else None, node, exec_id, task_operation, parent_exec_id)
+    return {'task_id': task_id, 'app_run_id': app_run_id, 'signature': signature, 'record': record, 'item': item}
+
+def dispatch_celery_tasks(prepared_tasks: List[Dict[str, Any]]):
+    """
+    Sends prepared Celery tasks as one group and adds them to the task cache.
+    The tasks are persisted before they are sent, so they can be adopted if this scheduler stops.
+
+    :param prepared_tasks: The tasks returned by `prepare_celery_task`.
+    """
+    if not prepared_tasks:
+        return
+    pipeline = redis.pipeline()
+    for prepared_task in prepared_tasks:
+        pipeline.hset(run_tasks_key.format(prepared_task['app_run_id']), prepared_task['task_id'], json.dumps(prepared_task['record']))
+        pipeline.sadd(run_tasks_index_key, prepared_task['app_run_id'])
+    pipeline.execute()
+    # Execute the nodes asynchronously using Celery
+    try:
+        group([prepared_task['signature'] for prepared_task in prepared_tasks]).apply_async()
+    except:
+        for prepared_task in prepared_tasks:
+            remove_persisted_task_script(keys=[run_tasks_key.format(prepared_task['app_run_id']), run_tasks_index_key], args=[prepared_task['task_id'], prepared_task['app_run_id']])
+        raise
+    for prepared_task in prepared_tasks:
+        add_task_cache(prepared_task['item'])
+        task, _, _, _, _, _, app_run_id, _, level, _, node, _, _, _ = prepared_task['item']
+        logger.info(f"Task added for run:{app_run_id} level:{level} node:{node.id}:{node.data['type']}:{node.data['title']} task_id:{task.id}")
+
+def create_celery_task(*args, **kwargs):
+    """
+    Creates a Celery task to execute a node asynchronously.
+    Takes the same arguments as `prepare_celery_task`.
+    """
+    dispatch_celery_tasks([prepare_celery_task(*args, **kwargs)])
+
+def add_task_cache(item):
+    """
+    Adds a task to the global tasks list and level tasks dictionary.
+
+    :param item: The task item to add.
+    """
+    task, _, _, _, _, _, app_run_id, _, level, _, _, _, _, _ = item
+    with ownership_lock:
+        # Add task to global tasks list
+        global_tasks.append(item)
+        # Add task to level tasks dictionary
+        if app_run_id not in level_tasks:
+            level_tasks[app_run_id] = {}
+        if level not in level_tasks[app_run_id]:
+            level_tasks[app_run_id][level] = []
+        level_tasks[app_run_id][level].append(task.id)
     
-def remove_task_cache(item):
+def remove_task_cache(item, persisted: bool = True):
     """
     Removes a task from the global tasks list and level tasks dictionary.
     
     :param item: The task item to remove.
+    :param persisted: Whether to also remove the persisted task. Tasks of app runs taken over by another scheduler are kept for adoption.
     """
-    global_tasks.remove(item)  # Remove task from global tasks list
-    task, _, _, _, _, _, app_run_id, _, level, _, _, _, _, _, _ = item
-    # Remove task from level tasks dictionary
-    level_tasks[app_run_id][level].remove(task.id)
-    if not level_tasks[app_run_id][level]:
-        del level_tasks[app_run_id][level]
-        if not level_tasks[app_run_id]:
-            del level_tasks[app_run_id]
-    
+    task, _, _, _, _, _, app_run_id, _, level, _, _, _, _, _ = item
+    if persisted:
+        remove_persisted_task_script(keys=[run_tasks_key.format(app_run_id), run_tasks_index_key], args=[task.id, app_run_id])
+    with ownership_lock:
+        if item not in global_tasks:
+            return
+        global_tasks.remove(item)  # Remove task from global tasks list
+        # Remove task from level tasks dictionary
+        level_tasks[app_run_id][level].remove(task.id)
+        if not level_tasks[app_run_id][level]:
+            del level_tasks[app_run_id][level]
+            if not level_tasks[app_run_id]:
+                del level_tasks[app_run_id]
+
+def adopt_orphaned_tasks():
+    """
+    Adopts the persisted in-flight tasks of app runs whose lease has expired, e.g. because their scheduler stopped.
+    """
+    for app_run_id in redis.smembers(run_tasks_index_key):
+        app_run_id = int(app_run_id)
+        # Hold the lock so the delay thread cannot dispatch tasks for the app run while they are being adopted
+        with ownership_lock:
+            if app_run_id in level_tasks or app_run_id in processing_runs or not claim_run(app_run_id):
+                continue
+            adopted_count = 0
+            for task_id, task_dict in redis.hgetall(run_tasks_key.format(app_run_id)).items():
+                task_dict = json.loads(task_dict)
+                edge = create_edge_from_dict(task_dict['edge']) if task_dict['edge'] else None
+                node = create_node_from_dict(task_dict['node'])
+                add_task_cache((run_workflow_node.AsyncResult(task_id.decode()), task_dict['team_id'], task_dict['app_user_id'], task_dict['app_name'], task_dict['icon'], task_dict['icon_background'],
+                    app_run_id, task_dict['run_name'], task_dict['level'], edge, node, task_dict['exec_id'], task_dict['task_operation'], task_dict['parent_exec_id']))
+                adopted_count += 1
+            if adopted_count:
+                logger.info(f"Adopted {adopted_count} orphaned tasks for run:{app_run_id}")
+            else:
+                redis.srem(run_tasks_index_key, app_run_id)
+                release_run(app_run_id)
+
+def lease_heartbeat_thread():
+    """
+    Renews the leases of the app runs owned by this scheduler.
+    App runs whose lease has been taken over by another scheduler are dropped from the local task cache.
+    """
+    global running
+    while running:
+        with ownership_lock:
+            app_run_ids = processing_runs | set(level_tasks)
+        for app_run_id in app_run_ids:
+            try:
+                if not claim_run(app_run_id):
+                    logger.warning(f"Lease lost for run:{app_run_id}, dropping its tasks")
+                    for item in [item for item in list(global_tasks) if item[6] == app_run_id]:
+                        remove_task_cache(item, False)
+            except Exception:
+                logger.error(f"Error renewing lease for run:{app_run_id} {traceback.format_exc()}")
+        time.sleep(settings.WORKFLOW_RUN_LEASE_TTL / 3)
+
+def queue_websocket_message(message: Dict[str, Any], coalesce_key: Optional[tuple] = None):
+    """
+    Queues a websocket message to be published with the next flush of the websocket message thread.
+    A message with a coalesce key replaces the pending message with the same key, and is moved to the end of the queue.
+
+    :param message: The websocket message.
+    :param coalesce_key: The key of the messages that can be merged, e.g. the progress messages of an app run for a user.
+    """
+    key = coalesce_key if coalesce_key else next(websocket_message_sequence)
+    with websocket_message_lock:
+        pending_websocket_messages.pop(key, None)
+        pending_websocket_messages[key] = message
+
+def flush_websocket_messages():
+    """
+    Publishes all pending websocket messages in one Redis pipeline.
+    """
+    global pending_websocket_messages
+    with websocket_message_lock:
+        messages = list(pending_websocket_messages.values())
+        pending_websocket_messages = {}
+    if messages:
+        push_to_websocket_queue_batch(messages)
+        logger.debug(f"Websocket messages flushed count:{len(messages)}")
+
+def websocket_message_thread():
+    """
+    Flushes the pending websocket messages at a fixed interval.
+    """
+    global running
+    while running:
+        time.sleep(settings.WORKFLOW_MESSAGE_FLUSH_INTERVAL)
+        try:
+            flush_websocket_messages()
+        except Exception:
+            logger.error(f"Error flushing websocket messages {traceback.format_exc()}")
+
 def push_workflow_debug_message(
     user_id: int,
     app_id: int,
@@ -273,6 +529,13 @@ def push_workflow_debug_message(
             #                 "file_path": full_path
             #             })
             node_exec_data['file_list'] = file_list
+
+    # Large inputs and outputs are left out, the client fetches them from the node info API
+    details = {field: node_exec_data[field] for field in debug_message_detail_fields if node_exec_data.get(field)}
+    if details and len(json.dumps(convert_json_to_basic_types(details), ensure_ascii=False)) > settings.WORKFLOW_DEBUG_MESSAGE_MAX_DETAILS_SIZE:
+        for field in details:
+            node_exec_data[field] = None
+        node_exec_data['details_omitted'] = 1
     
     queue_data = {
         'user_id': user_id,
@@ -311,8 +574,8 @@ def push_workflow_debug_message(
             }
         }
     }
-    push_to_websocket_queue(queue_data)
-    logger.info(f"Debug message pushed for run:{app_run_id} node:{node.id}:{node.data['type']}:{node.data['title']} exec_id:{node_exec_id} data:{queue_data} queue_length:{get_websocket_queue_length()}")
+    queue_websocket_message(queue_data)
+    logger.info(f"Debug message pushed for run:{app_run_id} node:{node.id}:{node.data['type']}:{node.data['title']} exec_id:{node_exec_id} status:{status} details_omitted:{node_exec_data.get('details_omitted', 0)}")
     
 def push_workflow_progress_message(
     app_user_id: int, 
@@ -335,6 +598,7 @@ def push_workflow_progress_message(
 ):
     """
     Pushes a workflow progress message to the websocket queue for the specified users.
+    A pending progress message of the same run and user that has not been flushed yet is replaced.
     Args:
         app_user_id (int): The ID of the application user.
         user_id (int): The ID of the user.
@@ -377,8 +641,8 @@ def push_workflow_progress_message(
                 'need_human_confirm': need_human_confirm
             }
         }
-        push_to_websocket_queue(queue_data)
-        logger.info(f"Progress message pushed for user_id:{user_id} run:{app_run_id} data:{queue_data} queue_length:{get_websocket_queue_length()}")
+        queue_websocket_message(queue_data, ('workflow_run_progress', app_run_id, user_id))
+        logger.info(f"Progress message pushed for user_id:{user_id} run:{app_run_id} status:{run_status} completed_progress:{queue_data['data']['completed_progress']}")
 
 def push_human_confirm_message(
     user_id: int,
@@ -446,8 +710,8 @@ def push_human_confirm_message(
                 }
             }
         }
-        push_to_websocket_queue(data)
-        logger.info(f"Human confirm message pushed for user_id:{uid} run:{app_run_id} node:{node.id}:{node.data['type']}:{node.data['title']} exec_id:{exec_id} data:{data} queue_length:{get_websocket_queue_length()}")
+        queue_websocket_message(data)
+        logger.info(f"Human confirm message pushed for user_id:{uid} run:{app_run_id} node:{node.id}:{node.data['type']}:{node.data['title']} exec_id:{exec_id}")
 
     # If the actual runner is not in the confirmation users list, send a waiting message
     if run_type != 1 and run_status != 4 and user_id not in user_ids:
@@ -488,8 +752,8 @@ def push_human_confirm_message(
                 'waiting_users': waiting_users
             }
         }
-        push_to_websocket_queue(waiting_data)
-        logger.info(f"Waiting confirm message pushed for runner user_id:{user_id} run:{app_run_id} node:{node.id}:{node.data['type']}:{node.data['title']} exec_id:{exec_id} waiting_users:{waiting_users} queue_length:{get_websocket_queue_length()}")
+        queue_websocket_message(waiting_data)
+        logger.info(f"Waiting confirm message pushed for runner user_id:{user_id} run:{app_run_id} node:{node.id}:{node.data['type']}:{node.data['title']} exec_id:{exec_id} waiting_users:{waiting_users}")
 
 def push_remove_human_confirm_message(
     user_id: int,
@@ -519,8 +783,8 @@ def push_remove_human_confirm_message(
             }
         }
     }
-    push_to_websocket_queue(data)
-    logger.info(f"Remove human confirm message pushed for user_id:{user_id} run:{app_run_id} exec_id:{exec_id} data:{data} queue_length:{get_websocket_queue_length()}")
+    queue_websocket_message(data)
+    logger.info(f"Remove human confirm message pushed for user_id:{user_id} run:{app_run_id} exec_id:{exec_id}")
 
 def push_node_exec_message(
     user_id: int,
@@ -553,8 +817,8 @@ def push_node_exec_message(
             'msg': msg
         }
     }
-    push_to_websocket_queue(data)
-    logger.info(f"Installing dependencies message pushed for user_id:{user_id} run:{app_run_id} exec_id:{exec_id} data:{data} queue_length:{get_websocket_queue_length()}")
+    queue_websocket_message(data)
+    logger.info(f"Installing dependencies message pushed for user_id:{user_id} run:{app_run_id} exec_id:{exec_id} msg:{msg}")
 
 def check_if_node_need_installing_dependencies(node: Node) -> bool:
     """
@@ -576,21 +840,96 @@ def check_if_node_need_installing_dependencies(node: Node) -> bool:
             category = node.data['tool']['tool_category']
         else:
             category = 't1'
-        current_file = os.path.realpath(__file__)
-        project_root = os.path.dirname(os.path.dirname(current_file))
-        sandbox_path = os.path.join(project_root, 'docker', 'sandbox')
-        tool_dir = os.path.join(sandbox_path, 'tools', category, provider)
-        runner = SandboxToolRunner()
-        dependencies = runner.load_requirements_from_file(tool_dir)
+        dependencies = sandbox_tool_registry.get_requirements(category, provider)
     return not SandboxBaseNode.check_venv_exists(dependencies)
 
+def dispatch_level_edges(run: Dict[str, Any], level: int, pending_edges: List[Dict[str, Any]], completed_steps: int, actual_completed_steps: int):
+    """
+    Inserts the node execution records of all pending edges of a level in bulk and sends their Celery tasks as one group.
+
+    :param run: The runnable app run.
+    :param level: The level of the edges.
+    :param pending_edges: The edges collected by the delay thread, with their target nodes and task parameters.
+    :param completed_steps: The completed steps of the app run.
+    :param actual_completed_steps: The actual completed steps of the app run.
+    """
+    team_id, app_user_id, user_id, app_id = run['team_id'], run['app_user_id'], run['user_id'], run['app_id']
+    workflow_id, app_run_id, run_type = run['workflow_id'], run['app_run_id'], run['type']
+
+    # Insert node execution records into the database
+    inserted_edges = [pending_edge for pending_edge in pending_edges if pending_edge['node_exec_data']]
+    if inserted_edges:
+        exec_ids = app_node_exec.insert_many([pending_edge['node_exec_data'] for pending_edge in inserted_edges])
+        for pending_edge, exec_id in zip(inserted_edges, exec_ids):
+            pending_edge['exec_id'] = exec_id
+
+    prepared_tasks = []
+    dispatched_edges = []
+    for pending_edge in pending_edges:
+        edge, target_node, exec_id = pending_edge['edge'], pending_edge['target_node'], pending_edge['exec_id']
+        if target_node.data['type'] == 'human' and pending_edge['human_node_run_status'] == 1:
+            # Push a workflow debug message to the WebSocket message queue
+            push_workflow_debug_message(user_id, app_id, workflow_id, app_run_id, run_type, level, edge, target_node, 1, None, completed_steps, actual_completed_steps, 1,
+                run['elapsed_time'], run['prompt_tokens'], run['completion_tokens'], run['total_tokens'], run['embedding_tokens'], run['reranking_tokens'],
+                run['total_steps'], run['created_time'], run['finished_time'], exec_id, 0, 0, {'status': 2, 'error': None, 'need_human_confirm': 1})
+            # Push human confirmation message to the WebSocket message queue
+            push_human_confirm_message(user_id, app_id, run['app_name'], run['icon'], run['icon_background'], workflow_id, app_run_id, run_type, run['run_name'], edge, target_node, exec_id)
+
+        if not (target_node.data['type'] == 'human' and pending_edge['human_node_run_status'] != 3):
+            prepared_tasks.append(prepare_celery_task(team_id, app_id, run['app_name'], run['icon'], run['icon_background'], workflow_id, app_user_id, user_id, app_run_id, run_type, run['run_name'],
+                exec_id, edge, target_node, pending_edge['task_level'], pending_edge['task_data'], pending_edge['task_operation'], pending_edge['parent_exec_id'],
+                pending_edge['ancestor_node_ids'], pending_edge['correct_llm_output'], pending_edge['override_rag_input']))
+            dispatched_edges.append(pending_edge)
+
+    # Execute the nodes asynchronously using Celery
+    dispatch_celery_tasks(prepared_tasks)
+
+    for pending_edge in dispatched_edges:
+        edge, target_node, exec_id = pending_edge['edge'], pending_edge['target_node'], pending_edge['exec_id']
+        if not (pending_edge['correct_llm_output'] or target_node.data['type'] == 'end' or (pending_edge['task_operation'] == 'assign_task' and pending_edge['task_level'] > 0)):
+            # Push a workflow debug message to the WebSocket message queue
+            push_workflow_debug_message(user_id, app_id, workflow_id, app_run_id, run_type, level, edge, target_node, 1, None, completed_steps, actual_completed_steps, 0,
+                run['elapsed_time'], run['prompt_tokens'], run['completion_tokens'], run['total_tokens'], run['embedding_tokens'], run['reranking_tokens'],
+                run['total_steps'], run['created_time'], run['finished_time'], exec_id, pending_edge['parent_exec_id'], 0, {'status': 2, 'error': None, 'need_human_confirm': 0})
+
+        if target_node.data['type'] in ['skill', 'custom_code', 'tool'] and check_if_node_need_installing_dependencies(target_node):
+            push_node_exec_message(
+                user_id, app_id, workflow_id, app_run_id, exec_id,
+                get_language_content('msg_preparing_environment', uid=user_id)
+            )
+
 def task_delay_thread():
     """
     Thread to process runnable workflow runs and execute node tasks.
+    Runs are scheduled as soon as their IDs are pushed to the schedule queue,
+    and all runnable runs are retrieved on every reconciliation sweep.
     """
     global running
+    next_sweep_time = 0
     while running:
-        runs = app_run.get_runnable_workflow_runs()  # Retrieve runnable workflow runs from the database
+        app_run_ids = []
+        timeout = next_sweep_time - time.monotonic()
+        if timeout > 0:
+            try:
+                app_run_ids = wait_for_queue_items([f'{settings.WORKFLOW_SCHEDULE_QUEUE_KEY}:{scheduler_id}', settings.WORKFLOW_SCHEDULE_QUEUE_KEY], timeout)
+            except Exception:
+                logger.error(f"Error waiting for workflow schedule notifications {traceback.format_exc()}")
+                time.sleep(1)
+                next_sweep_time = 0
+
+        if time.monotonic() >= next_sweep_time:
+            runs = app_run.get_runnable_workflow_runs()  # Retrieve all runnable workflow runs from the database
+            next_sweep_time = time.monotonic() + settings.WORKFLOW_RECONCILE_INTERVAL
+        elif app_run_ids:
+            runs = app_run.get_runnable_workflow_runs(list({int(app_run_id) for app_run_id in app_run_ids}))
+        else:
+            continue
+
+        try:
+            runs = claim_runs(runs, app_run_ids)  # Only process the runs owned by this scheduler
+        except Exception:
+            logger.error(f"Error claiming runs {traceback.format_exc()}")
+            continue
         # logger.debug(f"Runnable runs:{runs}")
         for run in runs:
             logger.info(f"Processing run id:{run['app_run_id']} type:{run['type']} level:{run['level']} completed_steps:{run['completed_steps']} actual_completed_steps:{run['actual_completed_steps']}")
@@ -610,11 +949,12 @@ def task_delay_thread():
                 actual_completed_steps = run['actual_completed_steps']  # Get actual completed steps
                 app_run_status = run['status']  # Get app run status
                 need_human_confirm = run['need_human_confirm']  # Get need human confirm flag
-                # Create a context object from the run's context dictionary
-                context = create_context_from_dict(run['context']) if run['context'] else Context()
                 edge_maps = graph.edges.build_edge_maps()  # Build edge maps for the graph
                 current_level_edge_count = 0  # Initialize the current level edge count
                 current_level_completed_edge_count = 0  # Initialize the current level completed edge count
+                run_progressed = False  # Whether edges were completed without dispatching tasks
+                app_run_updates = {}  # App run updates of skipped and waiting edges, written once for the level
+                pending_edges = []  # Edges to dispatch in one batch after all edges of the level have been processed
 
                 if level == 0: # start node
                     target_node = graph.nodes.nodes[0]  # Get the target node
@@ -644,6 +984,12 @@ def task_delay_thread():
 
                     continue
 
+                # Prefetch the source node executions of all edges of the level
+                source_node_executions = app_node_exec.get_nodes_successful_executions(
+                    app_run_id, list({edge.source_node_id for edge in graph.edges.edges if edge.level == level})
+                )
+                correct_llm_execution_ids = None  # Correct LLM output execution IDs of the level, fetched on first use
+
                 for edge in graph.edges.edges: # Iterate over edges starting from the completed steps
                     if edge.level != level: # Check if the source node level matches the run level
                         continue
@@ -657,7 +1003,8 @@ def task_delay_thread():
                     if edge.id in skipped_edges: # Check if the edge has been skipped
                         completed_edges.append(edge.id)
                         completed_steps += 1
-                        update_app_run(app_run_id, {'completed_edges': completed_edges, 'completed_steps': completed_steps})
+                        app_run_updates.update({'completed_edges': completed_edges, 'completed_steps': completed_steps})
+                        run_progressed = True
                         logger.debug(f"Edge already skipped for run:{app_run_id} edge:{edge.id}")
                         continue
 
@@ -671,7 +1018,7 @@ def task_delay_thread():
                     parent_exec_id = 0 # parent node execution ID
                     override_rag_input = None # override RAG input
 
-                    source_node_execution = app_node_exec.get_node_successful_execution(app_run_id, edge.source_node_id)
+                    source_node_execution = source_node_executions.get(edge.source_node_id)
                     if not source_node_execution: # Check if the source node execution record exists
                         logger.error(f"Source node execution record not found for run {app_run_id} edge {edge.id}")
                         raise Exception(f"Source node execution record not found for run {app_run_id} edge {edge.id}")
@@ -691,7 +1038,8 @@ def task_delay_thread():
                             # Update app run record to skip the edge
                             completed_edges.append(edge.id)
                             completed_steps += 1
-                            update_app_run(app_run_id, {'completed_edges': completed_edges, 'skipped_edges': skipped_edges, 'completed_steps': completed_steps})
+                            app_run_updates.update({'completed_edges': completed_edges, 'skipped_edges': skipped_edges, 'completed_steps': completed_steps})
+                            run_progressed = True
                             continue
 
                     # Get the task assignment level or task execution node
@@ -726,24 +1074,23 @@ def task_delay_thread():
                     # Check if the target node waits for all predecessors
                     for e in graph.edges.edges:
                         if e.level >= level and e.id != edge.id and e.target_node_id == target_node.id and e.id not in skipped_edges and e.id not in completed_edges:
-                            if e.level > level or app_node_exec.get_node_successful_execution(app_run_id, e.source_node_id):
+                            if e.level > level or e.source_node_id in source_node_executions:
                                 logger.debug(f"Wait edge:{e.id} for target node:{target_node.id}")
                                 all_predecessors_executed = False
                                 break
                             else:
                                 logger.debug(f"Predecessor not executed for edge:{e.id}")
                                 skipped_edges.append(e.id)
-                                update_app_run(app_run_id, {'skipped_edges': skipped_edges})
+                                app_run_updates.update({'skipped_edges': skipped_edges})
                     if not all_predecessors_executed:
                         completed_edges.append(edge.id)
                         completed_steps += 1
-                        update_app_run(app_run_id, {'completed_edges': completed_edges, 'completed_steps': completed_steps})
+                        app_run_updates.update({'completed_edges': completed_edges, 'completed_steps': completed_steps})
+                        run_progressed = True
                         continue
 
-                    # Create a context object from the run's context dictionary and filter records based on the ancestor node IDs
+                    # The worker only fetches the context records of the ancestor node IDs
                     ancestor_node_ids = graph.edges.get_all_ancestor_node_ids(parent_node.id if parent_node else target_node.id)
-                    ancestor_context = context.get_related_records(level, ancestor_node_ids)
-                    # logger.debug(f"Context for ancestor_node_ids:{ancestor_node_ids} records:{context.to_dict()}")
 
                     if app_run_status == 1:
                         update_app_run(app_run_id, {'status': 2}) # Update app run status to indicate it is running
@@ -751,7 +1098,9 @@ def task_delay_thread():
 
                     correct_llm_output = False # Flag to indicate if correct LLM output is found
                     if target_node.data['type'] in llm_correctable_node_types: # Check if the target node type is correctable
-                        correct_llm_output_execution_id, last_llm_execution_id = app_node_exec.get_correct_llm_output_execution_ids(app_run_id, level, edge.id)
+                        if correct_llm_execution_ids is None:
+                            correct_llm_execution_ids = app_node_exec.get_level_correct_llm_output_execution_ids(app_run_id, level)
+                        correct_llm_output_execution_id, last_llm_execution_id = correct_llm_execution_ids.get(edge.id, (0, 0))
                         if correct_llm_output_execution_id and last_llm_execution_id:
                             correct_llm_output = True
                             exec_id = correct_llm_output_execution_id
@@ -784,9 +1133,11 @@ def task_delay_thread():
                             update_app_run(app_run_id, {'status': 1, 'need_human_confirm': 1}) # Update app run record to indicate human confirmation is needed
                         logger.debug(f"Human node run status:{human_node_run_status}")
 
+                    node_exec_data = None
                     if not (correct_llm_output or (target_node.data['type'] == 'human' and human_node_run_status != 1)):
-                        # Prepare data for node execution record
+                        # Prepare data for node execution record, which is inserted with the other edges of the level
                         need_human_confirm = 1 if target_node.data['type'] == 'human' else 0
+                        exec_id = 0
                         node_exec_data = {
                             'workflow_id': workflow_id,
                             'user_id': user_id,
@@ -803,33 +1154,30 @@ def task_delay_thread():
                             'status': 2,  # Status indicating the node execution has started
                             'need_human_confirm': need_human_confirm
                         }
-                        exec_id = app_node_exec.insert(node_exec_data)  # Insert node execution record into the database
 
                     if target_node.data['type'] == 'human' and human_node_run_status == 1:
                         need_human_confirm = 1
-                        # Push a workflow debug message to the WebSocket message queue
-                        push_workflow_debug_message(user_id, app_id, workflow_id, app_run_id, run_type, level, edge, target_node, 1, None, completed_steps, actual_completed_steps, 1,
-                            run['elapsed_time'], run['prompt_tokens'], run['completion_tokens'], run['total_tokens'], run['embedding_tokens'], run['reranking_tokens'],
-                            run['total_steps'], run['created_time'], run['finished_time'], exec_id, 0, 0, {'status': 2, 'error': None, 'need_human_confirm': 1})
-                        # Push human confirmation message to the WebSocket message queue
-                        push_human_confirm_message(user_id, app_id, run['app_name'], run['icon'], run['icon_background'], workflow_id, app_run_id, run_type, run['run_name'], edge, target_node, exec_id)
 
-                    # Execute the node asynchronously using Celery
-                    if not (target_node.data['type'] == 'human' and human_node_run_status != 3):
-                        create_celery_task(team_id, app_id, run['app_name'], run['icon'], run['icon_background'], workflow_id, app_user_id, user_id, app_run_id, run_type, run['run_name'],
-                            exec_id, edge, target_node, task_level, task_data, task_operation, parent_exec_id, context, ancestor_context, correct_llm_output, override_rag_input)
-
-                        if not (correct_llm_output or target_node.data['type'] == 'end' or (task_operation == 'assign_task' and task_level > 0)):
-                            # Push a workflow debug message to the WebSocket message queue
-                            push_workflow_debug_message(user_id, app_id, workflow_id, app_run_id, run_type, level, edge, target_node, 1, None, completed_steps, actual_completed_steps, 0,
-                                run['elapsed_time'], run['prompt_tokens'], run['completion_tokens'], run['total_tokens'], run['embedding_tokens'], run['reranking_tokens'],
-                                run['total_steps'], run['created_time'], run['finished_time'], exec_id, parent_exec_id, 0, {'status': 2, 'error': None, 'need_human_confirm': 0})
-
-                        if target_node.data['type'] in ['skill', 'custom_code', 'tool'] and check_if_node_need_installing_dependencies(target_node):
-                            push_node_exec_message(
-                                user_id, app_id, workflow_id, app_run_id, exec_id,
-                                get_language_content('msg_preparing_environment', uid=user_id)
-                            )
+                    pending_edges.append({
+                        'edge': edge,
+                        'target_node': target_node,
+                        'exec_id': exec_id,
+                        'node_exec_data': node_exec_data,
+                        'human_node_run_status': human_node_run_status,
+                        'task_level': task_level,
+                        'task_data': task_data,
+                        'task_operation': task_operation,
+                        'parent_exec_id': parent_exec_id,
+                        'ancestor_node_ids': ancestor_node_ids,
+                        'correct_llm_output': correct_llm_output,
+                        'override_rag_input': override_rag_input
+                    })
+
+                if app_run_updates:
+                    # Write the updates before dispatching, so task callbacks cannot be overwritten by them
+                    update_app_run(app_run_id, app_run_updates)
+                if pending_edges:
+                    dispatch_level_edges(run, level, pending_edges, completed_steps, actual_completed_steps)
 
                 if current_level_edge_count == 0:
                     logger.error(f"No edges found for run:{app_run_id} level:{level}")
@@ -839,148 +1187,209 @@ def task_delay_thread():
                 if need_human_confirm == 0 and current_level_edge_count == current_level_completed_edge_count: # Check if all edges for the level have been completed
                     logger.debug(f"All edges completed for run:{app_run_id} level:{level}")
                     update_app_run(app_run_id, {'level': level + 1})
+                    run_progressed = True
+
+                if run_progressed and app_run_status == 1:
+                    notify_workflow_scheduler(app_run_id) # No task was dispatched, so schedule the run again
             except:
                 logger.error(f"Error processing run:{app_run_id} {traceback.format_exc()}")
 
-        time.sleep(1)
+        release_runs(runs)
+
+def process_task_result(item):
+    """
+    Processes the result of a finished Celery task and advances the corresponding app run.
+
+    :param item: The task item from the global tasks list.
+    """
+    task, team_id, app_user_id, app_name, icon, icon_background, app_run_id, run_name, level, edge, target_node, exec_id, task_operation, parent_exec_id = item
+    try:
+        result = task.get(timeout=task_timeout)  # Wait for the task to complete with a timeout
+        current_time = datetime.now()  # Current timestamp
+        logger.info(f"Task completed for run:{app_run_id} level:{level} node:{target_node.id}:{target_node.data['type']}:{target_node.data['title']} task_result:{result}")
+
+        run = app_run.get_running_app_run(app_run_id)  # Retrieve the running app run record
+        if not run:
+            logger.error(f"App run not found for run:{app_run_id}")
+            remove_task_cache(item)
+            return
+        completed_edges = run['completed_edges'] if run['completed_edges'] else []  # Get completed edges
+        completed_steps = run['completed_steps']  # Get completed steps
+        actual_completed_steps = run['actual_completed_steps']  # Get actual completed steps
+
+        if result['status'] == 'success':
+            # Process successful execution result
+            inputs = result['data'].get('inputs', None)
+            task_id = result['data'].get('task_id', None)
+            outputs = result['data'].get('outputs', None)
+            elapsed_time = float(result['data'].get('elapsed_time', 0))
+            prompt_tokens = result['data'].get('prompt_tokens', 0)
+            completion_tokens = result['data'].get('completion_tokens', 0)
+            total_tokens = result['data'].get('total_tokens', 0)
+            embedding_tokens = result['data'].get('embedding_tokens', 0)
+            reranking_tokens = result['data'].get('reranking_tokens', 0)
+
+            if inputs:
+                # Create input variable from input dictionary
+                input = create_variable_from_dict(inputs)
+                target_node.data['input'] = input  # Update target node with input variable
+            if outputs:
+                # Create output variable from result dictionary
+                output = create_variable_from_dict(outputs)
+                target_node.data['output'] = output  # Update target node with output variable
+            if edge:
+                if not task_operation or (task_operation == 'assign_task' and not task_id):
+                    completed_edges.append(edge.id)  # Add edge to completed edges
+                    completed_steps += 1  # Increment completed steps
+                    actual_completed_steps += 1  # Increment actual completed steps
+
+            if (not task_operation or (task_operation == 'assign_task' and not task_id)) and (target_node.data.get('input') or target_node.data.get('output')):
+                save_node_context(app_run_id, level, target_node)  # Save the context record of the node
+
+            need_human_confirm = 1 if target_node.data['type'] != 'human' and \
+                not (task_operation == 'assign_task' and task_id) and \
+                target_node.data.get('manual_confirmation', False) else 0
+            node_exec_data = {'status': 3, 'error': None, 'need_human_confirm': need_human_confirm, 'finished_time': current_time, **result['data']}
+            app_run_data = {
+                'completed_edges': completed_edges,
+                'completed_steps': completed_steps,
+                'actual_completed_steps': actual_completed_steps,
+                'need_human_confirm': need_human_confirm,
+                'error': None,
+                'elapsed_time': float(run['elapsed_time']) + elapsed_time,
+                'prompt_tokens': run['prompt_tokens'] + prompt_tokens,
+                'completion_tokens': run['completion_tokens'] + completion_tokens,
+                'total_tokens': run['total_tokens'] + total_tokens,
+                'embedding_tokens': run['embedding_tokens'] + embedding_tokens,
+                'reranking_tokens': run['reranking_tokens'] + reranking_tokens
+            }
+            if target_node.data['type'] == 'end':
+                # If the target node is an end node, update the app run record with completion details
+                app_run_data['outputs'] = outputs
+                app_run_data['status'] = 3  # Status indicating the app run has completed successfully
+                app_run_data['finished_time'] = current_time
+                # Set completed_steps to total_steps when workflow ends
+                app_run_data['completed_steps'] = run['total_steps']
+                redis.lpush(f'app_run_{app_run_id}_result', json.dumps({'status': 'success', 'data': outputs}))
+                redis.expire(f'app_run_{app_run_id}_result', 1)
+            elif run['status'] == 2 and len(level_tasks[app_run_id][level]) == 1:  # Check if all tasks for the level have completed
+                app_run_data['status'] = 1  # Status indicating the app run is still running
+                app_run_data['need_correct_llm'] = 0 # Reset the need correct LLM flag
+                if not task_operation or (task_operation == 'assign_task' and not task_id):
+                    app_run_data['level'] = level + 1 # Increment the level
+        else:
+            task_id = None
+            node_exec_data = {'status': 4, 'error': result['message'], 'need_human_confirm': 1}
+            app_run_data = {'status': 4, 'error': result['message'], 'need_human_confirm': 1}
+            redis.lpush(f'app_run_{app_run_id}_result', json.dumps({'status': 'failed', 'message': result['message']}))
+            redis.expire(f'app_run_{app_run_id}_result', 1)
+            if run['type'] == 2:
+                app_node_user_relation.add_node_user_relation(app_run_id, target_node.id, team_id, run['user_id'])
+
+        update_node_exec(exec_id, node_exec_data) # Update the node execution record with the new data
+        update_app_run(app_run_id, app_run_data) # Update the app run record with the new data
+        if app_run_data.get('status') == 1:
+            notify_workflow_scheduler(app_run_id) # Schedule the next level of the app run
+
+        if target_node.data['type'] != 'human' and not (task_operation == 'assign_task' and task_id):
+            # External running status 1: Running 2: Running successfully 3: Running failed
+            run_status = app_run_data.get('status', run['status'])
+            run_status = run_status if run_status == 1 else run_status - 1
+
+            if task_operation == 'assign_task' and not task_id:
+                first_task_exec_id = app_node_exec.get_first_recursive_task_execution_id(app_run_id, level, target_node.id)
+                node_exec_data['elapsed_time'] = app_node_exec.get_task_total_data(app_run_id, level, target_node.id)['total_elapsed_time']
+            else:
+                first_task_exec_id = 0
+
+            # Push a workflow debug message to the WebSocket message queue
+            push_workflow_debug_message(run['user_id'], run['app_id'], run['workflow_id'], app_run_id, run['type'], level, edge, target_node, run_status,
+                app_run_data['error'], app_run_data.get('completed_steps', completed_steps), app_run_data.get('actual_completed_steps', actual_completed_steps), app_run_data['need_human_confirm'],
+                app_run_data.get('elapsed_time', run['elapsed_time']), app_run_data.get('prompt_tokens', run['prompt_tokens']),
+                app_run_data.get('completion_tokens', run['completion_tokens']), app_run_data.get('total_tokens', run['total_tokens']),
+                app_run_data.get('embedding_tokens', run['embedding_tokens']), app_run_data.get('reranking_tokens', run['reranking_tokens']), run['total_steps'],
+                run['created_time'], app_run_data.get('finished_time', run['finished_time']), exec_id, parent_exec_id, first_task_exec_id, node_exec_data)
+
+            # if not task_operation or (task_operation == 'assign_task' and not task_id):
+            # Push workflow progress websocket message
+            push_workflow_progress_message(app_user_id, run['user_id'], run['app_id'], app_name, icon, icon_background, run['avatar'], run['workflow_id'], app_run_id, run['type'], run_name,
+                run_status, run['created_time'], run['total_steps'], app_run_data.get('elapsed_time', run['elapsed_time']), app_run_data.get('completed_steps', completed_steps),app_run_data['need_human_confirm'])
+
+            # Push a workflow need human confirm message to the WebSocket message queue
+            if (task_operation != 'assign_task' or (task_operation == 'assign_task' and not task_id)) and app_run_data['need_human_confirm'] == 1:
+                push_human_confirm_message(run['user_id'], run['app_id'], app_name, icon, icon_background, run['workflow_id'], app_run_id, run['type'], run_name, edge, target_node, 
+                    exec_id, node_exec_data['status'], parent_exec_id, first_task_exec_id)
+    except Exception as e:
+        logger.error(f"Error processing run:{app_run_id} {traceback.format_exc()}")
+        # Update records with failure status and error message if an exception occurred
+        redis.lpush(f'app_run_{app_run_id}_result', json.dumps({'status': 'failed', 'message': result['message']}))
+        redis.expire(f'app_run_{app_run_id}_result', 1)
+        update_app_run(app_run_id, {'status': 4, 'error': str(e), 'need_human_confirm': 1})
+
+    remove_task_cache(item)
 
 def task_callback_thread():
     """
     Handles task callbacks in a separate thread.
+    Finished tasks are reported by the Celery workers through the task done queue,
+    and all in-flight tasks are checked directly on every reconciliation sweep.
     """
     global running
+    done_task_ids = {}  # Finished task IDs mapped to the time they were reported
+    next_sweep_time = 0
     while running:
+        timeout = next_sweep_time - time.monotonic()
+        if done_task_ids:
+            # A task can finish before it is added to the global tasks list
+            timeout = min(timeout, 0.1)
+        try:
+            for task_id in wait_for_queue_items([f'{settings.WORKFLOW_TASK_DONE_QUEUE_KEY}:{scheduler_id}', settings.WORKFLOW_TASK_DONE_QUEUE_KEY], timeout):
+                done_task_ids.setdefault(task_id, time.monotonic())
+        except Exception:
+            logger.error(f"Error waiting for task done notifications {traceback.format_exc()}")
+            time.sleep(1)
+            next_sweep_time = 0
+
+        sweep = time.monotonic() >= next_sweep_time
+        if sweep:
+            next_sweep_time = time.monotonic() + settings.WORKFLOW_RECONCILE_INTERVAL
+            try:
+                adopt_orphaned_tasks()
+            except Exception:
+                logger.error(f"Error adopting orphaned tasks {traceback.format_exc()}")
+
         for item in list(global_tasks):
-            task, team_id, app_user_id, app_name, icon, icon_background, app_run_id, run_name, level, edge, target_node, context, exec_id, task_operation, parent_exec_id = item
-            if task.ready():
+            task, app_run_id = item[0], item[6]
+            if task.id in done_task_ids or (sweep and task.ready()):
+                done_task_ids.pop(task.id, None)
                 try:
-                    context = context if context else Context()  # Create a new context object if it does not exist
-                    result = task.get(timeout=task_timeout)  # Wait for the task to complete with a timeout
-                    current_time = datetime.now()  # Current timestamp
-                    logger.info(f"Task completed for run:{app_run_id} level:{level} node:{target_node.id}:{target_node.data['type']}:{target_node.data['title']} task_result:{result}")
-
-                    run = app_run.get_running_app_run(app_run_id)  # Retrieve the running app run record
-                    if not run:
-                        logger.error(f"App run not found for run:{app_run_id}")
-                        remove_task_cache(item)
-                        continue
-                    completed_edges = run['completed_edges'] if run['completed_edges'] else []  # Get completed edges
-                    completed_steps = run['completed_steps']  # Get completed steps
-                    actual_completed_steps = run['actual_completed_steps']  # Get actual completed steps
-
-                    if result['status'] == 'success':
-                        # Process successful execution result
-                        inputs = result['data'].get('inputs', None)
-                        task_id = result['data'].get('task_id', None)
-                        outputs = result['data'].get('outputs', None)
-                        elapsed_time = float(result['data'].get('elapsed_time', 0))
-                        prompt_tokens = result['data'].get('prompt_tokens', 0)
-                        completion_tokens = result['data'].get('completion_tokens', 0)
-                        total_tokens = result['data'].get('total_tokens', 0)
-                        embedding_tokens = result['data'].get('embedding_tokens', 0)
-                        reranking_tokens = result['data'].get('reranking_tokens', 0)
-
-                        if inputs:
-                            # Create input variable from input dictionary
-                            input = create_variable_from_dict(inputs)
-                            target_node.data['input'] = input  # Update target node with input variable
-                        if outputs:
-                            # Create output variable from result dictionary
-                            output = create_variable_from_dict(outputs)
-                            target_node.data['output'] = output  # Update target node with output variable
-                        if edge:
-                            if not task_operation or (task_operation == 'assign_task' and not task_id):
-                                completed_edges.append(edge.id)  # Add edge to completed edges
-                                completed_steps += 1  # Increment completed steps
-                                actual_completed_steps += 1  # Increment actual completed steps
-
-                        if (not task_operation or (task_operation == 'assign_task' and not task_id)) and (target_node.data.get('input') or target_node.data.get('output')):
-                            context.add_node(level, target_node)  # Add node to context
-
-                        need_human_confirm = 1 if target_node.data['type'] != 'human' and \
-                            not (task_operation == 'assign_task' and task_id) and \
-                            target_node.data.get('manual_confirmation', False) else 0
-                        node_exec_data = {'status': 3, 'error': None, 'need_human_confirm': need_human_confirm, 'finished_time': current_time, **result['data']}
-                        app_run_data = {
-                            'context': context.to_dict(),
-                            'completed_edges': completed_edges,
-                            'completed_steps': completed_steps,
-                            'actual_completed_steps': actual_completed_steps,
-                            'need_human_confirm': need_human_confirm,
-                            'error': None,
-                            'elapsed_time': float(run['elapsed_time']) + elapsed_time,
-                            'prompt_tokens': run['prompt_tokens'] + prompt_tokens,
-                            'completion_tokens': run['completion_tokens'] + completion_tokens,
-                            'total_tokens': run['total_tokens'] + total_tokens,
-                            'embedding_tokens': run['embedding_tokens'] + embedding_tokens,
-                            'reranking_tokens': run['reranking_tokens'] + reranking_tokens
-                        }
-                        if target_node.data['type'] == 'end':
-                            # If the target node is an end node, update the app run record with completion details
-                            app_run_data['outputs'] = outputs
-                            app_run_data['status'] = 3  # Status indicating the app run has completed successfully
-                            app_run_data['finished_time'] = current_time
-                            # Set completed_steps to total_steps when workflow ends
-                            app_run_data['completed_steps'] = run['total_steps']
-                            redis.lpush(f'app_run_{app_run_id}_result', json.dumps({'status': 'success', 'data': outputs}))
-                            redis.expire(f'app_run_{app_run_id}_result', 1)
-                        elif run['status'] == 2 and len(level_tasks[app_run_id][level]) == 1:  # Check if all tasks for the level have completed
-                            app_run_data['status'] = 1  # Status indicating the app run is still running
-                            app_run_data['need_correct_llm'] = 0 # Reset the need correct LLM flag
-                            if not task_operation or (task_operation == 'assign_task' and not task_id):
-                                app_run_data['level'] = level + 1 # Increment the level
-                    else:
-                        task_id = None
-                        node_exec_data = {'status': 4, 'error': result['message'], 'need_human_confirm': 1}
-                        app_run_data = {'status': 4, 'error': result['message'], 'need_human_confirm': 1}
-                        redis.lpush(f'app_run_{app_run_id}_result', json.dumps({'status': 'failed', 'message': result['message']}))
-                        redis.expire(f'app_run_{app_run_id}_result', 1)
-                        if run['type'] == 2:
-                            app_node_user_relation.add_node_user_relation(app_run_id, target_node.id, team_id, run['user_id'])
-
-                    update_node_exec(exec_id, node_exec_data) # Update the node execution record with the new data
-                    update_app_run(app_run_id, app_run_data) # Update the app run record with the new data
-
-                    if target_node.data['type'] != 'human' and not (task_operation == 'assign_task' and task_id):
-                        # External running status 1: Running 2: Running successfully 3: Running failed
-                        run_status = app_run_data.get('status', run['status'])
-                        run_status = run_status if run_status == 1 else run_status - 1
-
-                        if task_operation == 'assign_task' and not task_id:
-                            first_task_exec_id = app_node_exec.get_first_recursive_task_execution_id(app_run_id, level, target_node.id)
-                            node_exec_data['elapsed_time'] = app_node_exec.get_task_total_data(app_run_id, level, target_node.id)['total_elapsed_time']
-                        else:
-                            first_task_exec_id = 0
-
-                        # Push a workflow debug message to the WebSocket message queue
-                        push_workflow_debug_message(run['user_id'], run['app_id'], run['workflow_id'], app_run_id, run['type'], level, edge, target_node, run_status,
-                            app_run_data['error'], app_run_data.get('completed_steps', completed_steps), app_run_data.get('actual_completed_steps', actual_completed_steps), app_run_data['need_human_confirm'],
-                            app_run_data.get('elapsed_time', run['elapsed_time']), app_run_data.get('prompt_tokens', run['prompt_tokens']),
-                            app_run_data.get('completion_tokens', run['completion_tokens']), app_run_data.get('total_tokens', run['total_tokens']),
-                            app_run_data.get('embedding_tokens', run['embedding_tokens']), app_run_data.get('reranking_tokens', run['reranking_tokens']), run['total_steps'],
-                            run['created_time'], app_run_data.get('finished_time', run['finished_time']), exec_id, parent_exec_id, first_task_exec_id, node_exec_data)
-
-                        # if not task_operation or (task_operation == 'assign_task' and not task_id):
-                        # Push workflow progress websocket message
-                        push_workflow_progress_message(app_user_id, run['user_id'], run['app_id'], app_name, icon, icon_background, run['avatar'], run['workflow_id'], app_run_id, run['type'], run_name,
-                            run_status, run['created_time'], run['total_steps'], app_run_data.get('elapsed_time', run['elapsed_time']), app_run_data.get('completed_steps', completed_steps),app_run_data['need_human_confirm'])
-
-                        # Push a workflow need human confirm message to the WebSocket message queue
-                        if (task_operation != 'assign_task' or (task_operation == 'assign_task' and not task_id)) and app_run_data['need_human_confirm'] == 1:
-                            push_human_confirm_message(run['user_id'], run['app_id'], app_name, icon, icon_background, run['workflow_id'], app_run_id, run['type'], run_name, edge, target_node, 
-                                exec_id, node_exec_data['status'], parent_exec_id, first_task_exec_id)
-                except Exception as e:
-                    logger.error(f"Error processing run:{app_run_id} {traceback.format_exc()}")
-                    # Update records with failure status and error message if an exception occurred
-                    redis.lpush(f'app_run_{app_run_id}_result', json.dumps({'status': 'failed', 'message': result['message']}))
-                    redis.expire(f'app_run_{app_run_id}_result', 1)
-                    update_app_run(app_run_id, {'status': 4, 'error': str(e), 'need_human_confirm': 1})
-                    
-                remove_task_cache(item)
-                
-        time.sleep(1)
+                    owned = claim_run(app_run_id)
+                except Exception:
+                    logger.error(f"Error renewing lease for run:{app_run_id} {traceback.format_exc()}")
+                    continue
+                if not owned:
+                    logger.warning(f"Run:{app_run_id} is owned by another scheduler, dropping task:{task.id}")
+                    remove_task_cache(item, False)
+                    continue
+                process_task_result(item)
+                release_run(app_run_id)
+
+        if sweep:
+            # Forget notifications that never matched a task of this process
+            expired_time = time.monotonic() - settings.WORKFLOW_RECONCILE_INTERVAL
+            done_task_ids = {task_id: reported_time for task_id, reported_time in done_task_ids.items() if reported_time > expired_time}
 
 if __name__ == '__main__':
+    app_run.reflect_tables()
+
+    logger.info(f"Starting workflow scheduler:{scheduler_id}")
+
+    heartbeat_thread = threading.Thread(target=lease_heartbeat_thread, daemon=True)
+    heartbeat_thread.start()
+
+    message_thread = threading.Thread(target=websocket_message_thread, daemon=True)
+    message_thread.start()
+
     delay_thread = threading.Thread(target=task_delay_thread)
     delay_thread.start()
     
@@ -995,4 +1404,5 @@ if __name__ == '__main__':
         running = False
         delay_thread.join()
         callback_thread.join()
+        flush_websocket_messages()
         logger.debug("Program exited gracefully")
\ No newline at end of file
@@ -1,6 +1,7 @@
 /*
  * @LastEditors: biz
  */
+import { getDealtWithInfo } from '@/api/workflow';
 import useSocketStore from '@/store/websocket';
 import { checkViewInIframe, getIframeApiUrl, getIframeChatWsUrl, getIframeHostName, getProtocolIsHttps } from '@/utils/fullscreenStorage';
 import { useLatest, useWebSocket } from 'ahooks';
@@ -12,6 +13,23 @@ const URL = {
 };
 type ManagerType = 'chat' | 'dealt';
 
+// Large inputs and outputs are left out of node debug messages, fetch them from the node info API
+const loadOmittedNodeDetails = async (message: any) => {
+    const nodeExecData = message.data.node_exec_data;
+    const res = await getDealtWithInfo(nodeExecData.node_exec_id);
+    if (res?.code !== 0 || !res?.data) return;
+    const { inputs, outputs, outputs_md, file_list, prompt_data } = res.data;
+    const fullMessage = {
+        ...message,
+        data: {
+            ...message.data,
+            node_exec_data: { ...nodeExecData, inputs, outputs, outputs_md, file_list, prompt_data, details_omitted: 0 },
+        },
+    };
+    const { flowMessage, setFlowMessage } = useSocketStore.getState();
+    setFlowMessage(flowMessage.map(item => (item === message ? fullMessage : item)));
+};
+
 const useWebSocketManager = (type: ManagerType = 'dealt', listen?: Function) => {
     let url = URL[type];
     if(checkViewInIframe()){
@@ -39,6 +57,11 @@ const useWebSocketManager = (type: ManagerType = 'dealt', listen?: Function) =>
                     try {
                         const data = JSON.parse(message.data);
                         addFlowMessage(data);
+                        if (data?.type == 'workflow_run_debug' && data?.data?.node_exec_data?.details_omitted) {
+                            loadOmittedNodeDetails(data).catch(e => {
+                                console.error('Failed to load node details', data, e);
+                            });
+                        }
                     } catch (e) {
                         console.error('WebSocket format conversion error', message.data, e);
                     }
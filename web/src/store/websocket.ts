@@ -57,6 +57,8 @@ interface NodeExecData {
     embedding_tokens: number;
     /** Tokens generated during the run process with the reranking model */
     reranking_tokens: number;
+    /** 1: Inputs and outputs were too large for the message and are loaded from the node info API */
+    details_omitted?: number;
 }
 
 interface MessageObject {
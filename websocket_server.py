@@ -37,4 +37,4 @@ def start_queue_processor():
 app.add_event_handler("startup", start_queue_processor)
 
 if __name__ == "__main__":
-    uvicorn.run("websocket_server:app", host="0.0.0.0", port=settings.WEBSOCKET_PORT)
+    uvicorn.run("websocket_server:app", host="0.0.0.0", port=settings.WEBSOCKET_PORT, workers=settings.WEBSOCKET_WORKERS)